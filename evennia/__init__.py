@@ -99,6 +99,7 @@ SESSION_HANDLER = None
 TASK_HANDLER = None
 TICKER_HANDLER = None
 MONITOR_HANDLER = None
+OOB_STATE_HANDLER = None
 
 # Containers
 GLOBAL_SCRIPTS = None
@@ -153,7 +154,7 @@ def _init():
     global signals
     global settings, lockfuncs, logger, utils, gametime, ansi, spawn, managers
     global contrib, TICKER_HANDLER, MONITOR_HANDLER, SESSION_HANDLER
-    global TASK_HANDLER
+    global TASK_HANDLER, OOB_STATE_HANDLER
     global GLOBAL_SCRIPTS, OPTION_CLASSES
     global EvMenu, EvTable, EvForm, EvMore, EvEditor
     global ANSIString
@@ -182,6 +183,7 @@ def _init():
     from .scripts.models import ScriptDB
     from .scripts.monitorhandler import MONITOR_HANDLER
     from .scripts.scripts import DefaultScript
+    from .scripts.statehandler import OOB_STATE_HANDLER
     from .scripts.taskhandler import TASK_HANDLER
     from .scripts.tickerhandler import TICKER_HANDLER
     from .server import signals
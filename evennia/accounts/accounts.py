@@ -24,9 +24,11 @@ from django.utils.translation import gettext as _
 from evennia.accounts.manager import AccountManager
 from evennia.accounts.models import AccountDB
 from evennia.commands.cmdsethandler import CmdSetHandler
-from evennia.comms.models import ChannelDB
+from evennia.comms.models import ChannelDB, SubscriptionHandler
 from evennia.objects.models import ObjectDB
 from evennia.scripts.scripthandler import ScriptHandler
+from evennia.scripts.statehandler import OOB_STATE_HANDLER
+from evennia.server import shards
 from evennia.server.models import ServerConfig
 from evennia.server.signals import (
     SIGNAL_ACCOUNT_POST_CREATE,
@@ -130,6 +132,17 @@ class AccountSessionHandler(object):
         """
         return len(self.get())
 
+    def remote(self):
+        """
+        Get the sessions of this Account that are handled by other Server shards
+        (see `settings.SERVER_SHARDS`). These are not returned by `get`.
+
+        Returns:
+            sessids (list): The ids of the sessions.
+
+        """
+        return shards.remote_sessids(self.account.id)
+
 
 class DefaultAccount(AccountDB, metaclass=TypeclassBase):
     """
@@ -379,12 +392,15 @@ class DefaultAccount(AccountDB, metaclass=TypeclassBase):
         obj.account = self
         session.puid = obj.id
         session.puppet = obj
+        SubscriptionHandler.reset_online_cache()
 
         # re-cache locks to make sure superuser bypass is updated
         obj.locks.cache_lock_bypass(obj)
         # final hook
         obj.at_post_puppet()
         SIGNAL_OBJECT_POST_PUPPET.send(sender=obj, account=self, session=session)
+        # the puppet may be handled by another Server shard
+        shards.handoff_if_needed(obj)
 
     def unpuppet_object(self, session):
         """
@@ -404,8 +420,10 @@ class DefaultAccount(AccountDB, metaclass=TypeclassBase):
                 # do the disconnect, but only if we are the last session to puppet
                 obj.at_pre_unpuppet()
                 obj.sessions.remove(session)
+                OOB_STATE_HANDLER.unwatch(obj, session)
                 if not obj.sessions.count():
                     del obj.account
+                    SubscriptionHandler.reset_online_cache()
                 obj.at_post_unpuppet(self, session=session)
                 obj.tags.remove("puppeted", category="account")
                 SIGNAL_OBJECT_POST_UNPUPPET.send(sender=obj, session=session, account=self)
@@ -984,6 +1002,9 @@ class DefaultAccount(AccountDB, metaclass=TypeclassBase):
             kwargs["text"] = text
 
         # session relay
+        if not session and shards.SHARDED:
+            # our sessions on other Server shards
+            shards.msg_sessions(self.sessions.remote(), **kwargs)
         sessions = make_iter(session) if session else self.sessions.all()
         for session in sessions:
             session.data_out(**kwargs)
@@ -8,9 +8,11 @@ same inputs as the default one.
 
 
 import re
+from itertools import chain
 
 from django.conf import settings
 
+from evennia.commands.command import Command
 from evennia.utils.logger import log_trace
 
 _MULTIMATCH_REGEX = re.compile(settings.SEARCH_MULTIMATCH_REGEX, re.I + re.U)
@@ -46,6 +48,103 @@ def create_match(cmdname, string, cmdobj, raw_cmdname):
     return (cmdname, args, cmdobj, cmdlen, mratio, raw_cmdname)
 
 
+class CmdSetMatchIndex:
+    """
+    An index of the keys and aliases of the commands in a cmdset, used to find
+    the commands an input string may match by looking up the starts of the
+    string instead of testing every command in turn. It is built the first time
+    a cmdset is matched against and is then stored on it, so merged cmdsets
+    keep their index in the cmdhandler's merge cache.
+
+    Commands with their own `match` method can't be indexed and are always
+    tested.
+
+    """
+
+    def __init__(self, cmdset):
+        """
+        Build the index.
+
+        Args:
+            cmdset (CmdSet): The cmdset to index the commands of.
+
+        """
+        self.commands = cmdset.commands
+        self.ncommands = len(self.commands)
+        self.keyalias_changes = Command._keyalias_changes
+        # {name: [command position, ...]}, with and without the ignored prefixes
+        names, noprefix_names = {}, {}
+        # positions of the commands that must always be tested
+        self.always = []
+        for position, cmd in enumerate(self.commands):
+            if type(cmd).match is not Command.match:
+                self.always.append(position)
+                continue
+            for name in cmd._keyaliases:
+                names.setdefault(name, []).append(position)
+            for name in cmd._noprefix_aliases:
+                noprefix_names.setdefault(name, []).append(position)
+        self.names = names
+        self.noprefix_names = noprefix_names
+        self.maxlen = max((len(name) for name in chain(names, noprefix_names)), default=0)
+
+    def is_valid(self, cmdset):
+        """
+        Check if the index still reflects the commands of a cmdset.
+
+        Args:
+            cmdset (CmdSet): The cmdset the index was built for.
+
+        Returns:
+            bool: If the index can still be used.
+
+        """
+        return (
+            self.commands is cmdset.commands
+            and self.ncommands == len(cmdset.commands)
+            and self.keyalias_changes == Command._keyalias_changes
+        )
+
+    def candidates(self, search_string, include_prefixes=True):
+        """
+        Get the commands with a key or alias the search string starts with.
+
+        Args:
+            search_string (str): The lowercase input string.
+            include_prefixes (bool, optional): If the names with their ignored
+                prefixes (like @) should be used.
+
+        Returns:
+            list: The commands to test with `cmd.match`, in cmdset order.
+
+        """
+        names = self.names if include_prefixes else self.noprefix_names
+        positions = set(self.always)
+        for length in range(min(len(search_string), self.maxlen) + 1):
+            found = names.get(search_string[:length])
+            if found:
+                positions.update(found)
+        commands = self.commands
+        return [commands[position] for position in sorted(positions)]
+
+
+def get_match_index(cmdset):
+    """
+    Get the (cached) command name index of a cmdset.
+
+    Args:
+        cmdset (CmdSet): The cmdset.
+
+    Returns:
+        CmdSetMatchIndex: The index, rebuilt if the commands changed.
+
+    """
+    index = getattr(cmdset, "_match_index", None)
+    if index is None or not index.is_valid(cmdset):
+        index = cmdset._match_index = CmdSetMatchIndex(cmdset)
+    return index
+
+
 def build_matches(raw_string, cmdset, include_prefixes=False):
     """
     Build match tuples by matching raw_string against available commands.
@@ -67,7 +166,7 @@ def build_matches(raw_string, cmdset, include_prefixes=False):
         if not include_prefixes and len(raw_string) > 1:
             raw_string = raw_string.lstrip(_CMD_IGNORE_PREFIXES)
         search_string = raw_string.lower()
-        for cmd in cmdset:
+        for cmd in get_match_index(cmdset).candidates(search_string, include_prefixes):
             cmdname, raw_cmdname = cmd.match(search_string, include_prefixes=include_prefixes)
             if cmdname:
                 matches.append(create_match(cmdname, raw_string, cmd, raw_cmdname))
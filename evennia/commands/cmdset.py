@@ -214,6 +214,8 @@ class CmdSet(object, metaclass=_CmdSetMeta):
             self.key = key
         self.commands = []
         self.system_commands = []
+        # index of the command names, built by the cmdparser when first matching
+        self._match_index = None
         self.actual_mergetype = self.mergetype
         self.cmdsetobj = cmdsetobj
         # this is set only on merged sets, in cmdhandler.py, in order to
@@ -562,6 +564,7 @@ class CmdSet(object, metaclass=_CmdSetMeta):
             # extra run to make sure to avoid doublets
             commands = list(set(commands))
         self.commands = commands
+        self._match_index = None
 
     def remove(self, cmd):
         """
@@ -591,6 +594,7 @@ class CmdSet(object, metaclass=_CmdSetMeta):
                 pass
         else:
             self.commands = [oldcmd for oldcmd in self.commands if oldcmd != cmd]
+            self._match_index = None
 
     def get(self, cmd):
         """
@@ -672,6 +676,7 @@ class CmdSet(object, metaclass=_CmdSetMeta):
             else:
                 unique[cmd.key] = cmd
         self.commands = list(unique.values())
+        self._match_index = None
 
     def get_all_cmd_keys_and_aliases(self, caller=None):
         """
@@ -213,6 +213,10 @@ class Command(metaclass=CommandMeta):
     #   session - which session is responsible for triggering this command. Only set
     #             if triggered by an account.
 
+    # counts key/alias changes made with set_key/set_aliases, invalidating the
+    # cmdparser's command name indexes
+    _keyalias_changes = 0
+
     def __init__(self, **kwargs):
         """
         The lockhandler works the same as for objects.
@@ -322,6 +326,7 @@ class Command(metaclass=CommandMeta):
         """
         self.key = new_key.lower()
         self._optimize()
+        Command._keyalias_changes += 1
 
     def set_aliases(self, new_aliases):
         """
@@ -342,6 +347,7 @@ class Command(metaclass=CommandMeta):
         aliases = (str(alias).strip().lower() for alias in make_iter(new_aliases))
         self.aliases = list(set(alias for alias in aliases if alias != self.key))
         self._optimize()
+        Command._keyalias_changes += 1
 
     def match(self, cmdname, include_prefixes=True):
         """
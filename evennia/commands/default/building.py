@@ -15,6 +15,7 @@ from evennia.prototypes import menus as olc_menus
 from evennia.prototypes import prototypes as protlib
 from evennia.prototypes import spawner
 from evennia.scripts.models import ScriptDB
+from evennia.typeclasses.attributes import preload_attributes
 from evennia.utils import create, funcparser, logger, search, utils
 from evennia.utils.ansi import raw as ansi_raw
 from evennia.utils.dbserialize import deserialize
@@ -3253,6 +3254,11 @@ class ScriptEvMore(EvMore):
         if not scripts:
             return "<No scripts>"
 
+        # scripts without a running timer show their paused time; load it for
+        # the whole page at once rather than script by script
+        scripts = list(scripts)
+        preload_attributes(scripts, "_paused_time")
+
         table = EvTable(
             "|wdbref|n",
             "|wobj|n",
@@ -55,6 +55,7 @@ class CmdChannel(COMMAND_DEFAULT_CLASS):
       channel/unalias alias
       channel/who channelname
       channel/history channelname [= index]
+      channel/search channelname = text
       channel/sub channelname [= alias[;alias...]]
       channel/unsub channelname[,channelname, ...]
       channel/mute channelname[,channelname,...]
@@ -138,6 +139,13 @@ class CmdChannel(COMMAND_DEFAULT_CLASS):
     will go back 35 lines and show the previous 20 lines from that point (so
     lines -35 to -55).
 
+    ## search
+
+    Usage: channel/search channel = text
+
+    Show the last |c20|n messages in the channel history containing the given
+    text. This only works for channels storing their history in the database.
+
     ## sub and unsub
 
     Usage: channel/sub channel [=alias[;alias;...]]
@@ -220,6 +228,7 @@ class CmdChannel(COMMAND_DEFAULT_CLASS):
         "list",
         "all",
         "history",
+        "search",
         "sub",
         "unsub",
         "mute",
@@ -331,7 +340,11 @@ class CmdChannel(COMMAND_DEFAULT_CLASS):
                 all channel messaging hooks for custom overriding.
 
         """
-        caller = self.caller
+        if channel.store_history:
+            messages = channel.get_history(offset=start_index, nlines=20)
+            self.msg("\n".join(message.get_display_text() for message in messages))
+            return
+
         log_file = channel.get_log_filename()
 
         def send_msg(lines):
@@ -342,6 +355,24 @@ class CmdChannel(COMMAND_DEFAULT_CLASS):
         # asynchronously tail the log file
         tail_log_file(log_file, start_index, 20, callback=send_msg)
 
+    def search_channel_history(self, channel, freetext):
+        """
+        Search a channel's stored history for messages containing a text.
+
+        Args:
+            channel (Channel): The channel to search.
+            freetext (str): The text to search for.
+
+        """
+        if not channel.store_history:
+            self.msg(f"Channel {channel.key} doesn't store a searchable history.")
+            return
+        messages = channel.get_history(nlines=20, freetext=freetext)
+        if not messages:
+            self.msg(f"No messages in {channel.key} history contain '{freetext}'.")
+            return
+        self.msg("\n".join(message.get_display_text() for message in messages))
+
     def sub_to_channel(self, channel):
         """
         Subscribe to a channel. Note that all permissions should
@@ -991,6 +1022,14 @@ class CmdChannel(COMMAND_DEFAULT_CLASS):
             self.get_channel_history(channel, start_index=index)
             return
 
+        if "search" in switches:
+            # search channel history
+            if not self.rhs:
+                self.msg("Usage: channel/search channelname = text")
+                return
+            self.search_channel_history(channel, self.rhs)
+            return
+
         if "sub" in switches:
             # subscribe to a channel
             aliases = []
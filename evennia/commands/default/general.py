@@ -367,8 +367,13 @@ class CmdInventory(COMMAND_DEFAULT_CLASS):
         if not items:
             string = "You are not carrying anything."
         else:
+            from evennia.typeclasses.attributes import preload_attributes
+            from evennia.typeclasses.tags import preload_tags
             from evennia.utils.ansi import raw as raw_ansi
 
+            # load what we show of all items at once, rather than item by item
+            preload_attributes(items, "desc")
+            preload_tags(items, tagtype="alias")
             table = self.styled_table(border="header")
             for item in items:
                 singular, _ = item.get_numbered_name(1, self.caller)
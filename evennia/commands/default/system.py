@@ -741,6 +741,8 @@ class CmdServerLoad(COMMAND_DEFAULT_CLASS):
     Switches:
         mem - return only a string of the current memory usage
         flushmem - flush the idmapper cache
+        footprint - estimate memory held per entity type, typeclass and
+                    handler, and the change since the last footprint
 
     This command shows server load statistics and dynamic memory
     usage. It also allows to flush the cache of accessed database
@@ -766,11 +768,17 @@ class CmdServerLoad(COMMAND_DEFAULT_CLASS):
     caches may not show you a lower Residual/Virtual memory footprint,
     the released memory will instead be re-used by the program.
 
+    The |wfootprint|n switch walks the object cache and estimates how
+    much memory each database model, typeclass and handler cache (like
+    Attributes, Tags and ndb) holds on to. This can be slow on a big
+    cache. Running it again shows what changed since the last time,
+    which helps to find what is leaking memory.
+
     """
 
     key = "@server"
     aliases = ["@serverload"]
-    switch_options = ("mem", "flushmem")
+    switch_options = ("mem", "flushmem", "footprint")
     locks = "cmd:perm(list) or perm(Developer)"
     help_category = "System"
 
@@ -793,6 +801,10 @@ class CmdServerLoad(COMMAND_DEFAULT_CLASS):
             self.caller.msg(string.format(idmapper=(prev - now), gc=nflushed))
             return
 
+        if "footprint" in self.switches:
+            self.show_footprint()
+            return
+
         # display active processes
 
         os_windows = os.name == "nt"
@@ -903,6 +915,45 @@ class CmdServerLoad(COMMAND_DEFAULT_CLASS):
         # return to caller
         self.caller.msg(string)
 
+    def show_footprint(self):
+        """
+        Show the estimated memory footprint of the idmapper cache and how
+        it changed since the previous call.
+
+        """
+        from evennia.server.profiling import footprint
+
+        snapshot = footprint.take_snapshot()
+        previous = footprint.store_snapshot(snapshot)
+        diff = snapshot.diff(previous) if previous else None
+
+        string = "|wEstimated idmapper cache footprint:|n %i items, %.1f KB" % (
+            snapshot.total_count,
+            snapshot.total_size / 1024,
+        )
+        if diff:
+            string += " (%+.1f KB since %s ago)" % (
+                diff.total_size / 1024,
+                utils.time_format(snapshot.timestamp - previous.timestamp, style=1),
+            )
+        for category, title in (
+            ("models", "entity"),
+            ("typeclasses", "typeclass"),
+            ("handlers", "handler cache"),
+        ):
+            table = self.styled_table(title, "number", "size (KB)", "change (KB)", align="l")
+            changes = getattr(diff, category) if diff else {}
+            for name, num, size in snapshot.top(category):
+                change = changes.get(name, {}).get("size")
+                table.add_row(
+                    name,
+                    "%i" % num,
+                    "%.1f" % (size / 1024),
+                    "%+.1f" % (change / 1024) if change is not None else "-",
+                )
+            string += "\n%s" % table
+        self.caller.msg(string)
+
 
 class CmdTickers(COMMAND_DEFAULT_CLASS):
     """
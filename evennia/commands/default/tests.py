@@ -11,6 +11,7 @@ main test suite started with
  > python game/manage.py test.
 
 """
+
 import datetime
 from unittest.mock import MagicMock, Mock, patch
 
@@ -341,6 +342,10 @@ class TestSystem(BaseEvenniaCommandTest):
     def test_server_load(self):
         self.call(system.CmdServerLoad(), "", "Server CPU and Memory load:")
 
+    def test_server_footprint(self):
+        self.call(system.CmdServerLoad(), "/footprint", "Estimated idmapper cache footprint:")
+        self.call(system.CmdServerLoad(), "/footprint", "Estimated idmapper cache footprint:")
+
 
 _TASK_HANDLER = None
 
@@ -1859,6 +1864,26 @@ class TestCommsChannel(BaseEvenniaCommandTest):
             self.call(self.cmdchannel(), "/history testchannel", "")
             mock_tail.assert_called()
 
+    def test_channel__history_stored(self):
+        self.channel.store_history = True
+        self.channel.msg("Hello", senders=self.char1)
+        self.channel.msg("Goodbye", senders=self.char1)
+        with patch("evennia.commands.default.comms.tail_log_file") as mock_tail:
+            ret = self.call(self.cmdchannel(), "/history testchannel = 1")
+            mock_tail.assert_not_called()
+        self.assertIn(f"{self.char1.key}: Hello", ret)
+        self.assertNotIn("Goodbye", ret)
+
+    def test_channel__search(self):
+        self.call(self.cmdchannel(), "/search testchannel = bye", "Channel testchannel doesn't")
+        self.channel.store_history = True
+        self.channel.msg("Hello", senders=self.char1)
+        self.channel.msg("Goodbye", senders=self.char1)
+        ret = self.call(self.cmdchannel(), "/search testchannel = bye")
+        self.assertIn(f"{self.char1.key}: Goodbye", ret)
+        self.assertNotIn("Hello", ret)
+        self.call(self.cmdchannel(), "/search testchannel = foo", "No messages in testchannel")
+
     def test_channel__sub(self):
         self.channel.disconnect(self.char1)
 
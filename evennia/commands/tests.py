@@ -1173,6 +1173,37 @@ class TestCmdParser(TestCase):
             [("the third command", "", bcmd, 17, 1.0, "&the third command")],
         )
 
+    def test_match_index(self):
+        class _CmdCustomMatch(AccessableCommand):
+            key = "custom"
+
+            def match(self, cmdname, include_prefixes=True):
+                return ("custom", "custom") if cmdname.endswith("!") else (None, None)
+
+        a_cmdset = _CmdSetTest()
+        test1, test3 = a_cmdset.get(_CmdTest1), a_cmdset.get(_CmdTest3)
+        index = cmdparser.get_match_index(a_cmdset)
+        self.assertEqual(index.candidates("test1 rock"), [test1])
+        self.assertEqual(index.candidates("the third command"), [])
+        self.assertEqual(index.candidates("the third command", include_prefixes=False), [test3])
+        self.assertEqual(index.candidates("nothing"), [])
+        # the index is kept until the commands change
+        self.assertIs(cmdparser.get_match_index(a_cmdset), index)
+
+        a_cmdset.add(_CmdTest4)
+        a_cmdset.add(_CmdCustomMatch)
+        index = cmdparser.get_match_index(a_cmdset)
+        test4 = a_cmdset.get(_CmdTest4)
+        custom = a_cmdset.get(_CmdCustomMatch)
+        self.assertEqual(set(index.candidates("test2")), {test4, custom})
+        matched = [match[2] for match in cmdparser.build_matches("test2", a_cmdset)]
+        self.assertEqual(matched, [test4])
+        matched = [match[2] for match in cmdparser.build_matches("hey!", a_cmdset)]
+        self.assertEqual(matched, [custom])
+
+        test4.set_aliases(["foo"])
+        self.assertEqual(cmdparser.build_matches("foo bar", a_cmdset)[0][2], test4)
+
     @override_settings(SEARCH_MULTIMATCH_REGEX=r"(?P<number>[0-9]+)-(?P<name>.*)")
     def test_num_differentiators(self):
         self.assertEqual(cmdparser.try_num_differentiators("look me"), (None, None))
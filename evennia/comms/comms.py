@@ -2,16 +2,65 @@
 Base typeclass for in-game Channels.
 
 """
+
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
 from django.utils.text import slugify
 
 from evennia.comms.managers import ChannelManager
-from evennia.comms.models import ChannelDB
+from evennia.comms.models import ChannelDB, ChannelMessage
+from evennia.server import shards
 from evennia.typeclasses.models import TypeclassBase
 from evennia.utils import create, logger
 from evennia.utils.utils import make_iter
 
+_DEFAULT_ACCOUNT = None
+_DEFAULT_OBJECT = None
+_SESSIONS = None
+
+# receiver methods which, if not overridden from DefaultAccount, allow a channel
+# to format a message once for many receivers and send it to them all at once
+_BULK_RECEIVER_METHODS = (
+    "at_pre_channel_msg",
+    "channel_msg",
+    "at_post_channel_msg",
+    "msg",
+    "at_msg_receive",
+)
+# {class: bool} caching the check above
+_BULK_RECEIVER_CLASSES = {}
+
+
+def _can_bulk_receive(receiver):
+    """
+    Check if a channel message to this receiver can be formatted and sent in
+    bulk. This is the case for Accounts that don't customize how they receive
+    channel messages.
+
+    Args:
+        receiver (Account or Object): A channel subscriber.
+
+    Returns:
+        bool: If the receiver uses the default DefaultAccount receive hooks.
+
+    """
+    global _DEFAULT_ACCOUNT
+    if not _DEFAULT_ACCOUNT:
+        from evennia.accounts.accounts import DefaultAccount as _DEFAULT_ACCOUNT
+
+    cls = type(receiver)
+    can_bulk = _BULK_RECEIVER_CLASSES.get(cls)
+    if can_bulk is None:
+        can_bulk = _BULK_RECEIVER_CLASSES[cls] = issubclass(cls, _DEFAULT_ACCOUNT) and all(
+            getattr(cls, methodname) is getattr(_DEFAULT_ACCOUNT, methodname)
+            for methodname in _BULK_RECEIVER_METHODS
+        )
+    # methods may also be replaced on the instance
+    return can_bulk and not any(
+        methodname in receiver.__dict__ for methodname in _BULK_RECEIVER_METHODS
+    )
+
 
 class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
     """
@@ -26,6 +75,9 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
       will be replaced by the key of the Channel. If an Attribute 'log_file'
       is set, this will be used instead. If this is None and no Attribute is found,
       no history will be saved.
+    - `store_history` (bool, default `settings.CHANNEL_HISTORY_STORE`) - if set, messages
+      are also stored in the database, so the history can be searched by time, sender
+      and text with `.get_history()`.
     - `channel_prefix_string` (str, default `"[{channelname} ]"`) - this is used
       as a simple template to get the channel prefix with `.channel_prefix()`. It is used
       in front of every channel message; use `{channelmessage}` token to insert the
@@ -59,6 +111,8 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
     # store log in log file. `channel_key tag will be replace with key of channel.
     # Will use log_file Attribute first, if given
     log_file = "channel_{channelname}.log"
+    # also store messages in the database, for searching the history
+    store_history = settings.CHANNEL_HISTORY_STORE
     # which prefix to use when showing were a message is coming from. Set to
     # None to disable and set this later.
     channel_prefix_string = "[{channelname}] "
@@ -67,6 +121,9 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
     channel_msg_nick_pattern = r"{alias}\s*?|{alias}\s+?(?P<arg1>.+?)"
     channel_msg_nick_replacement = "channel {channelname} = $1"
 
+    # {"mute_list"/"ban_list": (stored value, set of entities)}, see _get_listed
+    _listed_cache = None
+
     def at_first_save(self):
         """
         Called by the typeclass system the very first time the channel
@@ -175,10 +232,51 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
     def banlist(self):
         return self.db.ban_list or []
 
+    def _get_listed(self, attrname):
+        """
+        Get the entities in the mute or ban list as a set, without unpacking
+        the stored list every time it's checked.
+
+        Args:
+            attrname (str): `"mute_list"` or `"ban_list"`.
+
+        Returns:
+            set: The listed entities.
+
+        Notes:
+            `mute`, `unmute`, `ban` and `unban` update the set. It's also
+            rebuilt if the stored list was changed in other ways (like by
+            setting `db.mute_list`, or by another Server shard).
+
+        """
+        if self._listed_cache is None:
+            self._listed_cache = {}
+        attr = self.attributes.get(attrname, return_obj=True)
+        stored = attr.db_value if attr else None
+        cached = self._listed_cache.get(attrname)
+        if cached is None or cached[0] is not stored:
+            listed = set(attr.value or []) if attr else set()
+            cached = self._listed_cache[attrname] = (stored, listed)
+        return cached[1]
+
+    def _update_listed(self, attrname, listed):
+        """
+        Store the new mute or ban list in the cache used by `_get_listed`.
+
+        Args:
+            attrname (str): `"mute_list"` or `"ban_list"`.
+            listed (list): The entities now in the list.
+
+        """
+        if self._listed_cache is None:
+            self._listed_cache = {}
+        attr = self.attributes.get(attrname, return_obj=True)
+        self._listed_cache[attrname] = (attr.db_value if attr else None, set(listed))
+
     @property
     def wholist(self):
         subs = self.subscriptions.all()
-        muted = list(self.mutelist)
+        muted = self._get_listed("mute_list")
         listening = [ob for ob in subs if ob.is_connected and ob not in muted]
         if subs:
             # display listening subscribers in bold
@@ -212,6 +310,7 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
         if subscriber not in mutelist:
             mutelist.append(subscriber)
             self.db.mute_list = mutelist
+            self._update_listed("mute_list", mutelist)
             return True
         return False
 
@@ -233,6 +332,7 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
         mutelist = self.mutelist
         if subscriber in mutelist:
             mutelist.remove(subscriber)
+            self._update_listed("mute_list", mutelist)
             return True
         return False
 
@@ -256,6 +356,7 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
         if target not in banlist:
             banlist.append(target)
             self.db.ban_list = banlist
+            self._update_listed("ban_list", banlist)
             return True
         return False
 
@@ -278,6 +379,7 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
         if target in banlist:
             banlist = [banned for banned in banlist if banned != target]
             self.db.ban_list = banlist
+            self._update_listed("ban_list", banlist)
             return True
         return False
 
@@ -297,7 +399,7 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
 
         """
         # check access
-        if subscriber in self.banlist or not self.access(subscriber, "listen"):
+        if subscriber in self._get_listed("ban_list") or not self.access(subscriber, "listen"):
             return False
         # pre-join hook
         connect = self.pre_join_channel(subscriber)
@@ -564,6 +666,11 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
             (where the senders/bypass_mute are embedded into **kwargs for
             later access in hooks)
 
+            Accounts that don't override any of their channel-receive hooks
+            (nor `msg`/`at_msg_receive`) are grouped by how they see the
+            names of the senders. The message is then only formatted once per
+            group and sent to all the group's sessions with a single call.
+
         """
         senders = make_iter(senders) if senders else []
         if self.send_to_online_only:
@@ -571,7 +678,9 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
         else:
             receivers = self.subscriptions.all()
         if not bypass_mute:
-            receivers = [receiver for receiver in receivers if receiver not in self.mutelist]
+            muted = self._get_listed("mute_list")
+            if muted:
+                receivers = [receiver for receiver in receivers if receiver not in muted]
 
         send_kwargs = {"senders": senders, "bypass_mute": bypass_mute, **kwargs}
 
@@ -580,13 +689,17 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
         if message in (None, False):
             return
 
+        receivers = self._bulk_msg(message, receivers, send_kwargs)
+
         for receiver in receivers:
             # send to each individual subscriber
 
             try:
                 recv_message = receiver.at_pre_channel_msg(message, self, **send_kwargs)
                 if recv_message in (None, False):
-                    return
+                    # only skips this receiver (this used to abort the rest of
+                    # the send, including at_post_msg)
+                    continue
 
                 receiver.channel_msg(recv_message, self, **send_kwargs)
 
@@ -598,6 +711,74 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
         # post-send hook
         self.at_post_msg(message, **send_kwargs)
 
+    def _bulk_msg(self, message, receivers, send_kwargs):
+        """
+        Send a message to all receivers that can receive it in bulk.
+
+        Args:
+            message (str): The message to send.
+            receivers (list): All receivers.
+            send_kwargs (dict): The kwargs to pass to the hooks.
+
+        Returns:
+            list: The receivers that must be sent to one by one.
+
+        """
+        global _DEFAULT_ACCOUNT, _DEFAULT_OBJECT, _SESSIONS
+        if not _SESSIONS:
+            from evennia.accounts.accounts import DefaultAccount as _DEFAULT_ACCOUNT
+            from evennia.objects.objects import DefaultObject as _DEFAULT_OBJECT
+            from evennia.server.sessionhandler import SESSIONS as _SESSIONS
+
+        senders = send_kwargs["senders"]
+        for sender in senders:
+            if getattr(type(sender), "at_msg_send", None) not in (
+                _DEFAULT_ACCOUNT.at_msg_send,
+                _DEFAULT_OBJECT.at_msg_send,
+            ):
+                # senders must be told about every receiver
+                return receivers
+
+        remaining = []
+        # {sender names as seen by the receivers: [receivers]}
+        variants = {}
+        for receiver in receivers:
+            if _can_bulk_receive(receiver):
+                variant = tuple(sender.get_display_name(receiver) for sender in senders)
+                variants.setdefault(variant, []).append(receiver)
+            else:
+                remaining.append(receiver)
+
+        for variant_receivers in variants.values():
+            try:
+                # all these receivers would format the message the same way
+                recv_message = variant_receivers[0].at_pre_channel_msg(message, self, **send_kwargs)
+                if recv_message in (None, False):
+                    # skip this group only, like for a single receiver in msg
+                    continue
+                sessions = [
+                    session for receiver in variant_receivers for session in receiver.sessions.all()
+                ]
+                _SESSIONS.data_out_many(
+                    sessions,
+                    text=(recv_message, {"from_channel": self.id}),
+                    options={"from_channel": self.id},
+                )
+                if shards.SHARDED:
+                    # receivers with sessions on other Server shards
+                    shards.msg_sessions(
+                        [
+                            sessid
+                            for receiver in variant_receivers
+                            for sessid in receiver.sessions.remote()
+                        ],
+                        text=(recv_message, {"from_channel": self.id}),
+                        options={"from_channel": self.id},
+                    )
+            except Exception:
+                logger.log_trace(f"Error sending channel message to {variant_receivers}.")
+        return remaining
+
     def at_post_msg(self, message, **kwargs):
         """
         This is called after sending to *all* valid recipients. It is normally
@@ -613,8 +794,43 @@ class DefaultChannel(ChannelDB, metaclass=TypeclassBase):
         if log_file:
             senders = ",".join(sender.key for sender in kwargs.get("senders", []))
             senders = f"{senders}: " if senders else ""
-            message = f"{senders}{message}"
-            logger.log_file(message, log_file)
+            logger.log_file(f"{senders}{message}", log_file)
+        if self.store_history:
+            # save channel history to database
+            ChannelMessage.objects.add_message(self, message, senders=kwargs.get("senders"))
+
+    def get_history(
+        self, offset=0, nlines=20, start=None, end=None, sender=None, freetext=None, **kwargs
+    ):
+        """
+        Get messages from the channel's stored history. This requires
+        `store_history` to be set on the channel.
+
+        Args:
+            offset (int, optional): How many of the latest matching messages to
+                skip, for paging back in time.
+            nlines (int, optional): The max number of messages to get.
+            start (datetime, optional): Only get messages sent at or after this time.
+            end (datetime, optional): Only get messages sent before this time.
+            sender (Object, Account or Script, optional): Only get messages
+                sent by this entity.
+            freetext (str, optional): Only get messages containing this text.
+            **kwargs: Unused by default.
+
+        Returns:
+            list: The matching `ChannelMessage`s, oldest first. Use their
+            `.get_display_text()` to show them.
+
+        """
+        return ChannelMessage.objects.search_history(
+            self,
+            start=start,
+            end=end,
+            sender=sender,
+            freetext=freetext,
+            offset=offset,
+            limit=nlines,
+        )
 
     def pre_join_channel(self, joiner, **kwargs):
         """
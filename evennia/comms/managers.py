@@ -4,8 +4,8 @@ Comm system components.
 
 """
 
-
 from django.conf import settings
+from django.db import models
 from django.db.models import Q
 
 from evennia.server import signals
@@ -505,3 +505,92 @@ class ChannelManager(ChannelDBManager, TypeclassManager):
     """
 
     pass
+
+
+#
+# Channel history manager
+#
+
+
+class ChannelMessageManager(models.Manager):
+    """
+    This ChannelMessageManager implements methods for storing and querying
+    the message history of channels. This is accessed as
+    `ChannelMessage.objects`.
+
+    """
+
+    def add_message(self, channel, message, senders=None):
+        """
+        Store a message in a channel's history.
+
+        Args:
+            channel (Channel): The channel the message was sent to.
+            message (str): The message.
+            senders (Object, Account, Script or list, optional): The sender(s).
+                Only the first sender is stored for searching by sender, but
+                the names of all of them are stored.
+
+        Returns:
+            ChannelMessage: The new history entry.
+
+        """
+        senders = make_iter(senders) if senders else []
+        sender_type, sender_id = "", None
+        if senders:
+            sender, typ = identify_object(senders[0])
+            if typ in ("account", "object", "script"):
+                sender_type, sender_id = typ, sender.id
+        return self.create(
+            db_channel_id=channel.id,
+            db_sender_type=sender_type,
+            db_sender_id=sender_id,
+            db_sender_names=",".join(getattr(sender, "key", str(sender)) for sender in senders),
+            db_message=message,
+        )
+
+    def search_history(
+        self, channel, start=None, end=None, sender=None, freetext=None, offset=0, limit=20
+    ):
+        """
+        Get a page of a channel's message history.
+
+        Args:
+            channel (Channel): The channel.
+            start (datetime, optional): Only get messages sent at or after this time.
+            end (datetime, optional): Only get messages sent before this time.
+            sender (Object, Account or Script, optional): Only get messages
+                sent by this entity.
+            freetext (str, optional): Only get messages containing this text
+                (case-insensitive).
+            offset (int, optional): How many of the latest matching messages to
+                skip, for paging backwards in time.
+            limit (int, optional): The max number of messages to get.
+
+        Returns:
+            list: The matching `ChannelMessage`s, oldest first.
+
+        Notes:
+            The query uses the database indexes on channel and time (and
+            sender), so the cost doesn't grow with the size of the history;
+            a `freetext` search only needs to scan as far back as it takes
+            to fill the page.
+
+        """
+        query = Q(db_channel_id=channel.id)
+        if start:
+            query &= Q(db_date_created__gte=start)
+        if end:
+            query &= Q(db_date_created__lt=end)
+        if sender:
+            sender, typ = identify_object(sender)
+            query &= Q(db_sender_type=typ or "", db_sender_id=getattr(sender, "id", None))
+        if freetext:
+            query &= Q(db_message__icontains=freetext)
+        offset = max(0, offset)
+        # newest first, matching the (channel, time) index; the id breaks ties
+        messages = list(
+            self.filter(query).order_by("-db_date_created", "-id")[offset : offset + limit]
+        )
+        messages.reverse()
+        return messages
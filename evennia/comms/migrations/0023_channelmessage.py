@@ -0,0 +1,67 @@
+# Generated by Django 4.1.13 on 2026-10-19 09:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comms", "0022_defaultchannel_alter_channeldb_id_alter_msg_id_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChannelMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "db_date_created",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False, verbose_name="date sent"
+                    ),
+                ),
+                (
+                    "db_sender_type",
+                    models.CharField(blank=True, max_length=16, verbose_name="sender type"),
+                ),
+                (
+                    "db_sender_id",
+                    models.PositiveIntegerField(blank=True, null=True, verbose_name="sender id"),
+                ),
+                ("db_sender_names", models.TextField(blank=True, verbose_name="sender names")),
+                ("db_message", models.TextField(verbose_name="message")),
+                (
+                    "db_channel",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="history_messages",
+                        to="comms.channeldb",
+                        verbose_name="channel",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Channel Message",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="channelmessage",
+            index=models.Index(
+                fields=["db_channel", "db_date_created"], name="comms_chann_db_chan_659577_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="channelmessage",
+            index=models.Index(
+                fields=["db_channel", "db_sender_type", "db_sender_id"],
+                name="comms_chann_db_chan_6eb339_idx",
+            ),
+        ),
+    ]
@@ -18,6 +18,7 @@ connect to channels by use of a ChannelConnect object (this object is
 necessary to easily be able to delete connections on the fly).
 
 """
+
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
@@ -29,7 +30,7 @@ from evennia.typeclasses.tags import Tag, TagHandler
 from evennia.utils.idmapper.models import SharedMemoryModel
 from evennia.utils.utils import crop, lazy_property, make_iter
 
-__all__ = ("Msg", "TempMsg", "ChannelDB", "SubscriptionHandler")
+__all__ = ("Msg", "TempMsg", "ChannelDB", "SubscriptionHandler", "ChannelMessage")
 
 
 _GA = object.__getattribute__
@@ -177,6 +178,7 @@ class Msg(SharedMemoryModel):
 
     class Meta(object):
         "Define Django meta options"
+
         verbose_name = "Msg"
 
     @lazy_property
@@ -526,6 +528,10 @@ class SubscriptionHandler(object):
 
     """
 
+    # bumped by `reset_online_cache` to make all handlers recompute their
+    # online subscribers
+    _online_version = 0
+
     def __init__(self, obj):
         """
         Initialize the handler
@@ -536,8 +542,21 @@ class SubscriptionHandler(object):
         """
         self.obj = obj
         self._cache = None
+        self._online_cache = None
+        self._online_cache_version = None
+
+    @staticmethod
+    def reset_online_cache():
+        """
+        Make all channels recompute which of their subscribers are online. This
+        is called whenever an account connects/disconnects or a puppet changes
+        hands.
+
+        """
+        SubscriptionHandler._online_version += 1
 
     def _recache(self):
+        self._online_cache = None
         self._cache = {
             account: True
             for account in self.obj.db_account_subscriptions.all()
@@ -633,7 +652,18 @@ class SubscriptionHandler(object):
         Returns:
             subscribers (list): Subscribers who are online or
                 are puppeted by an online account.
+
+        Notes:
+            The result is cached until the subscriptions change or an account
+            connects/disconnects or puppets/unpuppets (see `reset_online_cache`).
+
         """
+        if (
+            self._online_cache is not None
+            and self._online_cache_version == SubscriptionHandler._online_version
+        ):
+            return list(self._online_cache)
+        online_version = SubscriptionHandler._online_version
         subs = []
         recache_needed = False
         for obj in self.all():
@@ -652,7 +682,9 @@ class SubscriptionHandler(object):
             subs.append(obj)
         if recache_needed:
             self._recache()
-        return subs
+        self._online_cache = subs
+        self._online_cache_version = online_version
+        return list(subs)
 
     def clear(self):
         """
@@ -662,6 +694,7 @@ class SubscriptionHandler(object):
         self.obj.db_account_subscriptions.clear()
         self.obj.db_object_subscriptions.clear()
         self._cache = None
+        self._online_cache = None
 
 
 class ChannelDB(TypedObject):
@@ -702,6 +735,7 @@ class ChannelDB(TypedObject):
 
     class Meta:
         "Define Django meta options"
+
         verbose_name = "Channel"
         verbose_name_plural = "Channels"
 
@@ -712,3 +746,70 @@ class ChannelDB(TypedObject):
     @lazy_property
     def subscriptions(self):
         return SubscriptionHandler(self)
+
+
+# ------------------------------------------------------------
+#
+# Channel history
+#
+# ------------------------------------------------------------
+
+
+class ChannelMessage(models.Model):
+    """
+    One message in the history of a channel. This is stored by channels
+    with `store_history` set (see `settings.CHANNEL_HISTORY_STORE`) and
+    allows for searching the history by time, sender and text.
+
+    This is a plain Django model, not cached by the idmapper, since there are
+    usually many of these and each is only looked at now and then.
+
+    The ChannelMessage has the following database fields:
+
+      - db_channel: The channel the message was sent to.
+      - db_date_created: When the message was sent.
+      - db_sender_type: The kind of the (first) sender, "account", "object",
+        "script" or empty if unknown.
+      - db_sender_id: The database id of the (first) sender.
+      - db_sender_names: The comma-separated names of all senders.
+      - db_message: The message.
+
+    """
+
+    db_channel = models.ForeignKey(
+        "comms.ChannelDB",
+        on_delete=models.CASCADE,
+        related_name="history_messages",
+        verbose_name="channel",
+    )
+    db_date_created = models.DateTimeField("date sent", default=timezone.now, editable=False)
+    db_sender_type = models.CharField("sender type", max_length=16, blank=True)
+    db_sender_id = models.PositiveIntegerField("sender id", null=True, blank=True)
+    db_sender_names = models.TextField("sender names", blank=True)
+    db_message = models.TextField("message")
+
+    objects = managers.ChannelMessageManager()
+
+    class Meta:
+        "Define Django meta options"
+
+        verbose_name = "Channel Message"
+        indexes = [
+            models.Index(fields=["db_channel", "db_date_created"]),
+            models.Index(fields=["db_channel", "db_sender_type", "db_sender_id"]),
+        ]
+
+    def __str__(self):
+        return "%s: %s" % (self.db_sender_names or "-", crop(self.db_message, width=40))
+
+    def get_display_text(self):
+        """
+        Get the message as it is shown in the channel history.
+
+        Returns:
+            str: The message, prefixed with the time and sender names.
+
+        """
+        senders = f"{self.db_sender_names}: " if self.db_sender_names else ""
+        date = timezone.localtime(self.db_date_created).strftime("%Y-%m-%d %H:%M")
+        return f"{date} {senders}{self.db_message}"
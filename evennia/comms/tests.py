@@ -1,4 +1,9 @@
+from unittest.mock import Mock, patch
+
 from evennia import DefaultChannel
+from evennia.comms.models import SubscriptionHandler
+from evennia.server.serversession import ServerSession
+from evennia.server.sessionhandler import SESSIONS
 from evennia.utils.create import create_message
 from evennia.utils.test_resources import BaseEvenniaTest
 
@@ -51,3 +56,133 @@ class ChannelWholistTests(BaseEvenniaTest):
         expected = "Obj, |wChar|n"
         result = self.default_channel.wholist
         self.assertEqual(expected, result)
+
+
+class ChannelMsgTests(BaseEvenniaTest):
+    def setUp(self):
+        super().setUp()
+        # log in account2 with a second session
+        session = ServerSession()
+        session.init_session("telnet", ("localhost", "testmode"), SESSIONS)
+        session.sessid = 2
+        SESSIONS.portal_connect(session.get_sync_data())
+        self.session2 = SESSIONS.session_from_sessid(2)
+        SESSIONS.login(self.session2, self.account2, testmode=True)
+
+        self.channel, _ = DefaultChannel.create("coffeetalk")
+        self.channel.connect(self.account)
+        self.channel.connect(self.account2)
+        self.expected_text = f"[coffeetalk] |c{self.account.key}|n: Hello"
+
+    def tearDown(self):
+        del SESSIONS[self.session2.sessid]
+        super().tearDown()
+
+    def test_msg_bulk(self):
+        self.channel.msg("Hello", senders=self.account)
+        SESSIONS.data_out_many.assert_called_once_with(
+            [self.session, self.session2],
+            text=(self.expected_text, {"from_channel": self.channel.id}),
+            options={"from_channel": self.channel.id},
+        )
+
+    def test_msg_custom_receiver(self):
+        self.account.msg = Mock()
+        self.channel.msg("Hello", senders=self.account)
+        SESSIONS.data_out_many.assert_called_once_with(
+            [self.session2],
+            text=(self.expected_text, {"from_channel": self.channel.id}),
+            options={"from_channel": self.channel.id},
+        )
+        self.account.msg.assert_called_once_with(
+            text=(self.expected_text, {"from_channel": self.channel.id}),
+            from_obj=[self.account],
+            options={"from_channel": self.channel.id},
+        )
+
+    def test_msg_muted(self):
+        self.channel.mute(self.account2)
+        self.channel.msg("Hello", senders=self.account)
+        self.assertEqual(SESSIONS.data_out_many.call_args[0][0], [self.session])
+
+    def test_mute_cache(self):
+        self.assertTrue(self.channel.mute(self.account2))
+        self.channel.msg("Hello", senders=self.account)
+        self.assertEqual(SESSIONS.data_out_many.call_args[0][0], [self.session])
+        self.assertTrue(self.channel.unmute(self.account2))
+        self.channel.msg("Hello", senders=self.account)
+        self.assertEqual(SESSIONS.data_out_many.call_args[0][0], [self.session, self.session2])
+        # the list set directly (or by another process) is seen too
+        self.channel.db.mute_list = [self.account]
+        self.channel.msg("Hello", senders=self.account)
+        self.assertEqual(SESSIONS.data_out_many.call_args[0][0], [self.session2])
+
+    def test_ban_cache(self):
+        self.channel.disconnect(self.account2)
+        self.assertTrue(self.channel.ban(self.account2))
+        self.assertFalse(self.channel.connect(self.account2))
+        self.assertTrue(self.channel.unban(self.account2))
+        self.assertTrue(self.channel.connect(self.account2))
+
+    def test_data_out_many_custom_session(self):
+        class CustomSession(ServerSession):
+            def data_out(self, **kwargs):
+                self.sent = kwargs
+
+        custom = CustomSession()
+        custom.sessid = 3
+        server = Mock()
+        with patch.object(SESSIONS, "server", server, create=True):
+            type(SESSIONS).data_out_many(
+                SESSIONS, [self.session, custom, self.session2], text="Hello"
+            )
+        self.assertEqual(custom.sent, {"text": "Hello"})
+        self.assertEqual(
+            server.amp_protocol.send_MsgServer2Portal.call_args[0][0],
+            [self.session, self.session2],
+        )
+
+    def test_online_cache(self):
+        self.assertEqual(self.channel.subscriptions.online(), [self.account, self.account2])
+        self.account2.is_connected = False
+        self.assertEqual(self.channel.subscriptions.online(), [self.account, self.account2])
+        SubscriptionHandler.reset_online_cache()
+        self.assertEqual(self.channel.subscriptions.online(), [self.account])
+
+
+class ChannelHistoryTests(BaseEvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.channel, _ = DefaultChannel.create("coffeetalk")
+        self.channel.store_history = True
+
+    def test_store_and_search(self):
+        self.channel.msg("Hello", senders=self.account)
+        self.channel.msg("Hello back", senders=self.char1)
+        self.channel.msg("Goodbye", senders=self.account)
+
+        history = self.channel.get_history()
+        self.assertEqual([msg.db_message for msg in history], ["Hello", "Hello back", "Goodbye"])
+        self.assertEqual(history[0].db_sender_type, "account")
+        self.assertEqual(history[0].db_sender_id, self.account.id)
+        self.assertEqual(history[1].db_sender_names, self.char1.key)
+        self.assertTrue(history[2].get_display_text().endswith(f"{self.account.key}: Goodbye"))
+
+        # paging back from the latest message
+        self.assertEqual(
+            [msg.db_message for msg in self.channel.get_history(offset=1, nlines=1)],
+            ["Hello back"],
+        )
+        # filters
+        self.assertEqual(
+            [msg.db_message for msg in self.channel.get_history(sender=self.account)],
+            ["Hello", "Goodbye"],
+        )
+        self.assertEqual(
+            [msg.db_message for msg in self.channel.get_history(freetext="hello")],
+            ["Hello", "Hello back"],
+        )
+        self.assertEqual(
+            self.channel.get_history(start=history[2].db_date_created)[-1].db_message, "Goodbye"
+        )
+        self.assertEqual(self.channel.get_history(end=history[0].db_date_created), [])
@@ -3,6 +3,8 @@ Test wilderness
 
 """
 
+from unittest import mock
+
 from evennia import DefaultCharacter
 from evennia.utils.create import create_object
 from evennia.utils.test_resources import BaseEvenniaTest
@@ -163,3 +165,39 @@ class TestWilderness(BaseEvenniaTest):
         self.assertEqual(2, len(w.db.rooms))
         # and verify that obj1 is still at 1,1
         self.assertEqual(self.obj1.location, w.db.rooms[(1, 1)])
+
+    @mock.patch("evennia.contrib.grid.wilderness.wilderness.delay")
+    def test_room_pool(self, mock_delay):
+        wilderness.create_wilderness(room_pool_size=2)
+        w = self.get_wilderness_script()
+        self.assertEqual(len(w.db.unused_rooms), 2)
+
+        # entering uses a pooled room instead of creating one
+        with mock.patch.object(w, "_new_room") as mock_new_room:
+            wilderness.enter_wilderness(self.char1)
+            mock_new_room.assert_not_called()
+        self.assertEqual(len(w.db.unused_rooms), 1)
+        mock_delay.assert_called_once_with(0, w.warm_room_pool)
+
+        # the pool is topped up afterwards
+        w.warm_room_pool()
+        self.assertEqual(len(w.db.unused_rooms), 2)
+
+    def test_coordinate_index(self):
+        wilderness.create_wilderness()
+        w = self.get_wilderness_script()
+        wilderness.enter_wilderness(self.char1, coordinates=(1, 1))
+        wilderness.enter_wilderness(self.char2, coordinates=(1, 1))
+        self.assertEqual(w.get_objs_at_coordinates((1, 1)), [self.char1, self.char2])
+
+        w.move_obj(self.char2, (2, 1))
+        self.assertEqual(w.get_objs_at_coordinates((1, 1)), [self.char1])
+        self.assertEqual(w.get_objs_at_coordinates((2, 1)), [self.char2])
+
+        self.char2.move_to(self.room1)
+        self.assertEqual(w.get_objs_at_coordinates((2, 1)), [])
+        self.assertNotIn((2, 1), w.coordinate_index)
+
+        # the index is rebuilt from the stored coordinates
+        w.ndb.coordinate_index = None
+        self.assertEqual(w.coordinate_index, {(1, 1): {self.char1: None}})
@@ -114,6 +114,16 @@ create a new wilderness (with the name "default") but using our new map provider
     Rooms are created as needed. Unneeded rooms are stored away to avoid the
     overhead cost of creating new rooms again in the future.
 
+    To avoid creating rooms while players move around, the wilderness can keep
+    a pool of spare rooms ready. Give `room_pool_size` to `create_wilderness`
+    (or set it on the script later); the pool is filled up to this size when
+    the wilderness is created or the server starts, and topped up again shortly
+    after rooms are taken from it.
+
+    The objects at each coordinate are tracked in an in-memory index, so
+    finding what is at a location doesn't depend on how many objects are in
+    the wilderness.
+
 """
 
 from evennia import (
@@ -124,10 +134,10 @@ from evennia import (
     create_script,
 )
 from evennia.typeclasses.attributes import AttributeProperty
-from evennia.utils import inherits_from
+from evennia.utils import delay, inherits_from
 
 
-def create_wilderness(name="default", mapprovider=None, preserve_items=False):
+def create_wilderness(name="default", mapprovider=None, preserve_items=False, room_pool_size=0):
     """
     Creates a new wilderness map. Does nothing if a wilderness map already
     exists with the same name.
@@ -138,6 +148,10 @@ def create_wilderness(name="default", mapprovider=None, preserve_items=False):
             WildernessMap class (or subclass) that will be used to provide the
             layout of this wilderness map. If none is provided, the default
             infinite grid map will be used.
+        preserve_items (bool, optional): Don't recycle rooms with objects
+            left in them.
+        room_pool_size (int, optional): How many spare rooms to keep ready, so
+            rooms don't have to be created while objects move around.
 
     """
     if WildernessScript.objects.filter(db_key=name).exists():
@@ -150,6 +164,9 @@ def create_wilderness(name="default", mapprovider=None, preserve_items=False):
     script.db.mapprovider = mapprovider
     if preserve_items:
         script.preserve_items = True
+    if room_pool_size:
+        script.room_pool_size = room_pool_size
+        script.warm_room_pool()
 
 
 def enter_wilderness(obj, coordinates=(0, 0), name="default"):
@@ -225,6 +242,10 @@ class WildernessScript(DefaultScript):
     # in order to preserve the object
     preserve_items = AttributeProperty(default=False)
 
+    # How many unused rooms to keep ready in storage, so rooms don't need to be
+    # created while objects move around
+    room_pool_size = AttributeProperty(default=0)
+
     def at_script_creation(self):
         """
         Only called once, when the script is created. This is a default Evennia
@@ -252,13 +273,62 @@ class WildernessScript(DefaultScript):
         for coordinates, room in self.db.rooms.items():
             room.ndb.wildernessscript = self
             room.ndb.active_coordinates = coordinates
-        for item in self.db.itemcoordinates.keys():
+        for item in list(self.db.itemcoordinates.keys()):
             # Items deleted while in the wilderness can leave None-type 'ghosts'
             # These need to be cleaned up
             if item is None:
                 del self.db.itemcoordinates[item]
                 continue
             item.ndb.wilderness = self
+        self.ndb.coordinate_index = None
+        self.warm_room_pool()
+
+    @property
+    def coordinate_index(self):
+        """
+        In-memory index of what is where in the wilderness. It's built from
+        `itemcoordinates` on first use.
+
+        Returns:
+            dict: `{(x, y): {obj: None, ...}, ...}`. The inner dicts are used as
+            ordered sets of the objects at each coordinate.
+
+        """
+        index = self.ndb.coordinate_index
+        if index is None:
+            index = {}
+            for item, coordinates in self.itemcoordinates.items():
+                if item is not None:
+                    index.setdefault(coordinates, {})[item] = None
+            self.ndb.coordinate_index = index
+        return index
+
+    def _set_obj_coordinates(self, obj, coordinates):
+        """
+        Store the coordinates of an object in the wilderness.
+
+        Args:
+            obj (Object): The object.
+            coordinates (tuple): The new (x, y) coordinates of the object.
+
+        """
+        index = self.coordinate_index
+        old_coordinates = self.itemcoordinates.get(obj)
+        if old_coordinates != coordinates:
+            self._unindex_obj(obj, old_coordinates)
+            self.itemcoordinates[obj] = coordinates
+        index.setdefault(coordinates, {})[obj] = None
+
+    def _unindex_obj(self, obj, coordinates):
+        """
+        Remove an object from the coordinate index.
+
+        """
+        occupants = self.coordinate_index.get(coordinates)
+        if occupants is not None:
+            occupants.pop(obj, None)
+            if not occupants:
+                del self.coordinate_index[coordinates]
 
     def is_valid_coordinates(self, coordinates):
         """
@@ -291,22 +361,13 @@ class WildernessScript(DefaultScript):
         """
         Returns a list of every object at certain coordinates.
 
-        Imeplementation detail: this uses a naive iteration through every
-        object inside the wilderness which could cause slow downs when there
-        are a lot of objects in the map.
-
         Args:
             coordinates (tuple): a coordinate tuple like (x, y)
 
         Returns:
             [Object, ]: list of Objects at coordinates
         """
-        result = [
-            item
-            for item, item_coords in self.itemcoordinates.items()
-            if item_coords == coordinates and item is not None
-        ]
-        return list(result)
+        return list(self.coordinate_index.get(coordinates, ()))
 
     def move_obj(self, obj, new_coordinates):
         """
@@ -317,7 +378,7 @@ class WildernessScript(DefaultScript):
             new_coordinates (tuple): tuple of (x, y) where to move obj to.
         """
         # Update the position of this obj in the wilderness
-        self.itemcoordinates[obj] = new_coordinates
+        self._set_obj_coordinates(obj, new_coordinates)
         old_room = obj.location
 
         # Remove the obj's location. This is needed so that the object does not
@@ -380,6 +441,54 @@ class WildernessScript(DefaultScript):
         obj.location = room
         obj.ndb.wilderness = self
 
+    def _new_room(self, report_to=None):
+        """
+        Create a new WildernessRoom with its exits.
+
+        Args:
+            report_to (object, optional): the obj to return error messages to
+
+        Returns:
+            WildernessRoom: The new room.
+
+        """
+        # First, create the room
+        room = create_object(
+            typeclass=self.mapprovider.room_typeclass, key="Wilderness", report_to=report_to
+        )
+
+        # Then the exits
+        exits = [
+            ("north", "n"),
+            ("northeast", "ne"),
+            ("east", "e"),
+            ("southeast", "se"),
+            ("south", "s"),
+            ("southwest", "sw"),
+            ("west", "w"),
+            ("northwest", "nw"),
+        ]
+        for key, alias in exits:
+            create_object(
+                typeclass=self.mapprovider.exit_typeclass,
+                key=key,
+                aliases=[alias],
+                location=room,
+                destination=room,
+                report_to=report_to,
+            )
+        return room
+
+    def warm_room_pool(self):
+        """
+        Create unused rooms until there are `room_pool_size` of them in storage.
+
+        """
+        self.ndb.pool_refill = None
+        num_missing = self.room_pool_size - len(self.db.unused_rooms)
+        if num_missing > 0:
+            self.db.unused_rooms.extend(self._new_room() for _ in range(num_missing))
+
     def _create_room(self, coordinates, report_to):
         """
         Gets a new WildernessRoom to be used for the provided coordinates.
@@ -395,34 +504,12 @@ class WildernessScript(DefaultScript):
             # There is still unused rooms stored in storage, let's get one of
             # those
             room = self.db.unused_rooms.pop()
+            if len(self.db.unused_rooms) < self.room_pool_size and not self.ndb.pool_refill:
+                # top up the pool after this move is done
+                self.ndb.pool_refill = delay(0, self.warm_room_pool)
         else:
             # No more unused rooms...time to make a new one.
-
-            # First, create the room
-            room = create_object(
-                typeclass=self.mapprovider.room_typeclass, key="Wilderness", report_to=report_to
-            )
-
-            # Then the exits
-            exits = [
-                ("north", "n"),
-                ("northeast", "ne"),
-                ("east", "e"),
-                ("southeast", "se"),
-                ("south", "s"),
-                ("southwest", "sw"),
-                ("west", "w"),
-                ("northwest", "nw"),
-            ]
-            for key, alias in exits:
-                create_object(
-                    typeclass=self.mapprovider.exit_typeclass,
-                    key=key,
-                    aliases=[alias],
-                    location=room,
-                    destination=room,
-                    report_to=report_to,
-                )
+            room = self._new_room(report_to=report_to)
 
         room.ndb.active_coordinates = coordinates
         room.ndb.wildernessscript = self
@@ -480,6 +567,7 @@ class WildernessScript(DefaultScript):
         # Try removing the object from the coordinates system
         if loc := self.db.itemcoordinates.pop(obj, None):
             # The object was removed successfully
+            self._unindex_obj(obj, loc)
             # Make sure there was a room at that location
             if room := self.db.rooms.get(loc):
                 # If so, try to clean up the room
@@ -550,7 +638,7 @@ class WildernessRoom(DefaultRoom):
             self.wilderness.move_obj(moved_obj, coordinates)
         else:
             # This object wasn't in the wilderness yet. Let's add it.
-            itemcoords[moved_obj] = self.coordinates
+            self.wilderness._set_obj_coordinates(moved_obj, self.coordinates)
 
     def at_object_leave(self, moved_obj, target_location, move_type="move", **kwargs):
         """
@@ -99,20 +99,35 @@ spawn
 
     spawns/updates the entire database grid based on the added maps. For a new grid, this will
     spawn all new rooms/exits (and may take a good while!). For updating, rooms may be
-    removed/spawned if a map changed since the last spawn.
+    removed/spawned if a map changed since the last spawn. Only rooms and exits whose map
+    definitions changed since the last full spawn of their map are touched.
 
 spawn "(X,Y,Z|mapname)"
 
     spawns/updates only a part of the grid. Remember the quotes around the coordinate (this
     is mostly because shells don't like them)! Use '*' as a wild card for XY coordinates.
     This should usually only be used if the full grid has already been built once - otherwise
-    inter-map transitions may fail! Z is the name/z-coordinate of the map to spawn.
+    inter-map transitions may fail! Z is the name/z-coordinate of the map to spawn. A partial
+    spawn always syncs the given coordinates with the database and makes the next spawn of
+    the map a full one.
+
+spawn --dry-run ["(X,Y,Z|mapname)"]
+
+    don't change anything, only list the rooms that would be created, updated, deleted or
+    have their exits updated by the spawn.
+
+spawn --full ["(X,Y,Z|mapname)"]
+
+    ignore what was recorded at the last spawn and sync all rooms and exits with the maps.
+    Use this to repair rooms or exits that were changed or deleted in-game.
 
 Examples:
 
     evennia xyzgrid spawn                  - spawn all
     evennia xyzgrid "(*, *, mymap1)"       - spawn everything of map/zcoord mymap1
     evennia xyzgrid "(12, 5, mymap1)"      - spawn only coordinate (12, 5) on map/zcoord mymap1
+    evennia xyzgrid spawn --dry-run        - see what a spawn would do
+    evennia xyzgrid spawn --full           - resync all rooms/exits with the maps
 """
 
 _HELP_INITPATH = """
@@ -304,6 +319,10 @@ def _option_spawn(*suboptions):
 
     grid.log = _log
 
+    dry_run = "--dry-run" in suboptions
+    force = "--full" in suboptions
+    suboptions = [opt for opt in suboptions if opt not in ("--dry-run", "--full")]
+
     if suboptions:
         opts = "".join(suboptions).strip("()")
         # coordinate tuple
@@ -318,6 +337,15 @@ def _option_spawn(*suboptions):
     else:
         x, y, z = "*", "*", "*"
 
+    if dry_run:
+        report = grid.spawn(xyz=(x, y, z), dry_run=True, force=force)
+        for zcoord, changes in report.items():
+            print(f"Map '{zcoord}'" + (" (full sync):" if changes["full"] else ":"))
+            for action in ("create", "update", "relink", "delete"):
+                coords = changes[action]
+                print(f"  {action}: {len(coords)} " + " ".join(str(xy) for xy in coords))
+        return
+
     if x == y == z == "*":
         inp = input(
             "This will (re)spawn the entire grid. If it was built before, it may spawn \n"
@@ -334,7 +362,7 @@ def _option_spawn(*suboptions):
         return
 
     print("Beginner-Tutorial spawn ...")
-    grid.spawn(xyz=(x, y, z))
+    grid.spawn(xyz=(x, y, z), force=force)
     print(
         "... spawn complete!\nIt's recommended to reload the server to refresh caches if this "
         "modified an existing grid."
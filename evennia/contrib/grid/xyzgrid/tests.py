@@ -400,6 +400,44 @@ class TestMap1(_MapTest):
             ],
         )
 
+    def test_pathfinding_cache(self):
+        self.map.pathfinding_cache_size = 1
+        self.map.get_shortest_path((0, 0), (1, 1))
+        self.assertEqual(list(self.map.pathfinding_trees), [0])
+        # re-use the cached tree
+        with mock.patch.object(xymap, "dijkstra") as mock_dijkstra:
+            self.assertEqual(self.map.get_shortest_path((0, 0), (1, 0))[0], ["e"])
+            mock_dijkstra.assert_not_called()
+        # the least recently used tree is dropped
+        self.map.get_shortest_path((1, 1), (0, 0))
+        self.assertEqual(list(self.map.pathfinding_trees), [3])
+
+        # the baked graph is re-used as long as the map is unchanged
+        graph = self.map.pathfinding_graph
+        self.map.calculate_path_matrix()
+        self.assertIsNot(self.map.pathfinding_graph, graph)
+        self.assertEqual((self.map.pathfinding_graph != graph).nnz, 0)
+        # loaded as read-only memory-mapped arrays
+        self.assertFalse(self.map.pathfinding_graph.data.flags.writeable)
+        self.assertEqual(graph.nnz, 8)
+
+    def test_visual_range_cache(self):
+        self.assertEqual(self.map.get_visual_range((0, 0), dist=1, mode="nodes"), "#  \n||  \n@-#")
+        self.assertEqual(list(self.map.visual_range_cache), [(0, 0, 1, "nodes")])
+        # the cached area is re-used, but markers are not cached
+        with mock.patch.object(self.map, "_get_topology_around_coord") as mock_topology:
+            self.assertEqual(
+                self.map.get_visual_range((0, 0), dist=1, mode="nodes", character="X"),
+                "#  \n||  \nX-#",
+            )
+            mock_topology.assert_not_called()
+        # showing the whole map does not modify the map itself
+        self.map.get_visual_range((0, 0), dist=None, character="X")
+        self.assertEqual(self.map.display_map[0][0], "#")
+
+        self.map.invalidate_visual_range_cache()
+        self.assertFalse(self.map.visual_range_cache)
+
     @parameterized.expand(
         [
             ((0, 0), "| \n#-", [["|", " "], ["#", "-"]]),
@@ -1310,6 +1348,67 @@ class TestXYZGrid(BaseEvenniaTest):
         self.assertEqual(xyzroom.XYZRoom.objects.all().count(), 4)
         self.assertEqual(xyzroom.XYZExit.objects.all().count(), 8)
 
+    def test_spawn_incremental(self):
+        """Only changes since the last spawn should be spawned"""
+        report = self.grid.spawn()
+        self.assertTrue(report[self.zcoord]["full"])
+        self.assertEqual(len(report[self.zcoord]["create"]), 4)
+
+        # nothing changed - nothing should be spawned
+        with mock.patch.object(xymap_legend.MapNode, "spawn") as mock_spawn:
+            with mock.patch.object(xymap_legend.MapNode, "spawn_links") as mock_spawn_links:
+                report = self.grid.spawn()
+        mock_spawn.assert_not_called()
+        mock_spawn_links.assert_not_called()
+        self.assertEqual(
+            report,
+            {
+                self.zcoord: {
+                    "create": [],
+                    "update": [],
+                    "relink": [],
+                    "delete": [],
+                    "full": False,
+                }
+            },
+        )
+
+        # remove a room from the map
+        self.grid.add_maps(
+            {"map": MAP1.replace("#-#\n   | |", "#\n   |  ", 1), "zcoord": self.zcoord}
+        )
+        self.grid.reload()
+        expected = {
+            self.zcoord: {
+                "create": [],
+                "update": [],
+                "relink": [(0, 1), (1, 0)],
+                "delete": [(1, 1)],
+                "full": False,
+            }
+        }
+        self.assertEqual(self.grid.spawn(dry_run=True), expected)
+        self.assertEqual(xyzroom.XYZRoom.objects.all().count(), 4)
+
+        self.assertEqual(self.grid.spawn(), expected)
+        self.assertEqual(xyzroom.XYZRoom.objects.all().count(), 3)
+        self.assertEqual(xyzroom.XYZExit.objects.all().count(), 4)
+
+    def test_spawn_force(self):
+        """A forced spawn should repair rooms deleted in-game"""
+        self.grid.spawn()
+        xyzroom.XYZRoom.objects.get_xyz(xyz=(1, 1, self.zcoord)).delete()
+        self.assertEqual(xyzroom.XYZRoom.objects.all().count(), 3)
+
+        # the map didn't change, so a normal spawn does nothing
+        self.grid.spawn()
+        self.assertEqual(xyzroom.XYZRoom.objects.all().count(), 3)
+
+        report = self.grid.spawn(force=True)
+        self.assertTrue(report[self.zcoord]["full"])
+        self.assertEqual(xyzroom.XYZRoom.objects.all().count(), 4)
+        self.assertEqual(xyzroom.XYZExit.objects.all().count(), 8)
+
 
 # map transitions
 class Map12aTransition(xymap_legend.TransitionMapNode):
@@ -1354,6 +1453,32 @@ class TestXYZGridTransition(BaseEvenniaTest):
         directions, _ = self.grid.get_map("map12a").get_shortest_path(startcoord, endcoord)
         self.assertEqual(expected_directions, tuple(directions))
 
+    @parameterized.expand(
+        [
+            ((1, 0, "map12a"), (0, 1, "map12b"), ("w", "n", "e", "n", "w")),
+            ((0, 1, "map12b"), (1, 0, "map12a"), ("e", "s", "w", "s", "e")),
+            ((1, 0, "map12a"), (0, 1, "map12a"), ("w", "n")),
+        ]
+    )
+    def test_shortest_path_across_maps(self, startxyz, endxyz, expected_directions):
+        """
+        test shortest-path calculations across map transitions.
+
+        """
+        directions, path = self.grid.get_shortest_path(startxyz, endxyz)
+        self.assertEqual(expected_directions, tuple(directions))
+        self.assertEqual((path[0].X, path[0].Y, path[0].Z), startxyz)
+        self.assertEqual((path[-1].X, path[-1].Y, path[-1].Z), endxyz)
+
+    def test_transition_graph(self):
+        transitions, graph = self.grid.get_transition_graph()
+        self.assertEqual(len(transitions["map12a"]), 1)
+        self.assertEqual(len(transitions["map12b"]), 1)
+        # map12b's (1,0) is one step from the transition back to map12a
+        target, next_transitions = graph[("map12a", transitions["map12a"][0].node_index)]
+        self.assertEqual((target.X, target.Y, target.Z), (1, 0, "map12b"))
+        self.assertEqual(next_transitions, [(transitions["map12b"][0], 1)])
+
     def test_spawn(self):
         """
         Spawn the two maps into actual objects.
@@ -1373,6 +1498,23 @@ class TestXYZGridTransition(BaseEvenniaTest):
         self.assertEqual(east_exit.db_destination, room2)
         self.assertEqual(west_exit.db_destination, room1)
 
+    def test_spawn_relink_transitions(self):
+        """
+        Exits from other maps should be respawned when their destination is recreated.
+
+        """
+        self.grid.spawn()
+        xyzroom.XYZRoom.objects.get_xyz(xyz=(1, 0, "map12b")).delete()
+        room1 = xyzroom.XYZRoom.objects.get_xyz(xyz=(0, 1, "map12a"))
+        self.assertFalse([exi for exi in room1.exits if exi.db_key == "east"])
+
+        report = self.grid.spawn(xyz=("*", "*", "map12b"), force=True)
+        self.assertEqual(report["map12a"]["relink"], [(0, 1)])
+        room2 = xyzroom.XYZRoom.objects.get_xyz(xyz=(1, 0, "map12b"))
+        east_exit = [exi for exi in room1.exits if exi.db_key == "east"][0]
+        self.assertEqual(east_exit.db_destination, room2)
+        self.assertEqual(xyzroom.XYZExit.objects.all().count(), 10)
+
 
 class TestBuildExampleGrid(BaseEvenniaTest):
     """
@@ -92,14 +92,14 @@ See `./example.py` for a full grid example.
 
 ----
 """
-import pickle
-from collections import defaultdict
-from os import mkdir
+import hashlib
+from collections import OrderedDict, defaultdict
+from os import makedirs, mkdir, remove, replace
 from os.path import isdir, isfile
 from os.path import join as pathjoin
 
 try:
-    from scipy import zeros
+    import numpy
     from scipy.sparse import csr_matrix
     from scipy.sparse.csgraph import dijkstra
 except ImportError as err:
@@ -115,7 +115,7 @@ from evennia.utils import logger
 from evennia.utils.utils import is_iter, mod_import, variable_from_module
 
 from . import xymap_legend
-from .utils import BIGVAL, MapError, MapParserError
+from .utils import MapError, MapParserError
 
 _NO_DB_PROTOTYPES = True
 if hasattr(settings, "XYZGRID_USE_DB_PROTOTYPES"):
@@ -175,6 +175,10 @@ class XYMap:
     """
     mapcorner_symbol = "+"
     max_pathfinding_length = 500
+    # how many start-nodes to remember the shortest-path trees for
+    pathfinding_cache_size = 128
+    # how many (center, dist, mode) areas to remember for `get_visual_range`
+    visual_range_cache_size = 512
     empty_symbol = " "
     # we normally only accept one single character for the legend key
     legend_key_exceptions = "\\"
@@ -235,6 +239,9 @@ class XYMap:
         self.xygrid = None
         self.XYgrid = None
         self.display_map = None
+        self.display_array = None
+        # LRU cache {(ix, iy, dist, mode): (gridarray, ixc, iyc, xmin, xmax, ymin, ymax)}
+        self.visual_range_cache = OrderedDict()
         self.max_x = 0
         self.max_y = 0
         self.max_X = 0
@@ -242,14 +249,16 @@ class XYMap:
 
         # Dijkstra algorithm variables
         self.node_index_map = None
-        self.dist_matrix = None
-        self.pathfinding_routes = None
+        self.pathfinding_graph = None
+        # LRU cache {start_node_index: (distances, predecessors)}
+        self.pathfinding_trees = OrderedDict()
 
-        self.pathfinder_baked_filename = None
+        # directory holding the baked graph, one .npy file per array
+        self.pathfinder_baked_dir = None
         if Z:
             if not isdir(_CACHE_DIR):
                 mkdir(_CACHE_DIR)
-            self.pathfinder_baked_filename = pathjoin(_CACHE_DIR, f"{Z}.P")
+            self.pathfinder_baked_dir = pathjoin(_CACHE_DIR, f"{Z}.pathgraph")
 
         # load data and parse it
         self.reload()
@@ -539,6 +548,7 @@ class XYMap:
 
         # store
         self.display_map = display_map
+        self.invalidate_visual_range_cache()
 
     def _get_topology_around_coord(self, xy, dist=2):
         """
@@ -556,98 +566,222 @@ class XYMap:
                 surrounding the area containing `xy_coords`.
 
         Notes:
-            This performs a depth-first pass down the the given dist.
+            This performs a breadth-first pass down the the given dist, visiting
+            each node only once.
 
         """
+        center_node = self.get_node_from_coord(xy)
+        points = {(center_node.x, center_node.y)}
+        visited = {center_node.node_index}
+        frontier = [center_node]
+        for _ in range(dist):
+            next_frontier = []
+            for node in frontier:
+                for direction, end_node in node.links.items():
+                    points.update((link.x, link.y) for link in node.xy_steps_to_node[direction])
+                    if end_node.node_index not in visited:
+                        visited.add(end_node.node_index)
+                        points.add((end_node.x, end_node.y))
+                        next_frontier.append(end_node)
+            frontier = next_frontier
+
+        xs, ys = zip(*points)
+        return list(points), min(xs), max(xs), min(ys), max(ys)
+
+    def invalidate_visual_range_cache(self):
+        """
+        Clear the cached areas used by `get_visual_range`. This is done automatically
+        when the map is (re)parsed, but must be called manually if the
+        `get_display_symbol` of any nodes or links change dynamically.
 
-        def _scan_neighbors(
-            start_node, points, dist=2, xmin=BIGVAL, ymin=BIGVAL, xmax=0, ymax=0, depth=0
-        ):
+        """
+        display_map = self.display_map or []
+        self.display_array = numpy.empty((len(display_map), self.max_x + 1), dtype=object)
+        self.display_array[:] = display_map
+        self.visual_range_cache.clear()
 
-            x0, y0 = start_node.x, start_node.y
-            points.append((x0, y0))
-            xmin, xmax = min(xmin, x0), max(xmax, x0)
-            ymin, ymax = min(ymin, y0), max(ymax, y0)
-
-            if depth < dist:
-                # keep stepping
-                for direction, end_node in start_node.links.items():
-                    x, y = x0, y0
-                    for link in start_node.xy_steps_to_node[direction]:
-                        x, y = link.x, link.y
-                        points.append((x, y))
-                        xmin, xmax = min(xmin, x), max(xmax, x)
-                        ymin, ymax = min(ymin, y), max(ymax, y)
-
-                    points, xmin, xmax, ymin, ymax = _scan_neighbors(
-                        end_node,
-                        points,
-                        dist=dist,
-                        xmin=xmin,
-                        ymin=ymin,
-                        xmax=xmax,
-                        ymax=ymax,
-                        depth=depth + 1,
-                    )
+    def _get_visual_area(self, ix, iy, dist, mode):
+        """
+        Get the (uncropped, unmarked) area of the display map shown by
+        `get_visual_range`. Results are cached.
 
-            return points, xmin, xmax, ymin, ymax
+        Args:
+            ix, iy (int): The center coordinate on the xygrid.
+            dist (int): The distance to show.
+            mode (str): One of 'nodes' or 'scan'.
 
-        center_node = self.get_node_from_coord(xy)
-        points, xmin, xmax, ymin, ymax = _scan_neighbors(center_node, [], dist=dist)
-        return list(set(points)), xmin, xmax, ymin, ymax
+        Returns:
+            tuple: `(gridarray, ixc, iyc, xmin, xmax, ymin, ymax)`, with the display
+            area as a 2D numpy array of strings (must not be modified), the center
+            position within it and the limits of the area on the xygrid.
 
-    def calculate_path_matrix(self, force=False):
         """
-        Solve the pathfinding problem using Dijkstra's algorithm. This will try to
-        load the solution from disk if possible.
+        key = (ix, iy, dist, mode)
+        cache = self.visual_range_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        display_array = self.display_array
+        height, width = display_array.shape
+
+        if mode == "nodes":
+            # dist measures only full, reachable nodes.
+            points, xmin, xmax, ymin, ymax = self._get_topology_around_coord(
+                (ix // 2, iy // 2), dist=dist
+            )
+            gridarray = numpy.full((ymax - ymin + 1, xmax - xmin + 1), " ", dtype=object)
+            xs, ys = numpy.array(points).T
+            gridarray[ys - ymin, xs - xmin] = display_array[ys, xs]
+        else:
+            # scan-mode - dist measures individual grid points
+            xmin, xmax = max(0, ix - dist), min(width, ix + dist + 1)
+            ymin, ymax = max(0, iy - dist), min(height, iy + dist + 1)
+            gridarray = display_array[ymin:ymax, xmin:xmax]
+
+        area = (gridarray, ix - xmin, iy - ymin, xmin, xmax, ymin, ymax)
+        cache[key] = area
+        if len(cache) > self.visual_range_cache_size:
+            cache.popitem(last=False)
+        return area
+
+    def _load_path_graph(self, maphash):
+        """
+        Load the baked pathfinding graph from disk, if it matches the current map.
+        The arrays of the graph are memory-mapped, so they are only read from disk
+        as they are used and can be shared between processes.
 
         Args:
-            force (bool, optional): If the cache should always be rebuilt.
+            maphash (str): Hash of the current map string.
+
+        Returns:
+            scipy.sparse.csr_matrix or None: The graph, or None if there was no
+            (valid) graph stored for this map.
 
         """
-        if not force and self.pathfinder_baked_filename and isfile(self.pathfinder_baked_filename):
-            # check if the solution for this grid was already solved previously.
+        baked_dir = self.pathfinder_baked_dir
+        try:
+            if str(numpy.load(pathjoin(baked_dir, "maphash.npy"))) != maphash:
+                # the map changed since it was baked
+                return None
+            data, indices, indptr = (
+                numpy.load(pathjoin(baked_dir, f"{name}.npy"), mmap_mode="r")
+                for name in ("data", "indices", "indptr")
+            )
+            shape = tuple(numpy.load(pathjoin(baked_dir, "shape.npy")))
+            return csr_matrix((data, indices, indptr), shape=shape, copy=False)
+        except Exception:
+            logger.log_trace()
+            return None
 
-            mapstr, dist_matrix, pathfinding_routes = "", None, None
-            with open(self.pathfinder_baked_filename, "rb") as fil:
-                try:
-                    mapstr, dist_matrix, pathfinding_routes = pickle.load(fil)
-                except Exception:
-                    logger.log_trace()
-            if (
-                mapstr == self.mapstring
-                and dist_matrix is not None
-                and pathfinding_routes is not None
-            ):
-                # this is important - it means the map hasn't changed so
-                # we can re-use the stored data!
-                self.dist_matrix = dist_matrix
-                self.pathfinding_routes = pathfinding_routes
-
-        # build a matrix representing the map graph, with 0s as impassable areas
+    def _save_path_graph(self, maphash):
+        """
+        Bake the pathfinding graph to disk, as plain `.npy` files that can be
+        memory-mapped when loaded. Each file is written next to the old one and
+        then moved in place, since the old one may still be mapped.
+
+        Args:
+            maphash (str): Hash of the current map string.
+
+        """
+        baked_dir = self.pathfinder_baked_dir
+        graph = self.pathfinding_graph
+        makedirs(baked_dir, exist_ok=True)
+        maphash_file = pathjoin(baked_dir, "maphash.npy")
+        if isfile(maphash_file):
+            # a partially written graph must not be taken for a valid one
+            remove(maphash_file)
+        for name, array in (
+            ("data", graph.data),
+            ("indices", graph.indices),
+            ("indptr", graph.indptr),
+            ("shape", numpy.array(graph.shape)),
+            ("maphash", numpy.array(maphash)),
+        ):
+            filename = pathjoin(baked_dir, f"{name}.npy")
+            with open(f"{filename}.tmp", "wb") as fil:
+                numpy.save(fil, array)
+            replace(f"{filename}.tmp", filename)
+
+    def calculate_path_matrix(self, force=False):
+        """
+        Build the sparse graph of weighted links between nodes used for pathfinding.
+        Only the direct links are stored; shortest paths are solved on demand by
+        `get_shortest_path`. The graph is loaded from disk if possible.
+
+        Args:
+            force (bool, optional): If the cache should always be rebuilt.
 
+        """
+        self.pathfinding_trees.clear()
+        maphash = hashlib.sha1(self.mapstring.encode("utf-8")).hexdigest()
+
+        if not force and self.pathfinder_baked_dir and isdir(self.pathfinder_baked_dir):
+            # check if the graph for this map was already built previously.
+            graph = self._load_path_graph(maphash)
+            if graph is not None:
+                self.pathfinding_graph = graph
+                return
+
+        # build the graph directly in sparse (COO) form - a node can at most
+        # have 8 links, so this is proportional to the number of nodes
         nnodes = len(self.node_index_map)
-        pathfinding_graph = zeros((nnodes, nnodes))
+        rows, cols, weights = [], [], []
         for inode, node in self.node_index_map.items():
-            pathfinding_graph[inode, :] = node.linkweights(nnodes)
+            for inextnode, weight in node.weights.items():
+                rows.append(inode)
+                cols.append(inextnode)
+                weights.append(weight)
+        self.pathfinding_graph = csr_matrix(
+            (
+                numpy.array(weights, dtype=numpy.float64),
+                (numpy.array(rows, dtype=numpy.int32), numpy.array(cols, dtype=numpy.int32)),
+            ),
+            shape=(nnodes, nnodes),
+        )
+
+        if self.pathfinder_baked_dir:
+            # try to cache the results
+            try:
+                self._save_path_graph(maphash)
+            except OSError:
+                logger.log_trace()
 
-        # create a sparse matrix to represent link relationships from each node
-        pathfinding_matrix = csr_matrix(pathfinding_graph)
+    def get_pathfinding_tree(self, inode):
+        """
+        Get the shortest-path tree starting from a given node. The tree is solved
+        with Dijkstra's algorithm on the first request and then cached (the most
+        recently used `.pathfinding_cache_size` trees are kept).
+
+        Args:
+            inode (int): The `node_index` of the start node.
+
+        Returns:
+            tuple: `(distances, predecessors)`, two arrays indexed by `node_index`.
+            The `distances` are the path costs to every node from the start node
+            (`inf` if unreachable). `predecessors` are the previous node along the
+            shortest path to each node (`-9999` if unreachable, or for the start node).
+
+        """
+        trees = self.pathfinding_trees
+        if inode in trees:
+            trees.move_to_end(inode)
+            return trees[inode]
+
+        if self.pathfinding_graph is None:
+            self.calculate_path_matrix()
 
-        # solve using Dijkstra's algorithm
-        self.dist_matrix, self.pathfinding_routes = dijkstra(
-            pathfinding_matrix,
+        tree = dijkstra(
+            self.pathfinding_graph,
             directed=True,
+            indices=inode,
             return_predecessors=True,
             limit=self.max_pathfinding_length,
         )
-
-        if self.pathfinder_baked_filename:
-            # try to cache the results
-            with open(self.pathfinder_baked_filename, "wb") as fil:
-                pickle.dump(
-                    (self.mapstring, self.dist_matrix, self.pathfinding_routes), fil, protocol=4
-                )
+        trees[inode] = tree
+        if len(trees) > self.pathfinding_cache_size:
+            trees.popitem(last=False)
+        return tree
 
     def spawn_nodes(self, xy=("*", "*")):
         """
@@ -676,10 +810,7 @@ class XYMap:
         spawned = []
 
         # find existing nodes, in case some rooms need to be removed
-        map_coords = [
-            (node.X, node.Y)
-            for node in sorted(self.node_index_map.values(), key=lambda n: (n.Y, n.X))
-        ]
+        map_coords = set((node.X, node.Y) for node in self.node_index_map.values())
         for existing_room in _XYZROOMCLASS.objects.filter_xyz(xyz=(x, y, self.Z)):
             roomX, roomY, _ = existing_room.xyz
             if (roomX, roomY) not in map_coords:
@@ -693,6 +824,74 @@ class XYMap:
                 spawned.append(node)
         return spawned
 
+    def get_spawn_hashes(self):
+        """
+        Get hashes of what each node of the map spawns. Comparing these with the
+        hashes from the last spawn tells which rooms/exits need to be updated.
+
+        Returns:
+            dict: `{(X, Y): (room_hash, exits_hash), ...}` for all nodes that are
+            spawned into rooms.
+
+        """
+        return {
+            (node.X, node.Y): (node.get_spawn_hash(), node.get_links_spawn_hash())
+            for node in self.node_index_map.values()
+            if node.prototype
+        }
+
+    def get_spawn_diff(self, previous_hashes):
+        """
+        Compare the map to what was spawned last time.
+
+        Args:
+            previous_hashes (dict): The result of `get_spawn_hashes` at the last spawn.
+
+        Returns:
+            dict: `{"create": [...], "update": [...], "relink": [...], "delete": [...]}`,
+            each a sorted list of (X,Y) coordinates of rooms to create, rooms to update,
+            rooms whose exits should be updated and rooms to delete. Also includes the
+            key `"hashes"` with the current `get_spawn_hashes`.
+
+        """
+        hashes = self.get_spawn_hashes()
+        create, update, relink = [], [], []
+        for xy, (room_hash, exits_hash) in hashes.items():
+            previous = previous_hashes.get(xy)
+            if not previous:
+                create.append(xy)
+                relink.append(xy)
+                continue
+            if previous[0] != room_hash:
+                update.append(xy)
+            if previous[1] != exits_hash:
+                relink.append(xy)
+        delete = [xy for xy in previous_hashes if xy not in hashes]
+        return {
+            "create": sorted(create),
+            "update": sorted(update),
+            "relink": sorted(relink),
+            "delete": sorted(delete),
+            "hashes": hashes,
+        }
+
+    def delete_rooms(self, xy_coords):
+        """
+        Delete the spawned rooms (and their exits) at the given coordinates.
+
+        Args:
+            xy_coords (list): The (X,Y) coordinates of the rooms to delete.
+
+        """
+        global _XYZROOMCLASS
+        if not _XYZROOMCLASS:
+            from evennia.contrib.grid.xyzgrid.xyzroom import XYZRoom as _XYZROOMCLASS
+
+        for X, Y in xy_coords:
+            for existing_room in _XYZROOMCLASS.objects.filter_xyz(xyz=(X, Y, self.Z)):
+                self.log(f"  deleting room at {existing_room.xyz} (not found on map).")
+                existing_room.delete()
+
     def spawn_links(self, xy=("*", "*"), nodes=None, directions=None):
         """
         Convert links of this XYMap into actual in-game exits by spawning their related
@@ -796,20 +995,17 @@ class XYMap:
                 f"{endnode}. They must both be MapNodes (not Links)"
             )
 
-        if self.pathfinding_routes is None:
-            self.calculate_path_matrix()
-
-        pathfinding_routes = self.pathfinding_routes
+        _, predecessors = self.get_pathfinding_tree(istartnode)
         node_index_map = self.node_index_map
 
         path = [endnode]
         directions = []
 
-        while pathfinding_routes[istartnode, inextnode] != -9999:
+        while predecessors[inextnode] != -9999:
             # the -9999 is set by algorithm for unreachable nodes or if trying
             # to go a node we are already at (the start node in this case since
             # we are working backwards).
-            inextnode = pathfinding_routes[istartnode, inextnode]
+            inextnode = predecessors[inextnode]
             nextnode = node_index_map[inextnode]
             shortest_route_to = nextnode.shortest_route_to_node[path[-1].node_index]
 
@@ -908,46 +1104,37 @@ class XYMap:
         # convert inputs to xygrid
         width, height = self.max_x + 1, self.max_y + 1
         ix, iy = max(0, min(iX * 2, width)), max(0, min(iY * 2, height))
-        display_map = self.display_map
         xmin, xmax, ymin, ymax = 0, width - 1, 0, height - 1
 
+        if mode not in ("nodes", "scan"):
+            raise MapError(
+                f"Map.get_visual_range 'mode' was '{mode}' "
+                "- it must be either 'scan' or 'nodes'."
+            )
+
         if dist is None:
             # show the entire grid
-            gridmap = self.display_map
+            gridarray = self.display_array
             ixc, iyc = ix, iy
 
-        elif dist is None or dist <= 0 or not self.get_node_from_coord(xy):
+        elif dist <= 0 or not self.get_node_from_coord(xy):
             # There is no node at these coordinates. Show
             # nothing but ourselves or emptiness
             return character if character else self.empty_symbol
 
-        elif mode == "nodes":
-            # dist measures only full, reachable nodes.
-            points, xmin, xmax, ymin, ymax = self._get_topology_around_coord(xy, dist=dist)
-
-            ixc, iyc = ix - xmin, iy - ymin
-            # note - override width/height here since our grid is
+        else:
+            gridarray, ixc, iyc, xmin, xmax, ymin, ymax = self._get_visual_area(
+                ix, iy, dist, mode
+            )
+            # note - override height here since our grid is
             # now different from the original for future cropping
-            width, height = xmax - xmin + 1, ymax - ymin + 1
-            gridmap = [[" "] * width for _ in range(height)]
-            for (ix0, iy0) in points:
-                gridmap[iy0 - ymin][ix0 - xmin] = display_map[iy0][ix0]
+            height, width = gridarray.shape
 
-        elif mode == "scan":
-            # scan-mode - dist measures individual grid points
+        # work on a copy, the cached area is re-used
+        gridarray = gridarray.copy()
 
-            xmin, xmax = max(0, ix - dist), min(width, ix + dist + 1)
-            ymin, ymax = max(0, iy - dist), min(height, iy + dist + 1)
-            ixc, iyc = ix - xmin, iy - ymin
-            gridmap = [line[xmin:xmax] for line in display_map[ymin:ymax]]
-
-        else:
-            raise MapError(
-                f"Map.get_visual_range 'mode' was '{mode}' "
-                "- it must be either 'scan' or 'nodes'."
-            )
         if character:
-            gridmap[iyc][ixc] = character  # correct indexing; it's a list of lines
+            gridarray[iyc, ixc] = character
 
         if target:
             # stylize path to target
@@ -972,7 +1159,7 @@ class XYMap:
                 # don't decorate current (character?) location
                 ix, iy = node_or_link.x, node_or_link.y
                 if xmin <= ix <= xmax and ymin <= iy <= ymax:
-                    gridmap[iy - ymin][ix - xmin] = _target_path_style(node_or_link)
+                    gridarray[iy - ymin, ix - xmin] = _target_path_style(node_or_link)
 
         if max_size:
             # crop grid to make sure it doesn't grow too far
@@ -981,11 +1168,11 @@ class XYMap:
             max_y = self.max_y if max_y is None else max_y
             xmin, xmax = max(0, ixc - max_x // 2), min(width, ixc + max_x // 2 + 1)
             ymin, ymax = max(0, iyc - max_y // 2), min(height, iyc + max_y // 2 + 1)
-            gridmap = [line[xmin:xmax] for line in gridmap[ymin:ymax]]
+            gridarray = gridarray[ymin:ymax, xmin:xmax]
 
         if return_str:
             # we must flip the y-axis before returning the string
             indent = indent * " "
-            return indent + f"\n{indent}".join("".join(line) for line in gridmap[::-1])
+            return indent + f"\n{indent}".join("".join(line) for line in gridarray[::-1])
         else:
-            return gridmap
+            return gridarray.tolist()
@@ -10,13 +10,14 @@ usually shows as an Exit, but the length of the link has no in-game equivalent.
 """
 
 try:
-    from scipy import zeros
+    from numpy import zeros
 except ImportError as err:
     raise ImportError(
         f"{err}\nThe XYZgrid contrib requires "
         "the SciPy package. Install with `pip install scipy'."
     )
 
+import hashlib
 import uuid
 from collections import defaultdict
 
@@ -31,6 +32,26 @@ NodeTypeclass = None
 ExitTypeclass = None
 
 
+def _spawn_hash(*parts):
+    """
+    Get a short, stable hash of the parts that make up the spawned version of a
+    map component. Prototype keys are ignored since they are auto-generated on spawn.
+
+    """
+
+    def _stable(part):
+        if isinstance(part, dict):
+            return sorted(
+                ((key, _stable(value)) for key, value in part.items() if key != "prototype_key"),
+                key=lambda item: repr(item[0]),
+            )
+        if isinstance(part, (list, tuple)):
+            return [_stable(subpart) for subpart in part]
+        return part
+
+    return hashlib.blake2b(repr(_stable(parts)).encode("utf-8"), digest_size=8).hexdigest()
+
+
 UUID_XYZ_NAMESPACE = uuid.uuid5(uuid.UUID(int=0), "xyzgrid")
 
 
@@ -164,6 +185,46 @@ class MapNode:
         """
         return str(uuid.uuid5(UUID_XYZ_NAMESPACE, str((self.X, self.Y, self.Z))))
 
+    def get_spawn_hash(self):
+        """
+        Get a hash of everything used to spawn the room of this node. If this
+        is unchanged since the last spawn, the room does not need to be updated.
+
+        Returns:
+            str or None: The hash, or None if this node is not spawned.
+
+        """
+        if not self.prototype:
+            return None
+        return _spawn_hash(
+            f"{type(self).__module__}.{type(self).__name__}",
+            self.get_spawn_xyz(),
+            self.prototype,
+        )
+
+    def get_links_spawn_hash(self):
+        """
+        Get a hash of everything used to spawn the exits out of this node. If this
+        is unchanged since the last spawn, the exits do not need to be updated.
+
+        Returns:
+            str or None: The hash, or None if this node is not spawned.
+
+        """
+        if not self.prototype:
+            return None
+        return _spawn_hash(
+            *(
+                (
+                    direction,
+                    self.get_exit_spawn_name(direction),
+                    self.links[direction].get_spawn_xyz(),
+                    link.prototype,
+                )
+                for direction, link in sorted(self.first_links.items())
+            )
+        )
+
     def build_links(self):
         """
         This is called by the map parser when this node is encountered. It tells the node
@@ -230,14 +291,14 @@ class MapNode:
 
     def linkweights(self, nnodes):
         """
-        Retrieve all the weights for the direct links to all other nodes. This is
-        used for the efficient generation of shortest-paths.
+        Retrieve all the weights for the direct links to all other nodes as a dense
+        array. The pathfinder builds its sparse graph from `.weights` directly.
 
         Args:
             nnodes (int): The total number of nodes
 
         Returns:
-            scipy.array: Array of weights of the direct links to other nodes.
+            numpy.array: Array of weights of the direct links to other nodes.
                 The weight will be 0 for nodes not directly connected to one another.
 
         Notes:
@@ -457,9 +518,9 @@ class TransitionMapNode(MapNode):
     This node acts as an end-node for a link that actually leads to a specific node on another
     map. It is not actually represented by a separate room in-game.
 
-    This teleportation is not understood by the pathfinder, so why it will be possible to pathfind
-    to this node, it really represents a map transition. Only a single link must ever be connected
-    to this node.
+    This teleportation is not understood by the XYMap's pathfinder, so while it will be possible to
+    pathfind to this node, it really represents a map transition. `XYZGrid.get_shortest_path` can
+    find routes across such transitions. Only a single link must ever be connected to this node.
 
     Properties:
     - `target_map_xyz` (tuple) - the (X, Y, Z) coordinate of a node on the other map to teleport
@@ -16,13 +16,22 @@ The grid has three main functions:
 
 
 """
+from collections import defaultdict
+from heapq import heappop, heappush
+from math import isinf
+
 from evennia.scripts.scripts import DefaultScript
 from evennia.utils import logger
 from evennia.utils.utils import variable_from_module
 
+from .utils import MapError
 from .xymap import XYMap
+from .xymap_legend import TransitionMapNode
 from .xyzroom import XYZExit, XYZRoom
 
+# Attribute category for storing the spawn hashes of each map
+_SPAWN_HASH_CATEGORY = "xyzgrid_spawn_hashes"
+
 
 class XYZGrid(DefaultScript):
     """
@@ -139,6 +148,7 @@ class XYZGrid(DefaultScript):
         """
         self.log("(Re)loading grid ...")
         self.ndb.grid = {}
+        self.ndb.transition_graph = None
         nmaps = 0
         loaded_mapdata = {}
         changed = []
@@ -205,6 +215,174 @@ class XYZGrid(DefaultScript):
                 raise RuntimeError("XYZGrid.add_map data must contain 'zcoord'.")
 
             self.db.map_data[zcoord] = mapdata
+        self.ndb.transition_graph = None
+
+    def _get_transition_target(self, transition_node):
+        """
+        Get the node a TransitionMapNode leads to.
+
+        Args:
+            transition_node (TransitionMapNode): The transition.
+
+        Returns:
+            MapNode or None: The node on the other map, or None if the
+            transition's `target_map_xyz` does not point to a valid node.
+
+        """
+        X, Y, Z = transition_node.target_map_xyz
+        xymap = self.get_map(Z)
+        if not xymap:
+            return None
+        try:
+            target = xymap.get_node_from_coord((X, Y))
+        except (MapError, TypeError):
+            return None
+        if target is None or isinstance(target, TransitionMapNode):
+            return None
+        return target
+
+    def get_transition_graph(self):
+        """
+        Get the graph of transitions between maps. This is built on first use
+        and then cached until the grid reloads.
+
+        Returns:
+            tuple: `(transitions, graph)`. `transitions` is a dict
+            `{zcoord: [TransitionMapNode, ...]}` of the transitions out of each map.
+            `graph` is a dict `{(zcoord, node_index): (target_node, [(next_transition,
+            cost), ...])}` for each transition, with the node it leads to and the
+            transitions reachable from that node on its map, with the cost of
+            getting there.
+
+        """
+        if self.ndb.transition_graph is None:
+            transitions = {
+                zcoord: [
+                    node
+                    for node in xymap.node_index_map.values()
+                    if isinstance(node, TransitionMapNode)
+                ]
+                for zcoord, xymap in self.grid.items()
+            }
+            graph = {}
+            for zcoord, transition_nodes in transitions.items():
+                for transition_node in transition_nodes:
+                    target = self._get_transition_target(transition_node)
+                    if not target:
+                        continue
+                    distances, _ = target.xymap.get_pathfinding_tree(target.node_index)
+                    graph[(zcoord, transition_node.node_index)] = (
+                        target,
+                        [
+                            (next_node, float(distances[next_node.node_index]))
+                            for next_node in transitions.get(target.Z, [])
+                            if not isinf(distances[next_node.node_index])
+                        ],
+                    )
+            self.ndb.transition_graph = (transitions, graph)
+        return self.ndb.transition_graph
+
+    def get_shortest_path(self, start_xyz, end_xyz):
+        """
+        Get the shortest route between two points on the grid, also across maps
+        by way of their `TransitionMapNode`s.
+
+        Args:
+            start_xyz (tuple): The (X,Y,Z) coordinate to start from.
+            end_xyz (tuple): The (X,Y,Z) coordinate to find the shortest route to.
+
+        Returns:
+            tuple: Two lists, first containing the list of directions as strings
+            (n, ne etc) and the second is a mixed list of MapNodes and MapLinks (from
+            all maps passed through) describing the full path including the start- and
+            end-node. Both are empty if there is no route.
+
+        Notes:
+            Within a map, routes are found with the map's own pathfinder. Between
+            maps, only the (pre-calculated) costs between transitions are considered,
+            so the cost of finding a route across maps grows with the number of
+            transitions, not with the number of nodes.
+
+        """
+        start_map, end_map = self.get_map(start_xyz[2]), self.get_map(end_xyz[2])
+        if not (start_map and end_map):
+            return [], []
+        startnode = start_map.get_node_from_coord(start_xyz[:2])
+        endnode = end_map.get_node_from_coord(end_xyz[:2])
+        if not (startnode and endnode):
+            return [], []
+
+        transitions, graph = self.get_transition_graph()
+        distances, _ = start_map.get_pathfinding_tree(startnode.node_index)
+
+        # the route without leaving the map, if any
+        best_cost, best_last = float("inf"), None
+        if start_map is end_map:
+            best_cost = distances[endnode.node_index]
+
+        # Dijkstra's algorithm over the transitions. Each heap entry is
+        # (cost, tiebreak, transition_key, previous transition_key)
+        heap = []
+        for num, node in enumerate(transitions.get(start_map.Z, [])):
+            cost = distances[node.node_index]
+            if not isinf(cost):
+                heappush(heap, (cost, num, (start_map.Z, node.node_index), None))
+
+        previous = {}
+        counter = len(heap)
+        while heap:
+            cost, _, key, prev_key = heappop(heap)
+            if cost >= best_cost:
+                # nothing left in the heap can lead to a cheaper route
+                break
+            if key in previous:
+                continue
+            previous[key] = prev_key
+            if key not in graph:
+                continue
+            target, next_transitions = graph[key]
+            if target.xymap is end_map:
+                target_distances, _ = end_map.get_pathfinding_tree(target.node_index)
+                end_cost = cost + target_distances[endnode.node_index]
+                if end_cost < best_cost:
+                    best_cost, best_last = end_cost, key
+            for next_node, next_cost in next_transitions:
+                next_key = (next_node.Z, next_node.node_index)
+                if next_key not in previous:
+                    counter += 1
+                    heappush(heap, (cost + next_cost, counter, next_key, key))
+
+        if best_last is None:
+            if isinf(best_cost):
+                return [], []
+            # staying on the map is the shortest route
+            return start_map.get_shortest_path(start_xyz[:2], end_xyz[:2])
+
+        # walk back through the transitions used, then path each leg on its map
+        used = []
+        key = best_last
+        while key:
+            used.append(key)
+            key = previous[key]
+        used.reverse()
+
+        directions, path = [], []
+        leg_map, leg_start = start_map, startnode
+        for zcoord, node_index in used:
+            transition_node = leg_map.node_index_map[node_index]
+            leg_directions, leg_path = leg_map.get_shortest_path(
+                (leg_start.X, leg_start.Y), (transition_node.X, transition_node.Y)
+            )
+            directions.extend(leg_directions)
+            path.extend(leg_path)
+            leg_start = graph[(zcoord, node_index)][0]
+            leg_map = leg_start.xymap
+        leg_directions, leg_path = leg_map.get_shortest_path(
+            (leg_start.X, leg_start.Y), (endnode.X, endnode.Y)
+        )
+        directions.extend(leg_directions)
+        path.extend(leg_path)
+        return directions, path
 
     def remove_map(self, *zcoords, remove_objects=True):
         """
@@ -219,6 +397,7 @@ class XYZGrid(DefaultScript):
         for zcoord in zcoords:
             if zcoord in self.db.map_data:
                 self.db.map_data.pop(zcoord)
+            self.attributes.remove(str(zcoord), category=_SPAWN_HASH_CATEGORY)
             if remove_objects:
                 # we can't batch-delete because we want to run the .delete
                 # method that also wipes exits and moves content to save locations
@@ -236,7 +415,32 @@ class XYZGrid(DefaultScript):
             self.remove_map(*(zcoord for zcoord in self.db.map_data), remove_objects=True)
         super().delete()
 
-    def spawn(self, xyz=("*", "*", "*"), directions=None):
+    def _get_transition_relinks(self, targets):
+        """
+        Find the nodes with exits leading to the given rooms by way of map transitions.
+        Such exits are deleted along with their destination room, so they must be
+        respawned when the room is recreated.
+
+        Args:
+            targets (dict): `{zcoord: xy_coords}`, where `xy_coords` is a set of the (X,Y)
+                coordinates of the (re)spawned rooms on the map.
+
+        Returns:
+            dict: `{zcoord: [(X,Y), ...]}` of the nodes whose exits should be respawned.
+
+        """
+        relinks = defaultdict(set)
+        for zcoord, xymap in self.grid.items():
+            for node in xymap.node_index_map.values():
+                for target in node.links.values():
+                    if not isinstance(target, TransitionMapNode):
+                        continue
+                    X, Y, Z = target.target_map_xyz
+                    if (X, Y) in targets.get(Z, ()):
+                        relinks[zcoord].add((node.X, node.Y))
+        return {zcoord: sorted(xy_coords) for zcoord, xy_coords in relinks.items()}
+
+    def spawn(self, xyz=("*", "*", "*"), directions=None, dry_run=False, force=False):
         """
         Create/recreate/update the in-game grid based on the stored Maps or for a specific Map
         or coordinate.
@@ -246,6 +450,26 @@ class XYZGrid(DefaultScript):
                 acts as a wildcard.
             directions (list, optional): A list of cardinal directions ('n', 'ne' etc).
                 Spawn exits only the given direction. If unset, all needed directions are spawned.
+            dry_run (bool, optional): Don't change anything, only report what would be done.
+            force (bool, optional): Ignore what was recorded at the last spawn and sync
+                everything with the database. Use this to repair rooms and exits that
+                were changed or deleted in-game.
+
+        Returns:
+            dict: A report `{zcoord: {"create": [...], "update": [...], "relink": [...],
+            "delete": [...], "full": bool}}` of the (X,Y) coordinates of rooms that were (or
+            would be) created, updated, had their exits updated, or were deleted, per map.
+            If `full` is set, all of the map (or the given part of it) was synced to the
+            database, because of `force` or since the map had no record of an earlier
+            spawn. Maps with exits leading to recreated rooms on other maps are included
+            with those rooms under `relink`.
+
+        Notes:
+            When spawning entire maps (X and Y are wildcards and no `directions` are
+            given), a hash of every room and its exits is stored. On the next spawn,
+            only the rooms and exits whose definitions changed are touched, unless
+            `force` is set. Spawning only parts of a map always syncs those parts with
+            the database and makes the next spawn of the map a full one.
 
         Examples:
             - `xyz=('*', '*', '*')` (default) - spawn/update all maps.
@@ -266,15 +490,102 @@ class XYZGrid(DefaultScript):
         else:
             raise RuntimeError(f"The 'z' coordinate/name '{z}' is not found on the grid.")
 
+        whole_maps = x == y == wildcard and not directions
+
+        # figure out what changed since the last spawn
+        diffs = {}
+        for zcoord, xymap in xymaps.items():
+            previous_hashes = None
+            if whole_maps and not force:
+                previous_hashes = self.attributes.get(str(zcoord), category=_SPAWN_HASH_CATEGORY)
+            if previous_hashes is None:
+                # no record of an earlier spawn - sync everything
+                diff = xymap.get_spawn_diff({})
+                diff["full"] = True
+            else:
+                diff = xymap.get_spawn_diff(previous_hashes)
+                diff["full"] = False
+            diffs[zcoord] = diff
+
+        # exits on other maps transitioning to recreated rooms must be respawned
+        targets = {}
+        for zcoord, xymap in xymaps.items():
+            if diffs[zcoord]["full"]:
+                targets[zcoord] = {
+                    (node.X, node.Y)
+                    for node in xymap.node_index_map.values()
+                    if x in (wildcard, node.X) and y in (wildcard, node.Y)
+                }
+            else:
+                targets[zcoord] = set(diffs[zcoord]["create"])
+        transition_relinks = {
+            zcoord: xy_coords
+            for zcoord, xy_coords in self._get_transition_relinks(targets).items()
+            # a full spawn of a whole map respawns all its exits anyway
+            if not (zcoord in diffs and diffs[zcoord]["full"] and whole_maps)
+        }
+
+        report = {
+            zcoord: {key: value for key, value in diff.items() if key != "hashes"}
+            for zcoord, diff in diffs.items()
+        }
+        for zcoord, xy_coords in transition_relinks.items():
+            changes = report.setdefault(
+                zcoord, {"create": [], "update": [], "relink": [], "delete": [], "full": False}
+            )
+            changes["relink"] = sorted(set(changes["relink"]).union(xy_coords))
+        if dry_run:
+            return report
+
         # first build all nodes/rooms
         for zcoord, xymap in xymaps.items():
-            self.log(f"spawning/updating nodes for Z='{zcoord}' ...")
-            xymap.spawn_nodes(xy=(x, y))
+            diff = diffs[zcoord]
+            if diff["full"]:
+                self.log(f"spawning/updating nodes for Z='{zcoord}' ...")
+                xymap.spawn_nodes(xy=(x, y))
+                continue
+            self.log(
+                f"spawning/updating nodes for Z='{zcoord}' ({len(diff['create'])} new, "
+                f"{len(diff['update'])} changed, {len(diff['delete'])} removed) ..."
+            )
+            xymap.delete_rooms(diff["delete"])
+            for X, Y in diff["create"] + diff["update"]:
+                xymap.get_node_from_coord((X, Y)).spawn()
 
         # next build all links between nodes (including between maps)
         for zcoord, xymap in xymaps.items():
-            self.log(f"spawning/updating links for Z='{zcoord}' ...")
-            xymap.spawn_links(xy=(x, y), directions=directions)
+            diff = diffs[zcoord]
+            if diff["full"]:
+                self.log(f"spawning/updating links for Z='{zcoord}' ...")
+                xymap.spawn_links(xy=(x, y), directions=directions)
+            elif diff["relink"]:
+                self.log(
+                    f"spawning/updating links for Z='{zcoord}' "
+                    f"({len(diff['relink'])} rooms with changed exits) ..."
+                )
+                xymap.spawn_links(nodes=[xymap.get_node_from_coord(xy) for xy in diff["relink"]])
+
+        # and the exits transitioning to recreated rooms from other maps
+        for zcoord, xy_coords in transition_relinks.items():
+            xymap = self.grid[zcoord]
+            if zcoord in diffs and not diffs[zcoord]["full"]:
+                # these were already respawned above
+                xy_coords = [xy for xy in xy_coords if xy not in diffs[zcoord]["relink"]]
+            if xy_coords:
+                self.log(
+                    f"spawning/updating links for Z='{zcoord}' "
+                    f"({len(xy_coords)} rooms with transitions to respawned rooms) ..."
+                )
+                xymap.spawn_links(nodes=[xymap.get_node_from_coord(xy) for xy in xy_coords])
+
+        # remember what was spawned
+        for zcoord, diff in diffs.items():
+            if whole_maps:
+                self.attributes.add(str(zcoord), diff["hashes"], category=_SPAWN_HASH_CATEGORY)
+            else:
+                self.attributes.remove(str(zcoord), category=_SPAWN_HASH_CATEGORY)
+
+        return report
 
 
 def get_xyzgrid(print_errors=True):
@@ -140,3 +140,60 @@ class TestFileHelp(TestCase):
             self.assertEqual(HELP_ENTRY_DICTS[inum].get("aliases", []), helpentry.aliases)
             self.assertEqual(HELP_ENTRY_DICTS[inum]["category"], helpentry.help_category)
             self.assertEqual(HELP_ENTRY_DICTS[inum]["text"], helpentry.entrytext)
+
+
+class _IndexedEntry:
+    """
+    Minimal stand-in for a help entry.
+
+    """
+
+    def __init__(self, key, aliases="", category="general", text=""):
+        self.search_index_entry = {
+            "key": key,
+            "aliases": aliases,
+            "category": category,
+            "tags": "",
+            "text": text,
+        }
+
+
+class TestHelpSearchIndex(TestCase):
+    """
+    Test the cached help search index.
+
+    """
+
+    def setUp(self):
+        help_utils.clear_search_index_cache()
+        self.entries = [
+            _IndexedEntry("look", aliases="l ls", text="Look around."),
+            _IndexedEntry("get", aliases="grab", text="Pick something up."),
+            _IndexedEntry("drop", text="Drop something."),
+        ]
+
+    def test_search(self):
+        matches, suggestions = help_utils.help_search_with_index("grab", self.entries)
+        self.assertEqual(matches, [self.entries[1]])
+        self.assertEqual(suggestions, ["get"])
+
+    def test_index_cache(self):
+        fields = [{"field_name": "key", "boost": 10}, {"field_name": "aliases", "boost": 9}]
+        indx = [entry.search_index_entry for entry in self.entries]
+        index1 = help_utils.get_search_index(indx, fields)
+        # the same entries (even as new objects) reuse the index
+        self.assertIs(help_utils.get_search_index([dict(ent) for ent in indx], fields), index1)
+        # other fields need another index
+        self.assertIsNot(help_utils.get_search_index(indx, fields[:1]), index1)
+        # a changed entry means a new index
+        self.entries[2].search_index_entry["aliases"] = "discard"
+        matches, _ = help_utils.help_search_with_index("discard", self.entries, fields=fields)
+        self.assertEqual(matches, [self.entries[2]])
+        self.assertEqual(len(help_utils._SEARCH_INDEX_CACHE), 3)
+
+    @mock.patch("evennia.help.utils._SEARCH_INDEX_CACHE_SIZE", 2)
+    def test_index_cache_size(self):
+        fields = [{"field_name": "key", "boost": 10}]
+        for key in ("foo", "bar", "moo"):
+            help_utils.get_search_index([{"key": key}], fields)
+        self.assertEqual(len(help_utils._SEARCH_INDEX_CACHE), 2)
@@ -5,7 +5,9 @@ sub-categories.
 This is used primarily by the default `help` command.
 
 """
+
 import re
+from collections import OrderedDict
 
 from django.conf import settings
 
@@ -34,25 +36,15 @@ _RE_HELP_SUBTOPIC_PARSE = re.compile(r"^(?P<nesting>\#{2,6})\s*?(?P<name>.*?)$",
 
 MAX_SUBTOPIC_NESTING = 5
 
+# built search indexes, reused while the entries they were built from don't change.
+# {signature: lunr index}, least recently used first
+_SEARCH_INDEX_CACHE = OrderedDict()
+_SEARCH_INDEX_CACHE_SIZE = settings.HELP_SEARCH_INDEX_CACHE_SIZE
 
-def help_search_with_index(query, candidate_entries, suggestion_maxnum=5, fields=None):
-    """
-    Lunr-powered fast index search and suggestion wrapper. See https://lunrjs.com/.
 
-    Args:
-        query (str): The query to search for.
-        candidate_entries (list): This is the body of possible entities to search. Each
-            must have a property `.search_index_entry` that returns a dict with all
-            keys in the `fields` arg.
-        suggestion_maxnum (int): How many matches to allow at most in a multi-match.
-        fields (list, optional): A list of Lunr field mappings
-            ``{"field_name": str, "boost": int}``. See the Lunr documentation
-            for more details. The field name must exist in the dicts returned
-            by `.search_index_entry` of the candidates. If not given, a default setup
-            is used, prefering keys > aliases > category > tags.
-    Returns:
-        tuple: A tuple (matches, suggestions), each a list, where the `suggestion_maxnum` limits
-            how many suggestions are included.
+def _load_lunr():
+    """
+    Import lunr and set up its pipeline the first time it's needed.
 
     """
     global _LUNR, _LUNR_EXCEPTION, _LUNR_BUILDER_PIPELINE, _LUNR_GET_BUILDER
@@ -81,6 +73,82 @@ def help_search_with_index(query, candidate_entries, suggestion_maxnum=5, fields
         # _LUNR_BUILDER_PIPELINE = (trimmer, custom_stop_words_filter, stemmer)
         _LUNR_BUILDER_PIPELINE = (custom_stop_words_filter, stemmer)
 
+
+def get_search_index(index_entries, fields):
+    """
+    Get a Lunr search index for a set of help entries. Building the index is
+    the slow part of a search, so indexes are cached and reused for as long as
+    the entries they were built from are unchanged.
+
+    Args:
+        index_entries (list): The `search_index_entry` dicts of the entries.
+        fields (list): The Lunr field mappings ``{"field_name": str, "boost": int}``.
+
+    Returns:
+        lunr.Index: The search index. Its refs are the entries' `key`s.
+
+    Notes:
+        The cache is keyed on the contents of the entries (their key and
+        indexed fields), so a change to any entry (like editing a db help
+        entry, reloading file-help modules or getting a different cmdset)
+        means a new index is built for that set of entries, while indexes
+        for other sets are kept.
+
+    """
+    _load_lunr()
+    field_names = ("key",) + tuple(field["field_name"] for field in fields)
+    signature = (
+        tuple((field["field_name"], field.get("boost", 1)) for field in fields),
+        tuple(tuple(entry.get(name) for name in field_names) for entry in index_entries),
+    )
+    try:
+        search_index = _SEARCH_INDEX_CACHE.pop(signature, None)
+    except TypeError:
+        # unhashable field values - don't cache
+        signature = search_index = None
+
+    if search_index is None:
+        # build the search index
+        builder = _LUNR_GET_BUILDER()
+        builder.pipeline.reset()
+        builder.pipeline.add(*_LUNR_BUILDER_PIPELINE)
+        search_index = _LUNR(ref="key", fields=fields, documents=index_entries, builder=builder)
+
+    if signature is not None:
+        _SEARCH_INDEX_CACHE[signature] = search_index
+        while len(_SEARCH_INDEX_CACHE) > _SEARCH_INDEX_CACHE_SIZE:
+            _SEARCH_INDEX_CACHE.popitem(last=False)
+    return search_index
+
+
+def clear_search_index_cache():
+    """
+    Forget all cached help search indexes.
+
+    """
+    _SEARCH_INDEX_CACHE.clear()
+
+
+def help_search_with_index(query, candidate_entries, suggestion_maxnum=5, fields=None):
+    """
+    Lunr-powered fast index search and suggestion wrapper. See https://lunrjs.com/.
+
+    Args:
+        query (str): The query to search for.
+        candidate_entries (list): This is the body of possible entities to search. Each
+            must have a property `.search_index_entry` that returns a dict with all
+            keys in the `fields` arg.
+        suggestion_maxnum (int): How many matches to allow at most in a multi-match.
+        fields (list, optional): A list of Lunr field mappings
+            ``{"field_name": str, "boost": int}``. See the Lunr documentation
+            for more details. The field name must exist in the dicts returned
+            by `.search_index_entry` of the candidates. If not given, a default setup
+            is used, prefering keys > aliases > category > tags.
+    Returns:
+        tuple: A tuple (matches, suggestions), each a list, where the `suggestion_maxnum` limits
+            how many suggestions are included.
+
+    """
     indx = [cnd.search_index_entry for cnd in candidate_entries]
     mapping = {indx[ix]["key"]: cand for ix, cand in enumerate(candidate_entries)}
 
@@ -92,12 +160,8 @@ def help_search_with_index(query, candidate_entries, suggestion_maxnum=5, fields
             {"field_name": "tags", "boost": 5},
         ]
 
-    # build the search index
-    builder = _LUNR_GET_BUILDER()
-    builder.pipeline.reset()
-    builder.pipeline.add(*_LUNR_BUILDER_PIPELINE)
-
-    search_index = _LUNR(ref="key", fields=fields, documents=indx, builder=builder)
+    # get the (usually cached) search index
+    search_index = get_search_index(indx, fields)
 
     try:
         matches = search_index.search(query)[:suggestion_maxnum]
@@ -19,6 +19,7 @@ from evennia.commands.cmdsethandler import CmdSetHandler
 from evennia.objects.manager import ObjectManager
 from evennia.objects.models import ObjectDB
 from evennia.scripts.scripthandler import ScriptHandler
+from evennia.server import shards
 from evennia.server.signals import SIGNAL_EXIT_TRAVERSED
 from evennia.typeclasses.attributes import ModelAttributeBackend, NickHandler
 from evennia.typeclasses.models import TypeclassBase
@@ -65,20 +66,40 @@ class ObjectSessionHandler:
         """
         self.obj = obj
         self._sessid_cache = []
+        # sessions handled by other Server shards (see settings.SERVER_SHARDS)
+        self._remote_sessids = []
         self._recache()
 
     def _recache(self):
         global _SESSIONS
         if not _SESSIONS:
             from evennia.server.sessionhandler import SESSIONS as _SESSIONS
-        self._sessid_cache = list(
-            set(int(val) for val in (self.obj.db_sessid or "").split(",") if val)
-        )
-        if any(sessid for sessid in self._sessid_cache if sessid not in _SESSIONS):
+        sessids = list(set(int(val) for val in (self.obj.db_sessid or "").split(",") if val))
+        self._sessid_cache = [sessid for sessid in sessids if sessid in _SESSIONS]
+        if shards.SHARDED:
+            # sessions missing from our sessionhandler may be handled by other shards
+            self._remote_sessids = [sessid for sessid in sessids if sessid not in _SESSIONS]
+            self._prune_remote()
+        elif len(self._sessid_cache) < len(sessids):
             # cache is out of sync with sessionhandler! Only retain the ones in the handler.
-            self._sessid_cache = [sessid for sessid in self._sessid_cache if sessid in _SESSIONS]
-            self.obj.db_sessid = ",".join(str(val) for val in self._sessid_cache)
-            self.obj.save(update_fields=["db_sessid"])
+            self._save()
+
+    def _prune_remote(self):
+        """
+        Forget the sessions thought to be handled by other shards that the Portal
+        doesn't know about, like those left behind by a crash. This can only be done
+        once the Portal has told us about all sessions.
+
+        """
+        if self._remote_sessids and shards.SESSIONS_SYNCED:
+            remote_sessids = [sessid for sessid in self._remote_sessids if shards.is_remote(sessid)]
+            if len(remote_sessids) < len(self._remote_sessids):
+                self._remote_sessids = remote_sessids
+                self._save()
+
+    def _save(self):
+        self.obj.db_sessid = ",".join(str(val) for val in self._sessid_cache + self._remote_sessids)
+        self.obj.save(update_fields=["db_sessid"])
 
     def get(self, sessid=None):
         """
@@ -149,8 +170,10 @@ class ObjectSessionHandler:
             if len(sessid_cache) >= _SESSID_MAX:
                 return
             sessid_cache.append(sessid)
-            self.obj.db_sessid = ",".join(str(val) for val in sessid_cache)
-            self.obj.save(update_fields=["db_sessid"])
+            if sessid in self._remote_sessids:
+                # handed over to us from another shard
+                self._remote_sessids.remove(sessid)
+            self._save()
 
     def remove(self, session):
         """
@@ -168,8 +191,10 @@ class ObjectSessionHandler:
         sessid_cache = self._sessid_cache
         if sessid in sessid_cache:
             sessid_cache.remove(sessid)
-            self.obj.db_sessid = ",".join(str(val) for val in sessid_cache)
-            self.obj.save(update_fields=["db_sessid"])
+            self._save()
+        elif sessid in self._remote_sessids:
+            self._remote_sessids.remove(sessid)
+            self._save()
 
     def clear(self):
         """
@@ -177,6 +202,7 @@ class ObjectSessionHandler:
 
         """
         self._sessid_cache = []
+        self._remote_sessids = []
         self.obj.db_sessid = None
         self.obj.save(update_fields=["db_sessid"])
 
@@ -185,10 +211,24 @@ class ObjectSessionHandler:
         Get amount of sessions connected.
 
         Returns:
-            sesslen (int): Number of sessions handled.
+            sesslen (int): Number of sessions handled, including those handled
+                by other Server shards.
 
         """
-        return len(self._sessid_cache)
+        self._prune_remote()
+        return len(self._sessid_cache) + len(self._remote_sessids)
+
+    def remote(self):
+        """
+        Get the sessions linked to this Object that are handled by other Server
+        shards. These are not returned by `get`.
+
+        Returns:
+            sessids (list): The ids of the sessions.
+
+        """
+        self._prune_remote()
+        return list(self._remote_sessids)
 
 
 #
@@ -227,6 +267,10 @@ class DefaultObject(ObjectDB, metaclass=TypeclassBase):
 {footer}
     """
 
+    # db-fields (db_*) and Attributes whose changes are streamed to sessions
+    # watching this object's OOB state, see `get_oob_state`
+    oob_state_watch = ("db_key", "db_location", "desc")
+
     # on-object properties
 
     @lazy_property
@@ -646,6 +690,9 @@ class DefaultObject(ObjectDB, metaclass=TypeclassBase):
             kwargs["text"] = text
 
         # relay to session(s)
+        if not session and shards.SHARDED:
+            # sessions puppeting us from other Server shards
+            shards.msg_sessions(self.sessions.remote(), **kwargs)
         sessions = make_iter(session) if session else self.sessions.all()
         for session in sessions:
             session.data_out(**kwargs)
@@ -957,6 +1004,9 @@ class DefaultObject(ObjectDB, metaclass=TypeclassBase):
             except Exception as err:
                 logerr(errtxt.format(err="at_post_move"), err)
                 return False
+
+        # the new location may be handled by another Server shard
+        shards.handoff_if_needed(self)
         return True
 
     def clear_exits(self):
@@ -1404,6 +1454,29 @@ class DefaultObject(ObjectDB, metaclass=TypeclassBase):
         """
         return appearance.strip()
 
+    def get_oob_state(self, **kwargs):
+        """
+        Get the state of this object to send to OOB clients (like GMCP/MSDP
+        clients and the webclient) watching it with the `watch_state`
+        inputfunc. Only the keys that changed since the last update are sent.
+
+        Changes to the fields and Attributes listed in `oob_state_watch` cause
+        an update automatically. For other changes, call
+        `evennia.OOB_STATE_HANDLER.mark_dirty(obj)`.
+
+        Args:
+            **kwargs: Arbitrary data for use when overriding.
+
+        Returns:
+            dict: The state. Values must be possible to serialize as JSON.
+
+        """
+        return {
+            "name": self.key,
+            "location": self.location.key if self.location else None,
+            "desc": self.db.desc,
+        }
+
     def return_appearance(self, looker, **kwargs):
         """
         Main callback used by 'look' for the object to describe itself.
@@ -1508,6 +1581,9 @@ class DefaultObject(ObjectDB, metaclass=TypeclassBase):
             if cdict.get("attributes"):
                 # this should be tuples (key, val, ...)
                 self.attributes.batch_add(*cdict["attributes"])
+            if cdict.get("shared_attributes"):
+                # tuples like for attributes, shared with other objects
+                self.attributes.batch_add(*cdict["shared_attributes"], shared=True)
             if cdict.get("nattributes"):
                 # this should be a dict of nattrname:value
                 for key, value in cdict["nattributes"]:
@@ -153,6 +153,8 @@ from evennia.prototypes.prototypes import (
 from evennia.utils import logger
 from evennia.utils.utils import is_iter, make_iter
 
+_PROTOTYPE_SHARED_ATTRIBUTES = settings.PROTOTYPE_SHARED_ATTRIBUTES
+
 _CREATE_OBJECT_KWARGS = ("key", "location", "home", "destination")
 _PROTOTYPE_META_NAMES = (
     "prototype_key",
@@ -837,6 +839,8 @@ def batch_create_object(*objparams):
                         (the newly created object) available in the namespace. Execution
                         will happend after all other properties have been assigned and
                         is intended for calling custom handlers etc.
+                - `shared_attributes` (list, optional): Like `attributes`, but added with
+                    `new_obj.attributes.batch_add(*shared_attributes, shared=True)`.
 
     Returns:
         objects (list): A list of created objects
@@ -867,6 +871,7 @@ def batch_create_object(*objparams):
             "nattributes": objparam[4],
             "attributes": objparam[5],
             "tags": make_iter(objparam[6]),
+            "shared_attributes": objparam[8] if len(objparam) > 8 else None,
         }
         # this triggers all hooks
         obj.save()
@@ -881,6 +886,27 @@ def batch_create_object(*objparams):
 # Spawner mechanism
 
 
+def _is_fixed(value, spawn_value):
+    """
+    Check if a prototype value gives the same value for every spawned object,
+    so it can be shared.
+
+    Args:
+        value (any): The value in the prototype.
+        spawn_value (any): The value after being initialized for spawning.
+
+    Returns:
+        bool: If the value is fixed.
+
+    """
+    if callable(value) or type(value) is not type(spawn_value):
+        return False
+    try:
+        return bool(value == spawn_value)
+    except Exception:
+        return False
+
+
 def spawn(*prototypes, caller=None, **kwargs):
     """
     Spawn a number of prototyped objects.
@@ -903,6 +929,11 @@ def spawn(*prototypes, caller=None, **kwargs):
             (no object creation) and return the create-kwargs.
         protfunc_raise_errors (bool): Raise explicit exceptions on a malformed/not-found
             protfunc. Defaults to True.
+        shared_attributes (bool): Share the prototype's Attributes between the spawned
+            objects instead of giving each object its own copy. Only Attributes with a
+            fixed value (not given by a protfunc or callable) are shared. A shared
+            Attribute is copied to an object when it's changed on it. Defaults to
+            `settings.PROTOTYPE_SHARED_ATTRIBUTES`.
 
     Returns:
         object (Object, dict or list): Spawned object(s). If `only_validate` is given, return
@@ -929,6 +960,9 @@ def spawn(*prototypes, caller=None, **kwargs):
         protparent["prototype_key"] = str(protparent.get("prototype_key", key)).lower()
         custom_protparents[key] = protlib.homogenize_prototype(protparent)
 
+    share = kwargs.get("shared_attributes")
+    share = _PROTOTYPE_SHARED_ATTRIBUTES if share is None else share
+
     objsparams = []
     for prototype in prototypes:
 
@@ -1022,11 +1056,13 @@ def spawn(*prototypes, caller=None, **kwargs):
         # the rest are attribute tuples (attrname, value, category, locks)
         val = make_iter(prot.pop("attrs", []))
         attributes = []
+        shared_attributes = []
         for (attrname, value, *rest) in val:
-            attributes.append(
+            spawn_value = init_spawn_value(value, **init_spawn_kwargs)
+            (shared_attributes if share and _is_fixed(value, spawn_value) else attributes).append(
                 (
                     attrname,
-                    init_spawn_value(value, **init_spawn_kwargs),
+                    spawn_value,
                     rest[0] if rest else None,
                     rest[1] if len(rest) > 1 else None,
                 )
@@ -1040,17 +1076,16 @@ def spawn(*prototypes, caller=None, **kwargs):
             if key in _PROTOTYPE_META_NAMES:
                 continue
             else:
-                simple_attributes.append(
-                    (
-                        key,
-                        init_spawn_value(value, value_to_obj_or_any, **init_spawn_kwargs),
-                        None,
-                        None,
-                    )
-                )
+                spawn_value = init_spawn_value(value, value_to_obj_or_any, **init_spawn_kwargs)
+                (
+                    shared_attributes
+                    if share and _is_fixed(value, spawn_value)
+                    else simple_attributes
+                ).append((key, spawn_value, None, None))
 
         attributes = attributes + simple_attributes
         attributes = [tup for tup in attributes if not tup[0] in _NON_CREATE_KWARGS]
+        shared_attributes = [tup for tup in shared_attributes if not tup[0] in _NON_CREATE_KWARGS]
 
         # pack for call into _batch_create_object
         objsparams.append(
@@ -1063,6 +1098,7 @@ def spawn(*prototypes, caller=None, **kwargs):
                 attributes,
                 tags,
                 execs,
+                shared_attributes,
             )
         )
 
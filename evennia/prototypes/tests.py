@@ -93,6 +93,37 @@ class TestSpawner(BaseEvenniaTest):
             ["goblin grunt", "goblin archwizard"],
         )
 
+    def test_spawn_shared_attributes(self):
+        prot = {
+            "typeclass": "evennia.objects.objects.DefaultObject",
+            "key": "goblin",
+            "resists": ["cold", "poison"],
+            "attrs": [("lore", "Goblins are green.", "info")],
+            "health": lambda: randint(1, 1),
+            "rank": "$randint(5, 5)",
+        }
+        goblin1, goblin2 = spawner.spawn(prot, prot, shared_attributes=True)
+        resists1 = goblin1.attributes.get("resists", return_obj=True)
+        resists2 = goblin2.attributes.get("resists", return_obj=True)
+        self.assertTrue(resists1.db_shared)
+        self.assertEqual(resists1.id, resists2.id)
+        self.assertEqual(
+            goblin1.attributes.get("lore", category="info", return_obj=True).id,
+            goblin2.attributes.get("lore", category="info", return_obj=True).id,
+        )
+        # values not fixed in the prototype are not shared
+        self.assertFalse(goblin1.attributes.get("health", return_obj=True).db_shared)
+        self.assertFalse(goblin1.attributes.get("rank", return_obj=True).db_shared)
+        self.assertEqual(goblin1.db.rank, 5)
+
+        goblin1.db.resists.append("fire")
+        self.assertEqual(goblin1.db.resists, ["cold", "poison", "fire"])
+        self.assertEqual(goblin2.db.resists, ["cold", "poison"])
+
+        # not shared by default
+        goblin3 = spawner.spawn(prot)[0]
+        self.assertFalse(goblin3.attributes.get("resists", return_obj=True).db_shared)
+
 
 class TestUtils(BaseEvenniaTest):
     def test_prototype_from_object(self):
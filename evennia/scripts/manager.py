@@ -116,16 +116,26 @@ class ScriptDBManager(TypedObjectManager):
         """
         Update/sync/restart/delete scripts after server shutdown/restart.
 
+        Notes:
+            If `settings.SCRIPTS_BOOT_TIMED_ONLY` is set, only Scripts with an
+            active timer are loaded here. Other Scripts are not loaded until
+            they are accessed and don't get their `at_server_start` hook called.
+
         """
         for script in self.filter(db_is_active=True, db_persistent=False):
             script._stop_task()
 
-        for script in self.filter(db_is_active=True):
+        timed_only = settings.SCRIPTS_BOOT_TIMED_ONLY
+        active = self.filter(db_is_active=True)
+        if timed_only:
+            active = active.filter(db_interval__gt=0)
+        for script in active:
             script._unpause_task(auto_unpause=True)
             script.at_server_start()
 
-        for script in self.filter(db_is_active=False):
-            script.at_server_start()
+        if not timed_only:
+            for script in self.filter(db_is_active=False):
+                script.at_server_start()
 
     def search_script(self, ostring, obj=None, only_timed=False, typeclass=None):
         """
@@ -9,10 +9,20 @@ functionality:
 - Attribute-monitor tracks an object's specific Attribute and perform
     an action whenever that Attribute *changes* for whatever reason.
 
+Only entities with monitors on them are checked when they save, so the
+handler costs nothing for the (vast majority of) unmonitored entities.
+Monitors added with `batched=True` are not called on every save but at most
+once every `settings.MONITOR_BATCH_INTERVAL` seconds, no matter how many
+times the value changed in between.
+
 """
 import inspect
 from collections import defaultdict
 
+from django.conf import settings
+from twisted.internet import reactor
+
+from evennia.server import shards
 from evennia.server.models import ServerConfig
 from evennia.utils import logger, variable_from_module
 from evennia.utils.dbserialize import dbserialize, dbunserialize
@@ -21,6 +31,8 @@ _SA = object.__setattr__
 _GA = object.__getattribute__
 _DA = object.__delattr__
 
+_BATCH_INTERVAL = settings.MONITOR_BATCH_INTERVAL
+
 
 class MonitorHandler(object):
     """
@@ -34,8 +46,14 @@ class MonitorHandler(object):
         Initialize the handler.
 
         """
-        self.savekey = "_monitorhandler_save"
+        # with many Server shards, each saves the monitors it runs
+        self.savekey = (
+            f"_monitorhandler_save_{shards.SHARD}" if shards.SHARD else "_monitorhandler_save"
+        )
         self.monitors = defaultdict(lambda: defaultdict(dict))
+        # batched monitors waiting to be called {(obj, fieldname, idstring): True}
+        self.pending = {}
+        self._batch_call = None
 
     def save(self):
         """
@@ -43,21 +61,32 @@ class MonitorHandler(object):
         by the server process.
 
         Since dbserialize can't handle defaultdicts, we convert to an
-        intermediary save format ((obj,fieldname, idstring, callback, kwargs), ...)
+        intermediary save format
+        ((obj, fieldname, idstring, path, persistent, kwargs, batched), ...)
 
         """
-        savedata = []
         if self.monitors:
-            for obj in self.monitors:
-                for fieldname in self.monitors[obj]:
-                    for idstring, (callback, persistent, kwargs) in self.monitors[obj][
-                        fieldname
-                    ].items():
-                        path = "%s.%s" % (callback.__module__, callback.__name__)
-                        savedata.append((obj, fieldname, idstring, path, persistent, kwargs))
-            savedata = dbserialize(savedata)
+            savedata = dbserialize(self._get_savedata())
             ServerConfig.objects.conf(key=self.savekey, value=savedata)
 
+    def _get_savedata(self, session=None):
+        """
+        Get the monitors in the save format, optionally only those added with
+        a given `session` keyword.
+
+        """
+        savedata = []
+        for obj in self.monitors:
+            for fieldname in self.monitors[obj]:
+                for idstring, (callback, persistent, kwargs, batched) in self.monitors[obj][
+                    fieldname
+                ].items():
+                    if session and kwargs.get("session") is not session:
+                        continue
+                    path = "%s.%s" % (callback.__module__, callback.__name__)
+                    savedata.append((obj, fieldname, idstring, path, persistent, kwargs, batched))
+        return savedata
+
     def restore(self, server_reload=True):
         """
         Restore our monitors after a reload. This is called
@@ -70,28 +99,71 @@ class MonitorHandler(object):
 
         """
         self.monitors = defaultdict(lambda: defaultdict(dict))
+        self.pending = {}
         restored_monitors = ServerConfig.objects.conf(key=self.savekey)
         if restored_monitors:
-            restored_monitors = dbunserialize(restored_monitors)
-            for (obj, fieldname, idstring, path, persistent, kwargs) in restored_monitors:
-                try:
-                    if not server_reload and not persistent:
-                        # this monitor will not be restarted
-                        continue
-                    if "session" in kwargs and not kwargs["session"]:
-                        # the session was removed because it no longer
-                        # exists. Don't restart the monitor.
-                        continue
-                    modname, varname = path.rsplit(".", 1)
-                    callback = variable_from_module(modname, varname)
-
-                    if obj and hasattr(obj, fieldname):
-                        self.monitors[obj][fieldname][idstring] = (callback, persistent, kwargs)
-                except Exception:
-                    continue
+            self._add_saved(dbunserialize(restored_monitors), server_reload)
         # make sure to clean data from database
         ServerConfig.objects.conf(key=self.savekey, delete=True)
 
+    def _add_saved(self, savedata, server_reload=True):
+        """
+        Add monitors from the save format.
+
+        """
+        for monitor in savedata:
+            try:
+                # monitors saved before batching was added have no batched flag
+                obj, fieldname, idstring, path, persistent, kwargs, batched = (
+                    tuple(monitor) + (False,)
+                )[:7]
+                if not server_reload and not persistent:
+                    # this monitor will not be restarted
+                    continue
+                if "session" in kwargs and not kwargs["session"]:
+                    # the session was removed because it no longer
+                    # exists. Don't restart the monitor.
+                    continue
+                modname, varname = path.rsplit(".", 1)
+                callback = variable_from_module(modname, varname)
+
+                if obj and hasattr(obj, fieldname):
+                    self.monitors[obj][fieldname][idstring] = (
+                        callback,
+                        persistent,
+                        kwargs,
+                        batched,
+                    )
+            except Exception:
+                continue
+
+    def save_session(self, session):
+        """
+        Remove the monitors added with the `session` keyword of a Session
+        handed over to another Server shard, so they can be added there.
+
+        Args:
+            session (Session): The Session being handed off.
+
+        Returns:
+            list: The monitors, to give to `restore_session` on the other shard.
+
+        """
+        savedata = self._get_savedata(session)
+        for obj, fieldname, idstring, *_ in savedata:
+            self._remove(obj, fieldname, idstring)
+        return savedata
+
+    def restore_session(self, savedata):
+        """
+        Add the monitors of a Session handed over from another Server shard.
+
+        Args:
+            savedata (list): The monitors, from `save_session`.
+
+        """
+        self._add_saved(savedata)
+
     def _attr_category_fieldname(self, fieldname, category):
         """
         Modify the saved fieldname to make sure to differentiate between Attributes
@@ -100,9 +172,47 @@ class MonitorHandler(object):
         """
         return f"{fieldname}[{category}]" if category else fieldname
 
+    def is_monitored(self, obj):
+        """
+        Check if an entity has any monitors. This is called by every
+        entity as it saves, so it must be fast.
+
+        Args:
+            obj (Typeclassed Entity or Attribute): The entity that saves.
+
+        Returns:
+            bool: If `obj` has any monitors on it.
+
+        """
+        return obj in self.monitors
+
+    def _call(self, obj, fieldname, idstring, callback, kwargs):
+        """
+        Call a monitor callback, removing the monitor if it fails.
+
+        """
+        try:
+            callback(obj=obj, fieldname=fieldname, **kwargs)
+        except Exception:
+            self._remove(obj, fieldname, idstring)
+            logger.log_trace("Monitor callback was removed.")
+
+    def _call_batched(self):
+        """
+        Call all batched monitors whose fields changed since the last batch.
+
+        """
+        pending, self.pending = self.pending, {}
+        for obj, fieldname, idstring in pending:
+            monitor = self.monitors.get(obj, {}).get(fieldname, {}).get(idstring)
+            if monitor:
+                callback, _, kwargs, _ = monitor
+                self._call(obj, fieldname, idstring, callback, kwargs)
+
     def at_update(self, obj, fieldname):
         """
-        Called by the field/attribute as it saves.
+        Called by the field/attribute as it saves (only if `is_monitored`
+        returns True for it).
 
         """
         # if this an Attribute with a category we should differentiate
@@ -111,19 +221,29 @@ class MonitorHandler(object):
             obj.db_category if fieldname == "db_value" and hasattr(obj, "db_category") else None,
         )
 
-        to_delete = []
-        if obj in self.monitors and fieldname in self.monitors[obj]:
-            for idstring, (callback, persistent, kwargs) in self.monitors[obj][fieldname].items():
-                try:
-                    callback(obj=obj, fieldname=fieldname, **kwargs)
-                except Exception:
-                    to_delete.append((obj, fieldname, idstring))
-                    logger.log_trace("Monitor callback was removed.")
-        # we cleanup non-found monitors (has to be done after loop)
-        for (obj, fieldname, idstring) in to_delete:
-            del self.monitors[obj][fieldname][idstring]
-
-    def add(self, obj, fieldname, callback, idstring="", persistent=False, category=None, **kwargs):
+        monitors = self.monitors.get(obj, {}).get(fieldname)
+        if not monitors:
+            return
+        # copy, since failing callbacks are removed while we iterate
+        for idstring, (callback, persistent, kwargs, batched) in list(monitors.items()):
+            if batched:
+                self.pending[(obj, fieldname, idstring)] = True
+                if not self._batch_call or not self._batch_call.active():
+                    self._batch_call = reactor.callLater(_BATCH_INTERVAL, self._call_batched)
+            else:
+                self._call(obj, fieldname, idstring, callback, kwargs)
+
+    def add(
+        self,
+        obj,
+        fieldname,
+        callback,
+        idstring="",
+        persistent=False,
+        category=None,
+        batched=False,
+        **kwargs,
+    ):
         """
         Add monitoring to a given field or Attribute. A field must
         be specified with the full db_* name or it will be assumed
@@ -142,6 +262,10 @@ class MonitorHandler(object):
             category (str, optional): This is only used if `fieldname` refers to
                 an Attribute (i.e. it does not start with `db_`). You must specify this
                 if you want to target an Attribute with a category.
+            batched (bool, optional): If set, the callback is not called on
+                every change but at most once every `settings.MONITOR_BATCH_INTERVAL`
+                seconds, if the field changed since the last call. Use this when
+                only the latest value matters, like when relaying it to a client.
 
         Keyword Args:
             session (Session): If this keyword is given, the monitorhandler will
@@ -174,7 +298,22 @@ class MonitorHandler(object):
             )
             logger.log_trace(err)
         else:
-            self.monitors[obj][fieldname][idstring] = (callback, persistent, kwargs)
+            self.monitors[obj][fieldname][idstring] = (callback, persistent, kwargs, batched)
+
+    def _remove(self, obj, fieldname, idstring):
+        """
+        Remove a monitor, cleaning up so that an entity without monitors is
+        no longer considered monitored.
+
+        """
+        fielddict = self.monitors.get(obj)
+        if fielddict and fieldname in fielddict:
+            fielddict[fieldname].pop(idstring, None)
+            if not fielddict[fieldname]:
+                del fielddict[fieldname]
+            if not fielddict:
+                del self.monitors[obj]
+        self.pending.pop((obj, fieldname, idstring), None)
 
     def remove(self, obj, fieldname, idstring="", category=None):
         """
@@ -186,15 +325,14 @@ class MonitorHandler(object):
                 return
             fieldname = self._attr_category_fieldname("db_value", category)
 
-        idstring_dict = self.monitors[obj][fieldname]
-        if idstring in idstring_dict:
-            del self.monitors[obj][fieldname][idstring]
+        self._remove(obj, fieldname, idstring)
 
     def clear(self):
         """
         Delete all monitors.
         """
         self.monitors = defaultdict(lambda: defaultdict(dict))
+        self.pending = {}
 
     def all(self, obj=None):
         """
@@ -211,8 +349,9 @@ class MonitorHandler(object):
         objs = [obj] if obj else self.monitors
 
         for obj in objs:
-            for fieldname in self.monitors[obj]:
-                for idstring, (callback, persistent, kwargs) in self.monitors[obj][
+            fielddict = self.monitors.get(obj, {})
+            for fieldname in fielddict:
+                for idstring, (callback, persistent, kwargs, batched) in fielddict[
                     fieldname
                 ].items():
                     output.append((obj, fieldname, idstring, persistent, kwargs))
@@ -0,0 +1,403 @@
+"""
+Script scheduler
+
+This runs the timers of all Scripts from one place. Instead of each running
+Script owning its own reactor `LoopingCall`, every Script timer is a
+`ScriptTimer` that is queued in the `SCRIPT_SCHEDULER`. The scheduler keeps one
+bucket per interval; since all timers in a bucket repeat with the same interval,
+each bucket stays sorted simply by appending to it, so (re)scheduling a timer is
+O(1). A single reactor call is kept for the earliest due timer. When it fires,
+due timers are run in batches of at most `settings.SCRIPT_SCHEDULER_BATCH_SIZE`
+per reactor iteration, so that a large number of Scripts coming due at the same
+time don't block the server from handling network traffic in between.
+
+Stopping a timer removes its queued entry. Restarting or forcing a timer only
+marks its old entry as stale; that entry is skipped and dropped when it comes
+due. When no timers are running, the queues are emptied and the reactor call
+is cancelled.
+
+The Script timer API (`start`, `pause`, `time_until_next_repeat` etc) is
+unchanged; this module is not something one normally needs to use directly.
+
+"""
+
+import heapq
+from bisect import bisect_left
+from collections import deque
+from itertools import count
+from operator import itemgetter
+
+from django.conf import settings
+from twisted.internet import reactor
+
+from evennia.utils import logger
+
+
+class ScriptTimer:
+    """
+    The timer of one Script. It is run by a `ScriptScheduler` and has the same
+    interface as the `ExtendedLoopingCall` previously used for Scripts.
+
+    """
+
+    def __init__(self, func, scheduler=None):
+        """
+        Args:
+            func (callable): Called without arguments every time the timer fires.
+            scheduler (ScriptScheduler, optional): The scheduler to run the timer
+                with. If not given, the global `SCRIPT_SCHEDULER` is used.
+
+        """
+        self.func = func
+        self.scheduler = SCRIPT_SCHEDULER if scheduler is None else scheduler
+        self.running = False
+        self.interval = None
+        self.callcount = 0
+        self.starttime = None
+        self.start_delay = None
+        # when the timer fires next, in the scheduler clock's time
+        self.due = None
+        # changed every time the timer is stopped or rescheduled, making any
+        # older entries of this timer in the scheduler stale
+        self.generation = 0
+
+    def start(self, interval, now=True, start_delay=None, count_start=0):
+        """
+        Start firing the timer every `interval` seconds.
+
+        Args:
+            interval (int): Repeat interval in seconds.
+            now (bool, optional): Whether to fire immediately or after
+                `start_delay` seconds.
+            start_delay (int, optional): This only applies if `now=False`. It gives
+                the number of seconds to wait before the first call. If `None`,
+                use `interval` as this value instead.
+            count_start (int): Number of repeats to start at. The count goes up
+                every time the timer fires, including when forced with `force_repeat`.
+
+        Raises:
+            AssertionError: If trying to start a timer which is already running.
+            ValueError: If interval is set to an invalid value <= 0.
+
+        """
+        assert not self.running, "Tried to start an already running ScriptTimer."
+        if interval <= 0:
+            raise ValueError("interval must be > 0")
+        self.running = True
+        self.scheduler.nrunning += 1
+        self.interval = interval
+        self.callcount = max(0, count_start)
+        self.starttime = self.scheduler.seconds()
+        self.start_delay = start_delay if start_delay is None else max(0, start_delay)
+
+        if now:
+            self._fire(self.starttime, self.starttime, restart=True)
+        elif self.start_delay is not None:
+            self.due = self.starttime + self.start_delay
+            self.scheduler.add_delayed(self, self.due)
+        else:
+            self.due = self.starttime + interval
+            self.scheduler.add(self, self.due)
+
+    def stop(self):
+        """
+        Stop the timer.
+
+        Raises:
+            AssertionError: If the timer is not running.
+
+        """
+        assert self.running, "Tried to stop a ScriptTimer that was not running."
+        self.running = False
+        # the queued entry is found by its due time and generation
+        self.scheduler.remove(self)
+        self.generation += 1
+        self.due = None
+
+    def _fire(self, due, now, restart=False):
+        """
+        Call the timer's function and queue the next call. This is called by the
+        scheduler.
+
+        Args:
+            due (float): When this call was due.
+            now (float): The current time.
+            restart (bool, optional): Count the next interval from now, rather
+                than from when this call was due. This is the case for the first
+                call or a forced call.
+
+        """
+        self.callcount += 1
+        if self.start_delay:
+            # the first call after a start delay; from now on we repeat normally
+            self.start_delay = None
+            self.starttime = now
+            restart = True
+        generation = self.generation
+        try:
+            self.func()
+        except Exception:
+            logger.log_trace(f"Error running the script timer {self.func}.")
+
+        if self.running and self.generation == generation:
+            # not stopped or restarted by the call
+            if restart:
+                due = now + self.interval
+            else:
+                due += self.interval
+                if due <= now:
+                    # we are late; skip calls we missed, like a LoopingCall does
+                    due += ((now - due) // self.interval + 1) * self.interval
+            self.due = due
+            self.scheduler.add(self, due)
+
+    def force_repeat(self):
+        """
+        Fire the timer right away. The next call will be `interval` seconds
+        from now.
+
+        Raises:
+            AssertionError: When trying to force a timer that is not running.
+
+        """
+        assert self.running, "Tried to fire a ScriptTimer that was not running."
+        # make the currently queued entry stale
+        self.generation += 1
+        now = self.scheduler.seconds()
+        self.starttime = now
+        self._fire(now, now, restart=True)
+
+    def next_call_time(self):
+        """
+        Get the time until the timer fires next.
+
+        Returns:
+            float or None: The time in seconds until the next call. Returns `None`
+                if the timer is not running.
+
+        """
+        if self.running and self.due is not None:
+            return max(0, self.due - self.scheduler.seconds())
+
+    def __repr__(self):
+        return f"<ScriptTimer {self.func} interval={self.interval} running={self.running}>"
+
+
+class ScriptScheduler:
+    """
+    Runs the `ScriptTimer`s of all Scripts using one reactor call.
+
+    """
+
+    def __init__(self, clock=reactor, batch_size=None):
+        """
+        Args:
+            clock (IReactorTime, optional): The clock to run with, usually the reactor.
+            batch_size (int, optional): How many timers to run at most in one reactor
+                iteration. Defaults to `settings.SCRIPT_SCHEDULER_BATCH_SIZE`.
+
+        """
+        self.clock = clock
+        self.batch_size = batch_size or settings.SCRIPT_SCHEDULER_BATCH_SIZE
+        # {interval: deque of (due, generation, timer)}, each sorted on due
+        self.buckets = {}
+        # heap of (due, interval) for the first entry of each bucket
+        self.heads = []
+        # {interval: due} of the valid entries in `heads`
+        self.head_due = {}
+        # heap of (due, seq, generation, timer) for first calls after a start delay,
+        # which are not in step with the rest of their interval's bucket
+        self.delayed = []
+        self._seq = count()
+        self._clock_call = None
+        # the number of running timers
+        self.nrunning = 0
+
+    def __len__(self):
+        """
+        The number of queued entries, including stale ones not yet dropped.
+
+        """
+        return sum(len(bucket) for bucket in self.buckets.values()) + len(self.delayed)
+
+    def seconds(self):
+        """
+        Get the current time.
+
+        Returns:
+            float: The current time of the scheduler's clock.
+
+        """
+        return self.clock.seconds()
+
+    def add(self, timer, due):
+        """
+        Queue the next call of a timer in the bucket for its interval.
+
+        Args:
+            timer (ScriptTimer): The timer to queue.
+            due (float): When the timer should fire.
+
+        """
+        interval = timer.interval
+        bucket = self.buckets.get(interval)
+        if bucket is None:
+            bucket = self.buckets[interval] = deque()
+        entry = (due, timer.generation, timer)
+        if not bucket or bucket[-1][0] <= due:
+            bucket.append(entry)
+        else:
+            # out of order, which only happens if the scheduler is running
+            # late; find the place from the end, which is where it normally is
+            index = len(bucket) - 1
+            while index > 0 and bucket[index - 1][0] > due:
+                index -= 1
+            bucket.insert(index, entry)
+        if bucket[0] is entry:
+            self.head_due[interval] = due
+            heapq.heappush(self.heads, (due, interval))
+            self._schedule()
+
+    def add_delayed(self, timer, due):
+        """
+        Queue the first call of a timer that starts with a delay.
+
+        Args:
+            timer (ScriptTimer): The timer to queue.
+            due (float): When the timer should fire.
+
+        """
+        heapq.heappush(self.delayed, (due, next(self._seq), timer.generation, timer))
+        if self.delayed[0][3] is timer:
+            self._schedule()
+
+    def remove(self, timer):
+        """
+        Remove the queued entry of a timer being stopped. If this was the last
+        running timer, everything is cleared instead.
+
+        Args:
+            timer (ScriptTimer): The timer being stopped. Its `due` and
+                `generation` must still be those of its queued entry.
+
+        """
+        self.nrunning -= 1
+        if self.nrunning <= 0:
+            self.clear()
+            return
+        due = timer.due
+        if due is None:
+            return
+        interval = timer.interval
+        bucket = self.buckets.get(interval)
+        if bucket:
+            entry = (due, timer.generation, timer)
+            index = bisect_left(bucket, due, key=itemgetter(0))
+            while index < len(bucket) and bucket[index][0] == due:
+                if bucket[index] == entry:
+                    del bucket[index]
+                    if index == 0:
+                        # the head of the bucket changed
+                        if bucket:
+                            if self.head_due.get(interval) != bucket[0][0]:
+                                self.head_due[interval] = bucket[0][0]
+                                heapq.heappush(self.heads, (bucket[0][0], interval))
+                        else:
+                            # its entry in `heads` becomes stale
+                            del self.buckets[interval]
+                            self.head_due.pop(interval, None)
+                    return
+                index += 1
+        for index, entry in enumerate(self.delayed):
+            if entry[3] is timer and entry[2] == timer.generation:
+                # not called yet after its start delay
+                self.delayed[index] = self.delayed[-1]
+                self.delayed.pop()
+                heapq.heapify(self.delayed)
+                return
+
+    def clear(self):
+        """
+        Empty all queues and cancel the clock call. This does not stop any
+        timers, it's used when no timers are running.
+
+        """
+        # clear in place, in case we are inside `_run`
+        for bucket in self.buckets.values():
+            bucket.clear()
+        self.buckets.clear()
+        self.heads.clear()
+        self.head_due.clear()
+        self.delayed.clear()
+        self.nrunning = 0
+        if self._clock_call and self._clock_call.active():
+            self._clock_call.cancel()
+        self._clock_call = None
+
+    def _next_due(self):
+        """
+        Get when the next queued entry is due, or None if nothing is queued.
+
+        """
+        dues = []
+        if self.heads:
+            dues.append(self.heads[0][0])
+        if self.delayed:
+            dues.append(self.delayed[0][0])
+        return min(dues) if dues else None
+
+    def _schedule(self):
+        """
+        Make sure the clock calls us when the next entry is due.
+
+        """
+        due = self._next_due()
+        if due is None:
+            return
+        call = self._clock_call
+        if call and call.active():
+            if call.getTime() <= due:
+                return
+            call.cancel()
+        self._clock_call = self.clock.callLater(max(0, due - self.seconds()), self._run)
+
+    def _run(self):
+        """
+        Fire due timers, at most `batch_size` of them. This is called by the clock.
+
+        """
+        self._clock_call = None
+        now = self.seconds()
+        budget = self.batch_size
+
+        delayed = self.delayed
+        while delayed and delayed[0][0] <= now and budget > 0:
+            due, _, generation, timer = heapq.heappop(delayed)
+            if timer.generation == generation:
+                budget -= 1
+                timer._fire(due, now)
+
+        heads = self.heads
+        while heads and heads[0][0] <= now and budget > 0:
+            head_due, interval = heapq.heappop(heads)
+            if self.head_due.get(interval) != head_due:
+                # stale head
+                continue
+            del self.head_due[interval]
+            bucket = self.buckets.get(interval, ())
+            while bucket and bucket[0][0] <= now and budget > 0:
+                due, generation, timer = bucket.popleft()
+                if timer.generation == generation:
+                    budget -= 1
+                    timer._fire(due, now)
+            if bucket:
+                if self.head_due.get(interval) != bucket[0][0]:
+                    self.head_due[interval] = bucket[0][0]
+                    heapq.heappush(heads, (bucket[0][0], interval))
+            elif self.buckets.get(interval) is bucket:
+                del self.buckets[interval]
+
+        self._schedule()
+
+
+SCRIPT_SCHEDULER = ScriptScheduler()
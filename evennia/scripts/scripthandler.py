@@ -4,12 +4,126 @@ make sure they are still relevant. A scripthandler is automatically
 added to all game objects. You access it through the property
 `scripts` on the game object.
 
+Most objects have no Scripts. Unless `settings.TYPECLASS_AGGRESSIVE_CACHE` is
+turned off, the `SCRIPT_OWNER_CACHE` keeps track of which objects and accounts
+have Scripts, so the handlers of those without Scripts don't need to query the
+database at all.
+
 """
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_save
 from django.utils.translation import gettext as _
 
 from evennia.scripts.models import ScriptDB
 from evennia.utils import create, logger
 
+_TYPECLASS_AGGRESSIVE_CACHE = settings.TYPECLASS_AGGRESSIVE_CACHE
+
+
+class ScriptOwnerCache:
+    """
+    Keeps track of the ids of the objects and accounts that have Scripts. It is
+    loaded with one query when first needed and is then kept up to date as
+    Scripts are saved.
+
+    Notes:
+        Deleting a Script or moving it to another object doesn't remove the old
+        owner from the cache. That just means the old owner's handler will
+        query the database, as if there was no cache. Changing Script owners
+        with a queryset `update()` (which doesn't call `save`) is however not
+        noticed; call `clear()` after doing so. Scripts saved by other processes
+        are noted when their changes are applied (see `evennia.server.invalidation`).
+
+    """
+
+    def __init__(self):
+        # {"db_obj": set of ids, "db_account": set of ids}, or None if not loaded
+        self.owners = None
+
+    def load(self):
+        """
+        Load the ids of all objects and accounts with Scripts from the database.
+
+        """
+        owners = {"db_obj": set(), "db_account": set()}
+        for obj_id, account_id in ScriptDB.objects.filter(
+            Q(db_obj__isnull=False) | Q(db_account__isnull=False)
+        ).values_list("db_obj_id", "db_account_id"):
+            if obj_id:
+                owners["db_obj"].add(obj_id)
+            if account_id:
+                owners["db_account"].add(account_id)
+        self.owners = owners
+
+    def clear(self):
+        """
+        Forget all owners, so they are loaded anew from the database when next needed.
+
+        """
+        self.owners = None
+
+    def add(self, script):
+        """
+        Note the owner of a saved Script.
+
+        Args:
+            script (ScriptDB): The saved Script.
+
+        """
+        self.add_ids(script.db_obj_id, script.db_account_id)
+
+    def add_ids(self, obj_id=None, account_id=None):
+        """
+        Note the owners of a Script by their ids, such as for a Script saved by
+        another process (see `evennia.server.invalidation`).
+
+        Args:
+            obj_id (int, optional): The id of the object owning the Script.
+            account_id (int, optional): The id of the account owning the Script.
+
+        """
+        if self.owners is not None:
+            if obj_id:
+                self.owners["db_obj"].add(obj_id)
+            if account_id:
+                self.owners["db_account"].add(account_id)
+
+    def has_scripts(self, obj):
+        """
+        Check if an object or account may have Scripts.
+
+        Args:
+            obj (Object or Account): The entity to check.
+
+        Returns:
+            bool: False if the entity is known to have no Scripts, True otherwise.
+
+        """
+        if not _TYPECLASS_AGGRESSIVE_CACHE:
+            return True
+        if self.owners is None:
+            self.load()
+        fieldname = "db_account" if obj.__dbclass__.__name__ == "AccountDB" else "db_obj"
+        return obj.id in self.owners[fieldname]
+
+
+SCRIPT_OWNER_CACHE = ScriptOwnerCache()
+
+
+def _update_script_owners(sender, instance=None, **kwargs):
+    """
+    Keep the `SCRIPT_OWNER_CACHE` up to date as Scripts are saved. Scripts are
+    typeclassed, so this can't be limited to `sender=ScriptDB`.
+
+    """
+    if isinstance(instance, ScriptDB):
+        SCRIPT_OWNER_CACHE.add(instance)
+
+
+post_save.connect(_update_script_owners, dispatch_uid="evennia.scripts.scripthandler")
+
 
 class ScriptHandler(object):
     """
@@ -33,7 +147,7 @@ class ScriptHandler(object):
         List the scripts tied to this object.
 
         """
-        scripts = ScriptDB.objects.get_all_scripts_on_obj(self.obj)
+        scripts = self.all()
         string = ""
         for script in scripts:
             interval = "inf"
@@ -105,7 +219,7 @@ class ScriptHandler(object):
             nr_started (int): The number of started scripts found.
 
         """
-        scripts = ScriptDB.objects.get_all_scripts_on_obj(self.obj, key=key)
+        scripts = self.get(key)
         num = 0
         for script in scripts:
             script.start()
@@ -123,6 +237,8 @@ class ScriptHandler(object):
             scripts (queryset): The found scripts matching `key`.
 
         """
+        if not SCRIPT_OWNER_CACHE.has_scripts(self.obj):
+            return ScriptDB.objects.none()
         return ScriptDB.objects.get_all_scripts_on_obj(self.obj, key=key)
 
     def remove(self, key=None):
@@ -135,6 +251,8 @@ class ScriptHandler(object):
                 If no key is given, delete *all* scripts on the object!
 
         """
+        if not SCRIPT_OWNER_CACHE.has_scripts(self.obj):
+            return 0
         delscripts = ScriptDB.objects.get_all_scripts_on_obj(self.obj, key=key)
         if not delscripts:
             delscripts = [
@@ -157,4 +275,6 @@ class ScriptHandler(object):
         Get all scripts stored in this handler.
 
         """
+        if not SCRIPT_OWNER_CACHE.has_scripts(self.obj):
+            return ScriptDB.objects.none()
         return ScriptDB.objects.get_all_scripts_on_obj(self.obj)
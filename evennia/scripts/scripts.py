@@ -6,11 +6,14 @@ ability to run timers.
 """
 
 from django.utils.translation import gettext as _
-from twisted.internet.defer import Deferred, maybeDeferred
+from twisted.internet.defer import Deferred
 from twisted.internet.task import LoopingCall
+from twisted.python.failure import Failure
 
 from evennia.scripts.manager import ScriptManager
 from evennia.scripts.models import ScriptDB
+from evennia.scripts.scheduler import ScriptTimer
+from evennia.server import shards
 from evennia.typeclasses.models import TypeclassBase
 from evennia.utils import create, logger
 
@@ -21,7 +24,8 @@ class ExtendedLoopingCall(LoopingCall):
     """
     Custom child of LoopingCall that can start at a delay different than
     `self.interval` and self.count=0. This allows it to support pausing
-    by resuming at a later period.
+    by resuming at a later period. This is used by the TickerHandler; the
+    Script timers use `evennia.scripts.scheduler.ScriptTimer` instead.
 
     """
 
@@ -137,7 +141,8 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
     Base class for scripts. Don't inherit from this, inherit from the
     class `DefaultScript` below instead.
 
-    This handles the timer-component of the Script.
+    This handles the timer-component of the Script. The timer is a
+    `ScriptTimer`, run by the global `evennia.scripts.scheduler.SCRIPT_SCHEDULER`.
 
     """
 
@@ -151,7 +156,7 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
 
     def at_idmapper_flush(self):
         """
-        If we're flushing this object, make sure the LoopingCall is gone too.
+        If we're flushing this object, make sure the timer is gone too.
         """
         ret = super().at_idmapper_flush()
         if ret and self.ndb._task:
@@ -199,6 +204,20 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
             # script object already deleted from db - don't start a new timer
             raise ScriptDB.DoesNotExist
 
+        if shards.SHARD:
+            # the Script timers run on shard 0
+            shards.run_script_task(
+                self,
+                "_start_task",
+                interval=interval,
+                start_delay=start_delay,
+                repeats=repeats,
+                force_restart=force_restart,
+                auto_unpause=auto_unpause,
+                **kwargs,
+            )
+            return
+
         # handle setting/updating fields
         update_fields = []
         old_interval = self.db_interval
@@ -234,7 +253,7 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
 
         if not self.ndb._task:
             # we should have a fresh task after this point
-            self.ndb._task = ExtendedLoopingCall(self._step_task)
+            self.ndb._task = ScriptTimer(self._step_task)
 
         self._unpause_task(
             interval=interval,
@@ -257,6 +276,9 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
             auto_pause (str):
 
         """
+        if shards.SHARD:
+            shards.run_script_task(self, "_pause_task", auto_pause=auto_pause, **kwargs)
+            return
         if not self.db._paused_time:
             # only allow pause if not already paused
             task = self.ndb._task
@@ -286,6 +308,17 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
                 to recalculate the unpause startup interval.
 
         """
+        if shards.SHARD:
+            shards.run_script_task(
+                self,
+                "_unpause_task",
+                interval=interval,
+                start_delay=start_delay,
+                auto_unpause=auto_unpause,
+                old_interval=old_interval,
+                **kwargs,
+            )
+            return
         paused_time = self.db._paused_time
         if paused_time:
             if auto_unpause and self.db._manually_paused:
@@ -301,7 +334,7 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
                 start_delay = paused_time
 
             if not self.ndb._task:
-                self.ndb._task = ExtendedLoopingCall(self._step_task)
+                self.ndb._task = ScriptTimer(self._step_task)
 
             self.ndb._task.start(
                 self.db_interval, now=False, start_delay=start_delay, count_start=callcount
@@ -317,6 +350,9 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
         Stop task runner and delete the task.
 
         """
+        if shards.SHARD:
+            shards.run_script_task(self, "_stop_task", **kwargs)
+            return
         task_stopped = False
         task = self.ndb._task
         if task and task.running:
@@ -355,20 +391,23 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
 
     def _step_callback(self):
         """
-        Step task runner. No try..except needed due to defer wrap.
+        Step task runner. Errors are handled by `_step_task`.
+
+        Returns:
+            any: What `at_repeat` returned, which may be a Deferred.
 
         """
         if not self.ndb._task:
             # if there is no task, we have no business using this method
-            return
+            return None
 
         if not self.is_valid():
             self.stop()
-            return
+            return None
 
         # call hook
         try:
-            self.at_repeat()
+            ret = self.at_repeat()
         except Exception:
             logger.log_trace()
             raise
@@ -381,16 +420,25 @@ class ScriptBase(ScriptDB, metaclass=TypeclassBase):
             maxcount = self.db_repeats
             if maxcount > 0 and maxcount <= callcount:
                 self.stop()
+        return ret
 
     def _step_task(self):
         """
         Step task. This groups error handling.
+
+        Returns:
+            Deferred or None: The Deferred returned by `at_repeat`, if any.
+
         """
         try:
-            return maybeDeferred(self._step_callback).addErrback(self._step_errback)
+            ret = self._step_callback()
         except Exception:
-            logger.log_trace()
-        return None
+            self._step_errback(Failure())
+            return None
+        if isinstance(ret, Deferred):
+            # failures of an asynchronous at_repeat are handled the same way
+            ret.addErrback(self._step_errback)
+        return ret
 
     # Access methods / hooks
 
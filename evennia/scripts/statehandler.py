@@ -0,0 +1,309 @@
+"""
+OOB state channel - stream changes of an object's state to OOB clients.
+
+The OOB_STATE_HANDLER singleton from this module lets Sessions (usually
+GMCP/MSDP clients or the webclient) watch the state of an object, such as
+the health, location and inventory of their character. Instead of sending
+the whole state every time something changes, the handler:
+
+- Asks the object for its state with `obj.get_oob_state()`, which returns
+  a dict. This is only done once per update, no matter how many sessions
+  are watching.
+- Coalesces changes: marking an object as changed schedules one update
+  `settings.OOB_STATE_UPDATE_INTERVAL` seconds later. Any further changes
+  before then are sent with that same update.
+- Remembers what was last sent to each session and only sends the keys whose
+  values changed (keys removed from the state are sent with a value of `None`).
+  All changes for one session are sent in a single message.
+
+An object is marked as changed with `OOB_STATE_HANDLER.mark_dirty(obj)`. In
+addition, changes to the db-fields and Attributes listed in the object's
+`oob_state_watch` property mark the object automatically (this uses the
+MonitorHandler). As with the MonitorHandler, an Attribute can only be
+tracked if it exists when the watch starts.
+
+The changes are sent to the session as an outputfunc named after the watch
+(default `state`) with the changed keys as kwargs. For GMCP this is sent as
+`Char.State.Update {"hp": 10}`, for MSDP as a table and the webclient gets
+`["state", [], {"hp": 10}]`.
+
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from twisted.internet import reactor
+
+from evennia.server import shards
+from evennia.server.models import ServerConfig
+from evennia.utils import logger
+from evennia.utils.dbserialize import dbserialize, dbunserialize
+
+_UPDATE_INTERVAL = settings.OOB_STATE_UPDATE_INTERVAL
+_MONITOR_IDSTRING = "oob_state"
+_MONITOR_HANDLER = None
+
+# marker for 'never sent', to tell apart from a value of None
+_UNSET = object()
+
+
+def _on_watched_change(obj=None, **kwargs):
+    """
+    Called by the MonitorHandler when a watched field or Attribute changes.
+
+    """
+    OOB_STATE_HANDLER.mark_dirty(kwargs.get("state_obj", obj))
+
+
+class OOBStateHandler:
+    """
+    Tracks which sessions watch the state of which objects and sends them
+    the changes.
+
+    """
+
+    def __init__(self):
+        """
+        Initialize the handler.
+
+        """
+        # with many Server shards, each saves the watches of its sessions
+        self.savekey = (
+            f"_oobstatehandler_save_{shards.SHARD}" if shards.SHARD else "_oobstatehandler_save"
+        )
+        # {obj: {sessid: [session, outputfunc_name, last_sent_state]}}
+        self.watchers = defaultdict(dict)
+        self.dirty = set()
+        self._update_call = None
+
+    def _monitor(self, obj, start=True):
+        """
+        Start/stop monitoring the db-fields and Attributes listed in the
+        object's `oob_state_watch`.
+
+        """
+        global _MONITOR_HANDLER
+        if not _MONITOR_HANDLER:
+            from evennia.scripts.monitorhandler import MONITOR_HANDLER as _MONITOR_HANDLER
+
+        for fieldname in getattr(obj, "oob_state_watch", ()):
+            if start:
+                _MONITOR_HANDLER.add(
+                    obj, fieldname, _on_watched_change, idstring=_MONITOR_IDSTRING, state_obj=obj
+                )
+            else:
+                _MONITOR_HANDLER.remove(obj, fieldname, idstring=_MONITOR_IDSTRING)
+
+    def _schedule_update(self):
+        """
+        Schedule sending out the changes, unless already scheduled.
+
+        """
+        if not self._update_call or not self._update_call.active():
+            self._update_call = reactor.callLater(_UPDATE_INTERVAL, self.update)
+
+    def watch(self, obj, session, outputfunc_name="state"):
+        """
+        Start sending changes of an object's state to a session. The full
+        state is sent with the next update.
+
+        Args:
+            obj (Object): The object to watch. It should have a
+                `get_oob_state` method returning a dict.
+            session (Session): The session to send changes to.
+            outputfunc_name (str, optional): The name of the outputfunc used
+                to send the changes. Use different names if a session
+                watches more than one object.
+
+        """
+        if obj not in self.watchers:
+            self._monitor(obj)
+        self.watchers[obj][session.sessid] = [session, outputfunc_name, {}]
+        self.mark_dirty(obj)
+
+    def unwatch(self, obj, session):
+        """
+        Stop sending state changes of an object to a session.
+
+        Args:
+            obj (Object): The watched object.
+            session (Session): The session to stop sending to.
+
+        """
+        watchers = self.watchers.get(obj)
+        if watchers:
+            watchers.pop(session.sessid, None)
+            if not watchers:
+                self._stop_watching(obj)
+
+    def unwatch_session(self, session):
+        """
+        Stop all watches of a session, such as when it disconnects.
+
+        Args:
+            session (Session): The session.
+
+        """
+        for obj, watchers in list(self.watchers.items()):
+            if watchers.pop(session.sessid, None) and not watchers:
+                self._stop_watching(obj)
+
+    def _stop_watching(self, obj):
+        """
+        Remove an object no-one is watching anymore.
+
+        """
+        del self.watchers[obj]
+        self.dirty.discard(obj)
+        self._monitor(obj, start=False)
+
+    def mark_dirty(self, obj):
+        """
+        Mark that the state of an object has changed. The changes are sent to
+        its watchers with the next update. Does nothing if no-one is
+        watching the object, so this is cheap to call.
+
+        Args:
+            obj (Object): The object whose state changed.
+
+        """
+        if obj in self.watchers:
+            self.dirty.add(obj)
+            self._schedule_update()
+
+    def get_changes(self, state, last_sent):
+        """
+        Compare a state to what was last sent to a session.
+
+        Args:
+            state (dict): The current state.
+            last_sent (dict): The state last sent to the session.
+
+        Returns:
+            dict: The changed keys and their new values. Keys no longer in
+            the state are included with the value `None`.
+
+        """
+        changes = {
+            key: value for key, value in state.items() if last_sent.get(key, _UNSET) != value
+        }
+        changes.update({key: None for key in last_sent if key not in state})
+        return changes
+
+    def update(self):
+        """
+        Send the changes of all dirty objects to their watchers. This is
+        normally called automatically after a change, but can be called
+        manually to send changes right away.
+
+        """
+        dirty, self.dirty = self.dirty, set()
+        # {sessid: (session, {outputfunc_name: ((), changes)})}
+        outputs = {}
+        for obj in dirty:
+            watchers = self.watchers.get(obj)
+            if not watchers:
+                continue
+            try:
+                state = dict(obj.get_oob_state())
+            except Exception:
+                logger.log_trace(f"Could not get OOB state of {obj}.")
+                continue
+            for sessid, watch in watchers.items():
+                session, outputfunc_name, last_sent = watch
+                changes = self.get_changes(state, last_sent)
+                if changes:
+                    watch[2] = state
+                    outputs.setdefault(sessid, (session, {}))[1][outputfunc_name] = ((), changes)
+        for session, output in outputs.values():
+            session.msg(**output)
+
+    def save(self):
+        """
+        Store the watches to the database. This is called by the server
+        process before a reload.
+
+        """
+        savedata = [
+            (obj, session, outputfunc_name)
+            for obj, watchers in self.watchers.items()
+            for session, outputfunc_name, _ in watchers.values()
+        ]
+        if savedata:
+            ServerConfig.objects.conf(key=self.savekey, value=dbserialize(savedata))
+
+    def restore(self, server_reload=True):
+        """
+        Restore the watches after a reload. This is called by the server
+        process. The full state is sent again to all restored watchers.
+
+        Args:
+            server_reload (bool, optional): If False, the server went through a
+                cold reboot and all watches are dropped.
+
+        """
+        self.watchers = defaultdict(dict)
+        self.dirty = set()
+        restored = ServerConfig.objects.conf(key=self.savekey)
+        if restored and server_reload:
+            for obj, session, outputfunc_name in dbunserialize(restored):
+                if obj and session:
+                    self.watch(obj, session, outputfunc_name=outputfunc_name)
+        ServerConfig.objects.conf(key=self.savekey, delete=True)
+
+    def save_session(self, session):
+        """
+        Stop the watches of a Session handed over to another Server shard, so
+        they can be started there.
+
+        Args:
+            session (Session): The Session being handed off.
+
+        Returns:
+            list: `[(obj, outputfunc_name), ...]`, to give to `restore_session`
+            on the other shard.
+
+        """
+        savedata = [
+            (obj, watchers[session.sessid][1])
+            for obj, watchers in self.watchers.items()
+            if session.sessid in watchers
+        ]
+        self.unwatch_session(session)
+        return savedata
+
+    def restore_session(self, session, savedata):
+        """
+        Start the watches of a Session handed over from another Server shard.
+        The full state is sent with the next update.
+
+        Args:
+            session (Session): The Session.
+            savedata (list): The watches, from `save_session`.
+
+        """
+        for obj, outputfunc_name in savedata:
+            if obj:
+                self.watch(obj, session, outputfunc_name=outputfunc_name)
+
+    def all(self, obj=None):
+        """
+        List all watches, or all watches of a given object.
+
+        Args:
+            obj (Object, optional): Only list watches of this object.
+
+        Returns:
+            list: `[(obj, session, outputfunc_name), ...]`.
+
+        """
+        objs = [obj] if obj else list(self.watchers)
+        return [
+            (obj, session, outputfunc_name)
+            for obj in objs
+            for session, outputfunc_name, _ in self.watchers.get(obj, {}).values()
+        ]
+
+
+# access object
+OOB_STATE_HANDLER = OOBStateHandler()
@@ -5,16 +5,24 @@ Module containing the task handler for Evennia deferred tasks, persistent or not
 from datetime import datetime, timedelta
 from pickle import PickleError
 
+from django.conf import settings
 from twisted.internet import reactor
 from twisted.internet.defer import CancelledError as DefCancelledError
 from twisted.internet.task import deferLater
 
+from evennia.server import shards
 from evennia.server.models import ServerConfig
 from evennia.utils.dbserialize import dbserialize, dbunserialize
-from evennia.utils.logger import log_err
+from evennia.utils.logger import log_err, log_trace
+from evennia.utils.timingwheel import TimingWheel
 
 TASK_HANDLER = None
 
+# persistent tasks are stored as one ServerConfig row each, with this key prefix
+_TASK_KEY_PREFIX = "delayed_task_"
+# the key all persistent tasks were stored under in older versions
+_LEGACY_TASKS_KEY = "delayed_tasks"
+
 
 def handle_error(*args, **kwargs):
     """Handle errors within deferred objects."""
@@ -205,7 +213,6 @@ class TaskHandlerTask:
 
 
 class TaskHandler(object):
-
     """A light singleton wrapper allowing to access permanent tasks.
 
     When `utils.delay` is called, the task handler is used to create
@@ -218,47 +225,155 @@ class TaskHandler(object):
     stale tasks will not be automatically removed.
     This is not done on a timer. I is done as new tasks are added or the load method is called.
 
+    Each persistent task is stored as its own ServerConfig row, so adding or
+    removing one only writes that row. Tasks loaded from the database are not
+    unpacked (which may mean loading the objects they use) until they are called.
+
+    When running many Server shards, each shard runs, saves and loads its own
+    tasks. A shard only uses the task ids whose remainder when divided by the
+    number of shards is its shard number, so the shards never store their tasks
+    under the same key.
+
+    If `settings.DELAY_TIMING_WHEEL` is set, tasks are scheduled with a
+    `TimingWheel` driven by `clock` instead of directly with `clock`.
+
     """
 
     def __init__(self):
         self.tasks = {}
         self.to_save = {}
+        # ids of tasks loaded from the database that are not yet unpacked
+        self.unloaded = set()
         self.clock = reactor
+        self.timing_wheel = None
         # number of seconds before an uncalled canceled task is removed from TaskHandler
         self.stale_timeout = 60
         self._now = False  # used in unit testing to manually set now time
 
+    def get_scheduler(self):
+        """
+        Get what tasks are scheduled with.
+
+        Returns:
+            IReactorTime: `self.clock` or, if `settings.DELAY_TIMING_WHEEL` is
+                set, a `TimingWheel` driven by `self.clock`.
+
+        """
+        if not settings.DELAY_TIMING_WHEEL:
+            return self.clock
+        if not self.timing_wheel or self.timing_wheel.clock is not self.clock:
+            self.timing_wheel = TimingWheel(
+                self.clock, resolution=settings.DELAY_TIMING_WHEEL_RESOLUTION
+            )
+        return self.timing_wheel
+
+    def _get_task_key(self, task_id):
+        """
+        Get the ServerConfig key a persistent task is stored under.
+
+        """
+        return f"{_TASK_KEY_PREFIX}{task_id}"
+
+    def _is_own_task(self, task_id):
+        """
+        Check if a task id is one of this shard's (always True if not sharded).
+
+        """
+        return task_id % shards.SHARDS == shards.SHARD
+
+    def _get_new_task_id(self):
+        """
+        Get an unused task id of this shard.
+
+        """
+        task_id = shards.SHARD or shards.SHARDS
+        while task_id in self.tasks:
+            task_id += shards.SHARDS
+        return task_id
+
+    def _store_task(self, task_id, date, serialized):
+        """
+        Store a persistent task in its own ServerConfig row.
+
+        """
+        self.to_save[task_id] = serialized
+        ServerConfig.objects.conf(self._get_task_key(task_id), (date, serialized))
+
+    def _convert_legacy_tasks(self):
+        """
+        Move tasks stored by older versions (all in one ServerConfig value)
+        to one row per task.
+
+        """
+        value = ServerConfig.objects.conf(_LEGACY_TASKS_KEY)
+        if value is None:
+            return
+        tasks = dbunserialize(value) if isinstance(value, str) else value
+        for task_id, serialized in tasks.items():
+            # make them tasks of this shard
+            task_id *= shards.SHARDS
+            self._store_task(task_id, dbunserialize(serialized)[0], serialized)
+        ServerConfig.objects.conf(_LEGACY_TASKS_KEY, delete=True)
+
     def load(self):
         """Load from the ServerConfig.
 
         This should be automatically called when Evennia starts.
-        It populates `self.tasks` according to the ServerConfig.
+        It populates `self.tasks` according to the ServerConfig. The
+        callback and arguments of each task are not unpacked until the task
+        is called. When sharded, only the tasks of this shard are loaded.
 
         """
-        to_save = False
-        value = ServerConfig.objects.conf("delayed_tasks", default={})
-        if isinstance(value, str):
-            tasks = dbunserialize(value)
-        else:
-            tasks = value
+        if not shards.SHARD:
+            self._convert_legacy_tasks()
+        for conf in ServerConfig.objects.filter(db_key__startswith=_TASK_KEY_PREFIX):
+            try:
+                task_id = int(conf.db_key[len(_TASK_KEY_PREFIX) :])
+                if not self._is_own_task(task_id):
+                    continue
+                date, serialized = conf.value
+            except (TypeError, ValueError):
+                log_err(f"Could not load the persistent task '{conf.db_key}'.")
+                continue
+            self.to_save[task_id] = serialized
+            self.tasks[task_id] = (date, None, (), {}, True, None)
+            self.unloaded.add(task_id)
+
+        if self.stale_timeout > 0:  # cleanup stale tasks.
+            self.clean_stale_tasks()
+
+    def _unpack_task(self, task_id):
+        """
+        Unpack the callback and arguments of a task loaded from the database.
+
+        Args:
+            task_id (int): an existing task ID.
 
-        # At this point, `tasks` contains a dictionary of still-serialized tasks
-        for task_id, value in tasks.items():
-            date, callback, args, kwargs = dbunserialize(value)
+        Returns:
+            bool: If the task could be unpacked. If not (such as when the object
+                of an instance-method callback was deleted), the task is removed.
+
+        """
+        if task_id not in self.unloaded:
+            return True
+        self.unloaded.discard(task_id)
+        date, _, _, _, persistent, d = self.tasks[task_id]
+        try:
+            _, callback, args, kwargs = dbunserialize(self.to_save[task_id])
             if isinstance(callback, tuple):
                 # `callback` can be an object and name for instance methods
                 obj, method = callback
                 if obj is None:
-                    to_save = True
-                    continue
-
+                    # the object was deleted
+                    self.remove(task_id)
+                    return False
                 callback = getattr(obj, method)
-            self.tasks[task_id] = (date, callback, args, kwargs, True, None)
-
-        if self.stale_timeout > 0:  # cleanup stale tasks.
-            self.clean_stale_tasks()
-        if to_save:
-            self.save()
+        except Exception:
+            log_trace(f"Could not unpack the persistent task {task_id}. Removing it.")
+            self.remove(task_id)
+            return False
+        self.tasks[task_id] = (date, callback, args, kwargs, persistent, d)
+        return True
 
     def clean_stale_tasks(self):
         """remove uncalled but canceled from task handler.
@@ -283,7 +398,7 @@ class TaskHandler(object):
 
     def save(self):
         """
-        Save the tasks in ServerConfig.
+        Save the persistent tasks not yet saved to ServerConfig.
 
         """
 
@@ -310,9 +425,7 @@ class TaskHandler(object):
                     "instance method ({err}).".format(callback=callback, err=err)
                 )
 
-            self.to_save[task_id] = dbserialize((date, safe_callback, args, kwargs))
-
-        ServerConfig.objects.conf("delayed_tasks", self.to_save)
+            self._store_task(task_id, date, dbserialize((date, safe_callback, args, kwargs)))
 
     def add(self, timedelay, callback, *args, **kwargs):
         """
@@ -347,10 +460,7 @@ class TaskHandler(object):
         delta = timedelta(seconds=timedelay)
         comp_time = now + delta
         # get an open task id
-        used_ids = list(self.tasks.keys())
-        task_id = 1
-        while task_id in used_ids:
-            task_id += 1
+        task_id = self._get_new_task_id()
 
         # record the task to the tasks dictionary
         persistent = kwargs.get("persistent", False)
@@ -394,7 +504,7 @@ class TaskHandler(object):
         callback = self.do_task
         args = [task_id]
         kwargs = {}
-        d = deferLater(self.clock, timedelay, callback, *args, **kwargs)
+        d = deferLater(self.get_scheduler(), timedelay, callback, *args, **kwargs)
         d.addErrback(handle_error)
 
         # some tasks may complete before the deferred can be added
@@ -491,10 +601,11 @@ class TaskHandler(object):
             # if the task has not been run, cancel it
             self.cancel(task_id)
             del self.tasks[task_id]  # delete the task from the tasks dictionary
+        self.unloaded.discard(task_id)
         # remove the task from the persistent dictionary and ServerConfig
         if task_id in self.to_save:
             del self.to_save[task_id]
-            self.save()  # remove from ServerConfig.objects
+            ServerConfig.objects.conf(self._get_task_key(task_id), delete=True)
         # delete the instance of the deferred
         if d:
             del d
@@ -503,6 +614,7 @@ class TaskHandler(object):
     def clear(self, save=True, cancel=True):
         """
         Clear all tasks. By default tasks are canceled and removed from the database as well.
+        When sharded, the tasks of the other shards are left alone.
 
         Args:
             save=True (bool): Should changes to persistent tasks be saved to database.
@@ -517,10 +629,22 @@ class TaskHandler(object):
                 if cancel:
                     self.cancel(task_id)
             self.tasks = {}
+        self.unloaded = set()
         if self.to_save:
             self.to_save = {}
         if save:
-            self.save()
+            confs = ServerConfig.objects.filter(db_key__startswith=_TASK_KEY_PREFIX)
+            if shards.SHARDED:
+                # leave the tasks of the other shards alone
+                confs = confs.filter(
+                    pk__in=[
+                        pk
+                        for pk, key in confs.values_list("pk", "db_key")
+                        if key[len(_TASK_KEY_PREFIX) :].isdigit()
+                        and self._is_own_task(int(key[len(_TASK_KEY_PREFIX) :]))
+                    ]
+                )
+            confs.delete()
         return True
 
     def call_task(self, task_id):
@@ -538,7 +662,7 @@ class TaskHandler(object):
             handler. Otherwise it will be the return of the task's callback.
 
         """
-        if task_id in self.tasks:
+        if task_id in self.tasks and self._unpack_task(task_id):
             date, callback, args, kwargs, persistent, d = self.tasks.get(task_id)
         else:  # the task does not exist
             return False
@@ -560,7 +684,7 @@ class TaskHandler(object):
 
         """
         callback_return = False
-        if task_id in self.tasks:
+        if task_id in self.tasks and self._unpack_task(task_id):
             date, callback, args, kwargs, persistent, d = self.tasks.get(task_id)
         else:  # the task does not exist
             return False
@@ -597,10 +721,11 @@ class TaskHandler(object):
 
         """
         now = datetime.now()
+        scheduler = self.get_scheduler()
         for task_id, (date, callback, args, kwargs, _, _) in self.tasks.items():
             self.tasks[task_id] = date, callback, args, kwargs, True, None
             seconds = max(0, (date - now).total_seconds())
-            d = deferLater(self.clock, seconds, self.do_task, task_id)
+            d = deferLater(scheduler, seconds, self.do_task, task_id)
             d.addErrback(handle_error)
             # some tasks may complete before the deferred can be added
             if self.tasks.get(task_id, False):
@@ -1,10 +1,16 @@
 from unittest import TestCase, mock
 
 from parameterized import parameterized
+from django.test import override_settings
+from twisted.internet import defer, task
 
 from evennia import DefaultScript
 from evennia.scripts.models import ObjectDoesNotExist, ScriptDB
+from evennia.scripts.monitorhandler import MonitorHandler
+from evennia.scripts.scheduler import ScriptScheduler, ScriptTimer
+from evennia.scripts.scripthandler import SCRIPT_OWNER_CACHE
 from evennia.scripts.scripts import DoNothing, ExtendedLoopingCall
+from evennia.scripts.statehandler import OOBStateHandler
 from evennia.utils.create import create_script
 from evennia.utils.test_resources import BaseEvenniaTest
 
@@ -88,3 +94,433 @@ class TestExtendedLoopingCall(TestCase):
         loopcall.__call__.assert_not_called()
         self.assertEqual(loopcall.interval, 20)
         loopcall._scheduleFrom.assert_called_with(121)
+
+
+class TestScriptScheduler(TestCase):
+    """
+    Test the ScriptScheduler running ScriptTimers.
+
+    """
+
+    def setUp(self):
+        self.clock = task.Clock()
+        self.scheduler = ScriptScheduler(self.clock, batch_size=100)
+
+    def _timer(self, func=None):
+        return ScriptTimer(func or mock.Mock(), scheduler=self.scheduler)
+
+    def test_start(self):
+        timers = [self._timer() for _ in range(10)]
+        for timer in timers:
+            timer.start(10, now=False)
+        # one clock call for all timers
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.assertEqual(timers[0].next_call_time(), 10)
+        self.clock.advance(9)
+        timers[0].func.assert_not_called()
+        self.clock.advance(1)
+        for timer in timers:
+            timer.func.assert_called_once()
+            self.assertEqual(timer.callcount, 1)
+        self.clock.advance(10)
+        self.assertEqual(timers[0].callcount, 2)
+
+        timer = self._timer()
+        timer.start(10, now=True)
+        timer.func.assert_called_once()
+        self.assertEqual(timer.next_call_time(), 10)
+        with self.assertRaises(AssertionError):
+            timer.start(10)
+        with self.assertRaises(ValueError):
+            self._timer().start(0)
+
+    def test_start_delay(self):
+        timer = self._timer()
+        timer.start(10, now=False, start_delay=3, count_start=5)
+        self.assertEqual(timer.next_call_time(), 3)
+        self.clock.advance(3)
+        timer.func.assert_called_once()
+        self.assertEqual(timer.callcount, 6)
+        self.assertEqual(timer.next_call_time(), 10)
+        self.clock.advance(10)
+        self.assertEqual(timer.callcount, 7)
+
+    def test_stop(self):
+        timer = self._timer()
+        timer.start(5, now=False)
+        self.clock.advance(2)
+        timer.stop()
+        self.assertIsNone(timer.next_call_time())
+        # restarting queues it anew, the old entry is skipped
+        timer.start(5, now=False)
+        self.clock.advance(3)
+        timer.func.assert_not_called()
+        self.clock.advance(2)
+        timer.func.assert_called_once()
+        self.assertEqual(len(self.scheduler), 1)
+
+        # a stopped timer's entry is removed right away
+        other = self._timer()
+        other.start(5, now=False)
+        delayed = self._timer()
+        delayed.start(5, now=False, start_delay=2)
+        self.assertEqual(len(self.scheduler), 3)
+        other.stop()
+        delayed.stop()
+        self.assertEqual(len(self.scheduler), 1)
+        self.clock.advance(5)
+        other.func.assert_not_called()
+        delayed.func.assert_not_called()
+        self.assertEqual(timer.func.call_count, 2)
+
+        # with no timers running, the clock call is cancelled
+        timer.stop()
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+        self.assertEqual(len(self.scheduler), 0)
+
+        # stopping from the timer's own callback
+        timer = self._timer()
+        timer.func.side_effect = timer.stop
+        timer.start(5, now=False)
+        self.clock.advance(5)
+        self.assertFalse(timer.running)
+        self.clock.advance(5)
+        timer.func.assert_called_once()
+
+    def test_force_repeat(self):
+        timer = self._timer()
+        timer.start(10, now=False)
+        self.clock.advance(4)
+        timer.force_repeat()
+        timer.func.assert_called_once()
+        self.assertEqual(timer.next_call_time(), 10)
+        self.clock.advance(6)
+        timer.func.assert_called_once()
+        self.clock.advance(4)
+        self.assertEqual(timer.func.call_count, 2)
+
+    def test_batches(self):
+        self.scheduler.batch_size = 3
+        timers = [self._timer() for _ in range(7)]
+        for timer in timers:
+            timer.start(10, now=False)
+        # run the scheduler like the reactor would at that time (the test clock
+        # would otherwise also run the follow-up calls in the same advance)
+        self.clock.rightNow = 10.0
+        self.scheduler._clock_call.cancel()
+        self.scheduler._run()
+        self.assertEqual(sum(timer.callcount for timer in timers), 3)
+        # the rest run in the next reactor iteration(s)
+        self.assertEqual([call.getTime() for call in self.clock.getDelayedCalls()], [10.0])
+        self.clock.advance(0)
+        self.assertEqual(sum(timer.callcount for timer in timers), 7)
+
+    def test_late_and_mixed(self):
+        fired = []
+        timers = {}
+        for interval in (2, 3, 5):
+            timers[interval] = self._timer(lambda interval=interval: fired.append(interval))
+            timers[interval].start(interval, now=False)
+        timers[4] = self._timer(lambda: fired.append(4))
+        timers[4].start(4, now=False, start_delay=1)
+        self.clock.pump([1] * 6)
+        self.assertEqual(fired, [4, 2, 3, 2, 4, 5, 2, 3])
+        # running late skips the missed calls
+        fired.clear()
+        self.clock.advance(7)
+        self.assertEqual(sorted(fired), [2, 3, 4, 5])
+        self.assertEqual(timers[2].next_call_time(), 1)
+
+    def test_error(self):
+        timer = self._timer()
+        timer.func.side_effect = RuntimeError("Boom")
+        with mock.patch("evennia.scripts.scheduler.logger") as mock_logger:
+            timer.start(5, now=False)
+            self.clock.advance(5)
+            mock_logger.log_trace.assert_called_once()
+        self.assertTrue(timer.running)
+        self.assertEqual(timer.next_call_time(), 5)
+
+
+class TestScriptTimer(BaseEvenniaTest):
+    """
+    Test Script timers running with the scheduler.
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.clock = task.Clock()
+        patcher = mock.patch(
+            "evennia.scripts.scheduler.SCRIPT_SCHEDULER", ScriptScheduler(self.clock)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_timer(self):
+        script = create_script(DoNothing, interval=10, repeats=3, autostart=False)
+        with mock.patch.object(DoNothing, "at_repeat") as mock_repeat:
+            script.start(start_delay=True)
+            self.assertEqual(script.time_until_next_repeat(), 10)
+            self.clock.advance(10)
+            mock_repeat.assert_called_once()
+            self.assertEqual(script.remaining_repeats(), 2)
+
+            self.clock.advance(4)
+            script.pause()
+            self.clock.advance(100)
+            mock_repeat.assert_called_once()
+            script.unpause()
+            self.assertEqual(script.time_until_next_repeat(), 6)
+
+            self.clock.advance(6)
+            self.assertEqual(mock_repeat.call_count, 2)
+            self.clock.advance(10)
+            self.assertEqual(mock_repeat.call_count, 3)
+            # out of repeats
+            self.assertIsNone(script.time_until_next_repeat())
+            self.assertFalse(script.is_active)
+        script.delete()
+
+    def test_at_repeat_error(self):
+        script = create_script(DoNothing, interval=5, autostart=False)
+        with mock.patch.object(DoNothing, "at_repeat", side_effect=RuntimeError("Boom")):
+            script.start(start_delay=True)
+            with mock.patch("evennia.scripts.scripts.logger") as mock_logger:
+                self.clock.advance(5)
+                mock_logger.log_err.assert_called_once()
+        self.assertEqual(script.time_until_next_repeat(), 5)
+
+        # a failing Deferred returned by at_repeat is handled the same way
+        with mock.patch.object(
+            DoNothing, "at_repeat", return_value=defer.fail(RuntimeError("Boom"))
+        ):
+            with mock.patch("evennia.scripts.scripts.logger") as mock_logger:
+                self.clock.advance(5)
+                mock_logger.log_err.assert_called_once()
+        script.delete()
+
+
+class TestScriptHandler(BaseEvenniaTest):
+    """
+    Test the ScriptHandler and its cache of which objects have Scripts.
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        SCRIPT_OWNER_CACHE.clear()
+
+    def test_no_scripts(self):
+        self.assertEqual(list(self.char1.scripts.all()), [])
+        # the owners are loaded now, objects without scripts need no queries
+        with self.assertNumQueries(0):
+            self.assertEqual(list(self.char2.scripts.all()), [])
+            self.assertEqual(list(self.account.scripts.get("foo")), [])
+            self.assertEqual(self.char2.scripts.remove("foo"), 0)
+            self.assertEqual(str(self.char2.scripts), "")
+
+    def test_add_script(self):
+        self.assertFalse(SCRIPT_OWNER_CACHE.has_scripts(self.char1))
+        script = self.char1.scripts.add(DoNothing, autostart=False)
+        self.assertTrue(SCRIPT_OWNER_CACHE.has_scripts(self.char1))
+        self.assertEqual(list(self.char1.scripts.all()), [script])
+        self.assertEqual(list(self.char1.scripts.get("sys_do_nothing")), [script])
+        self.assertFalse(SCRIPT_OWNER_CACHE.has_scripts(self.char2))
+
+        # moving the script is noticed
+        script.obj = self.char2
+        self.assertEqual(list(self.char2.scripts.all()), [script])
+        self.assertEqual(list(self.char1.scripts.all()), [])
+
+        # a new load gets the same result
+        SCRIPT_OWNER_CACHE.clear()
+        self.assertTrue(SCRIPT_OWNER_CACHE.has_scripts(self.char2))
+        self.assertFalse(SCRIPT_OWNER_CACHE.has_scripts(self.char1))
+
+        script = self.account.scripts.add(DoNothing, autostart=False)
+        self.assertTrue(SCRIPT_OWNER_CACHE.has_scripts(self.account))
+        self.assertEqual(self.account.scripts.remove("sys_do_nothing"), 1)
+
+    @mock.patch("evennia.scripts.scripthandler._TYPECLASS_AGGRESSIVE_CACHE", False)
+    def test_no_cache(self):
+        self.assertTrue(SCRIPT_OWNER_CACHE.has_scripts(self.char1))
+        self.assertIsNone(SCRIPT_OWNER_CACHE.owners)
+
+
+class TestServerStartScripts(BaseEvenniaTest):
+    """
+    Test how Scripts are restored on a server start.
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.timed = create_script(DoNothing, key="timed", interval=100)
+        self.untimed = create_script(DoNothing, key="untimed")
+
+    def tearDown(self):
+        self.timed.delete()
+        self.untimed.delete()
+        super().tearDown()
+
+    def _started_keys(self):
+        with mock.patch.object(DoNothing, "at_server_start", autospec=True) as mock_start:
+            ScriptDB.objects.update_scripts_after_server_start()
+        return {call.args[0].key for call in mock_start.call_args_list}
+
+    def test_start_all(self):
+        self.assertTrue({"timed", "untimed"}.issubset(self._started_keys()))
+
+    @override_settings(SCRIPTS_BOOT_TIMED_ONLY=True)
+    def test_start_timed_only(self):
+        keys = self._started_keys()
+        self.assertIn("timed", keys)
+        self.assertNotIn("untimed", keys)
+
+
+class TestOOBStateHandler(BaseEvenniaTest):
+    """
+    Test the OOB state channel.
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.handler = OOBStateHandler()
+        self.session.msg = mock.Mock()
+        # the monitor callbacks report to the global handler
+        patcher = mock.patch("evennia.scripts.statehandler.OOB_STATE_HANDLER", self.handler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.handler.unwatch_session(self.session)
+        super().tearDown()
+
+    @mock.patch("evennia.scripts.statehandler.reactor")
+    def test_watch_sends_full_state_then_changes(self, mock_reactor):
+        mock_reactor.callLater.return_value.active.return_value = True
+        self.char1.db.desc = "A character."
+        self.handler.watch(self.char1, self.session)
+        mock_reactor.callLater.assert_called_once()
+        self.handler.update()
+        self.session.msg.assert_called_once_with(
+            state=((), {"name": "Char", "location": "Room", "desc": "A character."})
+        )
+        self.session.msg.reset_mock()
+
+        # several changes are coalesced into one message with only the changed keys
+        self.char1.db.desc = "A tall character."
+        self.char1.key = "Tall char"
+        self.char1.key = "Char"
+        self.char1.db.desc = "A short character."
+        self.assertEqual(mock_reactor.callLater.call_count, 1)
+        self.handler.update()
+        self.session.msg.assert_called_once_with(state=((), {"desc": "A short character."}))
+        self.session.msg.reset_mock()
+
+        # nothing changed, nothing sent
+        self.handler.mark_dirty(self.char1)
+        self.handler.update()
+        self.session.msg.assert_not_called()
+
+    @mock.patch("evennia.scripts.statehandler.reactor")
+    def test_removed_keys_and_multiple_watches(self, mock_reactor):
+        self.handler.watch(self.char1, self.session)
+        self.handler.watch(self.obj1, self.session, outputfunc_name="target")
+        self.handler.update()
+        self.session.msg.assert_called_once()
+        self.assertEqual(set(self.session.msg.call_args[1]), {"state", "target"})
+        self.session.msg.reset_mock()
+
+        with mock.patch.object(
+            self.char1, "get_oob_state", return_value={"name": "Char"}, create=True
+        ):
+            self.handler.mark_dirty(self.char1)
+            self.handler.update()
+        self.session.msg.assert_called_once_with(state=((), {"location": None, "desc": None}))
+
+    @mock.patch("evennia.scripts.statehandler.reactor")
+    def test_unwatch(self, mock_reactor):
+        self.handler.watch(self.char1, self.session)
+        self.assertEqual(self.handler.all(), [(self.char1, self.session, "state")])
+        self.handler.unwatch(self.char1, self.session)
+        self.assertEqual(self.handler.all(), [])
+        self.handler.update()
+        self.session.msg.assert_not_called()
+        # unwatched objects are not marked
+        self.handler.mark_dirty(self.char1)
+        self.assertFalse(self.handler.dirty)
+
+
+def _monitor_callback(**kwargs):
+    _monitor_callback.calls.append((kwargs["obj"], kwargs["fieldname"]))
+
+
+_monitor_callback.calls = []
+
+
+class TestMonitorHandler(BaseEvenniaTest):
+    """
+    Test the MonitorHandler.
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.handler = MonitorHandler()
+        patcher = mock.patch("evennia.utils.idmapper.models._MONITOR_HANDLER", self.handler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        _monitor_callback.calls = []
+
+    def test_field_monitor(self):
+        self.assertFalse(self.handler.is_monitored(self.obj1))
+        self.handler.add(self.obj1, "db_key", _monitor_callback, idstring="foo")
+        self.assertTrue(self.handler.is_monitored(self.obj1))
+        self.obj1.key = "New name"
+        self.assertEqual(_monitor_callback.calls, [(self.obj1, "db_key")])
+        # unmonitored fields and entities are not reported
+        self.obj1.location = self.room2
+        self.obj2.key = "Other name"
+        self.assertEqual(len(_monitor_callback.calls), 1)
+
+        self.handler.remove(self.obj1, "db_key", idstring="foo")
+        self.assertFalse(self.handler.is_monitored(self.obj1))
+        self.assertEqual(self.handler.all(), [])
+        self.obj1.key = "Third name"
+        self.assertEqual(len(_monitor_callback.calls), 1)
+
+    def test_attribute_monitor(self):
+        self.obj1.db.hp = 10
+        self.handler.add(self.obj1, "hp", _monitor_callback)
+        attr = self.obj1.attributes.get("hp", return_obj=True)
+        self.assertTrue(self.handler.is_monitored(attr))
+        self.assertFalse(self.handler.is_monitored(self.obj1))
+        self.obj1.db.hp = 5
+        self.assertTrue(_monitor_callback.calls)
+        self.assertEqual(set(_monitor_callback.calls), {(attr, "db_value")})
+
+    @mock.patch("evennia.scripts.monitorhandler.reactor")
+    def test_batched_monitor(self, mock_reactor):
+        mock_reactor.callLater.return_value.active.return_value = True
+        self.handler.add(self.obj1, "db_key", _monitor_callback, batched=True)
+        for num in range(5):
+            self.obj1.key = f"Name {num}"
+        self.assertEqual(_monitor_callback.calls, [])
+        mock_reactor.callLater.assert_called_once()
+        self.handler._call_batched()
+        self.assertEqual(_monitor_callback.calls, [(self.obj1, "db_key")])
+        # nothing changed since the last batch
+        self.handler._call_batched()
+        self.assertEqual(len(_monitor_callback.calls), 1)
+
+    def test_save_restore(self):
+        self.handler.add(self.obj1, "db_key", _monitor_callback, idstring="foo", batched=True)
+        self.handler.save()
+        self.handler.clear()
+        self.assertEqual(self.handler.all(), [])
+        self.handler.restore()
+        self.assertEqual(self.handler.all(), [(self.obj1, "db_key", "foo", False, {})])
+        self.assertTrue(self.handler.monitors[self.obj1]["db_key"]["foo"][3])
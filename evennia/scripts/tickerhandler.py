@@ -64,6 +64,10 @@ If one wants to duplicate TICKER_HANDLER's auto-saving feature in
 a  custom handler one can make a custom `AT_STARTSTOP_MODULE` entry to
 call the handler's `save()` and `restore()` methods when the server reboots.
 
+When running many Server shards (see `evennia.server.shards`), the tickers of
+TICKER_HANDLER only run on shard 0. The other shards pass on adding and
+removing tickers to it.
+
 """
 import inspect
 
@@ -71,9 +75,10 @@ from django.core.exceptions import ObjectDoesNotExist
 from twisted.internet.defer import inlineCallbacks
 
 from evennia.scripts.scripts import ExtendedLoopingCall
+from evennia.server import shards
 from evennia.server.models import ServerConfig
 from evennia.utils import inherits_from, variable_from_module
-from evennia.utils.dbserialize import dbserialize, dbunserialize, pack_dbobj
+from evennia.utils.dbserialize import dbserialize, dbunserialize, pack_dbobj, unpack_dbobj
 from evennia.utils.logger import log_err, log_trace
 
 _GA = object.__getattribute__
@@ -396,6 +401,28 @@ class TickerHandler(object):
         outpath = path if path and isinstance(path, str) else None
         return (packed_obj, methodname, outpath, interval, idstring, persistent)
 
+    def _on_other_shard(self):
+        """
+        Check if this is the main TICKER_HANDLER on a shard other than shard 0,
+        which passes on its changes to shard 0.
+
+        """
+        return bool(shards.SHARD) and self is TICKER_HANDLER
+
+    def _send_to_primary(self, method, **data):
+        """
+        Have shard 0 call a method of its TICKER_HANDLER.
+
+        Args:
+            method (str): One of `"add"`, `"remove"` or `"clear"`.
+            **data: The `store_key`, `interval` or `args` and `kwargs` of the
+                call. The `args` and `kwargs` are serialized like the ticker storage.
+
+        """
+        if "args" in data:
+            data["args"] = dbserialize((data["args"], data.pop("kwargs")))
+        shards.SHARD_BUS.send("ticker", dict(data, method=method), shard=0)
+
     def save(self):
         """
         Save ticker_storage as a serialized string into a temporary
@@ -531,6 +558,10 @@ class TickerHandler(object):
         """
         obj, path, callfunc = self._get_callback(callback)
         store_key = self._store_key(obj, path, interval, callfunc, idstring, persistent)
+        if self._on_other_shard():
+            # the callback is found from the store_key on shard 0
+            self._send_to_primary("add", store_key=store_key, args=args, kwargs=kwargs)
+            return store_key
         kwargs["_obj"] = obj
         kwargs["_callback"] = callfunc  # either method-name or callable
         self.ticker_storage[store_key] = (args, kwargs)
@@ -552,7 +583,8 @@ class TickerHandler(object):
                 this is used to identify the ticker.
 
         Raises:
-            KeyError: If no matching ticker was found to remove.
+            KeyError: If no matching ticker was found to remove. On shards other
+                than shard 0, this is only logged by shard 0.
 
         Notes:
             The store-key is normally built from the interval/callback/idstring/persistent values;
@@ -567,6 +599,9 @@ class TickerHandler(object):
         if not store_key:
             obj, path, callfunc = self._get_callback(callback)
             store_key = self._store_key(obj, path, interval, callfunc, idstring, persistent)
+        if self._on_other_shard():
+            self._send_to_primary("remove", store_key=store_key)
+            return
         to_remove = self.ticker_storage.pop(store_key, None)
         if to_remove:
             self.ticker_pool.remove(store_key)
@@ -586,6 +621,9 @@ class TickerHandler(object):
             non-db objects.
 
         """
+        if self._on_other_shard():
+            self._send_to_primary("clear", interval=interval)
+            return
         self.ticker_pool.stop(interval)
         if interval:
             self.ticker_storage = dict(
@@ -645,3 +683,30 @@ class TickerHandler(object):
 
 # main tickerhandler
 TICKER_HANDLER = TickerHandler()
+
+
+def _receive_ticker(data):
+    """
+    Change the tickers for another shard (see `TickerHandler._send_to_primary`).
+
+    """
+    method = data["method"]
+    if method == "add":
+        packed_obj, callfunc, path, interval, idstring, persistent = data["store_key"]
+        if callfunc:
+            obj = unpack_dbobj(packed_obj)
+            if not obj:
+                # deleted in the meantime
+                return
+            callback = getattr(obj, callfunc)
+        else:
+            callback = variable_from_module(*path.rsplit(".", 1))
+        args, kwargs = dbunserialize(data["args"])
+        TICKER_HANDLER.add(interval, callback, idstring, persistent, *args, **kwargs)
+    elif method == "remove":
+        TICKER_HANDLER.remove(store_key=data["store_key"])
+    elif method == "clear":
+        TICKER_HANDLER.clear(interval=data["interval"])
+
+
+shards.SHARD_BUS.register("ticker", _receive_ticker)
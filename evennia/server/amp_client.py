@@ -9,6 +9,7 @@ import os
 from django.conf import settings
 from twisted.internet import protocol
 
+from evennia.server import shards
 from evennia.server.portal import amp
 from evennia.utils import logger
 from evennia.utils.utils import class_from_module
@@ -114,7 +115,11 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
         # first thing we do is to request the Portal to sync all sessions
         # back with the Server side. We also need the startup mode (reload, reset, shutdown)
         self.send_AdminServer2Portal(
-            amp.DUMMYSESSION, operation=amp.PSYNC, spid=os.getpid(), info_dict=info_dict
+            amp.DUMMYSESSION,
+            operation=amp.PSYNC,
+            spid=os.getpid(),
+            info_dict=info_dict,
+            server_shard=shards.SHARD,
         )
         # run the intial setup if needed
         self.factory.server.run_initial_setup()
@@ -147,11 +152,16 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
             to Portal.
 
         Args:
-            session (Session): Unique Session.
+            session (Session or list): Unique Session, or a list of Sessions
+                that should all receive the same data.
             kwargs (any, optiona): Extra data.
 
         """
-        return self.data_to_portal(amp.MsgServer2Portal, session.sessid, **kwargs)
+        if isinstance(session, (list, tuple)):
+            sessid = [sess.sessid for sess in session]
+        else:
+            sessid = session.sessid
+        return self.data_to_portal(amp.MsgServer2Portal, sessid, **kwargs)
 
     def send_AdminServer2Portal(self, session, operation="", **kwargs):
         """
@@ -191,6 +201,9 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
         session = self.factory.server.sessions.get(sessid, None)
         if session:
             self.factory.server.sessions.data_in(session, **kwargs)
+        else:
+            # sent before the Portal knew we handed the session off
+            self.factory.server.sessions.relay_handed_off(sessid, **kwargs)
         return {}
 
     @amp.AdminPortal2Server.responder
@@ -248,6 +261,22 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
             # shutdown in stop mode
             server_sessionhandler.server.shutdown(mode="shutdown")
 
+        elif operation == amp.SBUS:  # message from another server shard
+            shards.SHARD_BUS.receive(kwargs.get("op"), kwargs.get("data"))
+
+        elif operation == amp.SHANDOFF:  # another server shard handed a session to us
+            server_sessionhandler.portal_handoff(
+                kwargs.get("sessiondata"), kwargs.get("handoffdata")
+            )
+
+        elif operation == amp.PHANDOFF:  # portal knows of a handoff we made
+            server_sessionhandler.portal_handoff_done(sessid)
+
+        elif operation == amp.PSHARDS:  # portal tells us which shard handles which session
+            shards.update_session_shards(
+                kwargs.get("sessions"), kwargs.get("removed"), full=kwargs.get("full", False)
+            )
+
         else:
             raise Exception("operation %(op)s not recognized." % {"op": operation})
 
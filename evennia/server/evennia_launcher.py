@@ -1914,12 +1914,14 @@ def init_game_directory(path, check_db=True, need_gamedir=True):
             print(INFO_WINDOWS_BATFILE.format(twistd_path=twistd_path))
 
 
-def run_dummyrunner(number_of_dummies):
+def run_dummyrunner(number_of_dummies, extra_args=None):
     """
     Start an instance of the dummyrunner
 
     Args:
         number_of_dummies (int): The number of dummy accounts to start.
+        extra_args (list, optional): Additional options to pass on to the
+            dummyrunner, like `--scenario=login_storm`.
 
     Notes:
         The dummy accounts' behavior can be customized by adding a
@@ -1932,6 +1934,8 @@ def run_dummyrunner(number_of_dummies):
     config_file = os.path.join(SETTINGS_PATH, "dummyrunner_settings.py")
     if os.path.exists(config_file):
         cmdstr.extend(["--config", config_file])
+    if extra_args:
+        cmdstr.extend(extra_args)
     try:
         call(cmdstr, env=getenv())
     except KeyboardInterrupt:
@@ -2306,7 +2310,7 @@ def main():
     if args.dummyrunner:
         # launch the dummy runner
         init_game_directory(CURRENT_DIR, check_db=True)
-        run_dummyrunner(args.dummyrunner[0])
+        run_dummyrunner(args.dummyrunner[0], extra_args=unknown_args)
     elif args.listsetting:
         # display all current server settings
         init_game_directory(CURRENT_DIR, check_db=False)
@@ -2419,6 +2423,15 @@ def main():
             )
             sys.exit()
 
+        if need_gamedir and not TEST_MODE:
+            from django.conf import settings
+
+            if settings.CACHE_INVALIDATION_EXTERNAL:
+                # tell a running game about the database changes we make
+                from evennia.server import invalidation
+
+                invalidation.connect_external()
+
         if run_custom_commands(option, *unknown_args):
             # run any custom commands
             sys.exit()
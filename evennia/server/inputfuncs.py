@@ -444,7 +444,7 @@ def monitor(session, *args, **kwargs):
     from evennia.scripts.monitorhandler import MONITOR_HANDLER
 
     name = kwargs.get("name", None)
-    outputfunc_name = kwargs("outputfunc_name", "monitor")
+    outputfunc_name = kwargs.get("outputfunc_name", "monitor")
     if name and name in _monitorable and session.puppet:
         field_name = _monitorable[name]
         obj = session.puppet
@@ -458,6 +458,7 @@ def monitor(session, *args, **kwargs):
                 _on_monitor_change,
                 idstring=session.sessid,
                 persistent=False,
+                batched=True,
                 name=name,
                 session=session,
                 outputfunc_name=outputfunc_name,
@@ -484,6 +485,41 @@ def monitored(session, *args, **kwargs):
     session.msg(monitored=(monitors, {}))
 
 
+def watch_state(session, *args, **kwargs):
+    """
+    Start (or stop) receiving changes of the state of the puppeted object.
+    The full state is sent first, then only the keys that changed, at most
+    once every `settings.OOB_STATE_UPDATE_INTERVAL` seconds. What is in the
+    state is decided by the object's `get_oob_state` method.
+
+    Keyword Args:
+      stop (bool): Stop watching.
+      outputfunc_name (str, optional): Change the name of the outputfunc
+        used to send the state (default `state`, which GMCP sends as
+        `Char.State.Update`).
+
+    """
+    from evennia.scripts.statehandler import OOB_STATE_HANDLER
+
+    obj = session.puppet
+    if not obj:
+        return
+    if kwargs.get("stop", False):
+        OOB_STATE_HANDLER.unwatch(obj, session)
+    else:
+        OOB_STATE_HANDLER.watch(
+            obj, session, outputfunc_name=kwargs.get("outputfunc_name", "state")
+        )
+
+
+def unwatch_state(session, *args, **kwargs):
+    """
+    Wrapper for turning off state watching
+    """
+    kwargs["stop"] = True
+    watch_state(session, *args, **kwargs)
+
+
 def _on_webclient_options_change(**kwargs):
     """
     Called when the webclient options stored on the account changes.
@@ -610,7 +646,7 @@ def msdp_report(session, *args, **kwargs):
     MSDP REPORT command
 
     """
-    kwargs["outputfunc_name":"report"]
+    kwargs["outputfunc_name"] = "report"
     monitor(session, *args, **kwargs)
 
 
@@ -0,0 +1,442 @@
+"""
+Idmapper cache invalidation
+
+Every Server process keeps the database objects it has loaded in its idmapper
+cache (see `evennia.utils.idmapper`) and trusts that cache over the database.
+When another process writes to the database, the Server must be told what
+changed so it can update its cache. Such writers are other Server shards (see
+`evennia.server.shards`) as well as processes outside the game, like
+`evennia shell`, a batch import script or a separately run web process.
+
+`connect` hooks into Django's `post_save`, `post_delete` and `m2m_changed`
+signals of all idmapper models. Each change is noted as a small
+`(action, label, pk, fields)` tuple and the changes are sent in one batch at
+the end of the current reactor iteration (or right away with `send_pending`,
+for example before handing a Session over to another shard). The receiving
+process calls `apply_changes`, which reloads the changed fields of the cached
+instances (with one query per model), drops deleted instances from the cache
+and resets the caches that depend on them, like the contents of a location or
+the Attributes of an object. Instances that are not cached are loaded fresh
+from the database when needed, but a new object is still added to the
+contents of its location, and the owners of a new Script are noted in the
+`SCRIPT_OWNER_CACHE`.
+
+Processes outside the game use `connect_external` instead. They usually don't
+run a reactor, so their changes are collected for a short time in a timer
+thread and then sent to the Portal over a plain socket, using the same AMP
+port as the `evennia` launcher. The Portal passes them on to all Server
+shards. The launcher does this for the Django commands it runs (like
+`evennia shell`); a standalone script or web process should call
+`connect_external()` itself after Django is set up.
+
+"""
+
+import atexit
+import pickle
+import socket
+import threading
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from twisted.internet import reactor
+from twisted.protocols.amp import AmpBox
+
+from evennia.server.portal import amp
+from evennia.utils import logger
+from evennia.utils.idmapper.models import SharedMemoryModel
+
+# [(action, label, pk, fields), ...] waiting to be sent
+_PENDING = []
+# the reactor call (or, for external processes, the timer) sending the changes
+_SEND_CALL = None
+# callable taking the list of changes to send
+_SENDER = None
+# if we are a process outside the game (see connect_external)
+_EXTERNAL = False
+# the signals may fire in other threads than the one sending
+_LOCK = threading.Lock()
+
+# seconds external processes collect changes before sending them
+_EXTERNAL_SEND_DELAY = 0.2
+_EXTERNAL_TIMEOUT = 5
+# the largest value an AMP box can hold
+_MAX_AMP_VALUE = 0xFFFF
+
+# many-to-many field of a model: the handlers (on the instance) caching it
+_M2M_HANDLERS = {
+    "db_attributes": ("attributes",),
+    "db_tags": ("tags", "aliases", "permissions"),
+    "db_account_subscriptions": ("subscriptions",),
+    "db_object_subscriptions": ("subscriptions",),
+}
+
+
+def _label(sender):
+    return sender._meta.concrete_model._meta.label
+
+
+def _note(action, label, pk, fields=None):
+    """
+    Queue a change to be sent at the end of the reactor iteration.
+
+    """
+    global _SEND_CALL
+    if _SENDER is None or pk is None:
+        return
+    with _LOCK:
+        _PENDING.append((action, label, pk, tuple(fields) if fields is not None else None))
+        if _SEND_CALL is None:
+            if _EXTERNAL:
+                _SEND_CALL = threading.Timer(_EXTERNAL_SEND_DELAY, send_pending)
+                _SEND_CALL.daemon = True
+                _SEND_CALL.start()
+            else:
+                _SEND_CALL = reactor.callLater(0, send_pending)
+
+
+def _cancel_send():
+    """
+    Cancel the scheduled sending of changes, if any. Must be called with the lock.
+
+    """
+    global _SEND_CALL
+    if _SEND_CALL is not None:
+        if _EXTERNAL:
+            _SEND_CALL.cancel()
+        elif _SEND_CALL.active():
+            _SEND_CALL.cancel()
+    _SEND_CALL = None
+
+
+def _post_save(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw or not issubclass(sender, SharedMemoryModel):
+        return
+    # new rows are sent too, so that the contents of their location are updated
+    _note("save", _label(sender), instance.pk, update_fields)
+
+
+def _post_delete(sender, instance, **kwargs):
+    if issubclass(sender, SharedMemoryModel):
+        _note("delete", _label(sender), instance.pk)
+
+
+def _m2m_changed(sender, instance, action, reverse=False, model=None, pk_set=None, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        # the change was made from the other side; each of the related rows changed
+        if isinstance(model, type) and issubclass(model, SharedMemoryModel):
+            name = _m2m_field_name(model, sender)
+            for pk in pk_set or ():
+                _note("m2m", _label(model), pk, (name,) if name else None)
+    elif isinstance(instance, SharedMemoryModel):
+        name = _m2m_field_name(type(instance), sender)
+        _note("m2m", _label(type(instance)), instance.pk, (name,) if name else None)
+
+
+def _m2m_field_name(model, through):
+    """
+    Get the name of the many-to-many field of `model` using the `through` table.
+
+    """
+    for field in model._meta.many_to_many:
+        if field.remote_field.through is through:
+            return field.name
+    return None
+
+
+def connect(sender):
+    """
+    Start sending the changes this process makes to the database.
+
+    Args:
+        sender (callable): Called as `sender(changes)` with a list of changes,
+            at most once per reactor iteration.
+
+    """
+    global _SENDER
+    _SENDER = sender
+    post_save.connect(_post_save, dispatch_uid="evennia-invalidation-save")
+    post_delete.connect(_post_delete, dispatch_uid="evennia-invalidation-delete")
+    m2m_changed.connect(_m2m_changed, dispatch_uid="evennia-invalidation-m2m")
+
+
+def is_connected():
+    """
+    Check if the changes this process makes to the database are being sent.
+
+    Returns:
+        bool: If `connect` (or `connect_external`) was called.
+
+    """
+    return _SENDER is not None
+
+
+def connect_external():
+    """
+    Start sending the changes this process makes to the database to the
+    running game, so it can update its cache. This is for processes other
+    than the Server, like `evennia shell` or a batch import script. Nothing
+    is sent if the game is not running.
+
+    """
+    global _EXTERNAL
+    with _LOCK:
+        _cancel_send()
+        _EXTERNAL = True
+    connect(send_to_portal)
+    # don't lose the last changes when the process ends
+    atexit.register(send_pending)
+
+
+def disconnect():
+    """
+    Stop sending changes. Changes not yet sent are dropped.
+
+    """
+    global _SENDER, _EXTERNAL
+    post_save.disconnect(dispatch_uid="evennia-invalidation-save")
+    post_delete.disconnect(dispatch_uid="evennia-invalidation-delete")
+    m2m_changed.disconnect(dispatch_uid="evennia-invalidation-m2m")
+    with _LOCK:
+        _SENDER = None
+        del _PENDING[:]
+        _cancel_send()
+        _EXTERNAL = False
+    atexit.unregister(send_pending)
+
+
+def send_pending():
+    """
+    Send all changes not yet sent. Several changes to the same row are merged.
+
+    """
+    with _LOCK:
+        _cancel_send()
+        pending = _PENDING[:]
+        del _PENDING[:]
+        sender = _SENDER
+    if not pending or sender is None:
+        return
+    # {(action, label, pk): set of fields, or None for all fields}
+    merged = {}
+    for action, label, pk, fields in pending:
+        key = (action, label, pk)
+        if key in merged:
+            if merged[key] is None or fields is None:
+                merged[key] = None
+            else:
+                merged[key].update(fields)
+        else:
+            merged[key] = set(fields) if fields is not None else None
+    try:
+        sender(
+            [
+                (action, label, pk, tuple(sorted(fields)) if fields is not None else None)
+                for (action, label, pk), fields in merged.items()
+            ]
+        )
+    except Exception:
+        logger.log_trace("Error sending cache invalidations.")
+
+
+def _pack(changes):
+    """
+    Pickle changes, split in as many parts as needed to fit in AMP boxes.
+
+    """
+    data = pickle.dumps(changes, pickle.HIGHEST_PROTOCOL)
+    if len(data) <= _MAX_AMP_VALUE or len(changes) < 2:
+        return [data]
+    half = len(changes) // 2
+    return _pack(changes[:half]) + _pack(changes[half:])
+
+
+def send_to_portal(changes):
+    """
+    Send changes to the Portal, which passes them on to the Server. This
+    doesn't need a running reactor; it's used by `connect_external`.
+
+    Args:
+        changes (list): The changes, as given to `apply_changes`.
+
+    """
+    boxes = []
+    for data in _pack(changes):
+        box = AmpBox()
+        box[b"_command"] = amp.MsgLauncher2Portal.key.encode("utf-8")
+        box[b"operation"] = amp.SINVALIDATE.encode("utf-8")
+        box[b"arguments"] = data
+        boxes.append(box.serialize())
+    try:
+        with socket.create_connection(
+            (settings.AMP_HOST, settings.AMP_PORT), timeout=_EXTERNAL_TIMEOUT
+        ) as sock:
+            sock.sendall(b"".join(boxes))
+    except OSError:
+        # the game is not running, so there is no cache to update
+        pass
+
+
+def _get_model(label):
+    from django.apps import apps
+
+    return apps.get_model(label)
+
+
+def _reload_fields(model, instances, fields):
+    """
+    Reload fields of cached instances of a model from the database.
+
+    Args:
+        model (Model): The model.
+        instances (dict): `{pk: instance}` of cached instances.
+        fields (set or None): The names of the fields to reload, or None for all.
+
+    Returns:
+        list: `[(instance, {attname: old value})]` for the reloaded instances.
+
+    """
+    concrete = [
+        field
+        for field in model._meta.concrete_fields
+        if not field.primary_key and (fields is None or field.name in fields)
+    ]
+    if not concrete:
+        return []
+    attnames = [field.attname for field in concrete]
+    rows = {
+        row["pk"]: row
+        for row in model._base_manager.filter(pk__in=list(instances)).values("pk", *attnames)
+    }
+    reloaded = []
+    for pk, instance in instances.items():
+        row = rows.get(pk)
+        if row is None:
+            # deleted before we got to it
+            instance.flush_from_cache(force=True)
+            continue
+        old = {}
+        for field in concrete:
+            attname = field.attname
+            old[attname] = instance.__dict__.get(attname)
+            if field.is_relation and field.is_cached(instance):
+                field.delete_cached_value(instance)
+            instance.__dict__[attname] = row[attname]
+        reloaded.append((instance, old))
+    return reloaded
+
+
+def _after_reload(model, instance, old):
+    """
+    Reset the caches depending on the reloaded fields of an instance.
+
+    """
+    from evennia.accounts.models import AccountDB
+    from evennia.comms.models import SubscriptionHandler
+    from evennia.objects.models import ObjectDB
+    from evennia.scripts.models import ScriptDB
+    from evennia.scripts.scripthandler import SCRIPT_OWNER_CACHE
+
+    if issubclass(model, ObjectDB):
+        old_location_id = old.get("db_location_id")
+        if "db_location_id" in old and old_location_id != instance.db_location_id:
+            for location_id in (old_location_id, instance.db_location_id):
+                location = ObjectDB.get_cached_instance(location_id) if location_id else None
+                if location and "contents_cache" in location.__dict__:
+                    location.contents_cache.init()
+        if "db_sessid" in old and "sessions" in instance.__dict__:
+            instance.sessions._recache()
+        if old.get("db_account_id", instance.db_account_id) != instance.db_account_id:
+            SubscriptionHandler.reset_online_cache()
+    elif issubclass(model, AccountDB):
+        SubscriptionHandler.reset_online_cache()
+    elif issubclass(model, ScriptDB):
+        if "db_obj_id" in old or "db_account_id" in old:
+            SCRIPT_OWNER_CACHE.add(instance)
+
+
+def apply_changes(changes):
+    """
+    Update the idmapper cache of this process with changes made to the database
+    by another process.
+
+    Args:
+        changes (list): `[(action, label, pk, fields), ...]`, where `action` is
+            one of `"save"`, `"delete"` or `"m2m"`, `label` is the `app.Model`
+            label of the model, `pk` the changed row and `fields` a list of
+            the changed fields (or None if all may have changed).
+
+    """
+    from evennia.objects.models import ObjectDB
+    from evennia.scripts.models import ScriptDB
+    from evennia.scripts.scripthandler import SCRIPT_OWNER_CACHE
+
+    # {model: [{pk: instance}, fields]} of cached instances to reload
+    saves = {}
+    # saved objects and Scripts we don't have cached, like new ones
+    uncached_objs = []
+    uncached_scripts = []
+    for action, label, pk, fields in changes:
+        try:
+            model = _get_model(label)
+        except LookupError:
+            logger.log_err(f"Cache invalidation: unknown model '{label}'.")
+            continue
+        instance = model.get_cached_instance(pk)
+        if instance is None:
+            if action == "save" and issubclass(model, ObjectDB):
+                uncached_objs.append(pk)
+            elif action == "save" and issubclass(model, ScriptDB):
+                uncached_scripts.append(pk)
+            continue
+        if action == "save":
+            entry = saves.setdefault(model, [{}, set()])
+            entry[0][pk] = instance
+            if fields is None or entry[1] is None:
+                entry[1] = None
+            else:
+                entry[1].update(fields)
+        elif action == "delete":
+            if isinstance(instance, ObjectDB):
+                location = ObjectDB.get_cached_instance(instance.db_location_id)
+                if location and "contents_cache" in location.__dict__:
+                    location.contents_cache.remove(instance)
+            instance.flush_from_cache(force=True)
+        elif action == "m2m":
+            names = fields or _M2M_HANDLERS
+            for name in names:
+                for handlername in _M2M_HANDLERS.get(name, ()):
+                    handler = instance.__dict__.get(handlername)
+                    if handler is None:
+                        continue
+                    if hasattr(handler, "reset_cache"):
+                        handler.reset_cache()
+                    elif hasattr(handler, "_recache"):
+                        handler._recache()
+
+    if uncached_objs:
+        # they may have been put in a location we have cached
+        location_ids = set(
+            ObjectDB._base_manager.filter(pk__in=uncached_objs).values_list(
+                "db_location_id", flat=True
+            )
+        )
+        for location_id in location_ids:
+            location = ObjectDB.get_cached_instance(location_id) if location_id else None
+            if location and "contents_cache" in location.__dict__:
+                location.contents_cache.init()
+
+    if uncached_scripts and SCRIPT_OWNER_CACHE.owners is not None:
+        # their owners may not be known to have Scripts yet
+        for obj_id, account_id in ScriptDB._base_manager.filter(
+            pk__in=uncached_scripts
+        ).values_list("db_obj_id", "db_account_id"):
+            SCRIPT_OWNER_CACHE.add_ids(obj_id, account_id)
+
+    for model, (instances, fields) in saves.items():
+        try:
+            for instance, old in _reload_fields(model, instances, fields):
+                _after_reload(model, instance, old)
+        except Exception:
+            logger.log_trace(f"Cache invalidation: error reloading {model.__name__} instances.")
@@ -41,6 +41,12 @@ PSHUTD = chr(16)  # portal (+server) shutdown
 SSHUTD = chr(17)  # server shutdown
 PSTATUS = chr(18)  # ping server or portal status
 SRESET = chr(19)  # server shutdown in reset mode
+SBUS = chr(20)  # message between server shards, relayed by the portal
+SHANDOFF = chr(21)  # server shard handing a session over to another shard
+PSHARDS = chr(22)  # portal telling server shards which shard handles which session
+SRELAY = chr(23)  # server shard passing back input for a session it handed off
+PHANDOFF = chr(24)  # portal confirming a handoff to the old shard, which answers when done
+SINVALIDATE = chr(25)  # outside process reporting database changes to the servers
 
 NUL = b"\x00"
 NULNUL = b"\x00\x00"
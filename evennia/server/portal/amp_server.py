@@ -4,17 +4,25 @@ communication to the AMP clients connecting to it (by default
 these are the Evennia Server and the evennia launcher).
 
 """
+
 import os
 import sys
+from collections import defaultdict
 from subprocess import STDOUT, Popen
 
 from django.conf import settings
-from twisted.internet import protocol
+from twisted.internet import protocol, reactor
+from twisted.internet.defer import DeferredList
 
 from evennia.server.portal import amp
 from evennia.utils import logger
 from evennia.utils.utils import class_from_module
 
+_SHARDS = max(1, settings.SERVER_SHARDS)
+_SHARDED = _SHARDS > 1
+# seconds to wait before restarting a Server shard that stopped on its own
+_SHARD_RESTART_DELAY = 5
+
 
 def _is_windows():
     return os.name == "nt"
@@ -35,7 +43,6 @@ def getenv():
 
 
 class AMPServerFactory(protocol.ServerFactory):
-
     """
     This factory creates AMP Server connection. This acts as the 'Portal'-side communication to the
     'Server' process.
@@ -64,10 +71,19 @@ class AMPServerFactory(protocol.ServerFactory):
         self.portal = portal
         self.protocol = class_from_module(settings.AMP_SERVER_PROTOCOL_CLASS)
         self.broadcasts = []
+        # the connection to the Server (to shard 0 if there are many shards)
         self.server_connection = None
+        # {shard: connection} to all Server shards
+        self.server_connections = {}
         self.launcher_connection = None
         self.disconnect_callbacks = {}
+        # called once all Server shards have disconnected
+        self.all_disconnect_callbacks = []
         self.server_connect_callbacks = []
+        # set while we wait for the Servers to stop after telling them to
+        self.servers_stopping = False
+        # {sessid: [set of shards handing the session off, [held-back input]]}
+        self.handoffs = {}
 
     def buildProtocol(self, addr):
         """
@@ -91,6 +107,9 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
 
     """
 
+    # the Server shard at the other end of this connection (see settings.SERVER_SHARDS)
+    shard = 0
+
     def connectionLost(self, reason):
         """
         Set up a simple callback mechanism to let the amp-server wait for a connection to close.
@@ -101,6 +120,9 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
         if self.factory.server_connection == self:
             self.factory.server_connection = None
             self.factory.portal.server_info_dict = {}
+        was_server = self.factory.server_connections.get(self.shard) is self
+        if was_server:
+            del self.factory.server_connections[self.shard]
         if self.factory.launcher_connection == self:
             self.factory.launcher_connection = None
 
@@ -111,6 +133,32 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
             except Exception:
                 logger.log_trace()
 
+        if not was_server:
+            return
+        for sessid in list(self.factory.handoffs):
+            # the shard can't pass back any more input for sessions it handed off
+            self.end_handoff(sessid, self.shard)
+        if (
+            _SHARDED
+            and not self.factory.servers_stopping
+            and not hasattr(self.factory.portal, "shutdown_complete")
+        ):
+            # the shard stopped without being told to (it probably crashed)
+            logger.log_err(
+                f"AMP: Server shard {self.shard} disconnected unexpectedly; restarting it "
+                f"in {_SHARD_RESTART_DELAY}s."
+            )
+            reactor.callLater(_SHARD_RESTART_DELAY, self.restart_shard, self.shard)
+        if not self.factory.server_connections:
+            self.factory.servers_stopping = False
+            callbacks = self.factory.all_disconnect_callbacks
+            self.factory.all_disconnect_callbacks = []
+            for callback, args, kwargs in callbacks:
+                try:
+                    callback(*args, **kwargs)
+                except Exception:
+                    logger.log_trace()
+
     def get_status(self):
         """
         Return status for the Evennia infrastructure.
@@ -143,10 +191,22 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
 
         Notes:
             Data will be sent across the wire pickled as a tuple
-            (sessid, kwargs).
+            (sessid, kwargs). With many Server shards, data for a Session goes to
+            the shard handling it and data without a Session to all shards.
 
         """
         # print("portal data_to_server: {}, {}, {}".format(command, sessid, kwargs))
+        if _SHARDED and self.factory.server_connections:
+            if sessid:
+                session = self.factory.portal.sessions.get(sessid)
+                shard = session.shard if session else 0
+                return self.data_to_shard(shard, command, sessid, **kwargs)
+            return DeferredList(
+                [
+                    self.data_to_shard(shard, command, sessid, **kwargs)
+                    for shard in list(self.factory.server_connections)
+                ]
+            )
         if self.factory.server_connection:
             return self.factory.server_connection.callRemote(
                 command, packed_data=amp.dumps((sessid, kwargs))
@@ -155,6 +215,53 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
             # if no server connection is available, broadcast
             return self.broadcast(command, sessid, packed_data=amp.dumps((sessid, kwargs)))
 
+    def data_to_shard(self, shard, command, sessid, **kwargs):
+        """
+        Send data across the wire to one Server shard.
+
+        Args:
+            shard (int): The shard to send to.
+            command (AMP Command): A protocol send command.
+            sessid (int): A unique Session id.
+            kwargs (any): Data to send. This will be pickled.
+
+        Returns:
+            deferred (deferred or None): A deferred with an errback, or None if
+                the shard is not connected.
+
+        """
+        connection = self.factory.server_connections.get(shard)
+        if not connection:
+            logger.log_err(f"AMP: Server shard {shard} is not connected; {command.key} dropped.")
+            return None
+        return connection.callRemote(command, packed_data=amp.dumps((sessid, kwargs))).addErrback(
+            self.errback, command.key
+        )
+
+    def end_handoff(self, sessid, shard):
+        """
+        Called when a Server shard that handed a Session off has passed back all
+        input it got for it (see the SHANDOFF operation). Once no shard is
+        handing the Session off anymore, the input held back meanwhile is sent
+        on, so the new shard gets all input in the order it was sent.
+
+        Args:
+            sessid (int): The Session handed off.
+            shard (int): The shard that handed it off.
+
+        """
+        pending = self.factory.handoffs.get(sessid)
+        if not pending:
+            return
+        pending[0].discard(shard)
+        if pending[0]:
+            return
+        del self.factory.handoffs[sessid]
+        session = self.factory.portal.sessions.get(sessid)
+        if session:
+            for kwargs in pending[1]:
+                self.send_MsgPortal2Server(session, **kwargs)
+
     def start_server(self, server_twistd_cmd):
         """
         (Re-)Launch the Evennia server.
@@ -163,10 +270,58 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
             server_twisted_cmd (list): The server start instruction
                 to pass to POpen to start the server.
 
+        Notes:
+            With `settings.SERVER_SHARDS` above 1, this starts one Server process
+            per shard. Each gets its shard number in the `EVENNIA_SHARD`
+            environment variable and shards above 0 get their own pid file.
+
+        """
+        self.factory.portal.server_twistd_cmd = server_twistd_cmd
+        for shard in range(_SHARDS):
+            self._start_server_process(server_twistd_cmd, shard)
+
+    def restart_shard(self, shard):
+        """
+        Start a single Server shard again after it stopped on its own.
+
+        Args:
+            shard (int): The shard to restart.
+
+        """
+        server_twistd_cmd = getattr(self.factory.portal, "server_twistd_cmd", None)
+        if (
+            not server_twistd_cmd
+            or shard in self.factory.server_connections
+            or self.factory.servers_stopping
+            or hasattr(self.factory.portal, "shutdown_complete")
+        ):
+            # already back, or we are stopping anyway
+            return
+        self._start_server_process(server_twistd_cmd, shard)
+
+    def _start_server_process(self, server_twistd_cmd, shard=0):
+        """
+        Launch one Server process.
+
+        Args:
+            server_twisted_cmd (list): The server start instruction
+                to pass to POpen to start the server.
+            shard (int, optional): The shard the Server should run as.
+
         """
         # start the Server
-        print("Portal starting server ... ")
+        print(f"Portal starting server {shard} ... " if shard else "Portal starting server ... ")
         process = None
+        env = getenv()
+        if _SHARDED:
+            env["EVENNIA_SHARD"] = str(shard)
+            if shard:
+                server_twistd_cmd = [
+                    arg.replace("server.pid", f"server-{shard}.pid")
+                    if arg.startswith("--pidfile=")
+                    else arg
+                    for arg in server_twistd_cmd
+                ]
         with open(settings.SERVER_LOG_FILE, "a") as logfile:
             # we link stdout to a file in order to catch
             # eventual errors happening before the Server has
@@ -177,7 +332,7 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
                     create_no_window = 0x08000000
                     process = Popen(
                         server_twistd_cmd,
-                        env=getenv(),
+                        env=env,
                         bufsize=-1,
                         stdout=logfile,
                         stderr=STDOUT,
@@ -186,12 +341,11 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
 
                 else:
                     process = Popen(
-                        server_twistd_cmd, env=getenv(), bufsize=-1, stdout=logfile, stderr=STDOUT
+                        server_twistd_cmd, env=env, bufsize=-1, stdout=logfile, stderr=STDOUT
                     )
             except Exception:
                 logger.log_trace()
 
-            self.factory.portal.server_twistd_cmd = server_twistd_cmd
             logfile.flush()
         if process and not _is_windows():
             # avoid zombie-process on Unix/BSD
@@ -209,6 +363,19 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
         """
         self.factory.disconnect_callbacks[self] = (callback, args, kwargs)
 
+    def wait_for_all_disconnect(self, callback, *args, **kwargs):
+        """
+        Add a callback for when all Server shards (or the one Server, if not
+        sharded) have disconnected. A Server shard can't be started again until
+        its old process has stopped.
+
+        Args:
+            callback (callable): Will be called with *args, **kwargs
+                once no Server is connected anymore.
+
+        """
+        self.factory.all_disconnect_callbacks.append((callback, args, kwargs))
+
     def wait_for_server_connect(self, callback, *args, **kwargs):
         """
         Add a callback for when the Server is sure to have connected.
@@ -235,6 +402,8 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
         elif mode == "shutdown":
             self.send_AdminPortal2Server(amp.DUMMYSESSION, operation=amp.SSHUTD)
         self.factory.portal.server_restart_mode = mode
+        if self.factory.server_connections:
+            self.factory.servers_stopping = True
 
     # sending amp data
 
@@ -262,6 +431,14 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
             deferred (Deferred): Asynchronous return.
 
         """
+        if _SHARDED and session.sessid and self.factory.server_connections:
+            pending = self.factory.handoffs.get(session.sessid)
+            if pending:
+                # held back until the old shard has passed back what it got before
+                # the handoff (see end_handoff)
+                pending[1].append(kwargs)
+                return None
+            return self.data_to_shard(session.shard, amp.MsgPortal2Server, session.sessid, **kwargs)
         return self.data_to_server(amp.MsgPortal2Server, session.sessid, **kwargs)
 
     def send_AdminPortal2Server(self, session, operation="", **kwargs):
@@ -276,10 +453,93 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
             data (str or dict, optional): Data used in the administrative operation.
 
         """
+        if _SHARDED and session.sessid and self.factory.server_connections:
+            # the session may already be gone from the handler, so we can't look it up
+            return self.data_to_shard(
+                session.shard, amp.AdminPortal2Server, session.sessid, operation=operation, **kwargs
+            )
         return self.data_to_server(
             amp.AdminPortal2Server, session.sessid, operation=operation, **kwargs
         )
 
+    def send_SessionShards(self, sessions=None, removed=None, shard=None):
+        """
+        Tell the Server shards which shard handles which Session. Does nothing
+        if there is only one Server.
+
+        Args:
+            sessions (list, optional): The changed Sessions. If neither this nor
+                `removed` is given, all Sessions are sent, replacing what the
+                shards knew.
+            removed (list, optional): The sessids of disconnected Sessions.
+            shard (int, optional): Only tell this shard.
+
+        """
+        if not _SHARDED:
+            return
+        full = sessions is None and removed is None
+        if full:
+            sessions = self.factory.portal.sessions.values()
+        sessions = {session.sessid: (session.shard, session.uid) for session in sessions or ()}
+        shards = [shard] if shard is not None else list(self.factory.server_connections)
+        for shard in shards:
+            self.data_to_shard(
+                shard,
+                amp.AdminPortal2Server,
+                amp.DUMMYSESSION.sessid,
+                operation=amp.PSHARDS,
+                sessions=sessions,
+                removed=removed,
+                full=full,
+            )
+
+    def relay_shard_bus(self, op, data=None, shard=None):
+        """
+        Relay a message from one Server shard to others.
+
+        Args:
+            op (str): The operation of the message.
+            data (any, optional): The data of the message.
+            shard (int, optional): The shard to send to. If not given, the message
+                goes to the shards handling the Sessions listed in `data["sessids"]`
+                or, if there is no such list, to all shards but the sender.
+
+        """
+        if shard is not None:
+            targets = {shard: data}
+        elif isinstance(data, dict) and "sessids" in data:
+            sessids = defaultdict(list)
+            for sessid in data["sessids"]:
+                session = self.factory.portal.sessions.get(sessid)
+                if session:
+                    sessids[session.shard].append(sessid)
+            targets = {shard: dict(data, sessids=ids) for shard, ids in sessids.items()}
+        else:
+            targets = {
+                shard: data for shard in self.factory.server_connections if shard != self.shard
+            }
+        for shard, shard_data in targets.items():
+            self.data_to_shard(
+                shard,
+                amp.AdminPortal2Server,
+                amp.DUMMYSESSION.sessid,
+                operation=amp.SBUS,
+                op=op,
+                data=shard_data,
+            )
+
+    def relay_invalidation(self, changes):
+        """
+        Pass database changes made outside the game on to all Server shards, so
+        they can update their caches (see `evennia.server.invalidation`).
+
+        Args:
+            changes (list): The changes.
+
+        """
+        for shard in list(self.factory.server_connections):
+            self.relay_shard_bus("invalidate", changes, shard=shard)
+
     # receive amp data
 
     @amp.MsgStatus.responder
@@ -319,6 +579,13 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
         """
         # Since the launcher command uses amp.String() we need to convert from byte here.
         operation = str(operation, "utf-8")
+
+        if operation == amp.SINVALIDATE:
+            # database changes from a process outside the game, like `evennia shell`.
+            # These are not from the launcher, so we don't answer.
+            self.relay_invalidation(amp.loads(arguments))
+            return {}
+
         self.factory.launcher_connection = self
         _, server_connected, _, _, _, _ = self.get_status()
 
@@ -335,7 +602,7 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
         elif operation == amp.SRELOAD:  # reload server #14
             if server_connected:
                 # We let the launcher restart us once they get the signal
-                self.factory.server_connection.wait_for_disconnect(self.send_Status2Launcher)
+                self.wait_for_all_disconnect(self.send_Status2Launcher)
                 self.stop_server(mode="reload")
             else:
                 self.wait_for_server_connect(self.send_Status2Launcher)
@@ -343,7 +610,7 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
 
         elif operation == amp.SRESET:  # reload server #19
             if server_connected:
-                self.factory.server_connection.wait_for_disconnect(self.send_Status2Launcher)
+                self.wait_for_all_disconnect(self.send_Status2Launcher)
                 self.stop_server(mode="reset")
             else:
                 self.wait_for_server_connect(self.send_Status2Launcher)
@@ -351,12 +618,13 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
 
         elif operation == amp.SSHUTD:  # server-only shutdown #17
             if server_connected:
-                self.factory.server_connection.wait_for_disconnect(self.send_Status2Launcher)
+                self.wait_for_all_disconnect(self.send_Status2Launcher)
                 self.stop_server(mode="shutdown")
 
         elif operation == amp.PSHUTD:  # portal + server shutdown  #16
             if server_connected:
-                self.factory.server_connection.wait_for_disconnect(self.factory.portal.shutdown)
+                self.factory.servers_stopping = True
+                self.wait_for_all_disconnect(self.factory.portal.shutdown)
             else:
                 self.factory.portal.shutdown()
 
@@ -374,14 +642,28 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
         This method is executed on the Portal.
 
         Args:
-            packed_data (str): Pickled data (sessid, kwargs) coming over the wire.
+            packed_data (str): Pickled data (sessid, kwargs) coming over the wire. The
+                sessid may also be a list of sessids that should all get the same data.
 
         """
         try:
             sessid, kwargs = self.data_in(packed_data)
-            session = self.factory.portal.sessions.get(sessid, None)
-            if session:
-                self.factory.portal.sessions.data_out(session, **kwargs)
+            if isinstance(sessid, list):
+                for sessid in sessid:
+                    session = self.factory.portal.sessions.get(sessid, None)
+                    if session:
+                        # protocols may modify the kwargs, so each session gets a copy
+                        self.factory.portal.sessions.data_out(
+                            session,
+                            **{
+                                cmdname: (cmdargs, dict(cmdkwargs))
+                                for cmdname, (cmdargs, cmdkwargs) in kwargs.items()
+                            },
+                        )
+            else:
+                session = self.factory.portal.sessions.get(sessid, None)
+                if session:
+                    self.factory.portal.sessions.data_out(session, **kwargs)
         except Exception:
             logger.log_trace("packed_data len {}".format(len(packed_data)))
         return {}
@@ -398,8 +680,6 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
             packed_data (str): Data received, a pickled tuple (sessid, kwargs).
 
         """
-        self.factory.server_connection = self
-
         sessid, kwargs = self.data_in(packed_data)
 
         # logger.log_msg("Evennia Server->Portal admin data %s:%s received" % (sessid, kwargs))
@@ -407,56 +687,69 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
         operation = kwargs.pop("operation")
         portal_sessionhandler = self.factory.portal.sessions
 
+        if operation == amp.PSYNC:
+            # the first thing a Server sends; it tells us its shard
+            self.shard = kwargs.get("server_shard", 0)
+        self.factory.server_connections[self.shard] = self
+        if self.shard == 0:
+            self.factory.server_connection = self
+
         if operation == amp.SLOGIN:  # server_session_login
             # a session has authenticated; sync it.
             session = portal_sessionhandler.get(sessid)
             if session:
                 portal_sessionhandler.server_logged_in(session, kwargs.get("sessiondata"))
+                self.send_SessionShards([session])
 
         elif operation == amp.SDISCONN:  # server_session_disconnect
             # the server is ordering to disconnect the session
             session = portal_sessionhandler.get(sessid)
             if session:
                 portal_sessionhandler.server_disconnect(session, reason=kwargs.get("reason"))
+                self.send_SessionShards(removed=[sessid])
 
         elif operation == amp.SDISCONNALL:  # server_session_disconnect_all
             # server orders all sessions to disconnect
             portal_sessionhandler.server_disconnect_all(reason=kwargs.get("reason"))
 
         elif operation == amp.SRELOAD:  # server reload
-            self.factory.server_connection.wait_for_disconnect(
-                self.start_server, self.factory.portal.server_twistd_cmd
-            )
+            # all shards must have stopped before any can be started again
+            self.wait_for_all_disconnect(self.start_server, self.factory.portal.server_twistd_cmd)
             self.stop_server(mode="reload")
 
         elif operation == amp.SRESET:  # server reset
-            self.factory.server_connection.wait_for_disconnect(
-                self.start_server, self.factory.portal.server_twistd_cmd
-            )
+            self.wait_for_all_disconnect(self.start_server, self.factory.portal.server_twistd_cmd)
             self.stop_server(mode="reset")
 
         elif operation == amp.SSHUTD:  # server-only shutdown
             self.stop_server(mode="shutdown")
 
         elif operation == amp.PSHUTD:  # full server+server shutdown
-            self.factory.server_connection.wait_for_disconnect(self.factory.portal.shutdown)
+            self.wait_for_all_disconnect(self.factory.portal.shutdown)
             self.stop_server(mode="shutdown")
 
         elif operation == amp.PSYNC:  # portal sync
             # Server has (re-)connected and wants the session data from portal
-            self.factory.portal.server_info_dict = kwargs.get("info_dict", {})
-            self.factory.portal.server_process_id = kwargs.get("spid", None)
+            if self.shard == 0:
+                self.factory.portal.server_info_dict = kwargs.get("info_dict", {})
+                self.factory.portal.server_process_id = kwargs.get("spid", None)
             # this defaults to 'shutdown' or whatever value set in server_stop
             server_restart_mode = self.factory.portal.server_restart_mode
 
-            sessdata = self.factory.portal.sessions.get_all_sync_data()
-            self.send_AdminPortal2Server(
-                amp.DUMMYSESSION,
-                amp.PSYNC,
+            # each shard only gets the sessions it handles
+            sessdata = self.factory.portal.sessions.get_all_sync_data(
+                shard=self.shard if _SHARDED else None
+            )
+            self.data_to_shard(
+                self.shard,
+                amp.AdminPortal2Server,
+                amp.DUMMYSESSION.sessid,
+                operation=amp.PSYNC,
                 server_restart_mode=server_restart_mode,
                 sessiondata=sessdata,
                 portal_start_time=self.factory.portal.start_time,
             )
+            self.send_SessionShards(shard=self.shard)
             self.factory.portal.sessions.at_server_connection()
 
             if self.factory.server_connection:
@@ -473,7 +766,9 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
             # server wants to save session data to the portal,
             # maybe because it's about to shut down.
             portal_sessionhandler.server_session_sync(
-                kwargs.get("sessiondata"), kwargs.get("clean", True)
+                kwargs.get("sessiondata"),
+                kwargs.get("clean", True),
+                shard=self.shard if _SHARDED else None,
             )
 
             # set a flag in case we are about to shut down soon
@@ -482,6 +777,45 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
         elif operation == amp.SCONN:  # server_force_connection (for irc/etc)
             portal_sessionhandler.server_connect(**kwargs)
 
+        elif operation == amp.SBUS:  # message between server shards
+            self.relay_shard_bus(kwargs.get("op"), kwargs.get("data"), kwargs.get("shard"))
+
+        elif operation == amp.SHANDOFF:  # server shard handing a session to another shard
+            session = portal_sessionhandler.get(sessid)
+            if session:
+                sessiondata = kwargs.get("sessiondata")
+                if sessiondata.get("shard") not in self.factory.server_connections:
+                    # the new shard is not running; hand the session back
+                    logger.log_err(
+                        f"AMP: Server shard {sessiondata.get('shard')} is not connected; "
+                        f"session {sessid} stays on shard {self.shard}."
+                    )
+                    sessiondata["shard"] = self.shard
+                session.load_sync_data(sessiondata)
+                # input is held back until the old shard has passed back what we sent
+                # it before now (see end_handoff)
+                self.factory.handoffs.setdefault(sessid, [set(), []])[0].add(self.shard)
+                self.send_AdminPortal2Server(
+                    session,
+                    operation=amp.SHANDOFF,
+                    sessiondata=sessiondata,
+                    handoffdata=kwargs.get("handoffdata"),
+                )
+                self.send_SessionShards([session])
+            # AMP keeps the order, so the old shard answers this after all our input
+            self.data_to_shard(self.shard, amp.AdminPortal2Server, sessid, operation=amp.PHANDOFF)
+
+        elif operation == amp.SRELAY:  # input a shard got for a session it had handed off
+            session = portal_sessionhandler.get(sessid)
+            if session:
+                # older than the input held back, so it's not held back itself
+                self.data_to_shard(
+                    session.shard, amp.MsgPortal2Server, sessid, **kwargs.get("data", {})
+                )
+
+        elif operation == amp.PHANDOFF:  # old shard has passed back all input
+            self.end_handoff(sessid, self.shard)
+
         else:
             raise Exception("operation %(op)s not recognized." % {"op": operation})
         return {}
@@ -223,6 +223,7 @@ class PortalSessionHandler(SessionHandler):
 
         # Tell the Server to disconnect its version of the Session as well.
         self.portal.amp_protocol.send_AdminPortal2Server(session, operation=PDISCONN)
+        self.portal.amp_protocol.send_SessionShards(removed=[session.sessid])
 
     def disconnect_all(self):
         """
@@ -318,7 +319,7 @@ class PortalSessionHandler(SessionHandler):
         session.load_sync_data(data)
         session.at_login()
 
-    def server_session_sync(self, serversessions, clean=True):
+    def server_session_sync(self, serversessions, clean=True, shard=None):
         """
         Server wants to save data to the portal, maybe because it's
         about to shut down. We don't overwrite any sessions here, just
@@ -331,6 +332,8 @@ class PortalSessionHandler(SessionHandler):
                 the properties to sync on all sessions.
             clean (bool): If True, remove any Portal sessions that are
                 not included in serversessions.
+            shard (int, optional): The Server shard syncing. If given, only
+                the sessions handled by this shard are cleaned.
         """
         to_save = [sessid for sessid in serversessions if sessid in self]
         # save protocols
@@ -338,7 +341,12 @@ class PortalSessionHandler(SessionHandler):
             self[sessid].load_sync_data(serversessions[sessid])
         if clean:
             # disconnect out-of-sync missing protocols
-            to_delete = [sessid for sessid in self if sessid not in to_save]
+            to_delete = [
+                sessid
+                for sessid, session in self.items()
+                if sessid not in to_save
+                and (shard is None or getattr(session, "shard", 0) == shard)
+            ]
             for sessid in to_delete:
                 self.server_disconnect(sessid)
 
@@ -63,6 +63,7 @@ EVENNIA_TO_GMCP = {
     "get_value": "Char.Value.Get",
     "repeat": "Char.Repeat.Update",
     "monitor": "Char.Monitor.Update",
+    "state": "Char.State.Update",
 }
 
 
@@ -0,0 +1,143 @@
+"""
+Benchmark of Attribute value encodings
+
+Compares how fast Attribute values are encoded for (and decoded from) the
+database with the pickle encoding (how all values were stored before) and with
+the compact encoding of `evennia.utils.picklefield`, which is used for values
+made up of the basic Python types. The sample values are typical game data:
+numbers, short strings, lists of ids and small nested stat dicts. It also
+reports the average size of the stored values.
+
+Run from the command line (no game dir is needed):
+
+    python -m evennia.server.profiling.attrbench --values 10000
+
+"""
+
+import argparse
+import os
+import random
+import time
+
+_WORDS = (
+    "strength agility health mana stamina gold level exp name desc title guild "
+    "rank home weapon armor shield ring amulet boots helm cloak"
+).split()
+
+
+def make_values(nvalues, seed=0):
+    """
+    Make up Attribute values of the kinds commonly stored.
+
+    Args:
+        nvalues (int): The number of values.
+        seed (int, optional): Random seed.
+
+    Returns:
+        list: The values.
+
+    """
+    rand = random.Random(seed)
+    makers = (
+        lambda: rand.randint(0, 10000),
+        lambda: rand.random() * 100,
+        lambda: rand.random() < 0.5,
+        lambda: " ".join(rand.sample(_WORDS, 4)),
+        lambda: [rand.randint(1, 100000) for _ in range(rand.randint(1, 20))],
+        lambda: {word: rand.randint(1, 20) for word in rand.sample(_WORDS, 6)},
+        lambda: {
+            "stats": {word: rand.randint(1, 20) for word in rand.sample(_WORDS, 4)},
+            "pos": (rand.randint(0, 100), rand.randint(0, 100)),
+            "flags": set(rand.sample(_WORDS, 3)),
+        },
+    )
+    return [makers[inum % len(makers)]() for inum in range(nvalues)]
+
+
+def run_benchmark(nvalues, repeat=3, seed=0):
+    """
+    Time encoding and decoding values with the pickle and compact encodings.
+
+    Args:
+        nvalues (int): The number of values to encode and decode.
+        repeat (int, optional): How many times to measure; the best time is kept.
+        seed (int, optional): Random seed.
+
+    Returns:
+        dict: `{encoding: {"encode_ms", "decode_ms", "size"}, ...}` with the total
+            time to encode and decode all values and the mean size of a stored
+            value, for `"pickle"` and `"compact"`.
+
+    """
+    from evennia.utils.picklefield import (
+        compact_decode,
+        compact_encode,
+        dbsafe_decode,
+        dbsafe_encode,
+    )
+
+    values = make_values(nvalues, seed=seed)
+    results = {}
+    for name, encode, decode in (
+        ("pickle", dbsafe_encode, dbsafe_decode),
+        ("compact", compact_encode, compact_decode),
+    ):
+        encode_times, decode_times = [], []
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            encoded = [encode(value) for value in values]
+            encode_times.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            for data in encoded:
+                decode(data)
+            decode_times.append(time.perf_counter() - t0)
+        results[name] = {
+            "encode_ms": min(encode_times) * 1000,
+            "decode_ms": min(decode_times) * 1000,
+            "size": sum(len(data) for data in encoded) / len(encoded),
+        }
+    return results
+
+
+def format_results(results):
+    """
+    Format benchmark results as a table.
+
+    Args:
+        results (dict): As returned by `run_benchmark`.
+
+    Returns:
+        str: The table.
+
+    """
+    lines = [f"{'encoding':<10}{'encode (ms)':>14}{'decode (ms)':>14}{'mean size':>12}"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<10}{result['encode_ms']:>14.1f}{result['decode_ms']:>14.1f}"
+            f"{result['size']:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """
+    Run the benchmark from the command line.
+
+    """
+    parser = argparse.ArgumentParser(description="Compare Attribute value encodings.")
+    parser.add_argument("--values", type=int, default=10000, help="Number of values.")
+    parser.add_argument("--repeat", type=int, default=3, help="Times to measure.")
+    args = parser.parse_args()
+
+    # the picklefield needs the models loaded, but no game dir (or database) is
+    # needed for this
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+    import django
+
+    django.setup()
+    print(f"{args.values} values:")
+    print(format_results(run_benchmark(args.values, repeat=args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
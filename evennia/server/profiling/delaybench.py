@@ -0,0 +1,139 @@
+"""
+Benchmark of delay schedulers
+
+Compares scheduling many delayed calls directly with the reactor (what
+`utils.delay` does by default) against scheduling them with a
+`evennia.utils.timingwheel.TimingWheel` (used if `settings.DELAY_TIMING_WHEEL`
+is set). For each scheduler, it schedules `--tasks` calls with random delays up
+to `--max-delay` seconds, cancels a `--cancel` fraction of them and waits for
+the rest to run. It reports the CPU time spent scheduling, cancelling and in
+total (including running the reactor), as well as how late the calls ran.
+
+Run from the command line (no game dir is needed):
+
+    python -m evennia.server.profiling.delaybench --tasks 100000 --max-delay 5
+
+"""
+
+import argparse
+import os
+import random
+import time
+
+from twisted.internet.defer import Deferred
+
+
+def run_benchmark(scheduler, clock, ntasks, max_delay, cancel_fraction=0.5, seed=0):
+    """
+    Schedule calls with a scheduler and measure it.
+
+    Args:
+        scheduler (IReactorTime): What to schedule with (anything with a `callLater`).
+        clock (IReactorTime): The clock the calls are timed against.
+        ntasks (int): How many calls to schedule.
+        max_delay (float): The max delay of a call, in seconds.
+        cancel_fraction (float, optional): The fraction of calls to cancel.
+        seed (int, optional): Random seed for the delays.
+
+    Returns:
+        Deferred: Fires with a dict of results when all calls not cancelled have
+            run. Times are CPU seconds, lateness is in (clock) seconds.
+
+    """
+    rand = random.Random(seed)
+    result = {"tasks": ntasks, "fired": 0, "cancelled": 0, "max_late": 0.0, "total_late": 0.0}
+    done = Deferred()
+
+    def _fire(due):
+        late = clock.seconds() - due
+        result["max_late"] = max(result["max_late"], late)
+        result["total_late"] += late
+        result["fired"] += 1
+        if result["fired"] + result["cancelled"] == ntasks:
+            result["total_cpu"] = time.process_time() - cpu_start
+            result["mean_late"] = result["total_late"] / max(1, result["fired"])
+            done.callback(result)
+
+    cpu_start = time.process_time()
+    now = clock.seconds()
+    calls = []
+    for _ in range(ntasks):
+        delay = rand.uniform(0, max_delay)
+        calls.append(scheduler.callLater(delay, _fire, now + delay))
+    result["add_cpu"] = time.process_time() - cpu_start
+
+    cpu = time.process_time()
+    for call in rand.sample(calls, int(ntasks * cancel_fraction)):
+        call.cancel()
+        result["cancelled"] += 1
+    result["cancel_cpu"] = time.process_time() - cpu
+    if result["cancelled"] == ntasks:
+        result.update(total_cpu=time.process_time() - cpu_start, mean_late=0.0)
+        done.callback(result)
+    return done
+
+
+def format_results(results):
+    """
+    Format benchmark results as a table.
+
+    Args:
+        results (dict): `{scheduler_name: result, ...}` as returned by `run_benchmark`.
+
+    Returns:
+        str: The table.
+
+    """
+    lines = [
+        f"{'scheduler':<12}{'add (s)':>10}{'cancel (s)':>12}{'total (s)':>12}"
+        f"{'mean late (ms)':>16}{'max late (ms)':>16}"
+    ]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<12}{result['add_cpu']:>10.3f}{result['cancel_cpu']:>12.3f}"
+            f"{result['total_cpu']:>12.3f}{result['mean_late'] * 1000:>16.1f}"
+            f"{result['max_late'] * 1000:>16.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """
+    Run the benchmark from the command line.
+
+    """
+    parser = argparse.ArgumentParser(description="Compare the reactor and a timing wheel.")
+    parser.add_argument("--tasks", type=int, default=100000, help="Number of delays.")
+    parser.add_argument("--max-delay", type=float, default=5.0, help="Max delay in seconds.")
+    parser.add_argument("--cancel", type=float, default=0.5, help="Fraction of delays to cancel.")
+    parser.add_argument("--resolution", type=float, default=0.1, help="Timing wheel tick (s).")
+    args = parser.parse_args()
+
+    # the evennia utils need settings, but no game dir is needed for this
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+    from twisted.internet import reactor
+
+    from evennia.utils.timingwheel import TimingWheel
+
+    results = {}
+
+    def _run(name, scheduler, next_run):
+        deferred = run_benchmark(scheduler, reactor, args.tasks, args.max_delay, args.cancel)
+        deferred.addCallback(lambda result: results.__setitem__(name, result))
+        deferred.addCallback(lambda _: next_run())
+
+    def _done():
+        print(f"{args.tasks} delays of up to {args.max_delay}s, {args.cancel:.0%} cancelled:")
+        print(format_results(results))
+        reactor.stop()
+
+    def _start():
+        wheel = TimingWheel(reactor, resolution=args.resolution)
+        _run("reactor", reactor, lambda: _run("wheel", wheel, _done))
+
+    reactor.callWhenRunning(_start)
+    reactor.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -29,11 +29,30 @@ change which actions by adding a path to
 in your settings. See utils.dummyrunner_actions.py
 for instructions on how to define this module.
 
+The settings module can also define named SCENARIOS (like login storms,
+room crowding or channel spam) that override its defaults. Pick one with
+`--scenario <name>`.
+
+Every command sent is tagged with the action that produced it and its
+round-trip time (until the first response from the server) is measured.
+Use `--output <prefix>` to save latency histograms and throughput over time
+as `<prefix>.json` and `<prefix>_latency.csv`/`<prefix>_throughput.csv`,
+`--duration <secs>` to stop the run after a fixed time (so runs on
+different commits can be compared) and `--processes <P>` to spread the
+clients over several processes when running thousands of them. Compare two
+saved runs with
+
+    python -m evennia.server.profiling.dummyrunner_stats old.json new.json
+
 """
 
 
+import argparse
+import os
 import random
+import subprocess
 import sys
+import tempfile
 import time
 from argparse import ArgumentParser
 
@@ -51,6 +70,10 @@ from django.conf import settings  # noqa
 
 from evennia.commands.cmdset import CmdSet  # noqa
 from evennia.commands.command import Command  # noqa
+from evennia.server.profiling.dummyrunner_stats import (  # noqa
+    StatsCollector,
+    merge_reports,
+)
 from evennia.utils import mod_import, time_format  # noqa
 from evennia.utils.ansi import strip_ansi  # noqa
 
@@ -83,6 +106,14 @@ CHANCE_OF_ACTION = DUMMYRUNNER_SETTINGS.CHANCE_OF_ACTION
 CHANCE_OF_LOGIN = DUMMYRUNNER_SETTINGS.CHANCE_OF_LOGIN
 # Port to use, if not specified on command line
 TELNET_PORT = DUMMYRUNNER_SETTINGS.TELNET_PORT or settings.TELNET_PORTS[0]
+# the (login, logout, (chance, func), ...) actions tuple
+ACTIONS = getattr(DUMMYRUNNER_SETTINGS, "ACTIONS", ())
+# the SCENARIO used, if any
+SCENARIO = None
+# prefix to make client names unique between worker processes
+WORKER_PREFIX = ""
+# per-command latency and throughput measurements
+STATS = StatsCollector()
 #
 NCONNECTED = 0  # client has received a connection
 NLOGIN_SCREEN = 0  # client has seen the login screen (server responded)
@@ -113,6 +144,9 @@ INFO_STARTING = """
     -> avg rate (per client, after login): {avg_rate} cmds/s
     -> total avg rate (after login): {avg_rate_total} cmds/s
 
+    SCENARIO = {scenario}
+    PROCESSES = {nprocesses}
+
     Use Ctrl-C (or Cmd-C) to stop/disconnect all clients.
 
     """
@@ -146,6 +180,12 @@ ERROR_FEW_ACTIONS = """
     contain at least login- and logout functions.
     """
 
+ERROR_NO_SCENARIO = """
+    Dummyrunner settings error: No scenario '{scenario}' found in the
+    SCENARIOS of the dummyrunner settings module. Available scenarios:
+    {scenarios}
+    """
+
 
 HELPTEXT = """
 DO NOT RUN THIS ON A PRODUCTION SERVER! USE A CLEAN/TESTING DATABASE!
@@ -255,7 +295,7 @@ def idcounter():
     """
     global ICOUNT
     ICOUNT += 1
-    return str("{:03d}".format(ICOUNT))
+    return WORKER_PREFIX + str("{:03d}".format(ICOUNT))
 
 
 GCOUNT = 0
@@ -271,7 +311,7 @@ def gidcounter():
     """
     global GCOUNT
     GCOUNT += 1
-    return "%s_%s" % (time.strftime(DATESTRING), GCOUNT)
+    return "%s_%s%s" % (time.strftime(DATESTRING), WORKER_PREFIX, GCOUNT)
 
 
 def makeiter(obj):
@@ -287,6 +327,58 @@ def makeiter(obj):
     return obj if hasattr(obj, "__iter__") else [obj]
 
 
+def action_tag(func):
+    """
+    Get the tag used to group latency measurements of an action.
+
+    Args:
+        func (callable): An action function, like `c_looks`.
+
+    Returns:
+        str: The tag, the function name without its `c_` prefix.
+
+    """
+    name = getattr(func, "__name__", str(func))
+    return name[2:] if name.startswith("c_") else name
+
+
+def load_settings(settings_module, scenario=None):
+    """
+    Set the runner's global settings from a dummyrunner settings module,
+    optionally overridden by one of the module's SCENARIOS.
+
+    Args:
+        settings_module (module): The dummyrunner settings module.
+        scenario (str, optional): Name of a scenario in the module's `SCENARIOS`
+            dict. Each scenario is a dict of settings to override, such as
+            `{"ACTIONS": (...), "CHANCE_OF_LOGIN": 1.0}`.
+
+    Raises:
+        KeyError: If the scenario is not defined.
+
+    """
+    global DUMMYRUNNER_SETTINGS, TIMESTEP, CHANCE_OF_ACTION, CHANCE_OF_LOGIN
+    global TELNET_PORT, ACTIONS, SCENARIO
+
+    options = {
+        "TIMESTEP": settings_module.TIMESTEP,
+        "CHANCE_OF_ACTION": settings_module.CHANCE_OF_ACTION,
+        "CHANCE_OF_LOGIN": settings_module.CHANCE_OF_LOGIN,
+        "TELNET_PORT": settings_module.TELNET_PORT,
+        "ACTIONS": getattr(settings_module, "ACTIONS", ()),
+    }
+    if scenario:
+        options.update(getattr(settings_module, "SCENARIOS", {})[scenario])
+
+    DUMMYRUNNER_SETTINGS = settings_module
+    SCENARIO = scenario
+    TIMESTEP = options["TIMESTEP"]
+    CHANCE_OF_ACTION = options["CHANCE_OF_ACTION"]
+    CHANCE_OF_LOGIN = options["CHANCE_OF_LOGIN"]
+    TELNET_PORT = options["TELNET_PORT"] or settings.TELNET_PORTS[0]
+    ACTIONS = options["ACTIONS"]
+
+
 # ------------------------------------------------------------
 # Client classes
 # ------------------------------------------------------------
@@ -334,6 +426,8 @@ class DummyClient(telnet.StatefulTelnetProtocol):
         self._ready = False
         self._report = ""
         self._cmdlist = []  # already stepping in a cmd definition
+        self._cmdtag = None  # action tag of the commands in _cmdlist
+        self._pending = None  # (tag, sendtime) of command awaiting response
         self._login = self.factory.actions[0]
         self._logout = self.factory.actions[1]
         self._actions = self.factory.actions[2:]
@@ -395,6 +489,12 @@ class DummyClient(telnet.StatefulTelnetProtocol):
         if not data.startswith(b"\xff"):
             # regular text, not a telnet command
 
+            if self._pending:
+                # first response after sending a command - its round-trip time
+                tag, sendtime = self._pending
+                self._pending = None
+                STATS.record(tag, time.time() - sendtime)
+
             if NCLIENTS == 1:
                 print("dummy-client sees:", str(data, "utf-8"))
 
@@ -509,6 +609,7 @@ class DummyClient(telnet.StatefulTelnetProtocol):
                     # lower rate of logins, but not below 1 / s
                     # get the login commands
                     self._cmdlist = list(makeiter(self._login(self)))
+                    self._cmdtag = "login"
                     NLOGGING_IN += 1  # this is for book-keeping
                     NLOGIN_SCREEN -= 1
                     self.report("-> create/login", self.key)
@@ -521,6 +622,7 @@ class DummyClient(telnet.StatefulTelnetProtocol):
                 crand = random.random()
                 cfunc = [func for (cprob, func) in self._actions if cprob >= crand][0]
                 self._cmdlist = list(makeiter(cfunc(self)))
+                self._cmdtag = action_tag(cfunc)
 
         # at this point we always have a list of commands
         if rand < CHANCE_OF_ACTION:
@@ -532,8 +634,12 @@ class DummyClient(telnet.StatefulTelnetProtocol):
                 # the send as possible
                 cmd = cmd.format(timestamp=time.time())
 
+            if self._pending:
+                # the previous command never got a response
+                STATS.record_noreply(self._pending[0])
             self.sendLine(bytes(cmd, "utf-8"))
             self.action_started = time.time()
+            self._pending = (self._cmdtag, self.action_started)
             self.istep += 1
 
             if NCLIENTS == 1:
@@ -557,17 +663,32 @@ class DummyFactory(protocol.ReconnectingClientFactory):
 # ------------------------------------------------------------
 
 
-def start_all_dummy_clients(nclients):
+def _save_stats(output):
+    """
+    Save the collected statistics to disk.
+
+    Args:
+        output (str): Path prefix for the JSON and CSV files.
+
+    """
+    STATS.write_json(f"{output}.json")
+    STATS.write_csv(output)
+
+
+def start_all_dummy_clients(nclients, duration=None, output=None):
     """
     Initialize all clients, connect them and start to step them
 
     Args:
         nclients (int): Number of dummy clients to connect.
+        duration (float, optional): If given, stop the run after this many seconds.
+        output (str, optional): If given, save the statistics of the run as
+            `<output>.json` and `<output>_*.csv` when stopping.
 
     """
     global NCLIENTS
     NCLIENTS = int(nclients)
-    actions = DUMMYRUNNER_SETTINGS.ACTIONS
+    actions = ACTIONS
 
     if len(actions) < 2:
         print(ERROR_FEW_ACTIONS)
@@ -586,6 +707,21 @@ def start_all_dummy_clients(nclients):
     # rebuild a new, optimized action structure
     actions = (flogin, flogout) + tuple(zip(cprobs, cfuncs))
 
+    STATS.start_time = time.time()
+    STATS.meta.update(
+        {
+            "nclients": NCLIENTS,
+            "scenario": SCENARIO,
+            "timestep": TIMESTEP,
+            "chance_of_action": CHANCE_OF_ACTION,
+            "chance_of_login": CHANCE_OF_LOGIN,
+        }
+    )
+    if output:
+        reactor.addSystemEventTrigger("after", "shutdown", _save_stats, output)
+    if duration:
+        reactor.callLater(duration, reactor.stop)
+
     # setting up all clients (they are automatically started)
     factory = DummyFactory(actions)
     for i in range(NCLIENTS):
@@ -594,6 +730,75 @@ def start_all_dummy_clients(nclients):
     reactor.run()
 
 
+def start_dummy_client_processes(nclients, nprocesses, worker_args, output=None):
+    """
+    Spread the clients over several dummyrunner worker processes, each
+    with its own reactor, and merge their statistics when they finish.
+
+    Args:
+        nclients (int): Total number of dummy clients to connect.
+        nprocesses (int): Number of worker processes to start.
+        worker_args (list): Extra command-line arguments to pass on to every
+            worker (like the scenario and duration).
+        output (str, optional): If given, save the merged statistics as
+            `<output>.json` and `<output>_*.csv`.
+
+    Returns:
+        StatsCollector or None: The merged stats, if any worker reported.
+
+    """
+    tmpdir = tempfile.mkdtemp(prefix="dummyrunner_")
+    workers = []
+    for iproc in range(nprocesses):
+        # spread the remainder over the first workers
+        nworker = nclients // nprocesses + (1 if iproc < nclients % nprocesses else 0)
+        if not nworker:
+            continue
+        worker_output = os.path.join(tmpdir, f"worker{iproc}")
+        cmd = [sys.executable, __file__, "-N", str(nworker), "--worker", str(iproc)]
+        cmd += ["--output", worker_output] + worker_args
+        workers.append((subprocess.Popen(cmd), worker_output))
+
+    try:
+        for proc, _ in workers:
+            proc.wait()
+    except KeyboardInterrupt:
+        # the workers got the same signal; wait for them to log out and save
+        for proc, _ in workers:
+            proc.wait()
+
+    reports = [
+        f"{worker_output}.json"
+        for _, worker_output in workers
+        if os.path.exists(f"{worker_output}.json")
+    ]
+    if not reports:
+        return None
+    merged = merge_reports(reports)
+    if output:
+        merged.write_json(f"{output}.json")
+        merged.write_csv(output)
+    return merged
+
+
+def _raise_fd_limit():
+    """
+    Raise the open-file limit as far as allowed, each client needs a socket.
+
+    """
+    try:
+        import resource
+    except ImportError:
+        # not available on Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
 # ------------------------------------------------------------
 # Command line interface
 # ------------------------------------------------------------
@@ -612,10 +817,51 @@ if __name__ == "__main__":
     parser.add_argument(
         "-N", nargs=1, default=1, dest="nclients", help="Number of clients to start"
     )
+    parser.add_argument(
+        "--config", dest="config", help="Path to a custom dummyrunner settings module"
+    )
+    parser.add_argument(
+        "--scenario", dest="scenario", help="Name of a scenario from the settings' SCENARIOS"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        dest="nprocesses",
+        help="Number of processes to spread the clients over",
+    )
+    parser.add_argument(
+        "--duration", type=float, dest="duration", help="Stop the run after this many seconds"
+    )
+    parser.add_argument(
+        "--output", dest="output", help="Save statistics as <output>.json and <output>_*.csv"
+    )
+    # internal, set on processes started with --processes
+    parser.add_argument("--worker", type=int, dest="worker", help=argparse.SUPPRESS)
 
     args = parser.parse_args()
     nclients = int(args.nclients[0])
 
+    if args.config:
+        DUMMYRUNNER_SETTINGS = mod_import(args.config) or DUMMYRUNNER_SETTINGS
+    try:
+        load_settings(DUMMYRUNNER_SETTINGS, scenario=args.scenario)
+    except KeyError:
+        print(
+            ERROR_NO_SCENARIO.format(
+                scenario=args.scenario,
+                scenarios=", ".join(getattr(DUMMYRUNNER_SETTINGS, "SCENARIOS", {})),
+            )
+        )
+        sys.exit()
+
+    if args.worker is not None:
+        # a worker process started by a parent dummyrunner
+        WORKER_PREFIX = f"w{args.worker}_"
+        _raise_fd_limit()
+        start_all_dummy_clients(nclients=nclients, duration=args.duration, output=args.output)
+        sys.exit()
+
     print(
         INFO_STARTING.format(
             nclients=nclients,
@@ -627,13 +873,30 @@ if __name__ == "__main__":
             chance_of_action=CHANCE_OF_ACTION * 100,
             avg_rate=(1 / TIMESTEP) * CHANCE_OF_ACTION,
             avg_rate_total=(1 / TIMESTEP) * CHANCE_OF_ACTION * nclients,
+            scenario=SCENARIO,
+            nprocesses=args.nprocesses,
         )
     )
 
     # run the dummyrunner
     TIME_START = t0 = time.time()
-    start_all_dummy_clients(nclients=nclients)
+    if args.nprocesses > 1:
+        worker_args = []
+        for option in ("config", "scenario", "duration"):
+            if getattr(args, option) is not None:
+                worker_args.extend([f"--{option}", str(getattr(args, option))])
+        stats = start_dummy_client_processes(
+            nclients, args.nprocesses, worker_args, output=args.output
+        )
+    else:
+        _raise_fd_limit()
+        start_all_dummy_clients(nclients=nclients, duration=args.duration, output=args.output)
+        stats = STATS
     ttot = time.time() - t0
 
     # output runtime
     print("... dummy client runner stopped after %s." % time_format(ttot, style=3))
+    if stats and stats.histograms:
+        print(stats.summary_table())
+    if args.output:
+        print(f"... statistics saved to {args.output}.json and {args.output}_*.csv.")
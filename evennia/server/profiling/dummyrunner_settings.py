@@ -11,6 +11,7 @@ The settings are global variables:
 - CHANCE_OF_LOGIN - chance 0-1 of login happening. 0.01 is a good number.
 - TELNET_PORT - port to use, defaults to settings.TELNET_PORT
 - ACTIONS - see below
+- SCENARIOS - see below
 
 ACTIONS is a tuple
 
@@ -54,9 +55,24 @@ TIMESTEP with a chance given by CHANCE_OF_ACTION by in the order given
 (no randomness) and allows for setting up a more complex chain of
 commands (such as creating an account and logging in).
 
+The dummyrunner measures the round-trip time of every command and groups
+the measurements by the name of the action function that produced them
+(without its `c_` prefix), so `c_looks` is reported as `looks`.
+
+SCENARIOS is a dict of named load patterns, selected with `--scenario <name>`
+on the dummyrunner command line. Each scenario is a dict that overrides any
+of the settings above, for example
+
+```python
+SCENARIOS = {
+    "login_storm": {"CHANCE_OF_LOGIN": 1.0, "ACTIONS": (...)},
+}
+```
+
 ----
 
 """
+
 import random
 import string
 
@@ -137,6 +153,18 @@ def c_login_nodig(client):
     return cmds
 
 
+def c_login_crowd(client):
+    "logins, stays in the start location together with everyone else"
+    cname = DUMMY_NAME.format(gid=client.gid)
+    cpwd = DUMMY_PWD.format(gid=client.gid)
+    add_cmdset = (
+        "py from evennia.server.profiling.dummyrunner import DummyRunnerCmdSet;"
+        "self.cmdset.add(DummyRunnerCmdSet, persistent=False)"
+    )
+    cmds = (f"create {cname} {cpwd}", "yes", f"connect {cname} {cpwd}", add_cmdset)
+    return cmds
+
+
 def c_logout(client):
     "logouts of the game"
     return ("quit",)
@@ -220,6 +248,16 @@ def c_socialize(client):
     return cmds
 
 
+def c_says(client):
+    "talks in the current location"
+    return ("say Hello from %s!" % client.key,)
+
+
+def c_channel_spam(client):
+    "sends a message to the public channel"
+    return ("pub Message %s from %s." % (client.counter(), client.key),)
+
+
 def c_moves(client):
     "moves to a previously created room, using the stored exits"
     cmds = client.exits  # try all exits - finally one will work
@@ -328,3 +366,44 @@ else:
     import sys
 
     sys.exit()
+
+
+# Scenarios (optional)
+
+# Named load patterns, picked with `--scenario <name>`. They override
+# the settings above.
+#
+# login_storm - all clients log in at once, then idle
+# room_crowding - all clients stay in the start location, looking and talking
+# channel_spam - all clients keep chatting on the public channel
+# building - clients dig, create and examine a lot
+
+SCENARIOS = {
+    "login_storm": {
+        "CHANCE_OF_LOGIN": 1.0,
+        "ACTIONS": (c_login, c_logout, (0.9, c_idles), (0.1, c_measure_lag)),
+    },
+    "room_crowding": {
+        "ACTIONS": (
+            c_login_crowd,
+            c_logout,
+            (0.5, c_looks),
+            (0.4, c_says),
+            (0.1, c_measure_lag),
+        ),
+    },
+    "channel_spam": {
+        "ACTIONS": (c_login, c_logout, (0.9, c_channel_spam), (0.1, c_measure_lag)),
+    },
+    "building": {
+        "ACTIONS": (
+            c_login,
+            c_logout,
+            (0.3, c_digs),
+            (0.3, c_creates_obj),
+            (0.2, c_examines),
+            (0.1, c_moves),
+            (0.1, c_measure_lag),
+        ),
+    },
+}
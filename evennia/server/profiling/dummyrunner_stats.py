@@ -0,0 +1,427 @@
+"""
+Dummyrunner statistics
+
+This module holds the measurement side of the dummyrunner. It is kept free of
+Django and Twisted so the collected data can be merged and compared outside of
+a running game (for example between two git commits).
+
+Each command sent by a dummy client is tagged with the name of the action that
+produced it. The time from sending the command until the first response
+arrives is stored in a `LatencyHistogram` for that tag. Completed commands are
+also counted in fixed time bins to give throughput over time.
+
+The histogram uses the same log-linear bucketing as HdrHistogram: values are
+stored as integer microseconds and each power-of-two range is split into a
+fixed number of linear sub-buckets. This keeps the relative error bounded
+(about 1% with the default precision) no matter the magnitude of the value,
+while only allocating buckets that are actually used.
+
+Results from one run are written with `write_json` and `write_csv`. Reports
+from several worker processes are combined with `merge_reports`. To compare
+two stored reports, run this module directly:
+
+    python -m evennia.server.profiling.dummyrunner_stats old.json new.json
+
+"""
+
+import csv
+import json
+import sys
+import time
+from collections import defaultdict
+
+REPORT_VERSION = 1
+
+# sub-bucket resolution of the histogram; 2**7 = 128 sub-buckets per
+# power-of-two range gives < 1% relative error.
+HISTOGRAM_SUB_BUCKET_BITS = 7
+
+# percentiles reported in summaries
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def _format_table(header, rows):
+    """
+    Format rows of strings as left-aligned text columns.
+
+    """
+    widths = [
+        max(len(row[icol]) for row in [header] + rows if icol < len(row))
+        for icol in range(len(header))
+    ]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in [header] + rows
+    )
+
+
+class LatencyHistogram:
+    """
+    A sparse, log-linear latency histogram.
+
+    Values are given in seconds and stored as integer microseconds.
+
+    """
+
+    def __init__(self, sub_bucket_bits=HISTOGRAM_SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.buckets = defaultdict(int)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+        """
+        Get the lowest value equivalent to `value` in this histogram.
+
+        Args:
+            value (int): Value in microseconds.
+
+        Returns:
+            int: The bucket key (lowest equivalent value).
+
+        """
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return (value >> shift) << shift
+
+    def record(self, seconds, count=1):
+        """
+        Record a measurement.
+
+        Args:
+            seconds (float): The measured time, in seconds.
+            count (int, optional): How many times to record it.
+
+        """
+        value = max(0, int(round(seconds * 1e6)))
+        self.buckets[self._bucket(value)] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """
+        Add all measurements from another histogram to this one.
+
+        Args:
+            other (LatencyHistogram): The histogram to merge in. Must use the
+                same precision.
+
+        """
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percent):
+        """
+        Get the value at a given percentile.
+
+        Args:
+            percent (float): Percentile, 0-100.
+
+        Returns:
+            float: The value in seconds, or 0 if nothing was recorded.
+
+        """
+        if not self.count:
+            return 0.0
+        target = max(1, self.count * percent / 100.0)
+        running = 0
+        for bucket in sorted(self.buckets):
+            running += self.buckets[bucket]
+            if running >= target:
+                # report the highest value equivalent to the bucket, like HdrHistogram
+                shift = max(0, bucket.bit_length() - self.sub_bucket_bits)
+                return min(bucket + (1 << shift) - 1, self.max) / 1e6
+        return self.max / 1e6
+
+    @property
+    def mean(self):
+        return (self.total / self.count / 1e6) if self.count else 0.0
+
+    def summary(self):
+        """
+        Summarize the histogram.
+
+        Returns:
+            dict: Count, min, mean, max and percentiles (in seconds).
+
+        """
+        summary = {
+            "count": self.count,
+            "min": (self.min or 0) / 1e6,
+            "mean": self.mean,
+            "max": (self.max or 0) / 1e6,
+        }
+        for percent in PERCENTILES:
+            summary[f"p{percent:g}"] = self.percentile(percent)
+        return summary
+
+    def to_dict(self):
+        return {
+            "sub_bucket_bits": self.sub_bucket_bits,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {str(bucket): count for bucket, count in sorted(self.buckets.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(sub_bucket_bits=data["sub_bucket_bits"])
+        hist.buckets.update({int(bucket): count for bucket, count in data["buckets"].items()})
+        hist.count = data["count"]
+        hist.total = data["total"]
+        hist.min = data["min"]
+        hist.max = data["max"]
+        return hist
+
+
+class StatsCollector:
+    """
+    Collects tagged round-trip times and throughput for one dummyrunner run.
+
+    """
+
+    def __init__(self, bin_size=1.0, start_time=None):
+        """
+        Args:
+            bin_size (float, optional): Width of throughput time bins, in seconds.
+            start_time (float, optional): Start of the run, as `time.time()`.
+
+        """
+        self.bin_size = bin_size
+        self.start_time = time.time() if start_time is None else start_time
+        self.histograms = defaultdict(LatencyHistogram)
+        # {bin_index: {tag: ncompleted}}
+        self.throughput = defaultdict(lambda: defaultdict(int))
+        # commands that got no response before the next one was sent
+        self.noreply = defaultdict(int)
+        self.meta = {}
+
+    def record(self, tag, rtt, now=None):
+        """
+        Record a completed command.
+
+        Args:
+            tag (str): The action tag of the command.
+            rtt (float): Round-trip time in seconds.
+            now (float, optional): When the response arrived. Defaults to now.
+
+        """
+        now = time.time() if now is None else now
+        self.histograms[tag].record(rtt)
+        self.throughput[int((now - self.start_time) // self.bin_size)][tag] += 1
+
+    def record_noreply(self, tag):
+        """
+        Record a command for which no response was seen.
+
+        Args:
+            tag (str): The action tag of the command.
+
+        """
+        self.noreply[tag] += 1
+
+    def total(self):
+        """
+        Get a histogram of all tags combined.
+
+        Returns:
+            LatencyHistogram: The combined histogram.
+
+        """
+        total = LatencyHistogram()
+        for hist in self.histograms.values():
+            total.merge(hist)
+        return total
+
+    def to_dict(self):
+        return {
+            "version": REPORT_VERSION,
+            "meta": self.meta,
+            "start_time": self.start_time,
+            "bin_size": self.bin_size,
+            "latency": {tag: hist.to_dict() for tag, hist in sorted(self.histograms.items())},
+            "noreply": dict(self.noreply),
+            "throughput": {str(ibin): dict(tags) for ibin, tags in sorted(self.throughput.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != REPORT_VERSION:
+            raise ValueError(f"Unsupported dummyrunner report version {data.get('version')}.")
+        stats = cls(bin_size=data["bin_size"], start_time=data["start_time"])
+        stats.meta = data["meta"]
+        for tag, hist in data["latency"].items():
+            stats.histograms[tag] = LatencyHistogram.from_dict(hist)
+        stats.noreply.update(data["noreply"])
+        for ibin, tags in data["throughput"].items():
+            stats.throughput[int(ibin)].update(tags)
+        return stats
+
+    def merge(self, other):
+        """
+        Merge the results of another collector (such as another worker
+        process) into this one. Throughput bins are aligned on wall-clock time.
+
+        Args:
+            other (StatsCollector): The collector to merge in.
+
+        """
+        for tag, hist in other.histograms.items():
+            self.histograms[tag].merge(hist)
+        for tag, count in other.noreply.items():
+            self.noreply[tag] += count
+        offset = other.start_time - self.start_time
+        for ibin, tags in other.throughput.items():
+            newbin = int((ibin * other.bin_size + offset) // self.bin_size)
+            for tag, count in tags.items():
+                self.throughput[newbin][tag] += count
+
+    def summary_table(self):
+        """
+        Get a printable summary of the run.
+
+        Returns:
+            str: A text table with one row per tag.
+
+        """
+        header = ["tag", "count", "noreply", "mean"] + [f"p{p:g}" for p in PERCENTILES] + ["max"]
+        rows = []
+        tags = sorted(self.histograms.items()) + [("TOTAL", self.total())]
+        for tag, hist in tags:
+            summary = hist.summary()
+            noreply = sum(self.noreply.values()) if tag == "TOTAL" else self.noreply.get(tag, 0)
+            rows.append(
+                [tag, str(summary["count"]), str(noreply), f"{summary['mean'] * 1000:.1f}ms"]
+                + [f"{summary[f'p{p:g}'] * 1000:.1f}ms" for p in PERCENTILES]
+                + [f"{summary['max'] * 1000:.1f}ms"]
+            )
+        return _format_table(header, rows)
+
+    def write_json(self, path):
+        """
+        Write the full report, including raw histogram buckets, as JSON.
+
+        Args:
+            path (str): File to write to.
+
+        """
+        with open(path, "w") as fil:
+            json.dump(self.to_dict(), fil, indent=1)
+
+    def write_csv(self, prefix):
+        """
+        Write the report as two CSV files, `<prefix>_latency.csv` with one
+        summary row per tag and `<prefix>_throughput.csv` with completed
+        commands per tag and time bin.
+
+        Args:
+            prefix (str): Path prefix of the files to write.
+
+        """
+        with open(f"{prefix}_latency.csv", "w", newline="") as fil:
+            writer = csv.writer(fil)
+            fields = ["count", "min", "mean"] + [f"p{p:g}" for p in PERCENTILES] + ["max"]
+            writer.writerow(["tag", "noreply"] + fields)
+            for tag, hist in sorted(self.histograms.items()):
+                summary = hist.summary()
+                writer.writerow(
+                    [tag, self.noreply.get(tag, 0)] + [summary[field] for field in fields]
+                )
+        with open(f"{prefix}_throughput.csv", "w", newline="") as fil:
+            writer = csv.writer(fil)
+            writer.writerow(["time", "tag", "count"])
+            for ibin, tags in sorted(self.throughput.items()):
+                for tag, count in sorted(tags.items()):
+                    writer.writerow([ibin * self.bin_size, tag, count])
+
+
+def load_report(path):
+    """
+    Load a report written by `StatsCollector.write_json`.
+
+    Args:
+        path (str): The JSON file to read.
+
+    Returns:
+        StatsCollector: The loaded stats.
+
+    """
+    with open(path) as fil:
+        return StatsCollector.from_dict(json.load(fil))
+
+
+def merge_reports(paths):
+    """
+    Combine reports from several dummyrunner worker processes.
+
+    Args:
+        paths (list): JSON report files to merge.
+
+    Returns:
+        StatsCollector: The merged stats. Its start time is the earliest of
+        all reports.
+
+    """
+    reports = sorted((load_report(path) for path in paths), key=lambda stats: stats.start_time)
+    merged = StatsCollector(bin_size=reports[0].bin_size, start_time=reports[0].start_time)
+    merged.meta = dict(reports[0].meta, workers=len(reports))
+    for stats in reports:
+        merged.merge(stats)
+    return merged
+
+
+def compare_reports(old, new, percent=99):
+    """
+    Compare two reports, such as from runs on two different commits.
+
+    Args:
+        old (StatsCollector): The baseline report.
+        new (StatsCollector): The report to compare against the baseline.
+        percent (float, optional): Which percentile to compare.
+
+    Returns:
+        str: A text table with the mean and percentile latency of each tag in
+        both reports and the relative change.
+
+    """
+
+    def _change(before, after):
+        return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+    pkey = f"p{percent:g}"
+    header = ["tag", "mean old", "mean new", "change", f"{pkey} old", f"{pkey} new", "change"]
+    rows = []
+    for tag in sorted(set(old.histograms) | set(new.histograms)):
+        if tag not in old.histograms or tag not in new.histograms:
+            rows.append([tag, "only in " + ("new" if tag in new.histograms else "old")])
+            continue
+        before, after = old.histograms[tag].summary(), new.histograms[tag].summary()
+        rows.append(
+            [
+                tag,
+                f"{before['mean'] * 1000:.1f}ms",
+                f"{after['mean'] * 1000:.1f}ms",
+                _change(before["mean"], after["mean"]),
+                f"{before[pkey] * 1000:.1f}ms",
+                f"{after[pkey] * 1000:.1f}ms",
+                _change(before[pkey], after[pkey]),
+            ]
+        )
+    return _format_table(header, rows)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m evennia.server.profiling.dummyrunner_stats old.json new.json")
+        sys.exit(1)
+    print(compare_reports(load_report(sys.argv[1]), load_report(sys.argv[2])))
@@ -0,0 +1,329 @@
+"""
+Memory footprint of the idmapper cache
+
+The `memplot` script only tracks the total memory of the process. This module
+instead walks every instance in the idmapper cache and estimates how much
+memory it retains, grouped by database model, by typeclass path and by the
+handler caches hanging off each instance (`attributes`, `tags`, `nattributes`
+(the `ndb`), `scripts`, `cmdset` etc). Snapshots can be compared over time to
+find what keeps growing.
+
+Sizes are estimates made with `sys.getsizeof` while following references.
+Every Python object is only counted once per snapshot, in the first place it
+is found. The walk does not follow references into other cached database
+entities (they are counted on their own), nor into modules, classes,
+functions or sessions, which are shared by everything.
+
+Usage:
+
+```python
+from evennia.server.profiling import footprint
+
+snapshot = footprint.take_snapshot()
+print(snapshot.report())
+# later
+print(footprint.take_snapshot().diff(snapshot).report())
+```
+
+This is also available in-game as `server/footprint`, which compares against
+the previous snapshot taken by the command.
+
+"""
+
+import sys
+import time
+import types
+from collections import defaultdict, deque
+
+from evennia.server.session import Session
+from evennia.utils.idmapper.models import SharedMemoryModel
+
+# how many of the largest entries to include in reports, per category
+REPORT_SIZE = 10
+
+# these are never followed by the size estimate, since they are shared
+# globally rather than owned by any one instance
+_SHARED_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CodeType,
+    types.FrameType,
+    Session,
+)
+_CONTAINER_TYPES = (list, tuple, set, frozenset, deque)
+
+# recent snapshots taken by `server/footprint`, for diffing
+SNAPSHOTS = []
+MAX_SNAPSHOTS = 10
+
+
+def estimate_size(obj, seen, owned_models=()):
+    """
+    Estimate the memory retained by an object by following its references.
+
+    Args:
+        obj (any): The object to measure.
+        seen (set): The `id()` of objects already counted. Will be updated.
+            Objects found here are not counted again.
+        owned_models (tuple, optional): `SharedMemoryModel` classes whose
+            instances should be counted as part of `obj` when referenced from
+            it (like the `Attribute`s held in an `AttributeHandler` cache).
+            References to other model instances are not followed.
+
+    Returns:
+        int: Estimated size in bytes.
+
+    """
+    total = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        # we only use type() and object.__getattribute__ here, since some
+        # objects (like DbHolder) turn all attribute access into db lookups
+        objtype = type(obj)
+        if id(obj) in seen or issubclass(objtype, _SHARED_TYPES):
+            continue
+        if issubclass(objtype, SharedMemoryModel) and not issubclass(objtype, owned_models):
+            # another cached entity, measured on its own
+            continue
+        seen.add(id(obj))
+        try:
+            total += sys.getsizeof(obj)
+        except TypeError:
+            continue
+        if issubclass(objtype, (str, bytes, int, float)):
+            continue
+        if issubclass(objtype, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif issubclass(objtype, _CONTAINER_TYPES):
+            stack.extend(obj)
+        else:
+            try:
+                stack.append(object.__getattribute__(obj, "__dict__"))
+            except AttributeError:
+                pass
+            for slot in getattr(objtype, "__slots__", ()):
+                try:
+                    stack.append(object.__getattribute__(obj, slot))
+                except AttributeError:
+                    pass
+    return total
+
+
+def _all_cached_models():
+    """
+    Get all leaf SharedMemoryModel classes (the ones that hold caches).
+
+    Returns:
+        list: The model classes.
+
+    """
+    models = []
+
+    def _recurse(submodels):
+        for submodel in submodels:
+            subclasses = submodel.__subclasses__()
+            if subclasses:
+                _recurse(subclasses)
+            else:
+                models.append(submodel)
+
+    _recurse(SharedMemoryModel.__subclasses__())
+    return models
+
+
+def _is_handler(key, value):
+    """
+    Check if an instance `__dict__` entry is a handler (handlers are stored
+    there by `lazy_property`).
+
+    """
+    return not key.startswith("__") and type(value).__name__.endswith("Handler")
+
+
+class MemorySnapshot:
+    """
+    Estimated memory use of the idmapper cache at one point in time.
+
+    The `models`, `typeclasses` and `handlers` properties are dicts
+    `{name: {"count": int, "size": int}}`. For handlers, the count is the
+    number of cached instances with that handler loaded.
+
+    """
+
+    def __init__(self, timestamp=None):
+        self.timestamp = time.time() if timestamp is None else timestamp
+        # set on diffs; the timestamp of the earlier snapshot
+        self.since = None
+        self.models = defaultdict(lambda: {"count": 0, "size": 0})
+        self.typeclasses = defaultdict(lambda: {"count": 0, "size": 0})
+        self.handlers = defaultdict(lambda: {"count": 0, "size": 0})
+
+    @property
+    def total_size(self):
+        return sum(entry["size"] for entry in self.models.values())
+
+    @property
+    def total_count(self):
+        return sum(entry["count"] for entry in self.models.values())
+
+    def add(self, model_name, typeclass_path, instance_size, handler_sizes):
+        """
+        Add the measurements of one cached instance.
+
+        Args:
+            model_name (str): Name of the database model.
+            typeclass_path (str): Python path of the instance's (type)class.
+            instance_size (int): Size of the instance itself, excluding handlers.
+            handler_sizes (dict): `{handlername: size}` of its loaded handlers.
+
+        """
+        size = instance_size + sum(handler_sizes.values())
+        for entry in (self.models[model_name], self.typeclasses[typeclass_path]):
+            entry["count"] += 1
+            entry["size"] += size
+        for handlername, handler_size in handler_sizes.items():
+            self.handlers[handlername]["count"] += 1
+            self.handlers[handlername]["size"] += handler_size
+
+    def diff(self, other):
+        """
+        Get the change since an earlier snapshot.
+
+        Args:
+            other (MemorySnapshot): The earlier snapshot.
+
+        Returns:
+            MemorySnapshot: A snapshot where every count and size is the
+            difference between this one and `other`.
+
+        """
+        diff = MemorySnapshot(timestamp=self.timestamp)
+        diff.since = other.timestamp
+        for category in ("models", "typeclasses", "handlers"):
+            mine, theirs = getattr(self, category), getattr(other, category)
+            result = getattr(diff, category)
+            for name in set(mine) | set(theirs):
+                before = theirs.get(name, {"count": 0, "size": 0})
+                after = mine.get(name, {"count": 0, "size": 0})
+                result[name] = {
+                    "count": after["count"] - before["count"],
+                    "size": after["size"] - before["size"],
+                }
+        return diff
+
+    def top(self, category, num=REPORT_SIZE):
+        """
+        Get the largest entries of a category.
+
+        Args:
+            category (str): One of "models", "typeclasses" or "handlers".
+            num (int, optional): How many entries to return.
+
+        Returns:
+            list: `[(name, count, size), ...]`, sorted by the absolute size.
+
+        """
+        entries = [
+            (name, entry["count"], entry["size"])
+            for name, entry in getattr(self, category).items()
+            if entry["count"] or entry["size"]
+        ]
+        return sorted(entries, key=lambda tup: abs(tup[2]), reverse=True)[:num]
+
+    def report(self, num=REPORT_SIZE):
+        """
+        Get a printable report of the snapshot.
+
+        Args:
+            num (int, optional): Max entries to list per category.
+
+        Returns:
+            str: The report.
+
+        """
+        signed = self.since is not None
+        sign = "+" if signed else ""
+        lines = [
+            f"Idmapper cache: {self.total_count:{sign}} instances, "
+            f"~{self.total_size / 1024:{sign}.1f} KB"
+            + (f" (change over {self.timestamp - self.since:.0f}s)" if signed else "")
+        ]
+        for category in ("models", "typeclasses", "handlers"):
+            lines.append(f"\n{category.capitalize()}:")
+            for name, count, size in self.top(category, num=num):
+                lines.append(f"  {name:<50} {count:>{sign}8} {size / 1024:>{sign}12.1f} KB")
+        return "\n".join(lines)
+
+
+def take_snapshot(owned_models=None):
+    """
+    Estimate the memory retained by all instances in the idmapper cache.
+
+    Args:
+        owned_models (tuple, optional): Model classes that are counted as part
+            of the handler caches referencing them rather than on their own.
+            Defaults to `(Attribute,)`, so Attributes are reported under the
+            `attributes`, `nattributes` and `nicks` handlers of their objects.
+
+    Returns:
+        MemorySnapshot: The snapshot.
+
+    """
+    if owned_models is None:
+        from evennia.typeclasses.attributes import Attribute
+
+        owned_models = (Attribute,)
+
+    snapshot = MemorySnapshot()
+    seen = set()
+    # owned models are measured last, so what is left of them is what is not
+    # referenced by any handler
+    models = sorted(_all_cached_models(), key=lambda model: issubclass(model, owned_models))
+    for model in models:
+        model_name = model.__dbclass__.__name__
+        for instance in model.get_all_cached_instances():
+            instdict = instance.__dict__
+            seen.update((id(instance), id(instdict)))
+            handlers = {}
+            other = []
+            for key, value in instdict.items():
+                if _is_handler(key, value):
+                    handlers[key.lstrip("_")] = value
+                else:
+                    other.append(value)
+            handler_sizes = {
+                name: estimate_size(handler, seen, owned_models=owned_models)
+                for name, handler in handlers.items()
+            }
+            instance_size = (
+                sys.getsizeof(instance)
+                + sys.getsizeof(instdict)
+                + sum(estimate_size(value, seen) for value in other)
+            )
+            typeclass_path = getattr(instance, "typeclass_path", None) or (
+                f"{type(instance).__module__}.{type(instance).__name__}"
+            )
+            snapshot.add(model_name, typeclass_path, instance_size, handler_sizes)
+    return snapshot
+
+
+def store_snapshot(snapshot):
+    """
+    Store a snapshot in `SNAPSHOTS`, dropping the oldest ones.
+
+    Args:
+        snapshot (MemorySnapshot): The snapshot to store.
+
+    Returns:
+        MemorySnapshot or None: The previously stored snapshot, if any.
+
+    """
+    previous = SNAPSHOTS[-1] if SNAPSHOTS else None
+    SNAPSHOTS.append(snapshot)
+    del SNAPSHOTS[:-MAX_SNAPSHOTS]
+    return previous
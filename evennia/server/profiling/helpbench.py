@@ -0,0 +1,149 @@
+"""
+Benchmark of help searches
+
+Measures how long a help query (`evennia.help.utils.help_search_with_index`,
+used by the default `help` command) takes for growing numbers of help entries.
+Each size is measured with a cold search-index cache, where the index has to be
+built for the query (this is how every query worked before the indexes were
+cached), and with a warm cache, where only the search itself runs.
+
+Run from the command line (no game dir is needed):
+
+    python -m evennia.server.profiling.helpbench --sizes 100 500 1000 2000 --queries 20
+
+"""
+
+import argparse
+import os
+import random
+import time
+
+_WORDS = (
+    "sword shield potion spell magic rune forge craft mine ore gem guild bank trade "
+    "quest map travel ship horse camp fire water earth wind light shadow stealth "
+    "combat attack defend parry dodge heal rest sleep eat drink cook fish hunt "
+    "tame mount ride climb swim dive jump sneak steal pray bless curse"
+).split()
+
+
+class BenchHelpEntry:
+    """
+    A help entry made up for the benchmark.
+
+    """
+
+    def __init__(self, key, aliases, category, text):
+        self.key = key
+        self.search_index_entry = {
+            "key": key,
+            "aliases": aliases,
+            "no_prefix": "",
+            "category": category,
+            "tags": "",
+            "text": text,
+        }
+
+
+def make_entries(size, seed=0):
+    """
+    Make up help entries.
+
+    Args:
+        size (int): The number of entries.
+        seed (int, optional): Random seed.
+
+    Returns:
+        list: The `BenchHelpEntry`s.
+
+    """
+    rand = random.Random(seed)
+    return [
+        BenchHelpEntry(
+            f"{rand.choice(_WORDS)}{inum}",
+            " ".join(f"{word}{inum}" for word in rand.sample(_WORDS, 2)),
+            rand.choice(_WORDS[:10]),
+            " ".join(rand.choice(_WORDS) for _ in range(60)),
+        )
+        for inum in range(size)
+    ]
+
+
+def run_benchmark(sizes, nqueries=10, seed=0):
+    """
+    Time help queries over different numbers of entries.
+
+    Args:
+        sizes (list): The numbers of entries to measure for.
+        nqueries (int, optional): The number of queries to average over per size.
+        seed (int, optional): Random seed.
+
+    Returns:
+        list: One dict `{"entries", "cold_ms", "warm_ms"}` per size, with the
+            average time of a query.
+
+    """
+    from evennia.help.utils import clear_search_index_cache, help_search_with_index
+
+    rand = random.Random(seed)
+    results = []
+    for size in sizes:
+        entries = make_entries(size, seed=seed)
+        queries = [rand.choice(entries).key for _ in range(nqueries)]
+        timings = {}
+        for mode in ("cold", "warm"):
+            clear_search_index_cache()
+            if mode == "warm":
+                help_search_with_index(queries[0], entries)
+            total = 0.0
+            for query in queries:
+                if mode == "cold":
+                    clear_search_index_cache()
+                t0 = time.perf_counter()
+                help_search_with_index(query, entries)
+                total += time.perf_counter() - t0
+            timings[mode] = total / nqueries * 1000
+        results.append({"entries": size, "cold_ms": timings["cold"], "warm_ms": timings["warm"]})
+    clear_search_index_cache()
+    return results
+
+
+def format_results(results):
+    """
+    Format benchmark results as a table.
+
+    Args:
+        results (list): As returned by `run_benchmark`.
+
+    Returns:
+        str: The table.
+
+    """
+    lines = [f"{'entries':>8}{'cold (ms)':>12}{'warm (ms)':>12}{'speedup':>10}"]
+    for result in results:
+        speedup = result["cold_ms"] / result["warm_ms"] if result["warm_ms"] else 0
+        lines.append(
+            f"{result['entries']:>8}{result['cold_ms']:>12.2f}{result['warm_ms']:>12.2f}"
+            f"{speedup:>9.1f}x"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """
+    Run the benchmark from the command line.
+
+    """
+    parser = argparse.ArgumentParser(description="Time help queries over entry counts.")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 500, 1000, 2000], help="Entry counts."
+    )
+    parser.add_argument("--queries", type=int, default=10, help="Queries per entry count.")
+    args = parser.parse_args()
+
+    # the help utils need settings, but no game dir is needed for this
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+    print(format_results(run_benchmark(args.sizes, nqueries=args.queries)))
+
+
+if __name__ == "__main__":
+    main()
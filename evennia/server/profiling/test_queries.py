@@ -1,15 +1,82 @@
 """
-This is a little routine for viewing the sql queries that are executed by a given
-query as well as count them for optimization testing.
+Query-count regression tests for the default commands.
+
+Each command in `COMMAND_CASES` is run against a seeded test world and the
+number of SQL queries (and the wall time) it causes is recorded. The test
+fails if a command needs more queries than stored for it in the baseline
+file `query_baseline.json`. The idmapper cache is flushed before every
+command, and so are the Attribute, Tag and contents caches of the entities
+the test itself holds on to, so the counts include loading what the command
+touches (this is where N+1 query patterns show up).
+
+The seeded world has `size` objects in the caller's location, `size` items in
+the caller's inventory and `size` exits leading out of the location. A second
+account is connected and puppets `Char2`, in the caller's location, so there is
+someone to hear `say`/`pose` and to list in `who`. A case can prepare the world
+with a `prepare_<name>` method of the test, run before it is measured (like
+`home` first moving the caller away from home). The size
+is set with the `EVENNIA_QUERY_WORLD_SIZE` environment variable (default 10).
+Since a well-behaved command needs the same number of queries no matter how
+big the world is, running with a larger size is a good way to find commands
+whose query count scales with the world.
+
+To write the current counts to the baseline after an intentional change, run
+with `EVENNIA_QUERY_BASELINE_UPDATE=1`:
+
+    EVENNIA_QUERY_BASELINE_UPDATE=1 evennia test --keepdb evennia.server.profiling.test_queries
+
+Setting `EVENNIA_QUERY_REPORT=<path>` also writes all measured counts and
+times to a JSON file.
+
+This module also keeps the `count_queries` helper for quick checks from the
+shell.
 
 """
 
+import json
 import os
-import sys
+import time
 
-# sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
-# os.environ["DJANGO_SETTINGS_MODULE"] = "game.settings"
 from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from evennia.commands.default import account, building, general, help
+from evennia.commands.default.cmdset_account import AccountCmdSet
+from evennia.commands.default.cmdset_character import CharacterCmdSet
+from evennia.server.serversession import ServerSession
+from evennia.server.sessionhandler import SESSIONS
+from evennia.utils import create
+from evennia.utils.idmapper.models import flush_cache
+from evennia.utils.test_resources import BaseEvenniaCommandTest
+
+QUERY_BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "query_baseline.json"
+)
+WORLD_SIZE = int(os.environ.get("EVENNIA_QUERY_WORLD_SIZE", 10))
+UPDATE_BASELINE = bool(os.environ.get("EVENNIA_QUERY_BASELINE_UPDATE"))
+REPORT_FILE = os.environ.get("EVENNIA_QUERY_REPORT")
+
+# (name, command class, arguments, caller) in the order they are run. The
+# caller is "char" (the test character) or "account".
+COMMAND_CASES = (
+    ("look", general.CmdLook, "", "char"),
+    ("look_obj", general.CmdLook, "seeded_obj_0", "char"),
+    ("inventory", general.CmdInventory, "", "char"),
+    ("get", general.CmdGet, "seeded_obj_0", "char"),
+    ("drop", general.CmdDrop, "seeded_obj_0", "char"),
+    ("give", general.CmdGive, "seeded_item_0 = Char2", "char"),
+    ("say", general.CmdSay, "Hello!", "char"),
+    ("pose", general.CmdPose, "waves.", "char"),
+    ("home", general.CmdHome, "", "char"),
+    ("who", account.CmdWho, "", "account"),
+    ("examine", building.CmdExamine, "seeded_obj_1", "char"),
+    ("set", building.CmdSetAttribute, "seeded_obj_1/testattr = 5", "char"),
+    ("desc", building.CmdDesc, "seeded_obj_1 = A new description.", "char"),
+    ("create", building.CmdCreate, "new_obj", "char"),
+    ("dig", building.CmdDig, "new_room = new_exit;ne, new_back;nb", "char"),
+    ("teleport", building.CmdTeleport, "/quiet Room2", "char"),
+    ("help", help.CmdHelp, "look", "char"),
+)
 
 
 def count_queries(exec_string, setup_string):
@@ -29,15 +96,169 @@ def count_queries(exec_string, setup_string):
     print("Number of queries: %s" % nqueries)
 
 
-if __name__ == "__main__":
+def seed_world(location, holder, size, typeclass, exit_typeclass, room_typeclass):
+    """
+    Populate the test world.
 
-    # setup tests here
+    Args:
+        location (Object): Where to put objects and exits.
+        holder (Object): Who should carry the seeded items.
+        size (int): How many objects, items and exits to create.
+        typeclass (str): Typeclass of objects and items.
+        exit_typeclass (str): Typeclass of exits.
+        room_typeclass (str): Typeclass of the rooms the exits lead to.
 
-    setup_string = """
-from evennia.objects.models import ObjectDB
-g = ObjectDB.objects.get(db_key="Griatch")
-"""
-    exec_string = """
-g.tags.all()
-"""
-    count_queries(exec_string, setup_string)
+    """
+    for inum in range(size):
+        obj = create.create_object(
+            typeclass, key=f"seeded_obj_{inum}", location=location, home=location
+        )
+        obj.db.desc = f"Seeded object number {inum}."
+        obj.db.weight = inum
+        obj.tags.add("seeded", category="profiling")
+        item = create.create_object(typeclass, key=f"seeded_item_{inum}", location=holder)
+        item.db.desc = f"Seeded item number {inum}."
+        room = create.create_object(room_typeclass, key=f"seeded_room_{inum}", nohome=True)
+        create.create_object(
+            exit_typeclass,
+            key=f"seeded_exit_{inum}",
+            location=location,
+            destination=room,
+        )
+
+
+def load_baseline():
+    """
+    Load the stored query-count baseline.
+
+    Returns:
+        dict: `{str(worldsize): {casename: nqueries, ...}, ...}`.
+
+    """
+    if not os.path.exists(QUERY_BASELINE_FILE):
+        return {}
+    with open(QUERY_BASELINE_FILE) as fil:
+        return json.load(fil)
+
+
+class TestCommandQueries(BaseEvenniaCommandTest):
+    """
+    Check the query counts of the default commands against the baseline.
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.char1.permissions.add("Developer")
+        seed_world(
+            self.room1,
+            self.char1,
+            WORLD_SIZE,
+            self.object_typeclass,
+            self.exit_typeclass,
+            self.room_typeclass,
+        )
+        # a second connected account, puppeting Char2 in the caller's location
+        session = ServerSession()
+        session.init_session("telnet", ("localhost", "testmode"), SESSIONS)
+        session.sessid = 2
+        SESSIONS.portal_connect(session.get_sync_data())
+        self.session2 = SESSIONS.session_from_sessid(2)
+        SESSIONS.login(self.session2, self.account2, testmode=True)
+        self.account2.puppet_object(self.session2, self.char2)
+
+    def tearDown(self):
+        del SESSIONS[self.session2.sessid]
+        super().tearDown()
+
+    def prepare_home(self):
+        """Move the caller away, so `home` has to move it back."""
+        self.char1.move_to(self.room2, quiet=True, move_type="teleport")
+
+    def flush_caches(self):
+        """
+        Flush the idmapper cache, as well as the caches of the entities this
+        test holds on to, which the flush leaves alive.
+
+        """
+        flush_cache()
+        for entity in (
+            self.account,
+            self.account2,
+            self.char1,
+            self.char2,
+            self.room1,
+            self.room2,
+            self.obj1,
+            self.obj2,
+            self.exit,
+            self.script,
+        ):
+            for handlername in ("attributes", "tags", "aliases", "permissions"):
+                handler = entity.__dict__.get(handlername)
+                if handler:
+                    handler.reset_cache()
+            # this holds on to the entity's contents
+            entity.__dict__.pop("contents_cache", None)
+
+    def measure(self, cmdclass, args, caller, cmdset):
+        """
+        Run one command from cold caches.
+
+        Returns:
+            tuple: `(nqueries, seconds)`.
+
+        """
+        self.flush_caches()
+        with CaptureQueriesContext(connection) as context:
+            t0 = time.perf_counter()
+            self.call(cmdclass(), args, caller=caller, cmdset=cmdset)
+            seconds = time.perf_counter() - t0
+        return len(context.captured_queries), seconds
+
+    def test_query_counts(self):
+        results = {}
+        cmdsets = {"account": AccountCmdSet(), "char": CharacterCmdSet()}
+        for name, cmdclass, args, callertype in COMMAND_CASES:
+            caller = self.account if callertype == "account" else self.char1
+            prepare = getattr(self, f"prepare_{name}", None)
+            if prepare:
+                prepare()
+            results[name] = self.measure(cmdclass, args, caller, cmdsets[callertype])
+
+        if REPORT_FILE:
+            with open(REPORT_FILE, "w") as fil:
+                json.dump(
+                    {
+                        "world_size": WORLD_SIZE,
+                        "results": {
+                            name: {"queries": nqueries, "seconds": seconds}
+                            for name, (nqueries, seconds) in results.items()
+                        },
+                    },
+                    fil,
+                    indent=2,
+                )
+
+        baseline = load_baseline()
+        if UPDATE_BASELINE:
+            baseline[str(WORLD_SIZE)] = {name: nqueries for name, (nqueries, _) in results.items()}
+            with open(QUERY_BASELINE_FILE, "w") as fil:
+                json.dump(baseline, fil, indent=2, sort_keys=True)
+                fil.write("\n")
+            return
+
+        expected = baseline.get(str(WORLD_SIZE))
+        if not expected:
+            self.skipTest(f"No query baseline stored for world size {WORLD_SIZE}.")
+        for name, (nqueries, _) in results.items():
+            with self.subTest(command=name):
+                if name not in expected:
+                    continue
+                self.assertLessEqual(
+                    nqueries,
+                    expected[name],
+                    f"'{name}' now needs {nqueries} queries (baseline {expected[name]}, "
+                    f"world size {WORLD_SIZE}). If this is intended, update the baseline "
+                    "with EVENNIA_QUERY_BASELINE_UPDATE=1.",
+                )
@@ -1,8 +1,15 @@
 from anything import Something
 from django.test import TestCase
 from mock import Mock, mock_open, patch
+from twisted.internet import task
 
+from evennia.utils.test_resources import BaseEvenniaTest
+from evennia.utils.timingwheel import TimingWheel
+
+from . import attrbench, delaybench, footprint, helpbench
 from .dummyrunner_settings import (
+    SCENARIOS,
+    c_channel_spam,
     c_creates_button,
     c_creates_obj,
     c_digs,
@@ -10,14 +17,17 @@ from .dummyrunner_settings import (
     c_help,
     c_idles,
     c_login,
+    c_login_crowd,
     c_login_nodig,
     c_logout,
     c_looks,
     c_moves,
     c_moves_n,
     c_moves_s,
+    c_says,
     c_socialize,
 )
+from .dummyrunner_stats import LatencyHistogram, StatsCollector, compare_reports
 
 try:
     import memplot
@@ -137,6 +147,111 @@ class TestDummyrunnerSettings(TestCase):
     def test_c_move_s(self):
         self.assertEqual(c_moves_s(self.client), ("south",))
 
+    def test_c_login_crowd(self):
+        cmds = c_login_crowd(self.client)
+        self.assertTrue(cmds[0].startswith("create " + self.client.name + " "))
+        self.assertEqual(cmds[1], "yes")
+        self.assertFalse(any(cmd.startswith("dig") for cmd in cmds))
+
+    def test_c_says(self):
+        self.client.key = "Dummy-001"
+        self.assertEqual(c_says(self.client), ("say Hello from Dummy-001!",))
+
+    def test_c_channel_spam(self):
+        self.client.key = "Dummy-001"
+        self.assertEqual(c_channel_spam(self.client), ("pub Message 1 from Dummy-001.",))
+
+    def test_scenarios(self):
+        for name, scenario in SCENARIOS.items():
+            actions = scenario["ACTIONS"]
+            self.assertGreater(len(actions), 2, name)
+            self.assertTrue(all(callable(func) for _, func in actions[2:]), name)
+
+
+class TestDummyrunnerStats(TestCase):
+    def test_histogram_percentiles(self):
+        hist = LatencyHistogram()
+        for msec in range(1, 1001):
+            hist.record(msec / 1000.0)
+        self.assertEqual(hist.count, 1000)
+        self.assertAlmostEqual(hist.mean, 0.5005)
+        # log-linear buckets keep the relative error below 1%
+        self.assertAlmostEqual(hist.percentile(50), 0.5, delta=0.005)
+        self.assertAlmostEqual(hist.percentile(99), 0.99, delta=0.01)
+        self.assertEqual(hist.percentile(100), 1.0)
+        self.assertEqual(hist.summary()["min"], 0.001)
+
+    def test_histogram_merge_and_serialize(self):
+        hist1, hist2 = LatencyHistogram(), LatencyHistogram()
+        hist1.record(0.01, count=3)
+        hist2.record(0.2)
+        hist1.merge(hist2)
+        self.assertEqual(hist1.count, 4)
+        self.assertEqual(hist1.max, 200000)
+        restored = LatencyHistogram.from_dict(hist1.to_dict())
+        self.assertEqual(restored.summary(), hist1.summary())
+
+    def test_collector_merge(self):
+        stats1 = StatsCollector(start_time=100.0)
+        stats1.record("looks", 0.01, now=100.5)
+        stats2 = StatsCollector(start_time=102.0)
+        stats2.record("looks", 0.03, now=102.5)
+        stats2.record("digs", 0.1, now=103.5)
+        stats2.record_noreply("idles")
+
+        stats1.merge(StatsCollector.from_dict(stats2.to_dict()))
+        self.assertEqual(stats1.histograms["looks"].count, 2)
+        self.assertEqual(stats1.noreply["idles"], 1)
+        # bins are realigned to the earliest start time
+        self.assertEqual(stats1.throughput[0]["looks"], 1)
+        self.assertEqual(stats1.throughput[2]["looks"], 1)
+        self.assertEqual(stats1.throughput[3]["digs"], 1)
+        self.assertIn("TOTAL", stats1.summary_table())
+
+    def test_compare_reports(self):
+        old, new = StatsCollector(), StatsCollector()
+        old.record("looks", 0.01)
+        new.record("looks", 0.02)
+        new.record("digs", 0.02)
+        table = compare_reports(old, new)
+        self.assertIn("+100.0%", table)
+        self.assertIn("only in new", table)
+
+
+class TestDelayBench(TestCase):
+    def test_run_benchmark(self):
+        results = {}
+        for name in ("reactor", "wheel"):
+            clock = task.Clock()
+            scheduler = clock if name == "reactor" else TimingWheel(clock, resolution=0.1)
+            deferred = delaybench.run_benchmark(scheduler, clock, 100, 2.0, cancel_fraction=0.25)
+            deferred.addCallback(lambda result, name=name: results.__setitem__(name, result))
+            clock.pump([0.05] * 50)
+            self.assertEqual(results[name]["fired"], 75)
+            self.assertEqual(results[name]["cancelled"], 25)
+        # calls run at the next pump step, or at the next tick for the wheel
+        self.assertLessEqual(results["reactor"]["max_late"], 0.05 + 1e-6)
+        self.assertLessEqual(results["wheel"]["max_late"], 0.1 + 1e-6)
+        self.assertIn("wheel", delaybench.format_results(results))
+
+
+class TestHelpBench(TestCase):
+    def test_run_benchmark(self):
+        results = helpbench.run_benchmark([5, 20], nqueries=2)
+        self.assertEqual([result["entries"] for result in results], [5, 20])
+        for result in results:
+            self.assertGreater(result["cold_ms"], 0)
+            self.assertGreater(result["warm_ms"], 0)
+        self.assertIn("speedup", helpbench.format_results(results))
+
+
+class TestAttrBench(TestCase):
+    def test_run_benchmark(self):
+        results = attrbench.run_benchmark(20, repeat=1)
+        self.assertEqual(set(results), {"pickle", "compact"})
+        self.assertLess(results["compact"]["size"], results["pickle"]["size"])
+        self.assertIn("compact", attrbench.format_results(results))
+
 
 class TestMemPlot(TestCase):
     @patch.object(memplot, "_idmapper")
@@ -158,3 +273,31 @@ class TestMemPlot(TestCase):
         handle = mocked_open()
         handle.write.assert_called_with("100.0, 0.001, 0.001, 9\n")
         script.stop()
+
+
+class TestFootprint(BaseEvenniaTest):
+    def test_estimate_size(self):
+        seen = set()
+        shared = ["x" * 1000]
+        size1 = footprint.estimate_size({"a": shared}, seen)
+        self.assertGreater(size1, 1000)
+        # already counted objects are not counted again
+        size2 = footprint.estimate_size({"b": shared}, seen)
+        self.assertLess(size2, 1000)
+        # other cached entities are not followed
+        self.assertLess(footprint.estimate_size([self.obj1], set()), 100)
+
+    def test_snapshot_and_diff(self):
+        self.obj1.db.testattr = "x" * 5000
+        self.obj1.ndb.testndb = "y" * 5000
+        snapshot1 = footprint.take_snapshot()
+        self.assertGreater(snapshot1.models["ObjectDB"]["count"], 0)
+        self.assertIn(self.obj1.typeclass_path, snapshot1.typeclasses)
+        self.assertGreater(snapshot1.handlers["attributes"]["size"], 5000)
+        self.assertGreater(snapshot1.handlers["nattributes"]["size"], 5000)
+
+        self.obj1.db.testattr2 = "z" * 20000
+        diff = footprint.take_snapshot().diff(snapshot1)
+        self.assertGreater(diff.handlers["attributes"]["size"], 20000)
+        self.assertEqual(diff.top("handlers", num=1)[0][0], "attributes")
+        self.assertIn("change over", diff.report())
@@ -11,6 +11,7 @@ import os
 import sys
 import time
 import traceback
+from functools import partial
 
 import django
 from twisted.application import internet, service
@@ -34,6 +35,7 @@ from django.utils.translation import gettext as _
 
 from evennia.accounts.models import AccountDB
 from evennia.scripts.models import ScriptDB
+from evennia.server import invalidation, shards
 from evennia.server.models import ServerConfig
 from evennia.server.sessionhandler import SESSIONS
 from evennia.utils import logger
@@ -72,13 +74,20 @@ WEBSERVER_INTERFACES = settings.WEBSERVER_INTERFACES
 
 GUEST_ENABLED = settings.GUEST_ENABLED
 
+# with several Server shards (see evennia.server.shards), shard 0 is the primary
+# Server, running the webserver, timers and global game state; the other shards
+# only run commands for the Sessions they handle
+PRIMARY_SHARD = shards.SHARD == 0
+
 # server-channel mappings
-WEBSERVER_ENABLED = settings.WEBSERVER_ENABLED and WEBSERVER_PORTS and WEBSERVER_INTERFACES
+WEBSERVER_ENABLED = (
+    PRIMARY_SHARD and settings.WEBSERVER_ENABLED and WEBSERVER_PORTS and WEBSERVER_INTERFACES
+)
 IRC_ENABLED = settings.IRC_ENABLED
 RSS_ENABLED = settings.RSS_ENABLED
 GRAPEVINE_ENABLED = settings.GRAPEVINE_ENABLED
 WEBCLIENT_ENABLED = settings.WEBCLIENT_ENABLED
-GAME_INDEX_ENABLED = settings.GAME_INDEX_ENABLED
+GAME_INDEX_ENABLED = PRIMARY_SHARD and settings.GAME_INDEX_ENABLED
 
 INFO_DICT = {
     "servername": SERVERNAME,
@@ -143,7 +152,8 @@ def _server_maintenance():
 
     # update game time and save it across reloads
     _GAMETIME_MODULE.SERVER_RUNTIME_LAST_UPDATED = now
-    ServerConfig.objects.conf("runtime", _GAMETIME_MODULE.SERVER_RUNTIME)
+    if PRIMARY_SHARD:
+        ServerConfig.objects.conf("runtime", _GAMETIME_MODULE.SERVER_RUNTIME)
 
     if _MAINTENANCE_COUNT % 5 == 0:
         # check cache size every 5 minutes
@@ -171,7 +181,7 @@ def _server_maintenance():
     # run unpuppet hooks for objects that are marked as being puppeted,
     # but which lacks an account (indicates a broken unpuppet operation
     # such as a server crash)
-    if _MAINTENANCE_COUNT > 1:
+    if _MAINTENANCE_COUNT > 1 and PRIMARY_SHARD:
         unpuppet_count = 0
         for obj in _OBJECTDB.objects.get_by_tag(key="puppeted", category="account"):
             if not obj.has_account:
@@ -217,6 +227,14 @@ class Evennia:
         # Database-specific startup optimizations.
         self.sqlite3_prep()
 
+        # update our idmapper cache with changes from other processes
+        shards.SHARD_BUS.register("invalidate", invalidation.apply_changes)
+        if shards.SHARDED:
+            # keep the idmapper caches of the shards in sync
+            invalidation.connect(partial(shards.SHARD_BUS.send, "invalidate"))
+            # registers the shard bus operation used to add tickers on shard 0
+            from evennia.scripts import tickerhandler  # noqa
+
         self.start_time = time.time()
 
         # wrap the SIGINT handler to make sure we empty the threadpool
@@ -358,6 +376,9 @@ class Evennia:
 
         """
         global INFO_DICT
+        if not PRIMARY_SHARD:
+            # only done by the primary Server
+            return
         initial_setup = importlib.import_module(settings.INITIAL_SETUP_MODULE)
         last_initial_setup_step = ServerConfig.objects.conf("last_initial_setup_step")
         try:
@@ -424,7 +445,8 @@ class Evennia:
         self.maintenance_task.start(60, now=True)  # call every minute
 
         # update eventual changed defaults
-        self.update_defaults()
+        if PRIMARY_SHARD:
+            self.update_defaults()
 
         # run at_init() on all cached entities on reconnect
         [
@@ -438,6 +460,9 @@ class Evennia:
         if mode == "reload":
             logger.log_msg("Server successfully reloaded.")
             self.at_server_reload_start()
+        elif not PRIMARY_SHARD:
+            # the cold-start cleanup is done by the primary Server
+            logger.log_msg(f"Evennia Server shard {shards.SHARD} successfully started.")
         elif mode == "reset":
             # only run hook, don't purge sessions
             self.at_server_cold_start()
@@ -479,6 +504,27 @@ class Evennia:
         from evennia.server.models import ServerConfig
         from evennia.utils import gametime as _GAMETIME_MODULE
 
+        if not PRIMARY_SHARD:
+            # the global state is saved by the primary Server
+            yield [o.at_server_reload() for o in ObjectDB.get_all_cached_instances()]
+            yield [p.at_server_reload() for p in AccountDB.get_all_cached_instances()]
+            if self.amp_protocol:
+                yield self.sessions.all_sessions_portal_sync()
+            if mode == "reload":
+                # the monitors and OOB watches of this shard's sessions, under
+                # keys of their own
+                from evennia.scripts.monitorhandler import MONITOR_HANDLER
+                from evennia.scripts.statehandler import OOB_STATE_HANDLER
+
+                MONITOR_HANDLER.save()
+                OOB_STATE_HANDLER.save()
+            invalidation.send_pending()
+            self.at_server_stop()
+            if not _reactor_stopping:
+                self.shutdown_complete = True
+                reactor.callLater(1, reactor.stop)
+            return
+
         if mode == "reload":
             # call restart hooks
             ServerConfig.objects.conf("server_restart_mode", "reload")
@@ -495,6 +541,10 @@ class Evennia:
             from evennia.scripts.monitorhandler import MONITOR_HANDLER
 
             MONITOR_HANDLER.save()
+
+            from evennia.scripts.statehandler import OOB_STATE_HANDLER
+
+            OOB_STATE_HANDLER.save()
         else:
             if mode == "reset":
                 # like shutdown but don't unset the is_connected flag and don't disconnect sessions
@@ -592,11 +642,25 @@ class Evennia:
             mode (str): One of 'reload', 'reset' or 'shutdown'.
 
         """
+        # start the task handler; each shard runs its own persistent delays
+        from evennia.scripts.taskhandler import TASK_HANDLER
 
+        TASK_HANDLER.load()
+        TASK_HANDLER.create_delays()
+
+        # each shard also saves and restores its own monitors and OOB watches
         from evennia.scripts.monitorhandler import MONITOR_HANDLER
 
         MONITOR_HANDLER.restore(mode == "reload")
 
+        from evennia.scripts.statehandler import OOB_STATE_HANDLER
+
+        OOB_STATE_HANDLER.restore(mode == "reload")
+
+        if not PRIMARY_SHARD:
+            # the other timers and channels are handled by the primary Server
+            return
+
         from evennia.scripts.tickerhandler import TICKER_HANDLER
 
         TICKER_HANDLER.restore(mode == "reload")
@@ -604,12 +668,6 @@ class Evennia:
         # Un-pause all scripts, stop non-persistent timers
         ScriptDB.objects.update_scripts_after_server_start()
 
-        # start the task handler
-        from evennia.scripts.taskhandler import TASK_HANDLER
-
-        TASK_HANDLER.load()
-        TASK_HANDLER.create_delays()
-
         # create/update channels
         self.create_default_channels()
 
@@ -640,7 +698,11 @@ class Evennia:
         # Remove non-persistent scripts
         from evennia.scripts.models import ScriptDB
 
-        for script in ScriptDB.objects.filter(db_persistent=False):
+        non_persistent = ScriptDB.objects.filter(db_persistent=False)
+        if settings.SCRIPTS_BOOT_TIMED_ONLY:
+            # stopping an inactive script only matters to its timer
+            non_persistent = non_persistent.filter(db_is_active=True)
+        for script in non_persistent:
             script._stop_task()
 
         if GUEST_ENABLED:
@@ -686,8 +748,13 @@ application = service.Application("Evennia")
 
 if "--nodaemon" not in sys.argv and "test" not in sys.argv:
     # activate logging for interactive/testing mode
+    logfilename = os.path.basename(settings.SERVER_LOG_FILE)
+    if not PRIMARY_SHARD:
+        # each shard logs to its own file, like server-1.log
+        name, ext = os.path.splitext(logfilename)
+        logfilename = f"{name}-{shards.SHARD}{ext}"
     logfile = logger.WeeklyLogFile(
-        os.path.basename(settings.SERVER_LOG_FILE),
+        logfilename,
         os.path.dirname(settings.SERVER_LOG_FILE),
         day_rotation=settings.SERVER_LOG_DAY_ROTATION,
         max_size=settings.SERVER_LOG_MAX_SIZE,
@@ -12,14 +12,16 @@ from django.conf import settings
 from django.utils import timezone
 
 from evennia.commands.cmdsethandler import CmdSetHandler
-from evennia.comms.models import ChannelDB
+from evennia.comms.models import ChannelDB, SubscriptionHandler
 from evennia.scripts.monitorhandler import MONITOR_HANDLER
+from evennia.scripts.statehandler import OOB_STATE_HANDLER
 from evennia.typeclasses.attributes import (
     AttributeHandler,
     DbHolder,
     InMemoryAttributeBackend,
 )
 from evennia.utils import logger
+from evennia.utils.dbserialize import dbserialize, dbunserialize
 from evennia.utils.utils import class_from_module, lazy_property, make_iter
 
 _GA = object.__getattribute__
@@ -53,6 +55,7 @@ class ServerSession(_BASE_SESSION_CLASS):
         """
         self.puppet = None
         self.account = None
+        self.shard = 0
         self.cmdset_storage_string = ""
         self.cmdset = CmdSetHandler(self, True)
 
@@ -122,6 +125,8 @@ class ServerSession(_BASE_SESSION_CLASS):
         # Update account's last login time.
         self.account.last_login = timezone.now()
         self.account.save()
+        # the account may now be online on its channels
+        SubscriptionHandler.reset_online_cache()
 
         # add the session-level cmdset
         self.cmdset = CmdSetHandler(self, True)
@@ -144,11 +149,65 @@ class ServerSession(_BASE_SESSION_CLASS):
             if not self.sessionhandler.sessions_from_account(account):
                 # no more sessions connected to this account
                 account.is_connected = False
+                SubscriptionHandler.reset_online_cache()
             # this may be used to e.g. delete account after disconnection etc
             account.at_post_disconnect()
             # remove any webclient settings monitors associated with this
             # session
             MONITOR_HANDLER.remove(account, "_saved_webclient_options", self.sessid)
+            # stop sending OOB state updates to this session
+            OOB_STATE_HANDLER.unwatch_session(self)
+
+    def get_handoff_data(self):
+        """
+        Get the state of the Session that is not part of its sync data, as it
+        is handed over to another Server shard (see
+        `ServerSessionHandler.handoff`). Its monitors and OOB watches are
+        removed from this shard.
+
+        Returns:
+            str: The serialized state, for `load_handoff_data`.
+
+        Notes:
+            Only `ndb` values that can be serialized like Attributes are carried
+            over; others are dropped. Non-persistent cmdsets are added again
+            from their paths on the other shard, so any changes made to the
+            cmdset instance are lost.
+
+        """
+        ndb = []
+        for attr in self.nattributes.all():
+            try:
+                dbserialize(attr.value)
+            except Exception:
+                continue
+            ndb.append((attr.key, attr.category, attr.value))
+        cmdsets = [cmdset.path for cmdset in self.cmdset.cmdset_stack[1:] if not cmdset.persistent]
+        return dbserialize(
+            {
+                "ndb": ndb,
+                "cmdsets": cmdsets,
+                "monitors": MONITOR_HANDLER.save_session(self),
+                "watches": OOB_STATE_HANDLER.save_session(self),
+            }
+        )
+
+    def load_handoff_data(self, handoffdata):
+        """
+        Load the state the Session had on the Server shard that handed it over
+        to this one. This is called after `at_sync`.
+
+        Args:
+            handoffdata (str): The state, from `get_handoff_data`.
+
+        """
+        handoffdata = dbunserialize(handoffdata)
+        for key, category, value in handoffdata["ndb"]:
+            self.nattributes.add(key, value, category=category)
+        for path in handoffdata["cmdsets"]:
+            self.cmdset.add(path)
+        MONITOR_HANDLER.restore_session(handoffdata["monitors"])
+        OOB_STATE_HANDLER.restore_session(self, handoffdata["watches"])
 
     def get_account(self):
         """
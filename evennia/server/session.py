@@ -69,6 +69,8 @@ class Session:
 
         # database id of puppeted object (if any)
         self.puid = None
+        # the Server shard handling this session (see settings.SERVER_SHARDS)
+        self.shard = 0
 
         # session time statistics
         self.conn_time = time.time()
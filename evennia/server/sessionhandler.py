@@ -19,6 +19,7 @@ from django.conf import settings
 from django.utils.translation import gettext as _
 
 from evennia.commands.cmdhandler import CMD_LOGINSTART
+from evennia.server import invalidation, shards
 from evennia.server.portal import amp
 from evennia.server.signals import (
     SIGNAL_ACCOUNT_POST_FIRST_LOGIN,
@@ -44,6 +45,7 @@ _ServerSession = None
 _ServerConfig = None
 _ScriptDB = None
 _OOB_HANDLER = None
+_BASE_DATA_OUT = None
 
 _ERR_BAD_UTF8 = _("Your client sent an incorrect UTF-8 sequence.")
 
@@ -93,6 +95,28 @@ def delayed_import():
     assert _ScriptDB, "ScriptDB class c ould not load"
 
 
+def _overrides_data_out(session):
+    """
+    Check if a session customizes what it sends, by overriding `data_out`.
+
+    Args:
+        session (ServerSession): The session.
+
+    Returns:
+        bool: If the session's `data_out` is not the one of `ServerSession`.
+
+    """
+    global _BASE_DATA_OUT
+    if not _BASE_DATA_OUT:
+        from evennia.server.serversession import ServerSession
+
+        _BASE_DATA_OUT = ServerSession.data_out
+    return (
+        getattr(type(session), "data_out", None) is not _BASE_DATA_OUT
+        or "data_out" in session.__dict__
+    )
+
+
 # -----------------------------------------------------------
 # SessionHandler base class
 # ------------------------------------------------------------
@@ -154,16 +178,24 @@ class SessionHandler(dict):
         else:
             return [session for session in self.values() if session.logged_in]
 
-    def get_all_sync_data(self):
+    def get_all_sync_data(self, shard=None):
         """
         Create a dictionary of sessdata dicts representing all
         sessions in store.
 
+        Args:
+            shard (int, optional): Only include the sessions handled by this
+                Server shard.
+
         Returns:
             syncdata (dict): A dict of sync data.
 
         """
-        return dict((sessid, sess.get_sync_data()) for sessid, sess in self.items())
+        return dict(
+            (sessid, sess.get_sync_data())
+            for sessid, sess in self.items()
+            if shard is None or getattr(sess, "shard", 0) == shard
+        )
 
     def clean_senddata(self, session, kwargs):
         """
@@ -310,6 +342,8 @@ class ServerSessionHandler(SessionHandler):
         self.server_data = {"servername": _SERVERNAME}
         # will be set on psync
         self.portal_start_time = 0.0
+        # sessids handed off to other shards that the Portal may still send input for
+        self.handed_off = set()
 
     def _run_cmd_login(self, session):
         """
@@ -416,6 +450,68 @@ class ServerSessionHandler(SessionHandler):
         if _BROADCAST_SERVER_RESTART_MESSAGES:
             self.announce_all(_(" ... Server restarted."))
 
+    def portal_handoff(self, sessiondata, handoffdata=None):
+        """
+        Called by Portal when another Server shard handed a Session over to
+        this one (see `handoff`). The Session's puppet is re-puppeted like
+        after a reload, without calling any puppet hooks.
+
+        Args:
+            sessiondata (dict): The sync data of the Session.
+            handoffdata (str, optional): The state the Session had on the other
+                shard, from `ServerSession.get_handoff_data`.
+
+        """
+        delayed_import()
+        global _ServerSession, _AccountDB
+
+        sess = _ServerSession()
+        sess.sessionhandler = self
+        sess.load_sync_data(sessiondata)
+        if sess.uid:
+            sess.account = _AccountDB.objects.get_account_from_uid(sess.uid)
+        self[sess.sessid] = sess
+        shards.update_session_shards({sess.sessid: (shards.SHARD, sess.uid)})
+        sess.at_sync()
+        if handoffdata:
+            sess.load_handoff_data(handoffdata)
+
+    def portal_handoff_done(self, sessid):
+        """
+        Called by Portal once it knows of a handoff we made (see `handoff`); it
+        sends nothing more for the Session to us after this. We answer so the
+        Portal can send on the input it held back meanwhile.
+
+        Args:
+            sessid (int): The id of the Session we handed off.
+
+        """
+        self.handed_off.discard(sessid)
+        stub = DummySession()
+        stub.sessid = sessid
+        self.server.amp_protocol.send_AdminServer2Portal(stub, operation=amp.PHANDOFF)
+
+    def relay_handed_off(self, sessid, **kwargs):
+        """
+        Called when the Portal sent input for a Session we have handed off but
+        before it knew about the handoff. The input is passed back to the
+        Portal, which sends it on to the Session's new shard.
+
+        Args:
+            sessid (int): The id of the Session.
+            **kwargs: The input.
+
+        Returns:
+            bool: If the Session was handed off and the input passed back.
+
+        """
+        if sessid not in self.handed_off:
+            return False
+        stub = DummySession()
+        stub.sessid = sessid
+        self.server.amp_protocol.send_AdminServer2Portal(stub, operation=amp.SRELAY, data=kwargs)
+        return True
+
     def portal_disconnect(self, session):
         """
         Called from Portal when Portal session closed from the portal
@@ -586,6 +682,43 @@ class ServerSessionHandler(SessionHandler):
                 session, operation=amp.SDISCONN, reason=reason
             )
 
+    def handoff(self, session, shard):
+        """
+        Hand a Session over to another Server shard, usually because its puppet
+        moved to a part of the game handled by that shard. The Session stays
+        connected; it's removed from this shard and the Portal passes it on to
+        the other shard (see `portal_handoff`), along with its `ndb`,
+        non-persistent cmdsets, monitors and OOB watches (see
+        `ServerSession.get_handoff_data` for what can't be carried over).
+        Until the Portal knows of the handoff, input it sends us for the
+        Session is passed back to it (see `relay_handed_off`).
+
+        Args:
+            session (Session): The Session to hand off.
+            shard (int): The shard to hand it to.
+
+        """
+        session = self.get(session.sessid)
+        if not session or shard == shards.SHARD:
+            return
+        # make sure the other shard knows all our changes before it takes over
+        invalidation.send_pending()
+
+        sessid = session.sessid
+        # this also removes its monitors and OOB watches from this shard
+        handoffdata = session.get_handoff_data()
+        session.shard = shard
+        sessiondata = session.get_sync_data()
+        del self[sessid]
+        self.handed_off.add(sessid)
+        shards.update_session_shards({sessid: (shard, session.uid)})
+        if session.puppet:
+            # the puppet's session is now on another shard
+            session.puppet.sessions._recache()
+        self.server.amp_protocol.send_AdminServer2Portal(
+            session, operation=amp.SHANDOFF, sessiondata=sessiondata, handoffdata=handoffdata
+        )
+
     def all_sessions_portal_sync(self):
         """
         This is called by the server when it reboots. It syncs all session data
@@ -819,6 +952,42 @@ class ServerSessionHandler(SessionHandler):
         # send across AMP
         self.server.amp_protocol.send_MsgServer2Portal(session, **kwargs)
 
+    def data_out_many(self, sessions, **kwargs):
+        """
+        Send the same data to many sessions at once (Server -> Portal).
+
+        Args:
+            sessions (list): Sessions to relay to.
+            text (str, optional): text data to return
+
+        Notes:
+            Unless outgoing messages are parsed with the FuncParser (which is
+            done separately for every session), the outdata is only scrubbed
+            once and relayed to the Portal as a single message. Sessions
+            whose class overrides `ServerSession.data_out` still have their
+            `data_out` called, one by one.
+
+        """
+        sessions = [session for session in sessions if session]
+        if _FUNCPARSER_PARSE_OUTGOING_MESSAGES_ENABLED:
+            bulk, single = [], sessions
+        else:
+            bulk, single = [], []
+            for session in sessions:
+                (single if _overrides_data_out(session) else bulk).append(session)
+            if len(bulk) < 2:
+                single.extend(bulk)
+                bulk = []
+
+        for session in single:
+            session.data_out(**kwargs)
+        if bulk:
+            # clean output for sending
+            kwargs = self.clean_senddata(bulk[0], kwargs)
+
+            # send across AMP
+            self.server.amp_protocol.send_MsgServer2Portal(bulk, **kwargs)
+
     def get_inputfuncs(self):
         """
         Get all registered inputfuncs (access function)
@@ -0,0 +1,353 @@
+"""
+Server shards
+
+With `settings.SERVER_SHARDS` set above 1, the Portal starts that many Server
+processes ('shards'), so that commands are run on more than one CPU core. Each
+shard handles the Sessions whose puppets are in its part of the game world,
+decided by a shard key of the puppet. By default the key is the `zone` Tag of
+the room the puppet is in (see `shard_key_from_zone`), and keys are mapped to
+shards with `settings.SERVER_SHARD_MAP` or by a hash of the key. Objects
+without a shard key belong to shard 0, which also handles all Sessions that
+are not yet logged in.
+
+When a puppet moves into a room belonging to another shard (or is puppeted
+while there), its Sessions are handed over to that shard via the Portal, along
+with their `ndb`, non-persistent cmdsets, monitors and OOB watches (see
+`ServerSessionHandler.handoff`). The Portal holds back input for the Session
+until the old shard has passed back what it got before the handoff. The
+shards talk to each other over a message bus (`SHARD_BUS`), relayed by the
+Portal. It is used for:
+
+- Keeping the idmapper caches of the shards in sync with what the other
+  shards write to the database (see `evennia.server.invalidation`).
+- Sending `msg` output to Sessions handled by another shard, for example to a
+  character puppeted on another shard or to the channel subscribers there.
+- Running the timers of Scripts and the tickers on shard 0 (see
+  `run_script_task` and the `TickerHandler`).
+
+The Portal tells every shard which shard handles each Session
+(`SESSION_SHARDS`).
+
+The timers of Scripts and the tickers only run on shard 0; the other shards
+pass on starting, pausing and stopping them. Persistent delays (`utils.delay`
+with `persistent=True`) run on the shard that made them, which also saves and
+restores them itself: each shard uses its own task ids, so the shards never
+store their tasks under the same key. Likewise each shard saves and restores
+the monitors and OOB watches of its Sessions under keys of its own. The global Scripts and the webserver only
+run on shard 0. All shards use the same database, so this requires a database
+that can be used by many processes at once (not SQLite).
+
+"""
+
+import os
+from collections import defaultdict
+from zlib import crc32
+
+from django.conf import settings
+
+from evennia.server.portal import amp
+from evennia.utils import logger
+from evennia.utils.utils import variable_from_module
+
+SHARDS = max(1, settings.SERVER_SHARDS)
+SHARDED = SHARDS > 1
+# the shard of this process; set by the Portal when starting the Server processes
+SHARD = int(os.environ.get("EVENNIA_SHARD", 0)) if SHARDED else 0
+
+_SHARD_MAP = settings.SERVER_SHARD_MAP
+_SHARD_KEY_FUNC = None
+_SESSIONS = None
+# guard against location loops when looking for the room of an object
+_MAX_LOCATION_DEPTH = 20
+
+# {sessid: (shard, uid)} for all Sessions, as told by the Portal
+SESSION_SHARDS = {}
+# if the Portal has told us about all Sessions since we started
+SESSIONS_SYNCED = False
+# {uid: set of sessids} for all logged-in Sessions
+_UID_SESSIONS = defaultdict(set)
+
+
+def shard_key_from_zone(obj):
+    """
+    The default shard key function (`settings.SERVER_SHARD_KEY_FUNC`), using
+    the `zone` Tag of the room (the top-most location) of an object.
+
+    Args:
+        obj (Object): The object to get the shard key of.
+
+    Returns:
+        str or None: The zone, or `None` if the room has no zone.
+
+    """
+    room = obj
+    for _ in range(_MAX_LOCATION_DEPTH):
+        location = room.location
+        if not location:
+            break
+        room = location
+    zones = room.tags.get(category="zone", return_list=True)
+    return min(zones) if zones else None
+
+
+def get_shard(obj):
+    """
+    Get the shard an object belongs to.
+
+    Args:
+        obj (Object): The object.
+
+    Returns:
+        int: The shard number, always 0 if sharding is not used.
+
+    """
+    global _SHARD_KEY_FUNC
+    if not SHARDED:
+        return 0
+    if not _SHARD_KEY_FUNC:
+        _SHARD_KEY_FUNC = variable_from_module(*settings.SERVER_SHARD_KEY_FUNC.rsplit(".", 1))
+    key = _SHARD_KEY_FUNC(obj)
+    if key is None:
+        return 0
+    shard = _SHARD_MAP.get(key)
+    if shard is None:
+        shard = crc32(str(key).encode("utf-8"))
+    return shard % SHARDS
+
+
+def handoff_if_needed(obj):
+    """
+    Hand the Sessions puppeting an object over to the shard the object belongs
+    to, if that is another shard. This is called after the object moved or was
+    puppeted.
+
+    Args:
+        obj (Object): The (possibly) puppeted object.
+
+    """
+    global _SESSIONS
+    if not SHARDED:
+        return
+    sessions = obj.sessions.all()
+    if not sessions:
+        return
+    shard = get_shard(obj)
+    if shard != SHARD:
+        if not _SESSIONS:
+            from evennia.server.sessionhandler import SESSIONS as _SESSIONS
+        for session in sessions:
+            _SESSIONS.handoff(session, shard)
+
+
+def update_session_shards(sessions=None, removed=None, full=False):
+    """
+    Update which shard handles which Session. This is called when the Portal
+    reports changes, or when this shard hands off or takes over a Session.
+
+    Args:
+        sessions (dict, optional): `{sessid: (shard, uid), ...}` for new or
+            changed Sessions.
+        removed (list, optional): The sessids of Sessions that disconnected.
+        full (bool, optional): If `sessions` holds all Sessions, replacing
+            what was known before.
+
+    """
+    global SESSIONS_SYNCED
+    if full:
+        SESSION_SHARDS.clear()
+        _UID_SESSIONS.clear()
+        SESSIONS_SYNCED = True
+    for sessid in removed or ():
+        _, uid = SESSION_SHARDS.pop(sessid, (None, None))
+        if uid:
+            _UID_SESSIONS[uid].discard(sessid)
+    for sessid, (shard, uid) in (sessions or {}).items():
+        _, old_uid = SESSION_SHARDS.get(sessid, (None, None))
+        if old_uid and old_uid != uid:
+            _UID_SESSIONS[old_uid].discard(sessid)
+        SESSION_SHARDS[sessid] = (shard, uid)
+        if uid:
+            _UID_SESSIONS[uid].add(sessid)
+
+
+def is_remote(sessid):
+    """
+    Check if a Session is handled by another shard.
+
+    Args:
+        sessid (int): The Session id.
+
+    Returns:
+        bool: If the Session is known and handled by another shard.
+
+    """
+    return SESSION_SHARDS.get(sessid, (SHARD, None))[0] != SHARD
+
+
+def remote_sessids(uid):
+    """
+    Get the ids of the Sessions of an Account that are handled by other shards.
+
+    Args:
+        uid (int): The Account id.
+
+    Returns:
+        list: The sessids.
+
+    """
+    if not SHARDED:
+        return []
+    return [sessid for sessid in _UID_SESSIONS.get(uid, ()) if is_remote(sessid)]
+
+
+def msg_sessions(sessids, **kwargs):
+    """
+    Send output to Sessions handled by other shards.
+
+    Args:
+        sessids (list): The ids of the Sessions.
+        **kwargs: The output, as sent to `session.data_out`.
+
+    """
+    if sessids:
+        SHARD_BUS.send("msg", {"sessids": list(sessids), "kwargs": kwargs})
+
+
+def run_script_task(script, method, **kwargs):
+    """
+    Run a timer method of a Script (like `_start_task`) on shard 0, where the
+    timers of all Scripts run.
+
+    Args:
+        script (Script): The Script.
+        method (str): The name of the method.
+        **kwargs: Passed on to the method. Must be possible to serialize as an
+            Attribute value.
+
+    """
+    from evennia.server import invalidation
+    from evennia.utils.dbserialize import dbserialize
+
+    # make sure shard 0 sees our changes to the Script first
+    invalidation.send_pending()
+    SHARD_BUS.send(
+        "script_task",
+        {"id": script.id, "method": method, "kwargs": dbserialize(kwargs)},
+        shard=0,
+    )
+
+
+class ShardBus:
+    """
+    Sends messages between the shards, relayed by the Portal. Every kind of
+    message has an operation name, and a handler for it is registered with
+    `register`.
+
+    """
+
+    def __init__(self):
+        # {op: callable}
+        self.handlers = {}
+
+    def register(self, op, handler):
+        """
+        Register the handler of an operation.
+
+        Args:
+            op (str): The name of the operation.
+            handler (callable): Called as `handler(data)` with the data sent.
+
+        """
+        self.handlers[op] = handler
+
+    def send(self, op, data=None, shard=None):
+        """
+        Send a message to other shards.
+
+        Args:
+            op (str): The name of the operation.
+            data (any, optional): Picklable data for the handler.
+            shard (int, optional): The shard to send to. If not given, the
+                message goes to all other shards, or, if `data` is a dict with
+                a `sessids` list, to the shards handling those Sessions (each
+                getting only the ids of its own Sessions).
+
+        Returns:
+            Deferred or None: Fires when the message was sent to the Portal,
+                None if not sharded or not connected to the Portal.
+
+        """
+        global _SESSIONS
+        if not SHARDED:
+            return None
+        if not _SESSIONS:
+            from evennia.server.sessionhandler import SESSIONS as _SESSIONS
+        amp_protocol = _SESSIONS.server.amp_protocol if _SESSIONS.server else None
+        if not amp_protocol:
+            return None
+        return amp_protocol.send_AdminServer2Portal(
+            amp.DUMMYSESSION, operation=amp.SBUS, op=op, data=data, shard=shard
+        )
+
+    def receive(self, op, data):
+        """
+        Handle a message from another shard. This is called by the AMP client.
+
+        Args:
+            op (str): The name of the operation.
+            data (any): The data sent.
+
+        """
+        handler = self.handlers.get(op)
+        if not handler:
+            logger.log_err(f"Shard bus: no handler for operation '{op}'.")
+            return
+        try:
+            handler(data)
+        except Exception:
+            logger.log_trace(f"Shard bus: error handling operation '{op}'.")
+
+
+SHARD_BUS = ShardBus()
+
+
+def _receive_msg(data):
+    """
+    Send output from another shard to our Sessions.
+
+    """
+    global _SESSIONS
+    if not _SESSIONS:
+        from evennia.server.sessionhandler import SESSIONS as _SESSIONS
+    for sessid in data["sessids"]:
+        session = _SESSIONS.get(sessid)
+        if session:
+            # the protocols may change the kwargs, so each Session gets a copy
+            session.data_out(**dict(data["kwargs"]))
+
+
+SHARD_BUS.register("msg", _receive_msg)
+
+
+def _receive_script_task(data):
+    """
+    Run a timer method of a Script for another shard (see `run_script_task`).
+
+    """
+    from evennia.scripts.models import ScriptDB
+    from evennia.utils.dbserialize import dbunserialize
+
+    script = ScriptDB.objects.filter(id=data["id"]).first()
+    if not script:
+        # deleted by the other shard, so all that's left is to stop its timer
+        script = ScriptDB.get_cached_instance(data["id"])
+        task = script.ndb._task if script else None
+        if task:
+            if task.running:
+                task.stop()
+            script.ndb._task = None
+        return
+    getattr(script, data["method"])(**dbunserialize(data["kwargs"]))
+
+
+SHARD_BUS.register("script_task", _receive_script_task)
@@ -85,6 +85,23 @@ class TestAMPClientSend(_TestAMP):
         self.amp_server.dataReceived(wire_data)
         self.portal.sessions.data_out.assert_called_with(self.portalsession, text={"foo": "bar"})
 
+    def test_msgserver2portal_many(self, mocktransport):
+        session2 = MagicMock()
+        session2.sessid = 2
+        portalsession2 = session.Session()
+        portalsession2.sessid = 2
+        self.portal.sessions[2] = portalsession2
+
+        self._connect_client(mocktransport)
+        self.amp_client.send_MsgServer2Portal([self.session, session2], text=[["foo"], {}])
+        wire_data = self._catch_wire_read(mocktransport)[0]
+
+        self._connect_server(mocktransport)
+        self.amp_server.dataReceived(wire_data)
+        self.portal.sessions.data_out.assert_any_call(self.portalsession, text=(["foo"], {}))
+        self.portal.sessions.data_out.assert_any_call(portalsession2, text=(["foo"], {}))
+        self.assertEqual(self.portal.sessions.data_out.call_count, 2)
+
     def test_adminserver2portal(self, mocktransport):
         self._connect_client(mocktransport)
 
@@ -122,3 +139,156 @@ class TestAMPClientRecv(_TestAMP):
         self.server.sessions.portal_disconnect_all = MagicMock()
         self.amp_client.dataReceived(wire_data)
         self.server.sessions.portal_disconnect_all.assert_called()
+
+
+@patch("evennia.server.portal.amp_server._SHARDED", True)
+class TestAMPShardRouting(_TestAMP):
+    """Test the portal routing data to many server shards"""
+
+    def setUp(self):
+        super().setUp()
+        self.connections = {0: MagicMock(), 1: MagicMock()}
+        self.amp_server_factory.server_connections.update(self.connections)
+        self.portalsession.shard = 0
+        portalsession2 = session.Session()
+        portalsession2.sessid = 2
+        portalsession2.shard = 1
+        self.portal.sessions[2] = portalsession2
+        self.portalsession2 = portalsession2
+
+    def tearDown(self):
+        del self.portal.sessions[2]
+        super().tearDown()
+
+    def _sent(self, shard):
+        "Get the (sessid, kwargs) sent to a shard"
+        return [
+            amp.loads(kwargs["packed_data"])
+            for _, kwargs in self.connections[shard].callRemote.call_args_list
+        ]
+
+    def test_msg_to_session_shard(self):
+        self.amp_server.send_MsgPortal2Server(self.portalsession2, text="foo")
+        self.assertEqual(self._sent(1), [(2, {"text": "foo"})])
+        self.assertEqual(self._sent(0), [])
+
+        self.amp_server.send_MsgPortal2Server(self.portalsession, text="bar")
+        self.assertEqual(self._sent(0), [(1, {"text": "bar"})])
+
+    def test_relay_by_sessids(self):
+        self.amp_server.relay_shard_bus("msg", {"sessids": [1, 2, 9999], "kwargs": {}})
+        self.assertEqual(self._sent(0)[0][1]["data"]["sessids"], [1])
+        self.assertEqual(self._sent(1)[0][1]["data"]["sessids"], [2])
+
+    def test_relay_to_others(self):
+        self.amp_server.shard = 1
+        self.amp_server.relay_shard_bus("invalidate", [("save", "objects.ObjectDB", 1, None)])
+        self.assertEqual(self._sent(1), [])
+        sessid, kwargs = self._sent(0)[0]
+        self.assertEqual(kwargs["operation"], amp.SBUS)
+        self.assertEqual(kwargs["op"], "invalidate")
+
+    def test_relay_invalidation(self):
+        changes = [("save", "objects.ObjectDB", 1, ("db_key",))]
+        self.amp_server.portal_receive_launcher2portal(
+            amp.SINVALIDATE.encode("utf-8"), amp.dumps(changes)
+        )
+        self.assertIsNone(self.amp_server_factory.launcher_connection)
+        for shard in (0, 1):
+            sessid, kwargs = self._sent(shard)[0]
+            self.assertEqual(kwargs["operation"], amp.SBUS)
+            self.assertEqual(kwargs["data"], changes)
+
+    def _operations(self, shard):
+        "Get the admin operations sent to a shard"
+        return [kwargs.get("operation") for _, kwargs in self._sent(shard)]
+
+    def test_handoff_holds_back_input(self):
+        # receiving from shard 0 makes this protocol its connection
+        self.amp_server.shard = 0
+        self.amp_server.callRemote = self.connections[0].callRemote
+        self.amp_server.portal_receive_adminserver2portal(
+            amp.dumps(
+                (
+                    1,
+                    {
+                        "operation": amp.SHANDOFF,
+                        "sessiondata": {"shard": 1, "uid": None},
+                        "handoffdata": "x",
+                    },
+                )
+            )
+        )
+        self.assertEqual(self.portalsession.shard, 1)
+        self.assertEqual(self._operations(1), [amp.SHANDOFF, amp.PSHARDS])
+        self.assertEqual(self._sent(1)[0][1]["handoffdata"], "x")
+        self.assertEqual(self._operations(0), [amp.PSHARDS, amp.PHANDOFF])
+
+        # held back until the old shard has passed back what it got before
+        self.amp_server.send_MsgPortal2Server(self.portalsession, text="new")
+        self.assertEqual(len(self._sent(1)), 2)
+        self.amp_server.portal_receive_adminserver2portal(
+            amp.dumps((1, {"operation": amp.SRELAY, "data": {"text": "old"}}))
+        )
+        self.assertEqual(self._sent(1)[2], (1, {"text": "old"}))
+        self.amp_server.portal_receive_adminserver2portal(
+            amp.dumps((1, {"operation": amp.PHANDOFF}))
+        )
+        self.assertEqual(self._sent(1)[3], (1, {"text": "new"}))
+        self.assertEqual(self.amp_server_factory.handoffs, {})
+
+        self.amp_server.send_MsgPortal2Server(self.portalsession, text="next")
+        self.assertEqual(self._sent(1)[4], (1, {"text": "next"}))
+
+    @patch("evennia.server.portal.amp_server.reactor")
+    def test_handoff_shard_lost(self, mock_reactor):
+        protocols = self._shard_protocols()
+        self.portalsession.shard = 1
+        self.amp_server_factory.handoffs[1] = [{0}, [{"text": "new"}]]
+        with patch.object(protocols[1], "callRemote") as mock_call:
+            protocols[0].connectionLost(None)
+        self.assertEqual(self.amp_server_factory.handoffs, {})
+        self.assertEqual(amp.loads(mock_call.call_args[1]["packed_data"]), (1, {"text": "new"}))
+
+    def _shard_protocols(self):
+        "Replace the mock shard connections with protocols we can disconnect"
+        protocols = {}
+        for shard in (0, 1):
+            protocols[shard] = self.amp_server_factory.buildProtocol("127.0.0.1")
+            protocols[shard].shard = shard
+        self.amp_server_factory.server_connections.clear()
+        self.amp_server_factory.server_connections.update(protocols)
+        self.amp_server_factory.server_connection = protocols[0]
+        return protocols
+
+    @patch("evennia.server.portal.amp_server.reactor")
+    def test_reload_waits_for_all_shards(self, mock_reactor):
+        protocols = self._shard_protocols()
+        self.portal.server_twistd_cmd = ["twistd"]
+        with patch.object(amp_server.AMPServerProtocol, "send_AdminPortal2Server"), patch.object(
+            amp_server.AMPServerProtocol, "start_server"
+        ) as mock_start:
+            # shard 0 asks for a reload
+            protocols[0].portal_receive_adminserver2portal(
+                amp.dumps((0, {"operation": amp.SRELOAD}))
+            )
+            protocols[0].connectionLost(None)
+            # shard 1 is still running
+            mock_start.assert_not_called()
+            protocols[1].connectionLost(None)
+            mock_start.assert_called_once_with(["twistd"])
+        # the shards were told to stop, so they are not restarted one by one
+        mock_reactor.callLater.assert_not_called()
+        self.assertFalse(self.amp_server_factory.servers_stopping)
+
+    @patch("evennia.server.portal.amp_server.reactor")
+    def test_restart_stopped_shard(self, mock_reactor):
+        protocols = self._shard_protocols()
+        self.portal.server_twistd_cmd = ["twistd"]
+        protocols[1].connectionLost(None)
+        mock_reactor.callLater.assert_called_once_with(
+            amp_server._SHARD_RESTART_DELAY, protocols[1].restart_shard, 1
+        )
+        with patch.object(amp_server.AMPServerProtocol, "_start_server_process") as mock_start:
+            protocols[1].restart_shard(1)
+        mock_start.assert_called_once_with(["twistd"], 1)
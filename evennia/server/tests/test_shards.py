@@ -0,0 +1,361 @@
+"""
+Test Server shards and the idmapper cache invalidation between them.
+
+"""
+
+import pickle
+import threading
+
+from mock import MagicMock, patch
+from twisted.protocols.amp import parseString
+
+from evennia.objects.models import ObjectDB
+from evennia.scripts import tickerhandler
+from evennia.scripts.models import ScriptDB
+from evennia.scripts.monitorhandler import MONITOR_HANDLER
+from evennia.scripts.scripthandler import SCRIPT_OWNER_CACHE
+from evennia.scripts.scripts import DefaultScript
+from evennia.scripts.statehandler import OOB_STATE_HANDLER
+from evennia.server import invalidation, shards
+from evennia.server.portal import amp
+from evennia.server.sessionhandler import SESSIONS
+from evennia.typeclasses.attributes import AttributeHandler, ModelAttributeBackend
+from evennia.utils import create
+from evennia.utils.test_resources import BaseEvenniaTest
+
+_TYPECLASS = "evennia.objects.objects.DefaultObject"
+_SCRIPT_TYPECLASS = "evennia.scripts.scripts.DefaultScript"
+_CMDSET = "evennia.commands.default.cmdset_unloggedin.UnloggedinCmdSet"
+
+
+def _monitor_callback(**kwargs):
+    pass
+
+
+@patch.multiple(
+    "evennia.server.shards", SHARDED=True, SHARDS=2, SHARD=0, SESSIONS_SYNCED=False, _SHARD_MAP={}
+)
+class TestShards(BaseEvenniaTest):
+    def tearDown(self):
+        shards.update_session_shards(full=True)
+        super().tearDown()
+
+    def test_get_shard(self):
+        self.assertEqual(shards.get_shard(self.obj1), 0)
+        self.room1.tags.add("north", category="zone")
+        with patch.dict("evennia.server.shards._SHARD_MAP", {"north": 1}):
+            self.assertEqual(shards.get_shard(self.obj1), 1)
+            self.obj2.location = self.obj1
+            self.assertEqual(shards.get_shard(self.obj2), 1)
+        self.assertIn(shards.get_shard(self.obj1), (0, 1))
+        with patch("evennia.server.shards.SHARDED", False):
+            self.assertEqual(shards.get_shard(self.obj1), 0)
+
+    def test_session_shards(self):
+        uid = self.account.id
+        shards.update_session_shards({1: (0, uid), 2: (1, uid), 3: (1, None)})
+        self.assertFalse(shards.is_remote(1))
+        self.assertTrue(shards.is_remote(2))
+        self.assertEqual(shards.remote_sessids(uid), [2])
+        self.assertEqual(self.account.sessions.remote(), [2])
+        shards.update_session_shards(removed=[2])
+        self.assertEqual(shards.remote_sessids(uid), [])
+        shards.update_session_shards({4: (1, uid)}, full=True)
+        self.assertEqual(shards.SESSION_SHARDS, {4: (1, uid)})
+
+    def test_bus_send(self):
+        amp_protocol = MagicMock()
+        with patch.object(SESSIONS, "server", MagicMock(amp_protocol=amp_protocol), create=True):
+            shards.SHARD_BUS.send("foo", {"bar": 1}, shard=1)
+        amp_protocol.send_AdminServer2Portal.assert_called_with(
+            amp.DUMMYSESSION, operation=amp.SBUS, op="foo", data={"bar": 1}, shard=1
+        )
+
+    def test_bus_receive(self):
+        handler = MagicMock()
+        shards.SHARD_BUS.register("test_op", handler)
+        try:
+            shards.SHARD_BUS.receive("test_op", {"bar": 1})
+        finally:
+            del shards.SHARD_BUS.handlers["test_op"]
+        handler.assert_called_with({"bar": 1})
+
+        with patch("evennia.server.shards.logger") as mock_logger:
+            shards.SHARD_BUS.receive("no_such_op", None)
+            mock_logger.log_err.assert_called_once()
+
+    def test_receive_msg(self):
+        with patch.object(self.session, "data_out") as mock_data_out:
+            shards._receive_msg({"sessids": [self.session.sessid, 99], "kwargs": {"text": "hi"}})
+        mock_data_out.assert_called_once_with(text="hi")
+
+    def test_remote_puppet_sessions(self):
+        self.char1.db_sessid = "98,99"
+        self.char1.sessions._recache()
+        self.assertEqual(self.char1.sessions.get(), [])
+        self.assertEqual(self.char1.sessions.remote(), [98, 99])
+        self.assertEqual(self.char1.sessions.count(), 2)
+        self.char1.sessions.remove(98)
+        self.assertEqual(self.char1.db_sessid, "99")
+
+        with patch("evennia.server.shards.msg_sessions") as mock_msg_sessions:
+            self.char1.msg("hello")
+        mock_msg_sessions.assert_called_with([99], text="hello", options=None)
+
+    def test_stale_remote_sessions(self):
+        uid = self.account.id
+        shards.update_session_shards({98: (1, uid)}, full=True)
+        # 99 was left behind by a crash
+        self.char1.db_sessid = "98,99"
+        self.char1.sessions._recache()
+        self.assertEqual(self.char1.sessions.remote(), [98])
+        self.assertEqual(self.char1.db_sessid, "98")
+
+        # 98 disconnected without the other shard cleaning up
+        shards.update_session_shards(removed=[98])
+        self.assertFalse(self.char1.has_account)
+        self.assertEqual(self.char1.db_sessid, "")
+
+    def _bus_data(self, mock_send, op):
+        """Get the data sent over the bus, as it arrives on shard 0."""
+        args, kwargs = mock_send.call_args
+        self.assertEqual(args[0], op)
+        self.assertEqual(kwargs, {"shard": 0})
+        return pickle.loads(pickle.dumps(args[1]))
+
+    def test_script_timer_on_primary(self):
+        with patch("evennia.server.shards.SHARD", 1), patch.object(
+            shards.SHARD_BUS, "send"
+        ) as mock_send:
+            script = create.create_script(DefaultScript, key="timed", interval=100)
+        self.assertIsNone(script.ndb._task)
+        shards._receive_script_task(self._bus_data(mock_send, "script_task"))
+        self.assertTrue(script.ndb._task.running)
+        self.assertTrue(script.is_active)
+
+        with patch("evennia.server.shards.SHARD", 1), patch.object(
+            shards.SHARD_BUS, "send"
+        ) as mock_send:
+            script.stop()
+        self.assertTrue(script.ndb._task.running)
+        shards._receive_script_task(self._bus_data(mock_send, "script_task"))
+        self.assertIsNone(script.ndb._task)
+        self.assertFalse(script.is_active)
+        script.delete()
+
+    def test_ticker_on_primary(self):
+        handler = tickerhandler.TICKER_HANDLER
+        callback = self.obj1.at_object_creation
+        with patch("evennia.server.shards.SHARD", 1), patch.object(
+            shards.SHARD_BUS, "send"
+        ) as mock_send:
+            store_key = handler.add(10, callback, "", False, 5, target=self.obj2)
+        self.assertNotIn(store_key, handler.ticker_storage)
+        tickerhandler._receive_ticker(self._bus_data(mock_send, "ticker"))
+        args, kwargs = handler.ticker_storage[store_key]
+        self.assertEqual(list(args), [5])
+        self.assertEqual(kwargs["target"], self.obj2)
+
+        with patch("evennia.server.shards.SHARD", 1), patch.object(
+            shards.SHARD_BUS, "send"
+        ) as mock_send:
+            handler.remove(10, callback, persistent=False)
+        self.assertIn(store_key, handler.ticker_storage)
+        tickerhandler._receive_ticker(self._bus_data(mock_send, "ticker"))
+        self.assertNotIn(store_key, handler.ticker_storage)
+
+    @patch("evennia.scripts.statehandler.reactor")
+    def test_handoff(self, mock_reactor):
+        sessid = self.session.sessid
+        self.room2.tags.add("south", category="zone")
+        amp_protocol = MagicMock()
+        with patch.dict("evennia.server.shards._SHARD_MAP", {"south": 1}), patch.object(
+            SESSIONS, "server", MagicMock(amp_protocol=amp_protocol), create=True
+        ):
+            self.account.puppet_object(self.session, self.char1)
+            self.session.ndb.foo = "bar"
+            self.session.ndb.lock = threading.Lock()
+            self.session.cmdset.add(_CMDSET)
+            MONITOR_HANDLER.add(
+                self.account, "db_key", _monitor_callback, idstring="test", session=self.session
+            )
+            OOB_STATE_HANDLER.watch(self.char1, self.session)
+            amp_protocol.send_AdminServer2Portal.assert_not_called()
+            self.char1.move_to(self.room2)
+
+            self.assertNotIn(sessid, SESSIONS)
+            self.assertEqual(self.session.shard, 1)
+            self.assertEqual(self.char1.sessions.get(), [])
+            self.assertEqual(self.char1.sessions.remote(), [sessid])
+            self.assertTrue(shards.is_remote(sessid))
+            amp_protocol.send_AdminServer2Portal.assert_called_once()
+            _, kwargs = amp_protocol.send_AdminServer2Portal.call_args
+            self.assertEqual(kwargs["operation"], amp.SHANDOFF)
+            self.assertEqual(kwargs["sessiondata"]["shard"], 1)
+            # the monitors and watches go with the session
+            self.assertEqual(MONITOR_HANDLER.all(self.account), [])
+            self.assertEqual(OOB_STATE_HANDLER.all(self.char1), [])
+
+            # input the portal sent before it knew of the handoff is passed back
+            amp_protocol.reset_mock()
+            self.assertTrue(SESSIONS.relay_handed_off(sessid, text=[["look"], {}]))
+            stub, kwargs_relay = amp_protocol.send_AdminServer2Portal.call_args
+            self.assertEqual(stub[0].sessid, sessid)
+            self.assertEqual(kwargs_relay["operation"], amp.SRELAY)
+            self.assertEqual(kwargs_relay["data"], {"text": [["look"], {}]})
+            SESSIONS.portal_handoff_done(sessid)
+            _, kwargs_done = amp_protocol.send_AdminServer2Portal.call_args
+            self.assertEqual(kwargs_done["operation"], amp.PHANDOFF)
+            self.assertFalse(SESSIONS.relay_handed_off(sessid, text=[["look"], {}]))
+
+            # taking the session back
+            sessiondata = dict(kwargs["sessiondata"], shard=0)
+            SESSIONS.portal_handoff(sessiondata, kwargs["handoffdata"])
+        session = SESSIONS[sessid]
+        self.assertEqual(session.account, self.account)
+        self.assertEqual(session.puppet, self.char1)
+        self.assertEqual(self.char1.sessions.get(), [session])
+        self.assertFalse(shards.is_remote(session.sessid))
+        self.assertEqual(session.ndb.foo, "bar")
+        # what can't be serialized is dropped
+        self.assertIsNone(session.ndb.lock)
+        self.assertTrue(session.cmdset.has(_CMDSET))
+        (monitor,) = MONITOR_HANDLER.all(self.account)
+        self.assertEqual(monitor[4]["session"], session)
+        self.assertEqual(OOB_STATE_HANDLER.all(self.char1), [(self.char1, session, "state")])
+        MONITOR_HANDLER.remove(self.account, "db_key", idstring="test")
+        OOB_STATE_HANDLER.unwatch_session(session)
+        self.session = session
+
+    def test_savekey_per_shard(self):
+        with patch("evennia.server.shards.SHARD", 1):
+            self.assertEqual(type(MONITOR_HANDLER)().savekey, MONITOR_HANDLER.savekey + "_1")
+            self.assertEqual(type(OOB_STATE_HANDLER)().savekey, OOB_STATE_HANDLER.savekey + "_1")
+
+
+class TestInvalidation(BaseEvenniaTest):
+    def tearDown(self):
+        invalidation.disconnect()
+        super().tearDown()
+
+    def test_send_pending(self):
+        sender = MagicMock()
+        invalidation.connect(sender)
+        self.obj1.key = "Newname"
+        self.obj1.db_desc = "a desc"
+        self.obj1.save()
+        self.obj1.tags.add("foo")
+        invalidation.send_pending()
+
+        sender.assert_called_once()
+        changes = sender.call_args[0][0]
+        self.assertIn(("save", "objects.ObjectDB", self.obj1.id, None), changes)
+        self.assertIn(("m2m", "objects.ObjectDB", self.obj1.id, ("db_tags",)), changes)
+        self.assertEqual(len(changes), len(set(changes)))
+
+        sender.reset_mock()
+        invalidation.send_pending()
+        sender.assert_not_called()
+
+    def test_apply_save(self):
+        ObjectDB.objects.filter(id=self.obj1.id).update(db_key="Changed")
+        self.assertEqual(self.obj1.key, "Obj")
+        invalidation.apply_changes([("save", "objects.ObjectDB", self.obj1.id, ("db_key",))])
+        self.assertEqual(self.obj1.key, "Changed")
+
+    def test_apply_move(self):
+        self.assertIn(self.obj1, self.room1.contents)
+        ObjectDB.objects.filter(id=self.obj1.id).update(db_location=self.room2)
+        invalidation.apply_changes([("save", "objects.ObjectDB", self.obj1.id, None)])
+        self.assertEqual(self.obj1.location, self.room2)
+        self.assertNotIn(self.obj1, self.room1.contents)
+        self.assertIn(self.obj1, self.room2.contents)
+
+    def test_apply_new_object(self):
+        self.assertTrue(self.room1.contents)
+        # as if created by another process, bypassing our cache
+        ObjectDB.objects.bulk_create(
+            [ObjectDB(db_key="New", db_location=self.room1, db_typeclass_path=_TYPECLASS)]
+        )
+        obj_id = ObjectDB.objects.filter(db_key="New").values_list("id", flat=True)[0]
+        self.assertNotIn(obj_id, [obj.id for obj in self.room1.contents])
+        invalidation.apply_changes([("save", "objects.ObjectDB", obj_id, None)])
+        self.assertIn(obj_id, [obj.id for obj in self.room1.contents])
+
+    def test_apply_delete(self):
+        obj1_id = self.obj1.id
+        self.assertIn(self.obj1, self.room1.contents)
+        invalidation.apply_changes([("delete", "objects.ObjectDB", obj1_id, None)])
+        self.assertIsNone(ObjectDB.get_cached_instance(obj1_id))
+        self.assertNotIn(obj1_id, [obj.id for obj in self.room1.contents])
+
+    def test_apply_m2m(self):
+        self.obj1.tags.add("foo")
+        with patch.object(self.obj1.tags, "reset_cache") as mock_reset:
+            invalidation.apply_changes([("m2m", "objects.ObjectDB", self.obj1.id, ("db_tags",))])
+        mock_reset.assert_called_once()
+
+    def test_apply_attribute_delete(self):
+        self.obj1.attributes.add("foo", 1)
+        # the Attribute cache of obj1 in another process
+        other = AttributeHandler(self.obj1, ModelAttributeBackend)
+        self.assertEqual(other.get("foo"), 1)
+        sender = MagicMock()
+        invalidation.connect(sender)
+        self.obj1.attributes.remove("foo")
+        invalidation.send_pending()
+        changes = sender.call_args[0][0]
+        with patch.dict(self.obj1.__dict__, {"attributes": other}):
+            invalidation.apply_changes(changes)
+        self.assertIsNone(other.get("foo"))
+
+    def test_apply_script_save(self):
+        SCRIPT_OWNER_CACHE.load()
+        self.assertFalse(SCRIPT_OWNER_CACHE.has_scripts(self.obj1))
+        self.assertFalse(SCRIPT_OWNER_CACHE.has_scripts(self.obj2))
+        # a new Script, as if created by another process
+        ScriptDB.objects.bulk_create(
+            [ScriptDB(db_key="New", db_obj=self.obj1, db_typeclass_path=_SCRIPT_TYPECLASS)]
+        )
+        script_id = ScriptDB.objects.filter(db_key="New").values_list("id", flat=True)[0]
+        invalidation.apply_changes([("save", "scripts.ScriptDB", script_id, None)])
+        self.assertTrue(SCRIPT_OWNER_CACHE.has_scripts(self.obj1))
+
+        # a cached Script moved to another object
+        script = create.create_script(DefaultScript, key="Moved")
+        ScriptDB.objects.filter(id=script.id).update(db_obj=self.obj2)
+        invalidation.apply_changes([("save", "scripts.ScriptDB", script.id, ("db_obj",))])
+        self.assertEqual(script.obj, self.obj2)
+        self.assertTrue(SCRIPT_OWNER_CACHE.has_scripts(self.obj2))
+        SCRIPT_OWNER_CACHE.clear()
+
+    def test_send_to_portal(self):
+        changes = [("save", "objects.ObjectDB", pk, ("db_key",)) for pk in range(100)]
+        with patch("evennia.server.invalidation.socket.create_connection") as mock_connect:
+            invalidation.send_to_portal(changes)
+            with patch("evennia.server.invalidation._MAX_AMP_VALUE", 1000):
+                invalidation.send_to_portal(changes)
+        sock = mock_connect.return_value.__enter__.return_value
+        for call, many in zip(sock.sendall.call_args_list, (False, True)):
+            boxes = parseString(call[0][0])
+            # with a small max value, the changes are split
+            self.assertEqual(len(boxes) > 1, many)
+            self.assertEqual(boxes[0][b"operation"], amp.SINVALIDATE.encode("utf-8"))
+            sent = [change for box in boxes for change in pickle.loads(box[b"arguments"])]
+            self.assertEqual(sent, changes)
+
+        # no running game
+        with patch(
+            "evennia.server.invalidation.socket.create_connection",
+            side_effect=ConnectionRefusedError,
+        ):
+            invalidation.send_to_portal(changes)
+
+    def test_connect_external(self):
+        with patch("evennia.server.invalidation.send_to_portal") as mock_send:
+            invalidation.connect_external()
+            self.obj1.key = "Newname"
+            self.assertIsInstance(invalidation._SEND_CALL, threading.Timer)
+            invalidation.send_pending()
+        mock_send.assert_called_once_with([("save", "objects.ObjectDB", self.obj1.id, ("db_key",))])
+        self.assertIsNone(invalidation._SEND_CALL)
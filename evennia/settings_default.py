@@ -12,6 +12,7 @@ value - which may change as Evennia is developed. This way you can
 always be sure of what you have changed and what is default behaviour.
 
 """
+
 import os
 import sys
 
@@ -53,6 +54,14 @@ SSL_INTERFACES = ["0.0.0.0"]
 # server-side (see INPUT_FUNC_MODULES). TELNET_ENABLED is required for this
 # to work.
 TELNET_OOB_ENABLED = False
+# OOB clients (and the webclient) watching the state of an object (like
+# their character's health and location) get the changed keys at most this
+# often (in seconds). All changes made within this time are sent together.
+OOB_STATE_UPDATE_INTERVAL = 0.2
+# Monitors added to the MonitorHandler with `batched=True` (like the ones set
+# up by the `monitor` inputfunc) fire at most this often (in seconds), with
+# the latest value, no matter how often the monitored value changes.
+MONITOR_BATCH_INTERVAL = 0.1
 # Activate SSH protocol communication (SecureShell)
 SSH_ENABLED = False
 # Ports to use for SSH
@@ -117,6 +126,21 @@ EVENNIA_ADMIN = True
 AMP_HOST = "localhost"
 AMP_PORT = 4006
 AMP_INTERFACE = "127.0.0.1"
+# Run the game in this many Server processes ('shards') behind the one Portal,
+# to use more than one CPU core for running commands. Each Session is handled by
+# the shard its puppet belongs to, and moves between shards with the puppet. The
+# shards keep each other's caches up to date and relay messages between them.
+# Script timers, tickers, global scripts and the webserver run only on the first
+# shard (shard 0); persistent delays (utils.delay) run on the shard making them.
+# Using more than one shard requires a database that handles access from many
+# processes, such as PostgreSQL or MySQL; don't use this with SQLite.
+SERVER_SHARDS = 1
+# Callable taking an object and returning its shard key, or None for shard 0. The
+# default is the 'zone' Tag (see the Zones docs) of the object's room.
+SERVER_SHARD_KEY_FUNC = "evennia.server.shards.shard_key_from_zone"
+# Map shard keys to shard numbers, like {"magicalforest": 1, "city": 2}. Shard keys
+# not in this map are spread over the shards by a hash of the key.
+SERVER_SHARD_MAP = {}
 
 
 # Path to the lib directory containing the bulk of the codebase's code.
@@ -156,6 +180,19 @@ CHANNEL_LOG_NUM_TAIL_LINES = 20
 # Max size (in bytes) of channel log files before they rotate.
 # Minimum is 1000 (1kB) but should usually be larger.
 CHANNEL_LOG_ROTATE_SIZE = 1000000
+# If set, channels also store their messages in the database (the
+# ChannelMessage model), so channel history can be paged and searched by time,
+# sender and text without reading the log files. Can also be set per channel
+# typeclass with the `store_history` class property.
+CHANNEL_HISTORY_STORE = False
+# Lines logged with `logger.log_file` (like channel messages) are collected and
+# written by a background thread, when LOG_FILE_FLUSH_SIZE bytes are waiting for
+# a file or at the latest LOG_FILE_FLUSH_INTERVAL seconds after they were logged.
+LOG_FILE_FLUSH_INTERVAL = 1.0
+LOG_FILE_FLUSH_SIZE = 65536
+# How many of the latest lines of a log file to keep in memory once it has been
+# tailed (like for channel history), so tailing it again doesn't read the file.
+LOG_FILE_TAIL_CACHE_LINES = 200
 # Unused by default, but used by e.g. the MapSystem contrib. A place for storing
 # semi-permanent data and avoid it being rebuilt over and over. It is created
 # on-demand only.
@@ -225,11 +262,33 @@ MXP_OUTGOING_ONLY = True
 # be necessary (use @server to see how many objects are in the idmapper
 # cache at any time). Setting this to None disables the cache cap.
 IDMAPPER_CACHE_MAXSIZE = 200  # (MB)
+# Django commands run with the evennia launcher while the game is running (like
+# `evennia shell`) tell the Server about the database changes they make, so the
+# Server's idmapper cache doesn't keep serving the old data. Standalone scripts and
+# web processes can do the same by calling
+# `evennia.server.invalidation.connect_external()` after setting up Django.
+CACHE_INVALIDATION_EXTERNAL = True
 # This determines how many connections per second the Portal should
 # accept, as a DoS countermeasure. If the rate exceeds this number, incoming
 # connections will be queued to this rate, so none will be lost.
 # Must be set to a value > 0.
 MAX_CONNECTION_RATE = 2
+# Schedule `utils.delay` tasks with a timing wheel (evennia.utils.timingwheel)
+# driven by one repeating reactor call, instead of one reactor call per task.
+# This makes adding and cancelling delays cheaper when very many are pending,
+# but tasks may run up to DELAY_TIMING_WHEEL_RESOLUTION seconds late.
+DELAY_TIMING_WHEEL = False
+DELAY_TIMING_WHEEL_RESOLUTION = 0.1
+# The timers of all Scripts are run by one scheduler. When many Scripts come
+# due at the same time, at most this many are run per reactor iteration, so
+# the server can handle network traffic in between.
+SCRIPT_SCHEDULER_BATCH_SIZE = 1000
+# When the server starts, all Scripts are loaded, to restart their timers and
+# call their `at_server_start` hooks. With a great many Scripts, this makes the
+# start slow. If this is set, only the Scripts with an active timer are loaded
+# on start; other Scripts are loaded when first accessed and don't get their
+# `at_server_start` hook called.
+SCRIPTS_BOOT_TIMED_ONLY = False
 # Determine how many commands per second a given Session is allowed
 # to send to the Portal via a connected protocol. Too high rate will
 # drop the command and echo a warning. Note that this will also cap
@@ -422,6 +481,13 @@ PROTOTYPE_MODULES = ["world.prototypes"]
 # Modules containining Prototype functions able to be embedded in prototype
 # definitions from in-game.
 PROT_FUNC_MODULES = ["evennia.prototypes.protfuncs"]
+# Let all objects spawned from a prototype share the prototype's Attributes
+# (those with a fixed value), instead of each object storing its own copy.
+# A shared Attribute is stored and cached only once, and is copied to an
+# object the first time it's changed on that object. This saves a lot of
+# database space and memory when spawning many objects from the same
+# prototypes.
+PROTOTYPE_SHARED_ATTRIBUTES = False
 # Module holding settings/actions for the dummyrunner program (see the
 # dummyrunner for more information)
 DUMMYRUNNER_SETTINGS_MODULE = "evennia.server.profiling.dummyrunner_settings"
@@ -542,14 +608,20 @@ BASE_SCRIPT_TYPECLASS = "typeclasses.scripts.Script"
 DEFAULT_HOME = "#2"
 # The start position for new characters. Default is Limbo (#2).
 START_LOCATION = "#2"
-# Lookups of Attributes, Tags, Nicks, Aliases can be aggressively
-# cached to avoid repeated database hits. This often gives noticeable
-# performance gains since they are called so often. Drawback is that
-# if you are accessing the database from multiple processes (such as
-# from a website -not- running Evennia's own webserver) data may go
-# out of sync between the processes. Keep on unless you face such
-# issues.
+# Lookups of Attributes, Tags, Nicks, Aliases (and whether an object has
+# any Scripts) can be aggressively cached to avoid repeated database hits.
+# This often gives noticeable performance gains since they are called so
+# often. Drawback is that if you are accessing the database from multiple
+# processes (such as from a website -not- running Evennia's own webserver)
+# data may go out of sync between the processes. Keep on unless you face
+# such issues.
 TYPECLASS_AGGRESSIVE_CACHE = True
+# Attribute values made up only of basic Python types (str, int, float, bool,
+# None, lists, tuples, dicts and sets of those, and database objects) are
+# stored in a compact encoding that is faster to read and write than a pickle.
+# Other values are always pickled. Rows stored before are read either way.
+# Turn off to pickle all values.
+PICKLEFIELD_COMPACT_ENCODING = True
 # These are fallbacks for BASE typeclasses failing to load. Usually needed only
 # during doc building. The system expects these to *always* load correctly, so
 # only modify if you are making fundamental changes to how objects/accounts
@@ -656,6 +728,11 @@ HELP_CLICKABLE_TOPICS = True
 # so we need to make sure to tell Lunr to not filter them out by adding them here
 # (many are auto-added out of the box, this extends the list).
 LUNR_STOP_WORD_FILTER_EXCEPTIONS = []
+# Building the search index is the slow part of a help search, so built indexes
+# are kept and reused for as long as the help entries they cover don't change.
+# This is how many to keep (there is usually one per combination of cmdset and
+# help access among the players).
+HELP_SEARCH_INDEX_CACHE_SIZE = 32
 
 ######################################################################
 # FuncParser
@@ -1181,6 +1258,7 @@ SESSION_SYNC_ATTRS = (
     "protocol_flags",
     "server_data",
     "cmdset_storage_string",
+    "shard",
 )
 
 # The following are used for the communications between the Portal and Server.
@@ -6,18 +6,30 @@ Attributes are also used to implement Nicks. This module also contains
 the Attribute- and NickHandlers as well as the `NAttributeHandler`,
 which is a non-db version of Attributes.
 
+An Attribute can be *shared* between many objects, such as the Attributes
+all objects spawned from the same prototype get. A shared Attribute is only
+stored (and cached) once. Changing it on one object through its AttributeHandler
+(`obj.db.desc = ...`, `obj.db.stats["str"] += 1` etc) first copies it into a
+new Attribute only used by that object (copy-on-write). A shared Attribute
+is deleted when the last object using it is deleted or stops using it. See
+`AttributeHandler.batch_add`.
+
 
 """
+
 import fnmatch
 import re
 from collections import defaultdict
+from collections.abc import MutableMapping
+from weakref import WeakValueDictionary
 
 from django.conf import settings
 from django.db import models
 from django.utils.encoding import smart_str
 
 from evennia.locks.lockhandler import LockHandler
-from evennia.utils.dbserialize import from_pickle, to_pickle
+from evennia.server import invalidation
+from evennia.utils.dbserialize import batch_saves, from_pickle, to_pickle
 from evennia.utils.idmapper.models import SharedMemoryModel
 from evennia.utils.picklefield import PickledObjectField
 from evennia.utils.utils import is_iter, lazy_property, make_iter, to_str
@@ -378,6 +390,13 @@ class Attribute(IAttribute, SharedMemoryModel):
         null=True,
         help_text="Subclass of Attribute (None or nick)",
     )
+    # if this Attribute is shared between objects, and copied on write
+    db_shared = models.BooleanField(
+        "shared",
+        default=False,
+        help_text="If this Attribute is shared by many objects (like the objects spawned "
+        "from a prototype). It is copied to an object when changed on it.",
+    )
     # time stamp
     db_date_created = models.DateTimeField("date_created", editable=False, auto_now_add=True)
 
@@ -386,8 +405,12 @@ class Attribute(IAttribute, SharedMemoryModel):
 
     class Meta:
         "Define Django meta options"
+
         verbose_name = "Attribute"
 
+    # a value changed in-place inside a batch() block, waiting to be saved
+    _batched_value = None
+
     # Wrapper properties to easily set database fields. These are
     # @property decorators that allows to access these fields using
     # normal python operations (without having to remember to save()
@@ -417,8 +440,12 @@ class Attribute(IAttribute, SharedMemoryModel):
         Getter. Allows for `value = self.value`.
         We cannot cache here since it makes certain cases (such
         as storing a dbobj which is then deleted elsewhere) out-of-sync.
-        The overhead of unpickling seems hard to avoid.
+        The overhead of unpickling seems hard to avoid. The exception is a
+        value changed in-place inside a `batch()` block, which is returned
+        as-is until it's saved when the block ends.
         """
+        if self._batched_value is not None:
+            return self._batched_value
         return from_pickle(self.db_value, db_obj=self)
 
     @value.setter
@@ -427,6 +454,7 @@ class Attribute(IAttribute, SharedMemoryModel):
         Setter. Allows for self.value = value. We cannot cache here,
         see self.__value_get.
         """
+        self._batched_value = None
         self.db_value = to_pickle(new_value)
         self.save(update_fields=["db_value"])
 
@@ -539,6 +567,15 @@ class IAttributeBackend:
                 return [attr]  # return cached entity
             else:
                 return []  # no such attribute: return an empty list
+        elif (
+            _TYPECLASS_AGGRESSIVE_CACHE
+            and (self._cache_complete or "-%s" % category in self._catcache)
+            and invalidation.is_connected()
+        ):
+            # all Attributes (of this category) are cached, so there is no such
+            # Attribute. This needs the invalidation bus, which tells us of
+            # Attributes added by other processes; without it we check the database.
+            return []
         else:
             conn = self.query_key(key, category)
             if conn:
@@ -565,7 +602,7 @@ class IAttributeBackend:
             attrs (list): The discovered Attributes.
         """
         catkey = "-%s" % category
-        if _TYPECLASS_AGGRESSIVE_CACHE and catkey in self._catcache:
+        if _TYPECLASS_AGGRESSIVE_CACHE and (self._cache_complete or catkey in self._catcache):
             return [attr for key, attr in self._cache.items() if key.endswith(catkey) and attr]
         else:
             # we have to query to make this category up-date in the cache
@@ -622,6 +659,19 @@ class IAttributeBackend:
         """
         return self._get_cache(key, category)
 
+    def get_value(self, attr):
+        """
+        Get the value of an Attribute of this object.
+
+        Args:
+            attr (IAttribute): The Attribute.
+
+        Returns:
+            any: The value.
+
+        """
+        return attr.value
+
     def _set_cache(self, key, category, attr_obj):
         """
         Update cache.
@@ -768,6 +818,11 @@ class IAttributeBackend:
                 - (key, value, category, lockstring)
                 - (key, value, category, lockstring, default_access)
 
+        Keyword Args:
+            strattr (bool): If `True`, value must be a string.
+            shared (bool): If `True`, new Attributes are shared (see
+                `AttributeHandler.batch_add`).
+
         Raises:
             RuntimeError: If trying to pass a non-iterable as argument.
 
@@ -781,6 +836,7 @@ class IAttributeBackend:
         """
         new_attrobjs = []
         strattr = kwargs.get("strattr", False)
+        shared = kwargs.get("shared", False) and not strattr
         for tup in args:
             if not is_iter(tup) or len(tup) < 2:
                 raise RuntimeError("batch_add requires iterables as arguments (got %r)." % tup)
@@ -796,6 +852,10 @@ class IAttributeBackend:
                 attr_obj = attr_objs[0]
                 # update an existing attribute object
                 self.do_batch_update_attribute(attr_obj, category, lockstring, new_value, strattr)
+            elif shared:
+                new_attr = self.do_get_shared_attribute(keystr, category, lockstring, new_value)
+                self._set_cache(keystr, category, new_attr)
+                new_attrobjs.append(new_attr)
             else:
                 new_attr = self.do_create_attribute(
                     keystr, category, lockstring, new_value, strvalue=strattr
@@ -804,6 +864,25 @@ class IAttributeBackend:
         if new_attrobjs:
             self.do_batch_finish(new_attrobjs)
 
+    def do_get_shared_attribute(self, key, category, lockstring, value):
+        """
+        Get (or create) an Attribute shared by all objects given the same
+        Attribute this way. Backends not supporting shared Attributes just
+        create a new Attribute.
+
+        Args:
+            key (str): The Attribute's key.
+            category (str or None): The Attribute's category, or None
+            lockstring (str): Any locks for the Attribute.
+            value (obj): The Value of the Attribute.
+
+        Returns:
+            attr (IAttribute): The Attribute. It is not yet added to this object;
+                that's done by `do_batch_finish`.
+
+        """
+        return self.do_create_attribute(key, category, lockstring, value, strvalue=False)
+
     def do_delete_attribute(self, attr):
         """
         Does the hard work of actually deleting things.
@@ -988,6 +1067,62 @@ class InMemoryAttributeBackend(IAttributeBackend):
         self._category_storage[attr.category].remove(attr)
 
 
+# {(model, attrtype, key, category, lockstring, stored value): shared Attribute}
+_SHARED_ATTRIBUTES = WeakValueDictionary()
+
+
+def delete_unused_shared_attributes(through, attrs):
+    """
+    Delete shared Attributes that are no longer linked to any object. This is
+    called after unlinking shared Attributes from an object.
+
+    Args:
+        through (Model): The m2m through-model linking the Attributes to their objects.
+        attrs (list): The shared Attributes that were unlinked.
+
+    """
+    used = set(through.objects.filter(attribute__in=attrs).values_list("attribute_id", flat=True))
+    for attr in attrs:
+        if attr.id not in used:
+            attr.delete()
+
+
+class _SharedAttributeWriter:
+    """
+    Stands in for a shared Attribute as the Attribute a mutable value (like a
+    `_SaverDict`) read from it saves itself to. So changing the value in-place
+    copies the Attribute to the object instead of changing it for all objects.
+
+    """
+
+    # a value changed in-place inside a batch() block, waiting to be saved
+    _batched_value = None
+
+    def __init__(self, backend, attr):
+        self.backend = backend
+        self.attr = attr
+
+    @property
+    def pk(self):
+        return self.attr.pk
+
+    @property
+    def value(self):
+        return self.backend.get_value(self.attr)
+
+    @value.setter
+    def value(self, new_value):
+        self._batched_value = None
+        if self.attr.db_shared:
+            # the shared Attribute is deleted if this was its last object
+            key, category = self.attr.key, self.attr.category
+            self.backend.update_attribute(self.attr, new_value)
+            # from now on, save to the object's own copy
+            self.attr = self.backend.get(key, category)[0]
+        else:
+            self.attr.value = new_value
+
+
 class ModelAttributeBackend(IAttributeBackend):
     """
     Uses Django models for storing Attributes.
@@ -999,6 +1134,8 @@ class ModelAttributeBackend(IAttributeBackend):
     def __init__(self, handler, attrtype):
         super().__init__(handler, attrtype)
         self._model = to_str(handler.obj.__dbclass__.__name__.lower())
+        # {attr id: _SharedAttributeWriter} for the shared Attributes read
+        self._shared_writers = {}
 
     def query_all(self):
         query = {
@@ -1008,7 +1145,9 @@ class ModelAttributeBackend(IAttributeBackend):
         }
         return [
             conn.attribute
-            for conn in getattr(self.obj, self._m2m_fieldname).through.objects.filter(**query)
+            for conn in getattr(self.obj, self._m2m_fieldname)
+            .through.objects.filter(**query)
+            .select_related("attribute")
         ]
 
     def query_key(self, key, category):
@@ -1032,7 +1171,9 @@ class ModelAttributeBackend(IAttributeBackend):
         }
         return [
             conn.attribute
-            for conn in getattr(self.obj, self._m2m_fieldname).through.objects.filter(**query)
+            for conn in getattr(self.obj, self._m2m_fieldname)
+            .through.objects.filter(**query)
+            .select_related("attribute")
         ]
 
     def do_create_attribute(self, key, category, lockstring, value, strvalue):
@@ -1055,7 +1196,65 @@ class ModelAttributeBackend(IAttributeBackend):
         self._set_cache(key, category, new_attr)
         return new_attr
 
+    def get_value(self, attr):
+        if attr.db_shared:
+            writer = self._shared_writers.get(attr.id)
+            if writer is None:
+                writer = self._shared_writers[attr.id] = _SharedAttributeWriter(self, attr)
+            if writer._batched_value is not None:
+                return writer._batched_value
+            return from_pickle(attr.db_value, db_obj=writer)
+        return attr.value
+
+    def do_get_shared_attribute(self, key, category, lockstring, value):
+        lockstring = lockstring if lockstring else ""
+        value = to_pickle(value)
+        stored = Attribute._meta.get_field("db_value").get_db_prep_value(value)
+        cachekey = (self._model, self._attrtype, key, category, lockstring, stored)
+        attr = _SHARED_ATTRIBUTES.get(cachekey)
+        if attr is None or Attribute.get_cached_instance(attr.pk) is not attr:
+            # not looked up yet, or flushed from the idmapper cache since
+            attr = Attribute.objects.filter(
+                db_shared=True,
+                db_model=self._model,
+                db_attrtype=self._attrtype,
+                db_key=key,
+                db_category=category,
+                db_lock_storage=lockstring,
+                db_value=value,
+            ).first()
+            if attr is None:
+                attr = Attribute(
+                    db_key=key,
+                    db_category=category,
+                    db_model=self._model,
+                    db_lock_storage=lockstring,
+                    db_attrtype=self._attrtype,
+                    db_value=value,
+                    db_shared=True,
+                )
+                attr.save()
+            _SHARED_ATTRIBUTES[cachekey] = attr
+        return attr
+
+    def _unshare_attribute(self, attr, category, lock_storage, value, strvalue):
+        """
+        Replace a shared Attribute on this object with a copy only used by this
+        object, with a new value.
+
+        """
+        m2m = getattr(self.obj, self._m2m_fieldname)
+        m2m.remove(attr)
+        self._shared_writers.pop(attr.id, None)
+        self._delete_cache(attr.key, attr.category)
+        new_attr = self.create_attribute(attr.key, category, lock_storage, value, strvalue=strvalue)
+        delete_unused_shared_attributes(m2m.through, [attr])
+        return new_attr
+
     def do_update_attribute(self, attr, value, strvalue):
+        if attr.db_shared:
+            self._unshare_attribute(attr, attr.category, attr.lock_storage, value, strvalue)
+            return
         if strvalue:
             attr.value = None
             attr.db_strvalue = value
@@ -1065,6 +1264,9 @@ class ModelAttributeBackend(IAttributeBackend):
         attr.save(update_fields=["db_strvalue", "db_value"])
 
     def do_batch_update_attribute(self, attr_obj, category, lock_storage, new_value, strvalue):
+        if attr_obj.db_shared:
+            self._unshare_attribute(attr_obj, category, lock_storage, new_value, strvalue)
+            return
         attr_obj.db_category = category
         attr_obj.db_lock_storage = lock_storage if lock_storage else ""
         if strvalue:
@@ -1082,13 +1284,149 @@ class ModelAttributeBackend(IAttributeBackend):
         getattr(self.obj, self._m2m_fieldname).add(*attr_objs)
 
     def do_delete_attribute(self, attr):
+        if attr.db_shared:
+            # other objects may still use it
+            m2m = getattr(self.obj, self._m2m_fieldname)
+            m2m.remove(attr)
+            self._shared_writers.pop(attr.id, None)
+            delete_unused_shared_attributes(m2m.through, [attr])
+            return
         try:
+            if invalidation.is_connected():
+                # unlink it first, so other processes are told that the Attributes of
+                # the object changed, not only that the Attribute was deleted
+                getattr(self.obj, self._m2m_fieldname).remove(attr)
             attr.delete()
         except AssertionError:
             # This could happen if the Attribute has already been deleted.
             pass
 
 
+def preload_attributes(objs, keys=None, category=None):
+    """
+    Load the Attributes of many objects with one query and put them in each
+    object's Attribute cache, so reading them from the objects afterwards
+    needs no more queries. This is what `.with_attributes()` on a queryset of
+    typeclassed entities uses.
+
+    Args:
+        objs (list): Typeclassed entities, all with the same database model.
+        keys (str or list, optional): Only load Attributes with these keys. If not
+            given, all Attributes of the objects are loaded.
+        category (str, optional): The category of the Attributes to load. Only
+            used together with `keys`.
+
+    Notes:
+        Keys given but not found are cached as missing on the objects. Nothing
+        is loaded if `settings.TYPECLASS_AGGRESSIVE_CACHE` is off, since there is
+        then no cache to load into.
+
+    """
+    objs = [obj for obj in make_iter(objs) if obj.pk]
+    if not objs or not _TYPECLASS_AGGRESSIVE_CACHE:
+        return
+    model = to_str(objs[0].__dbclass__.__name__.lower())
+    keys = [str(key).strip().lower() for key in make_iter(keys)] if keys else None
+    category = category.strip().lower() if category is not None else None
+
+    query = models.Q(
+        **{
+            "%s__id__in" % model: [obj.pk for obj in objs],
+            "attribute__db_model__iexact": model,
+            "attribute__db_attrtype": None,
+        }
+    )
+    if keys:
+        keyquery = models.Q()
+        for key in keys:
+            keyquery |= models.Q(attribute__db_key__iexact=key)
+        query &= keyquery & models.Q(attribute__db_category__iexact=category)
+
+    through = getattr(objs[0], ModelAttributeBackend._m2m_fieldname).through
+    attrs_by_obj = defaultdict(list)
+    for conn in through.objects.filter(query).select_related("attribute"):
+        attrs_by_obj[getattr(conn, "%s_id" % model)].append(conn.attribute)
+
+    for obj in objs:
+        backend = obj.attributes.backend
+        cache = {
+            f"{to_str(attr.key).lower()}-{attr.category.lower() if attr.category else None}": attr
+            for attr in attrs_by_obj[obj.pk]
+        }
+        if keys:
+            for key in keys:
+                backend._cache["%s-%s" % (key, category)] = cache.get("%s-%s" % (key, category))
+        else:
+            backend._cache = cache
+            backend._catcache = {}
+            backend._cache_complete = True
+
+
+class AttributeCategoryDict(MutableMapping):
+    """
+    A dict stored as one Attribute per key, all in the same category. Changing
+    (or adding or deleting) one key only writes that key's Attribute, instead of
+    re-saving the entire dict as when storing a dict in a single Attribute. Get
+    it with `obj.attributes.category_dict(category)`.
+
+    Keys must be non-empty strings and are case-insensitive, like Attribute keys.
+
+    """
+
+    def __init__(self, handler, category):
+        """
+        Args:
+            handler (AttributeHandler): The handler of the object to store on.
+            category (str): The category of the Attributes holding the keys.
+
+        """
+        self.handler = handler
+        self.category = category.strip().lower()
+
+    def _get(self, key):
+        """
+        Get the Attribute for a key, or None.
+
+        """
+        if not isinstance(key, str) or not key.strip():
+            # an empty key would make the backend match the whole category
+            return None
+        attr_objs = self.handler.backend.get(key, self.category)
+        return attr_objs[0] if attr_objs else None
+
+    def __getitem__(self, key):
+        attr_obj = self._get(key)
+        if attr_obj is None:
+            raise KeyError(key)
+        return attr_obj.value
+
+    def __setitem__(self, key, value):
+        if not isinstance(key, str):
+            raise TypeError(f"AttributeCategoryDict keys must be strings, not {type(key)}.")
+        if not key.strip():
+            # it could not be read back, see _get
+            raise ValueError("AttributeCategoryDict keys must not be empty.")
+        self.handler.add(key, value, category=self.category)
+
+    def __delitem__(self, key):
+        attr_obj = self._get(key)
+        if attr_obj is None:
+            raise KeyError(key)
+        self.handler.backend.delete_attribute(attr_obj)
+
+    def __contains__(self, key):
+        return self._get(key) is not None
+
+    def __iter__(self):
+        return iter([attr.key for attr in self.handler.backend.get(None, self.category)])
+
+    def __len__(self):
+        return len(self.handler.backend.get(None, self.category))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
 class AttributeHandler:
     """
     Handler for adding Attributes to the object.
@@ -1209,7 +1547,7 @@ class AttributeHandler:
         if strattr:
             ret = ret if return_obj else [attr.strvalue for attr in ret if attr]
         else:
-            ret = ret if return_obj else [attr.value for attr in ret if attr]
+            ret = ret if return_obj else [self.backend.get_value(attr) for attr in ret if attr]
 
         if return_list:
             return ret if ret else [default] if default is not None else []
@@ -1287,6 +1625,15 @@ class AttributeHandler:
                 will save the value without pickling which is less
                 flexible but faster to search (not often used except
                 internally).
+            shared (bool): If `True`, Attributes not already on the object
+                are shared with all other objects given the same Attribute
+                (same key, category, locks and value) this way, like the
+                objects spawned from the same prototype. A shared Attribute
+                is only stored and cached once. The first time it's changed
+                (or removed) on an object through this handler, the object
+                gets its own copy, leaving the other objects unaffected.
+                Changing the Attribute object itself changes it for all
+                objects sharing it. Can't be combined with `strattr`.
 
         Raises:
             RuntimeError: If trying to pass a non-iterable as argument.
@@ -1302,6 +1649,56 @@ class AttributeHandler:
         """
         self.backend.batch_add(*args, **kwargs)
 
+    def batch(self):
+        """
+        Get a context manager deferring the saving of in-place changes to
+        Attribute values, such as `obj.db.mydict["key"] = 1`, until the end of
+        the block. An Attribute changed many times in the block is then only
+        saved once.
+
+        Returns:
+            contextmanager: The context manager to use with `with`.
+
+        Example:
+        ::
+
+            with obj.attributes.batch():
+                for key in obj.db.inventory_counts:
+                    obj.db.inventory_counts[key] += 1
+
+        Notes:
+            This defers the saving of all Attributes changed in-place in the
+            block, not just the ones on this object. See
+            `evennia.utils.dbserialize.batch_saves`.
+
+        """
+        return batch_saves()
+
+    def category_dict(self, category):
+        """
+        Get a dict-like view of all Attributes of a category, where each key is
+        stored in its own Attribute. Use this instead of a dict in a single
+        Attribute for big dicts where one key is changed at a time, since then
+        only that key's Attribute has to be saved.
+
+        Args:
+            category (str): The category of the Attributes. This should not be
+                used for other Attributes on the object.
+
+        Returns:
+            AttributeCategoryDict: The dict view. It is backed by this handler,
+                so it reflects (and changes) the object's Attributes.
+
+        Example:
+        ::
+
+            counts = obj.attributes.category_dict("inventory_counts")
+            counts["arrow"] = 20
+            counts["arrow"] -= 1   # only saves the 'arrow' Attribute
+
+        """
+        return AttributeCategoryDict(self, category)
+
     def remove(
         self,
         key=None,
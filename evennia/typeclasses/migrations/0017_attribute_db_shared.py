@@ -0,0 +1,22 @@
+# Generated by Django 4.1.13 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("typeclasses", "0016_alter_attribute_id_alter_tag_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attribute",
+            name="db_shared",
+            field=models.BooleanField(
+                default=False,
+                help_text="If this Attribute is shared by many objects (like the objects spawned from a prototype). It is copied to an object when changed on it.",
+                verbose_name="shared",
+            ),
+        ),
+    ]
@@ -45,6 +45,7 @@ from evennia.typeclasses.attributes import (
     DbHolder,
     InMemoryAttributeBackend,
     ModelAttributeBackend,
+    delete_unused_shared_attributes,
 )
 from evennia.typeclasses.tags import (
     AliasHandler,
@@ -81,10 +82,15 @@ def call_at_first_save(sender, instance, created, **kwargs):
 
 def remove_attributes_on_delete(sender, instance, **kwargs):
     """
-    Wipe object's Attributes when it's deleted
+    Wipe object's Attributes when it's deleted. Shared Attributes are only
+    deleted if no other objects use them.
 
     """
-    instance.db_attributes.all().delete()
+    instance.db_attributes.filter(db_shared=False).delete()
+    shared = list(instance.db_attributes.filter(db_shared=True))
+    if shared:
+        instance.db_attributes.remove(*shared)
+        delete_unused_shared_attributes(instance.db_attributes.through, shared)
 
 
 # ------------------------------------------------------------
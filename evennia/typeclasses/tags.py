@@ -15,6 +15,7 @@ from django.conf import settings
 from django.db import models
 
 from evennia.locks.lockfuncs import perm as perm_lockfunc
+from evennia.server import invalidation
 from evennia.utils.utils import make_iter, to_str
 
 _TYPECLASS_AGGRESSIVE_CACHE = settings.TYPECLASS_AGGRESSIVE_CACHE
@@ -207,7 +208,9 @@ class TagHandler(object):
         }
         return [
             conn.tag
-            for conn in getattr(self.obj, self._m2m_fieldname).through.objects.filter(**query)
+            for conn in getattr(self.obj, self._m2m_fieldname)
+            .through.objects.filter(**query)
+            .select_related("tag")
         ]
 
     def _fullcache(self):
@@ -265,6 +268,15 @@ class TagHandler(object):
                 del self._cache[cachekey]
             if tag:
                 return [tag]  # return cached entity
+            elif (
+                _TYPECLASS_AGGRESSIVE_CACHE
+                and (self._cache_complete or "-%s" % category in self._catcache)
+                and invalidation.is_connected()
+            ):
+                # all tags (of this category) are cached, so there is no such tag.
+                # This needs the invalidation bus, which tells us of tags added by
+                # other processes; without it we check the database.
+                return []
             else:
                 query = {
                     "%s__id" % self._model: self._objid,
@@ -284,7 +296,7 @@ class TagHandler(object):
             # assume the cache to be complete unless we have queried
             # for this category before
             catkey = "-%s" % category
-            if _TYPECLASS_AGGRESSIVE_CACHE and catkey in self._catcache:
+            if _TYPECLASS_AGGRESSIVE_CACHE and (self._cache_complete or catkey in self._catcache):
                 return [tag for key, tag in self._cache.items() if key.endswith(catkey)]
             else:
                 # we have to query to make this category up-date in the cache
@@ -296,9 +308,9 @@ class TagHandler(object):
                 }
                 tags = [
                     conn.tag
-                    for conn in getattr(self.obj, self._m2m_fieldname).through.objects.filter(
-                        **query
-                    )
+                    for conn in getattr(self.obj, self._m2m_fieldname)
+                    .through.objects.filter(**query)
+                    .select_related("tag")
                 ]
                 if _TYPECLASS_AGGRESSIVE_CACHE:
                     for tag in tags:
@@ -609,6 +621,83 @@ class TagHandler(object):
         return ",".join(self.all())
 
 
+# the handler on a typeclassed entity caching each type of Tag
+_TAG_HANDLERS = {None: "tags", "alias": "aliases", "permission": "permissions"}
+
+
+def preload_tags(objs, categories=None, tagtype=None):
+    """
+    Load the Tags of many objects with one query and put them in each object's
+    Tag cache, so checking them on the objects afterwards needs no more
+    queries. This is what `.with_tags()` on a queryset of typeclassed entities
+    uses.
+
+    Args:
+        objs (list): Typeclassed entities, all with the same database model.
+        categories (list, optional): Only load Tags of these categories (`None`
+            being the default category). If not given, all Tags are loaded.
+        tagtype (str, optional): The type of Tags to load; `None` for normal Tags
+            (`obj.tags`), `"alias"` for `obj.aliases` or `"permission"` for
+            `obj.permissions`.
+
+    Notes:
+        Nothing is loaded if `settings.TYPECLASS_AGGRESSIVE_CACHE` is off, since
+        there is then no cache to load into.
+
+    """
+    objs = [obj for obj in make_iter(objs) if obj.pk]
+    if not objs or not _TYPECLASS_AGGRESSIVE_CACHE:
+        return
+    handlername = _TAG_HANDLERS[tagtype]
+    model = objs[0].__dbclass__.__name__.lower()
+    if categories is not None:
+        categories = [
+            category.strip().lower() if category is not None else None
+            for category in make_iter(categories)
+        ]
+
+    query = models.Q(
+        **{
+            "%s__id__in" % model: [obj.pk for obj in objs],
+            "tag__db_model": model,
+            "tag__db_tagtype": tagtype,
+        }
+    )
+    if categories is not None:
+        catquery = models.Q(tag__db_category__in=[cat for cat in categories if cat is not None])
+        if None in categories:
+            catquery |= models.Q(tag__db_category__isnull=True)
+        query &= catquery
+
+    through = getattr(objs[0], TagHandler._m2m_fieldname).through
+    tags_by_obj = defaultdict(list)
+    for conn in through.objects.filter(query).select_related("tag"):
+        tags_by_obj[getattr(conn, "%s_id" % model)].append(conn.tag)
+
+    for obj in objs:
+        handler = getattr(obj, handlername)
+        cache = {
+            "%s-%s"
+            % (
+                to_str(tag.db_key).lower(),
+                tag.db_category.lower() if tag.db_category else None,
+            ): tag
+            for tag in tags_by_obj[obj.pk]
+        }
+        if categories is None:
+            handler._cache = cache
+            handler._catcache = {}
+            handler._cache_complete = True
+        else:
+            for category in categories:
+                catkey = "-%s" % category
+                handler._cache = {
+                    key: tag for key, tag in handler._cache.items() if not key.endswith(catkey)
+                }
+                handler._catcache[catkey] = True
+            handler._cache.update(cache)
+
+
 class AliasProperty(TagProperty):
     """
     Allows for setting aliases like Django fields:
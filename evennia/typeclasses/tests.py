@@ -8,6 +8,7 @@ from mock import patch
 from parameterized import parameterized
 
 from evennia.objects.objects import DefaultObject
+from evennia.typeclasses.attributes import Attribute
 from evennia.utils.test_resources import BaseEvenniaTest, EvenniaTestCase
 
 # ------------------------------------------------------------
@@ -112,6 +113,137 @@ class TestAttributes(BaseEvenniaTest):
         self.assertEqual(self.obj1.attributes.get("test"), None)
         self.assertEqual(self.obj1.attributes.get("test", strattr=True), "two")
 
+    def test_batch(self):
+        self.obj1.db.counts = {"a": 0, "b": 0}
+        attrobj = self.obj1.attributes.get("counts", return_obj=True)
+        with patch.object(attrobj, "save", wraps=attrobj.save) as mock_save:
+            with self.obj1.attributes.batch():
+                for _ in range(5):
+                    self.obj1.db.counts["a"] += 1
+                    self.obj1.db.counts["b"] += 2
+                with self.obj1.attributes.batch():
+                    self.obj1.db.counts["c"] = [1]
+                self.obj1.db.counts["c"].append(2)
+                mock_save.assert_not_called()
+                self.assertEqual(self.obj1.db.counts, {"a": 5, "b": 10, "c": [1, 2]})
+            mock_save.assert_called_once()
+        attrobj.flush_from_cache(force=True)
+        self.obj1.attributes.reset_cache()
+        self.assertEqual(self.obj1.db.counts, {"a": 5, "b": 10, "c": [1, 2]})
+
+    def test_batch_reassign(self):
+        self.obj1.db.counts = {"a": 0}
+        with self.obj1.attributes.batch():
+            self.obj1.db.counts["a"] = 1
+            self.obj1.db.counts = {"b": 1}
+        self.assertEqual(self.obj1.db.counts, {"b": 1})
+
+    def test_batch_error(self):
+        self.obj1.db.counts = {"a": 0}
+        with self.assertRaises(RuntimeError):
+            with self.obj1.attributes.batch():
+                self.obj1.db.counts["a"] = 1
+                raise RuntimeError("error")
+        self.obj1.attributes.get("counts", return_obj=True).flush_from_cache(force=True)
+        self.obj1.attributes.reset_cache()
+        self.assertEqual(self.obj1.db.counts, {"a": 1})
+
+    def test_category_dict(self):
+        counts = self.obj1.attributes.category_dict("counts")
+        counts["arrow"] = 20
+        counts["bag"] = {"gold": 1}
+        counts["arrow"] -= 1
+        counts["bag"]["gold"] += 1
+        self.assertEqual(counts, {"arrow": 19, "bag": {"gold": 2}})
+        self.assertEqual(self.obj1.attributes.get("arrow", category="counts"), 19)
+        self.assertIn("arrow", counts)
+        self.assertNotIn("", counts)
+        self.assertNotIn("sword", counts)
+        self.assertEqual(len(counts), 2)
+        del counts["arrow"]
+        self.assertEqual(dict(counts), {"bag": {"gold": 2}})
+        with self.assertRaises(KeyError):
+            counts["arrow"]
+        with self.assertRaises(KeyError):
+            del counts["arrow"]
+        self.assertIsNone(self.obj1.db.bag)
+        with self.assertRaises(TypeError):
+            counts[1] = 2
+        with self.assertRaises(ValueError):
+            counts[" "] = 2
+        self.assertEqual(len(counts), 1)
+
+    def test_category_dict_saves_one_key(self):
+        counts = self.obj1.attributes.category_dict("counts")
+        counts["arrow"] = 20
+        counts["sword"] = 1
+        arrow = self.obj1.attributes.get("arrow", category="counts", return_obj=True)
+        sword = self.obj1.attributes.get("sword", category="counts", return_obj=True)
+        with patch.object(sword, "save") as mock_save:
+            counts["arrow"] = 10
+            mock_save.assert_not_called()
+        self.assertEqual(arrow.value, 10)
+
+    def test_shared(self):
+        self.obj1.attributes.batch_add(("stats", {"str": 10}), ("desc", "A box."), shared=True)
+        self.obj2.attributes.batch_add(("stats", {"str": 10}), ("desc", "A box."), shared=True)
+        attr1 = self.obj1.attributes.get("stats", return_obj=True)
+        attr2 = self.obj2.attributes.get("stats", return_obj=True)
+        self.assertTrue(attr1.db_shared)
+        self.assertEqual(attr1.id, attr2.id)
+        self.assertEqual(self.obj2.db.stats, {"str": 10})
+
+        # changing it in-place copies it to the object
+        self.obj1.db.stats["str"] += 1
+        self.assertEqual(self.obj1.db.stats, {"str": 11})
+        self.assertEqual(self.obj2.db.stats, {"str": 10})
+        self.assertNotEqual(self.obj1.attributes.get("stats", return_obj=True).id, attr1.id)
+        self.assertFalse(self.obj1.attributes.get("stats", return_obj=True).db_shared)
+
+        # so does assigning to it
+        self.obj2.db.desc = "A crate."
+        self.assertEqual(self.obj2.db.desc, "A crate.")
+        self.assertEqual(self.obj1.db.desc, "A box.")
+
+        # removing it leaves it for the other objects
+        self.obj1.attributes.remove("desc")
+        self.obj1.attributes.reset_cache()
+        self.assertFalse(self.obj1.attributes.has("desc"))
+        self.assertEqual(self.char1.attributes.get("desc"), None)
+        self.char1.attributes.batch_add(("desc", "A box."), shared=True)
+        self.assertEqual(self.char1.db.desc, "A box.")
+
+    def test_shared_kept_on_delete(self):
+        self.obj1.attributes.batch_add(("desc", "A box."), shared=True)
+        self.obj2.attributes.batch_add(("desc", "A box."), shared=True)
+        attr = self.obj1.attributes.get("desc", return_obj=True)
+        self.obj1.delete()
+        self.assertTrue(Attribute.objects.filter(id=attr.id).exists())
+        self.assertEqual(self.obj2.db.desc, "A box.")
+
+        # the last object using it takes it along
+        self.obj2.delete()
+        self.assertFalse(Attribute.objects.filter(id=attr.id).exists())
+
+    def test_shared_deleted_when_unused(self):
+        self.obj1.attributes.batch_add(("desc", "A box."), ("stats", [1]), shared=True)
+        self.obj2.attributes.batch_add(("desc", "A box."), ("stats", [1]), shared=True)
+        desc = self.obj1.attributes.get("desc", return_obj=True)
+        stats = self.obj1.attributes.get("stats", return_obj=True)
+
+        self.obj1.attributes.remove("desc")
+        self.obj1.db.stats = [2]
+        self.assertEqual(Attribute.objects.filter(id__in=(desc.id, stats.id)).count(), 2)
+        self.obj2.attributes.remove("desc")
+        self.obj2.db.stats.append(2)
+        self.assertFalse(Attribute.objects.filter(id__in=(desc.id, stats.id)).exists())
+        self.assertEqual(self.obj2.db.stats, [1, 2])
+
+        # a new shared Attribute is made when needed again
+        self.obj1.attributes.batch_add(("desc", "A box."), shared=True)
+        self.assertNotEqual(self.obj1.attributes.get("desc", return_obj=True).id, desc.id)
+        self.assertEqual(self.obj1.db.desc, "A box.")
+
 
 class TestTypedObjectManager(BaseEvenniaTest):
     def _manager(self, methodname, *args, **kwargs):
@@ -213,6 +345,69 @@ class TestTypedObjectManager(BaseEvenniaTest):
         self.assertEqual(tagobj.db_category, "category4")
         self.assertEqual(tagobj.db_data, "data4")
 
+    def _preloaded(self, queryset):
+        for obj in (self.obj1, self.obj2):
+            obj.attributes.reset_cache()
+            obj.tags.reset_cache()
+            obj.aliases.reset_cache()
+        ids = [self.obj1.id, self.obj2.id]
+        return list(queryset.filter(id__in=ids).order_by("id"))
+
+    def test_with_attributes(self):
+        self.obj1.db.score = 10
+        self.obj1.attributes.add("score", 5, category="old")
+        self.obj2.db.name = "Bob"
+        manager = self.obj1.__class__.objects
+        with self.assertNumQueries(2):
+            obj1, obj2 = self._preloaded(manager.with_attributes("score", "rank"))
+        with self.assertNumQueries(0):
+            self.assertEqual(obj1.db.score, 10)
+            self.assertEqual(obj1.db.rank, None)
+            self.assertEqual(obj2.db.score, None)
+
+        with self.assertNumQueries(2):
+            obj1, obj2 = self._preloaded(manager.all().with_attributes())
+        with self.assertNumQueries(0), patch(
+            "evennia.server.invalidation.is_connected", return_value=True
+        ):
+            self.assertEqual(obj1.db.score, 10)
+            self.assertEqual(obj1.attributes.get("score", category="old"), 5)
+            self.assertEqual(obj1.attributes.get(category="old"), 5)
+            self.assertEqual(obj2.db.name, "Bob")
+            self.assertEqual(obj2.db.score, None)
+        # without the invalidation bus, another process may have added it
+        with self.assertNumQueries(1):
+            self.assertEqual(obj2.db.score, None)
+        with self.assertNumQueries(0):
+            self.assertEqual(obj2.db.score, None)
+
+    def test_with_tags(self):
+        self.obj1.tags.add("goblin", category="race")
+        self.obj1.tags.add("red")
+        self.obj2.aliases.add("gob")
+        manager = self.obj1.__class__.objects
+        with self.assertNumQueries(3):
+            obj1, obj2 = self._preloaded(manager.with_tags().with_tags(tagtype="alias"))
+        with self.assertNumQueries(0), patch(
+            "evennia.server.invalidation.is_connected", return_value=True
+        ):
+            self.assertEqual(obj1.tags.get("goblin", category="race"), "goblin")
+            self.assertEqual(obj1.tags.get("blue"), None)
+            self.assertEqual(sorted(obj1.tags.all()), ["goblin", "red"])
+            self.assertEqual(obj2.tags.all(), [])
+            self.assertIn("gob", obj2.aliases.all())
+
+        with self.assertNumQueries(2):
+            obj1, obj2 = self._preloaded(manager.all().with_tags("race"))
+        with self.assertNumQueries(0), patch(
+            "evennia.server.invalidation.is_connected", return_value=True
+        ):
+            self.assertEqual(obj1.tags.get(category="race"), "goblin")
+            self.assertEqual(obj2.tags.get("goblin", category="race"), None)
+        self.assertEqual(obj1.tags.get("red"), "red")
+        with self.assertNumQueries(1):
+            self.assertEqual(obj2.tags.get("goblin", category="race"), None)
+
 
 # setting up testing typeclass with child- and parent class
 class TestSearchManagerTypeclassParent(DefaultObject):
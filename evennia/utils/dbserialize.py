@@ -17,9 +17,17 @@ used by Attributes - without it, one would not be able to update mutables
 in-situ, e.g `obj.db.mynestedlist[3][5] = 3` would never be saved and
 be out of sync with the database.
 
+Every such update normally saves the whole Attribute value. Inside a
+`with batch_saves():` block (also available as `obj.attributes.batch()`), the
+saves are instead deferred until the block exits, so an Attribute changed many
+times in the block is only saved once.
+
 """
+
+import threading
 from collections import OrderedDict, defaultdict, deque
 from collections.abc import MutableMapping, MutableSequence, MutableSet
+from contextlib import contextmanager
 from functools import update_wrapper
 
 try:
@@ -34,7 +42,15 @@ from django.utils.safestring import SafeString
 from evennia.utils import logger
 from evennia.utils.utils import is_iter, to_bytes, uses_database
 
-__all__ = ("to_pickle", "from_pickle", "do_pickle", "do_unpickle", "dbserialize", "dbunserialize")
+__all__ = (
+    "to_pickle",
+    "from_pickle",
+    "do_pickle",
+    "do_unpickle",
+    "dbserialize",
+    "dbunserialize",
+    "batch_saves",
+)
 
 PICKLE_PROTOCOL = 2
 
@@ -151,6 +167,59 @@ def _save(method):
     return update_wrapper(save_wrapper, method)
 
 
+class _SaveBatch(threading.local):
+    """
+    The state of `batch_saves` blocks, separate for each thread.
+
+    """
+
+    def __init__(self):
+        self.depth = 0
+        # {id(attribute): (attribute, root _SaverMutable)}
+        self.pending = {}
+
+
+_SAVE_BATCH = _SaveBatch()
+
+
+@contextmanager
+def batch_saves():
+    """
+    Defer the saving of in-place changes to Attribute values (like
+    `obj.db.mydict["key"] = 3`) until the end of the block. Each changed
+    Attribute is then saved once, no matter how many times it was changed.
+    Blocks can be nested; the saves happen when the outermost block exits (also
+    if it exits with an error).
+
+    Example:
+    ::
+
+        with batch_saves():
+            for key in obj.db.inventory_counts:
+                obj.db.inventory_counts[key] += 1
+
+    Notes:
+        Assigning a whole new value to an Attribute (`obj.db.mydict = {}`) is
+        still saved right away; this also drops any deferred save of the old
+        value.
+
+    """
+    _SAVE_BATCH.depth += 1
+    try:
+        yield
+    finally:
+        _SAVE_BATCH.depth -= 1
+        if not _SAVE_BATCH.depth:
+            pending, _SAVE_BATCH.pending = _SAVE_BATCH.pending, {}
+            for db_obj, root in pending.values():
+                if getattr(db_obj, "_batched_value", None) is not root:
+                    # a new value was assigned in the meantime
+                    continue
+                db_obj._batched_value = None
+                if db_obj.pk:
+                    db_obj.value = root
+
+
 class _SaverMutable:
     """
     Parent class for properly handling  of nested mutables in
@@ -185,7 +254,13 @@ class _SaverMutable:
                         cls_name=cls_name, obj=self, non_saver_name=non_saver_name
                     )
                 )
-            self._db_obj.value = self
+            if _SAVE_BATCH.depth:
+                # save when the batch ends; until then the Attribute returns
+                # this (changed) value when read
+                self._db_obj._batched_value = self
+                _SAVE_BATCH.pending[id(self._db_obj)] = (self._db_obj, self)
+            else:
+                self._db_obj.value = self
         else:
             logger.log_err("_SaverMutable %s has no root Attribute to save to." % self)
 
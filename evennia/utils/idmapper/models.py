@@ -482,10 +482,13 @@ class SharedMemoryModel(Model, metaclass=SharedMemoryModelBase):
             # meta.fields are already field objects; get them all
             new = True
             update_fields = self._meta.fields
+        # only entities with monitors on them need to report their updates
+        monitored = _MONITOR_HANDLER.is_monitored(self)
         for field in update_fields:
             fieldname = field.name
-            # trigger eventual monitors
-            _MONITOR_HANDLER.at_update(self, fieldname)
+            if monitored:
+                # trigger eventual monitors
+                _MONITOR_HANDLER.at_update(self, fieldname)
             # if a hook is defined it must be named exactly on this form
             hookname = "at_%s_postsave" % fieldname
             if hasattr(self, hookname) and callable(_GA(self, hookname)):
@@ -6,20 +6,25 @@ are all directed either to stdout (if Evennia is running in
 interactive mode) or to $GAME_DIR/server/logs.
 
 The log_file() function uses its own threading system to log to
-arbitrary files in $GAME_DIR/server/logs.
+arbitrary files in $GAME_DIR/server/logs. Lines are buffered and written in
+batches by a background thread, and the latest lines of files that are tailed
+with tail_log_file() are kept in memory.
 
 Note: All logging functions have two aliases, log_type() and
 log_typemsg(). This is for historical, back-compatible reasons.
 
 """
 
-
+import atexit
 import os
+import threading
 import time
+from collections import deque
 from datetime import datetime
 from traceback import format_exc
 
 from twisted import logger as twisted_logger
+from twisted.internet.defer import succeed
 from twisted.internet.threads import deferToThread
 from twisted.python import logfile
 from twisted.python import util as twisted_util
@@ -398,7 +403,7 @@ class EvenniaLogFile(logfile.LogFile):
         if not append_tail:
             logfile.LogFile.rotate(self)
             return
-        lines = tail_log_file(self.path, 0, self.num_lines_to_append)
+        lines = _tail_filehandle(self, 0, self.num_lines_to_append)
         super().rotate()
         for line in lines:
             self.write(line)
@@ -486,6 +491,219 @@ def _open_log_file(filename):
     return None
 
 
+def _tail_filehandle(filehandle, offset, nlines):
+    """
+    Read lines from the end of an open log file.
+
+    Args:
+        filehandle (EvenniaLogFile): The log file.
+        offset (int): The line offset from the end of the file.
+        nlines (int): How many lines to get.
+
+    Returns:
+        list: The lines, as returned by `readlines`.
+
+    """
+    # step backwards in chunks and stop only when we have enough lines
+    lines_found = []
+    buffer_size = 4098
+    block_count = -1
+    while len(lines_found) < (offset + nlines):
+        try:
+            # scan backwards in file, starting from the end
+            filehandle.seek(block_count * buffer_size, os.SEEK_END)
+        except IOError:
+            # file too small for this seek, take what we've got
+            filehandle.seek(0)
+            lines_found = filehandle.readlines()
+            break
+        lines_found = filehandle.readlines()
+        block_count -= 1
+    # return the right number of lines
+    return lines_found[-nlines - offset : -offset if offset else None]
+
+
+class BufferedLogWriter:
+    """
+    Writes the lines logged with `log_file` to their files in batches, from a
+    background thread. A file is written to when `settings.LOG_FILE_FLUSH_SIZE`
+    bytes are waiting for it, or at the latest `settings.LOG_FILE_FLUSH_INTERVAL`
+    seconds after a line was logged. Anything left is written when the process
+    exits.
+
+    It also keeps the latest `settings.LOG_FILE_TAIL_CACHE_LINES` lines of every
+    file that has been tailed, so later tails don't need to read the file.
+
+    """
+
+    def __init__(self):
+        # protects the pending lines and the line caches
+        self.lock = threading.Condition()
+        # makes sure only one thread at a time uses the log files
+        self.file_lock = threading.RLock()
+        # {filename: [lines]} and {filename: total size} of lines not yet written
+        self.pending = {}
+        self.pending_size = {}
+        # {filename: deque} with the latest lines of the tailed files
+        self.recent = {}
+        # filenames whose cache holds all lines of the file
+        self.complete = set()
+        self.thread = None
+        self.flush_interval = None
+        self.flush_size = None
+        self.tail_cache_lines = None
+
+    def _start(self):
+        """
+        Start the writer thread, unless already running. Must be called
+        with the lock held.
+
+        """
+        if self.thread:
+            return
+        # we delay import of settings to keep logger module as free
+        # from django as possible.
+        from django.conf import settings
+
+        self.flush_interval = settings.LOG_FILE_FLUSH_INTERVAL
+        self.flush_size = settings.LOG_FILE_FLUSH_SIZE
+        self.tail_cache_lines = settings.LOG_FILE_TAIL_CACHE_LINES
+        self.thread = threading.Thread(target=self._run, name="evennia-log-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        """
+        The writer thread.
+
+        """
+        while True:
+            with self.lock:
+                self.lock.wait(self.flush_interval)
+            self.flush()
+
+    def _write(self, pending):
+        """
+        Write lines to their files.
+
+        Args:
+            pending (dict): `{filename: [line, ...]}`.
+
+        """
+        with self.file_lock:
+            for filename, lines in pending.items():
+                try:
+                    filehandle = _open_log_file(filename)
+                    if filehandle:
+                        filehandle.write("".join(lines))
+                        # since we don't close the handle, we need to flush
+                        # manually or log file won't be written to until the
+                        # write buffer is full.
+                        filehandle.flush()
+                except Exception:
+                    log_trace(f"Could not write to log file {filename}.")
+
+    def write(self, msg, filename):
+        """
+        Add a line to a log file. It's written to the file later.
+
+        Args:
+            msg (str): The line to log. It will be prefixed with the time.
+            filename (str): The file (within the log dir) to log to.
+
+        """
+        line = "\n%s [-] %s" % (timeformat(), msg.strip())
+        with self.lock:
+            self._start()
+            self.pending.setdefault(filename, []).append(line)
+            self.pending_size[filename] = self.pending_size.get(filename, 0) + len(line)
+            recent = self.recent.get(filename)
+            if recent is not None:
+                recent.extend(line[1:].split("\n"))
+            if self.pending_size[filename] >= self.flush_size:
+                self.lock.notify()
+
+    def flush(self, filename=None):
+        """
+        Write all pending lines to their files right away.
+
+        Args:
+            filename (str, optional): Only write the lines of this file.
+
+        """
+        with self.file_lock:
+            with self.lock:
+                if filename:
+                    pending = (
+                        {filename: self.pending.pop(filename)} if filename in self.pending else {}
+                    )
+                    self.pending_size.pop(filename, None)
+                else:
+                    pending, self.pending, self.pending_size = self.pending, {}, {}
+            self._write(pending)
+
+    def tail(self, filename, offset, nlines):
+        """
+        Get the latest lines of a log file from memory.
+
+        Args:
+            filename (str): The log file (within the log dir).
+            offset (int): The line offset from the end of the file.
+            nlines (int): How many lines to get.
+
+        Returns:
+            list or None: The lines (like `readlines` would return them), or
+            `None` if they are not all held in memory.
+
+        """
+        with self.file_lock:
+            with self.lock:
+                self._start()
+                recent = self.recent.get(filename)
+                if recent is None:
+                    # first time - load the end of the file. All lines logged so
+                    # far must be in the file for this
+                    self.flush(filename)
+                    filehandle = _open_log_file(filename)
+                    if not filehandle:
+                        return None
+                    lines = [
+                        line.rstrip("\n")
+                        for line in _tail_filehandle(filehandle, 0, self.tail_cache_lines + 1)
+                    ]
+                    if len(lines) <= self.tail_cache_lines:
+                        self.complete.add(filename)
+                    recent = self.recent[filename] = deque(lines, maxlen=self.tail_cache_lines)
+
+                nrecent = len(recent)
+                if offset + nlines > nrecent and (
+                    filename not in self.complete or nrecent == recent.maxlen
+                ):
+                    return None
+                end = max(0, nrecent - offset)
+                lines = [line + "\n" for line in list(recent)[max(0, end - nlines) : end]]
+        if lines and not offset:
+            # the last line of the file has no line break
+            lines[-1] = lines[-1][:-1]
+        return lines
+
+    def forget(self, filename):
+        """
+        Drop the cached lines of a file, such as after it was rotated.
+
+        Args:
+            filename (str): The log file (within the log dir).
+
+        """
+        with self.lock:
+            self.recent.pop(filename, None)
+            self.complete.discard(filename)
+
+
+# the global log writer
+LOG_WRITER = BufferedLogWriter()
+
+
 def log_file(msg, filename="game.log"):
     """
     Arbitrary file logger using threads.
@@ -496,25 +714,12 @@ def log_file(msg, filename="game.log"):
             will appear in the logs directory and log entries will start
             on new lines following datetime info.
 
-    """
+    Notes:
+        The line is written to the file by a background thread shortly after
+        (see `BufferedLogWriter`). Use `LOG_WRITER.flush()` to write it right away.
 
-    def callback(filehandle, msg):
-        """Writing to file and flushing result"""
-        msg = "\n%s [-] %s" % (timeformat(), msg.strip())
-        filehandle.write(msg)
-        # since we don't close the handle, we need to flush
-        # manually or log file won't be written to until the
-        # write buffer is full.
-        filehandle.flush()
-
-    def errback(failure):
-        """Catching errors to normal log"""
-        log_trace()
-
-    # save to server/logs/ directory
-    filehandle = _open_log_file(filename)
-    if filehandle:
-        deferToThread(callback, filehandle, msg).addErrback(errback)
+    """
+    LOG_WRITER.write(msg, filename)
 
 
 def log_file_exists(filename="game.log"):
@@ -550,9 +755,12 @@ def rotate_log_file(filename="game.log", num_lines_to_append=None):
 
     """
     if log_file_exists(filename):
-        file_handle = _open_log_file(filename)
-        if file_handle:
-            file_handle.rotate(num_lines_to_append=num_lines_to_append)
+        with LOG_WRITER.file_lock:
+            LOG_WRITER.flush(filename)
+            file_handle = _open_log_file(filename)
+            if file_handle:
+                file_handle.rotate(num_lines_to_append=num_lines_to_append)
+            LOG_WRITER.forget(filename)
 
 
 def tail_log_file(filename, offset, nlines, callback=None):
@@ -575,26 +783,16 @@ def tail_log_file(filename, offset, nlines, callback=None):
             otherwise it will be a list with The nline entries from the end of the file, or
             all if the file is shorter than nlines.
 
+    Notes:
+        The latest lines are usually served from memory by the `LOG_WRITER`;
+        the file is only read for lines further back than it remembers.
+
     """
 
     def seek_file(filehandle, offset, nlines, callback):
         """step backwards in chunks and stop only when we have enough lines"""
-        lines_found = []
-        buffer_size = 4098
-        block_count = -1
-        while len(lines_found) < (offset + nlines):
-            try:
-                # scan backwards in file, starting from the end
-                filehandle.seek(block_count * buffer_size, os.SEEK_END)
-            except IOError:
-                # file too small for this seek, take what we've got
-                filehandle.seek(0)
-                lines_found = filehandle.readlines()
-                break
-            lines_found = filehandle.readlines()
-            block_count -= 1
-        # return the right number of lines
-        lines_found = lines_found[-nlines - offset : -offset if offset else None]
+        with LOG_WRITER.file_lock:
+            lines_found = _tail_filehandle(filehandle, offset, nlines)
         if callback:
             callback(lines_found)
             return None
@@ -605,6 +803,14 @@ def tail_log_file(filename, offset, nlines, callback=None):
         """Catching errors to normal log"""
         log_trace()
 
+    lines = LOG_WRITER.tail(filename, offset, nlines)
+    if lines is not None:
+        if callback:
+            callback(lines)
+            return succeed(None)
+        return lines
+
+    LOG_WRITER.flush(filename)
     filehandle = _open_log_file(filename)
     if filehandle:
         if callback:
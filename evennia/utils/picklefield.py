@@ -27,7 +27,37 @@ Pickle field implementation for Django.
 
 Modified for Evennia by Griatch and the Evennia community.
 
+Values made up only of the basic Python types (str, int, float, bool, None and
+lists, tuples, dicts and sets of those, as well as packed database objects) are
+stored in a compact, versioned encoding instead of as base64-encoded pickles.
+Such a value starts with the header `~1` (which can't start a base64 string)
+followed by a type tag:
+
+- `~1s<text>` - str
+- `~1i<digits>` - int
+- `~1f<repr>` - float
+- `~1b1` / `~1b0` - bool
+- `~1j<json>` - any other value, as JSON, where the types JSON can't represent
+  are tagged as single-key dicts: `{"~t": [...]}` (tuple), `{"~s": [...]}`
+  (set), `{"~d": [[key, value], ...]}` (dict with keys that are not strings)
+  and `{"~o": [app_label, model, date_created, id]}` (packed database object).
+
+These are much quicker to encode and decode than pickles, and readable in the
+database. Everything else is pickled as before. Rows stored as pickles (such as
+all rows stored before the compact encoding was added) are still read as such
+and are converted to the compact encoding the next time they are saved. Set
+`settings.PICKLEFIELD_COMPACT_ENCODING = False` to only store pickles.
+
+The field always pickled what it saved, but a row written around it (like with
+raw SQL) could hold a plain string, which is returned as-is when read. Such a
+string starting with `~1` is now read as the compact encoding if it is a valid
+one (`~1shello` reads as `hello`) and only returned as-is otherwise. Check for
+such rows before upgrading, with `SELECT id FROM typeclasses_attribute WHERE
+db_value LIKE '~1%'`, and re-save their values through the field.
+
 """
+
+import json
 from ast import literal_eval
 from base64 import b64decode, b64encode
 from copy import Error as CopyError
@@ -37,8 +67,10 @@ from pickle import dumps, loads
 from zlib import compress, decompress
 
 # import six # this is actually a pypy component, not in default syslib
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import lookups
 from django.forms.fields import CharField
 from django.forms.widgets import Textarea
 from django.utils.encoding import force_str
@@ -47,6 +79,9 @@ from evennia.utils.dbserialize import pack_dbobj
 
 DEFAULT_PROTOCOL = 4
 
+# header of the compact encoding, followed by a one-letter type tag
+COMPACT_HEADER = "~1"
+
 
 class PickledObject(str):
     """
@@ -114,6 +149,133 @@ def dbsafe_decode(value, compress_object=False):
     return loads(value)
 
 
+class _NotCompact(Exception):
+    """
+    Raised for values that can't be stored in the compact encoding.
+
+    """
+
+
+def _to_compact_tree(item):
+    """
+    Convert a value to a structure that can be dumped to JSON, tagging the types
+    JSON doesn't have.
+
+    Raises:
+        _NotCompact: If the value contains anything but the supported types.
+
+    """
+    dtype = type(item)
+    if dtype is str or dtype is int or dtype is float or dtype is bool or item is None:
+        return item
+    elif dtype is list:
+        return [_to_compact_tree(val) for val in item]
+    elif dtype is tuple:
+        if (
+            len(item) == 4
+            and item[0] == "__packed_dbobj__"
+            and type(item[1]) is tuple
+            and len(item[1]) == 2
+        ):
+            return {"~o": [item[1][0], item[1][1], item[2], item[3]]}
+        return {"~t": [_to_compact_tree(val) for val in item]}
+    elif dtype is dict:
+        if all(type(key) is str and key[:1] != "~" for key in item):
+            return {key: _to_compact_tree(val) for key, val in item.items()}
+        return {"~d": [[_to_compact_tree(key), _to_compact_tree(val)] for key, val in item.items()]}
+    elif dtype is set:
+        return {"~s": [_to_compact_tree(val) for val in item]}
+    raise _NotCompact()
+
+
+def _from_compact_object(dct):
+    """
+    JSON object hook converting the tagged types back.
+
+    """
+    if len(dct) == 1:
+        key, val = next(iter(dct.items()))
+        if key == "~t":
+            return tuple(val)
+        elif key == "~o":
+            return ("__packed_dbobj__", (val[0], val[1]), val[2], val[3])
+        elif key == "~s":
+            return set(val)
+        elif key == "~d":
+            return dict(val)
+    return dct
+
+
+# reused, since json.dumps/loads create new ones when given options
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"))
+_JSON_DECODER = json.JSONDecoder()
+_JSON_TAGGED_DECODER = json.JSONDecoder(object_hook=_from_compact_object)
+
+
+def compact_encode(value):
+    """
+    Encode a value in the compact encoding, if possible.
+
+    Args:
+        value (any): The value to encode.
+
+    Returns:
+        str or None: The encoded value, or `None` if the value can't be stored
+            in the compact encoding (and must be pickled).
+
+    """
+    dtype = type(value)
+    try:
+        if dtype is str:
+            # strings with characters some databases can't store in a text
+            # column are escaped as JSON instead
+            if "\x00" not in value and (
+                value.isascii() or (max(value) <= "\uffff" and value.encode("utf-8"))
+            ):
+                return COMPACT_HEADER + "s" + value
+        elif dtype is int:
+            return COMPACT_HEADER + "i" + str(value)
+        elif dtype is float:
+            return COMPACT_HEADER + "f" + repr(value)
+        elif dtype is bool:
+            return COMPACT_HEADER + ("b1" if value else "b0")
+        # ensure_ascii escapes what a text column may not store
+        return COMPACT_HEADER + "j" + _JSON_ENCODER.encode(_to_compact_tree(value))
+    except (_NotCompact, ValueError, RecursionError):
+        # ValueError also covers too large ints and unencodable strings
+        return None
+
+
+def compact_decode(value):
+    """
+    Decode a value stored in the compact encoding.
+
+    Args:
+        value (str): The stored value, starting with `COMPACT_HEADER`.
+
+    Returns:
+        any: The decoded value.
+
+    Raises:
+        ValueError: If the value is not a valid compact encoding.
+
+    """
+    tag, data = value[2:3], value[3:]
+    if tag == "s":
+        return data
+    elif tag == "i":
+        return int(data)
+    elif tag == "j":
+        if '{"~' in data:
+            return _JSON_TAGGED_DECODER.decode(data)
+        return _JSON_DECODER.decode(data)
+    elif tag == "f":
+        return float(data)
+    elif tag == "b" and data in ("0", "1"):
+        return data == "1"
+    raise ValueError(f"Unknown compact encoding tag {tag!r}.")
+
+
 class PickledWidget(Textarea):
     """
     This is responsible for outputting HTML representing a given field.
@@ -211,8 +373,24 @@ class PickledObjectField(models.Field):
     def __init__(self, *args, **kwargs):
         self.compress = kwargs.pop("compress", False)
         self.protocol = kwargs.pop("protocol", DEFAULT_PROTOCOL)
+        # None means to follow settings.PICKLEFIELD_COMPACT_ENCODING
+        self.compact = kwargs.pop("compact", None)
         super().__init__(*args, **kwargs)
 
+    def use_compact(self):
+        """
+        Check if values should be stored in the compact encoding when possible.
+
+        Returns:
+            bool: If the compact encoding should be used.
+
+        """
+        if self.compress:
+            return False
+        if self.compact is None:
+            return settings.PICKLEFIELD_COMPACT_ENCODING
+        return self.compact
+
     def get_default(self):
         """
         Returns the default value for this field.
@@ -241,8 +419,18 @@ class PickledObjectField(models.Field):
         aren't sure if the value is a pickle or not, then we catch the
         error and return the original value instead.
 
+        A value starting with `COMPACT_HEADER` can never be a pickle (that
+        is base64), but a raw string stored outside of this field could
+        look like one. If it doesn't decode as compact, it's returned as-is,
+        like other values that don't unpickle.
+
         """
         if value is not None:
+            if value.startswith(COMPACT_HEADER):
+                try:
+                    return compact_decode(value)
+                except ValueError:
+                    return value
             try:
                 value = dbsafe_decode(value, self.compress)
             except Exception:
@@ -280,9 +468,34 @@ class PickledObjectField(models.Field):
             # marshaller (telling it to store it like it would a string), but
             # since both of these methods result in the same value being stored,
             # doing things this way is much easier.
-            value = force_str(dbsafe_encode(value, self.compress, self.protocol))
+            encoded = compact_encode(value) if self.use_compact() else None
+            if encoded is None:
+                encoded = force_str(dbsafe_encode(value, self.compress, self.protocol))
+            value = encoded
         return value
 
+    def get_lookup_encodings(self, value):
+        """
+        Get all the ways a value may be stored, for matching it in lookups.
+
+        Args:
+            value (any): The value to look for.
+
+        Returns:
+            list: The encoded values, as `PickledObject`s.
+
+        """
+        encodings = [PickledObject(force_str(dbsafe_encode(value, self.compress, self.protocol)))]
+        if not self.compress:
+            # rows may be in the compact encoding even if it's not used for new
+            # values right now; database objects are stored packed
+            encoded = compact_encode(value)
+            if encoded is None:
+                encoded = compact_encode(pack_dbobj(value))
+            if encoded is not None:
+                encodings.append(PickledObject(encoded))
+        return encodings
+
     def value_to_string(self, obj):
         value = self.value_from_object(obj)
         return self.get_db_prep_value(value)
@@ -298,3 +511,41 @@ class PickledObjectField(models.Field):
         return super().get_db_prep_lookup(
             lookup_type, value, connection=connection, prepared=prepared
         )
+
+
+@PickledObjectField.register_lookup
+class PickledIn(lookups.In):
+    """
+    `in` lookup matching each value whether it's stored pickled or in the
+    compact encoding.
+
+    """
+
+    def get_prep_lookup(self):
+        if self.rhs_is_direct_value() and self.rhs is not None:
+            field = self.lhs.output_field
+            self.rhs = [
+                encoded
+                for value in self.rhs
+                if value is not None
+                for encoded in field.get_lookup_encodings(value)
+            ]
+        return super().get_prep_lookup()
+
+
+@PickledObjectField.register_lookup
+class PickledExact(PickledIn):
+    """
+    `exact` lookup matching a value whether it's stored pickled or in the
+    compact encoding.
+
+    """
+
+    lookup_name = "exact"
+
+    def get_prep_lookup(self):
+        if self.rhs is None or hasattr(self.rhs, "resolve_expression"):
+            # a None rhs is turned into an isnull lookup by the query
+            return self.rhs
+        self.rhs = [self.rhs]
+        return super().get_prep_lookup()
@@ -257,9 +257,15 @@ class EvenniaTestMixin:
             SESSIONS.disconnect,
             settings.DEFAULT_HOME,
             settings.PROTOTYPE_MODULES,
+            SESSIONS.data_out_many,
         )
         SESSIONS.data_out = Mock()
         SESSIONS.disconnect = Mock()
+        SESSIONS.data_out_many = Mock(
+            side_effect=lambda sessions, **kwargs: [
+                SESSIONS.data_out(session, **kwargs) for session in sessions
+            ]
+        )
 
         self.create_accounts()
         self.create_rooms()
@@ -275,6 +281,7 @@ class EvenniaTestMixin:
             SESSIONS.disconnect = self.backups[1]
             settings.DEFAULT_HOME = self.backups[2]
             settings.PROTOTYPE_MODULES = self.backups[3]
+            SESSIONS.data_out_many = self.backups[4]
         except AttributeError as err:
             raise AttributeError(
                 f"{err}: Teardown error. If you overrode the `setUp()` method "
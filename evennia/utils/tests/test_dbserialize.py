@@ -3,12 +3,15 @@ Tests for dbserialize module
 """
 
 from collections import defaultdict, deque
+from datetime import datetime
 
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
 from parameterized import parameterized
 
 from evennia.objects.objects import DefaultObject
-from evennia.utils import dbserialize
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils import dbserialize, picklefield
 
 
 class TestDbSerialize(TestCase):
@@ -206,3 +209,127 @@ class DbObjWrappers(TestCase):
         self.assertEqual(self.dbobj1.db.dfdict["key"]["con1"].hidden_obj, self.dbobj2)
         self.assertEqual(self.dbobj1.db.dfdict["key"]["con2"].hidden_obj, self.dbobj2)
         self.assertEqual(self.dbobj1.db.dfdict["key"]["con2"].hidden_obj, self.dbobj2)
+
+
+class TestCompactEncoding(TestCase):
+    """
+    Test the compact encoding of Attribute values.
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.obj = DefaultObject(db_key="Tester")
+        self.obj.save()
+        self.obj2 = DefaultObject(db_key="Tester2")
+        self.obj2.save()
+
+    def _stored(self, key, obj=None):
+        """Get the Attribute value as stored in the database"""
+        attr = (obj or self.obj).attributes.get(key, return_obj=True)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT db_value FROM {Attribute._meta.db_table} WHERE id = %s", [attr.id]
+            )
+            return cursor.fetchone()[0]
+
+    def _store_pickled(self, key, value, obj=None):
+        """Store an Attribute value the way it was before the compact encoding"""
+        attr = (obj or self.obj).attributes.get(key, return_obj=True)
+        Attribute.objects.filter(id=attr.id).update(
+            db_value=picklefield.PickledObject(picklefield.dbsafe_encode(value))
+        )
+        attr.flush_from_cache(force=True)
+
+    @parameterized.expand(
+        [
+            ("str", "foo bar"),
+            ("unicode", "åäö"),
+            ("astral", "dragon \U0001f409"),
+            ("nul", "a\x00b"),
+            ("int", 42),
+            ("bigint", 2**80),
+            ("float", 1.5),
+            ("bool", False),
+            ("list", [1, "a", None, 2.5, True]),
+            ("tuple", (1, (2, 3))),
+            ("set", {1, 2, "a"}),
+            ("dict", {"a": [1, 2], "b": {"c": None}}),
+            ("intkeys", {1: "a", (2, 3): "b"}),
+            ("tildekey", {"~t": [1, 2]}),
+        ]
+    )
+    def test_roundtrip(self, _, value):
+        encoded = picklefield.compact_encode(value)
+        self.assertTrue(encoded.startswith(picklefield.COMPACT_HEADER))
+        decoded = picklefield.compact_decode(encoded)
+        self.assertEqual(decoded, value)
+        self.assertIs(type(decoded), type(value))
+
+    @parameterized.expand(
+        [
+            ("bytes", b"foo"),
+            ("nested_bytes", [1, b"foo"]),
+            ("defaultdict", defaultdict(list, {"a": [1]})),
+            ("deque", deque([1, 2])),
+            ("OrderedDict", dbserialize.OrderedDict([("a", 1)])),
+            ("datetime", [datetime(2000, 1, 1)]),
+            ("frozenset_key", {frozenset((1,)): 1}),
+        ]
+    )
+    def test_not_compact(self, _, value):
+        self.assertIsNone(picklefield.compact_encode(value))
+
+    def test_stored_compact(self):
+        self.obj.db.test = {"a": (1, 2), "b": self.obj2}
+        self.assertTrue(self._stored("test").startswith(picklefield.COMPACT_HEADER + "j"))
+        self.obj.attributes.reset_cache()
+        self.assertEqual(self.obj.db.test, {"a": (1, 2), "b": self.obj2})
+        self.obj.db.test2 = "foo"
+        self.assertEqual(self._stored("test2"), picklefield.COMPACT_HEADER + "sfoo")
+
+    def test_stored_pickled(self):
+        self.obj.db.test = deque([1, 2])
+        self.assertFalse(self._stored("test").startswith(picklefield.COMPACT_HEADER))
+        self.obj.attributes.reset_cache()
+        self.assertEqual(self.obj.db.test, deque([1, 2]))
+
+    def test_legacy_row(self):
+        self.obj.db.test = "placeholder"
+        self._store_pickled("test", [1, "two"])
+        self.obj.attributes.reset_cache()
+        self.assertEqual(self.obj.db.test, [1, "two"])
+        self.assertFalse(self._stored("test").startswith(picklefield.COMPACT_HEADER))
+        # converted when saved again
+        self.obj.db.test = [1, "two"]
+        self.assertTrue(self._stored("test").startswith(picklefield.COMPACT_HEADER))
+
+    def test_raw_row(self):
+        self.obj.db.test = "placeholder"
+        attr = self.obj.attributes.get("test", return_obj=True)
+        for raw in ("~1 not compact", "~1i1.5", "~1j{bad", "~1bx", "~1"):
+            Attribute.objects.filter(id=attr.id).update(db_value=picklefield.PickledObject(raw))
+            attr.flush_from_cache(force=True)
+            self.obj.attributes.reset_cache()
+            self.assertEqual(self.obj.db.test, raw)
+
+    def test_lookups(self):
+        self.obj.db.compact = "value"
+        self.obj2.db.legacy = "placeholder"
+        self._store_pickled("legacy", "value", obj=self.obj2)
+        self.assertEqual(Attribute.objects.filter(db_value="value").count(), 2)
+        self.assertEqual(Attribute.objects.filter(db_value__in=["value", "other"]).count(), 2)
+        self.assertEqual(Attribute.objects.filter(db_value="other").count(), 0)
+        self.assertEqual(
+            set(DefaultObject.objects.get_by_attribute(value="value")), {self.obj, self.obj2}
+        )
+
+    def test_lookup_dbobj(self):
+        self.obj.db.target = self.obj2
+        self.assertEqual(list(DefaultObject.objects.get_by_attribute(value=self.obj2)), [self.obj])
+
+    @override_settings(PICKLEFIELD_COMPACT_ENCODING=False)
+    def test_disabled(self):
+        self.obj.db.test = "foo"
+        self.assertFalse(self._stored("test").startswith(picklefield.COMPACT_HEADER))
+        self.assertEqual(Attribute.objects.filter(db_value="foo").count(), 1)
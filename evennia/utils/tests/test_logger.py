@@ -0,0 +1,94 @@
+"""
+Unit tests for the buffered file logging of the evennia.utils.logger module.
+
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from evennia.utils import logger
+
+
+@override_settings(
+    LOG_FILE_FLUSH_INTERVAL=60, LOG_FILE_FLUSH_SIZE=1000000, LOG_FILE_TAIL_CACHE_LINES=5
+)
+class TestBufferedLogWriter(TestCase):
+    def setUp(self):
+        self.logdir = tempfile.mkdtemp()
+        self.writer = logger.BufferedLogWriter()
+        patcher = mock.patch.multiple(
+            logger, _LOGDIR=self.logdir, _LOG_FILE_HANDLES={}, LOG_WRITER=self.writer
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for filehandle in logger._LOG_FILE_HANDLES.values():
+            filehandle.close()
+        shutil.rmtree(self.logdir)
+
+    def _read(self, filename="test.log"):
+        with open(os.path.join(self.logdir, filename)) as fil:
+            return fil.read()
+
+    def test_buffered_write(self):
+        logger.log_file("line 1", filename="test.log")
+        logger.log_file("line 2", filename="test.log")
+        logger.log_file("other", filename="other.log")
+        self.assertEqual(
+            self.writer.pending_size["test.log"], 2 * len(self.writer.pending["test.log"][0])
+        )
+        self.writer.flush("test.log")
+        self.assertNotIn("test.log", self.writer.pending)
+        self.assertIn("other.log", self.writer.pending)
+        lines = self._read().split("\n")
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith(" [-] line 1"))
+        self.assertTrue(lines[2].endswith(" [-] line 2"))
+        self.writer.flush()
+        self.assertEqual(self.writer.pending, {})
+        self.assertTrue(self._read("other.log").endswith(" [-] other"))
+
+    def test_tail_from_memory(self):
+        for inum in range(8):
+            logger.log_file(f"line {inum}", filename="test.log")
+        # first tail loads the end of the file, which means writing it
+        lines = logger.tail_log_file("test.log", 0, 3)
+        self.assertEqual(self.writer.pending, {})
+        self.assertEqual(
+            [line.split(" [-] ")[1] for line in lines], ["line 5\n", "line 6\n", "line 7"]
+        )
+        file_lines = self._read().split("\n")[-3:]
+        self.assertEqual(lines, [line + "\n" for line in file_lines[:-1]] + file_lines[-1:])
+
+        # later lines are added to the cache as they are logged
+        logger.log_file("line 8", filename="test.log")
+        with mock.patch("evennia.utils.logger._tail_filehandle") as mock_tail:
+            lines = logger.tail_log_file("test.log", 1, 2)
+            mock_tail.assert_not_called()
+        self.assertEqual([line.split(" [-] ")[1] for line in lines], ["line 6\n", "line 7\n"])
+        callback = mock.Mock()
+        logger.tail_log_file("test.log", 0, 1, callback=callback)
+        self.assertTrue(callback.call_args[0][0][0].endswith(" [-] line 8"))
+
+        # asking for more than is cached reads the file
+        lines = logger.tail_log_file("test.log", 0, 8)
+        self.assertEqual(len(lines), 8)
+        self.assertTrue(lines[0].endswith(" [-] line 1\n"))
+        self.assertTrue(lines[-1].endswith(" [-] line 8"))
+
+    def test_tail_short_file(self):
+        logger.log_file("line 1", filename="test.log")
+        logger.log_file("line 2", filename="test.log")
+        # the file starts with an empty line
+        self.assertEqual(len(logger.tail_log_file("test.log", 0, 20)), 3)
+        logger.log_file("line 3", filename="test.log")
+        with mock.patch("evennia.utils.logger._tail_filehandle") as mock_tail:
+            lines = logger.tail_log_file("test.log", 0, 20)
+            mock_tail.assert_not_called()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[-1].endswith(" [-] line 3"))
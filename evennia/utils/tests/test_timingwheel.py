@@ -0,0 +1,105 @@
+"""
+Unit tests for the evennia.utils.timingwheel module.
+
+"""
+
+import random
+from unittest import TestCase
+from unittest.mock import Mock
+
+from twisted.internet import task
+from twisted.internet.task import deferLater
+
+from evennia.utils.timingwheel import TimingWheel
+
+
+class TestTimingWheel(TestCase):
+    def setUp(self):
+        self.clock = task.Clock()
+        self.wheel = TimingWheel(self.clock, resolution=0.1, slots=8, levels=2)
+
+    def test_call_later(self):
+        func = Mock()
+        call = self.wheel.callLater(0.5, func, 1, foo=2)
+        self.assertTrue(call.active())
+        self.assertEqual(len(self.wheel), 1)
+        # the wheel uses one clock call, not one per wheel call
+        self.wheel.callLater(0.5, Mock())
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(0.4)
+        func.assert_not_called()
+        self.clock.advance(0.1)
+        func.assert_called_once_with(1, foo=2)
+        self.assertFalse(call.active())
+        self.assertEqual(len(self.wheel), 0)
+        # the wheel stops its clock call when idle
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+    def test_cancel(self):
+        func = Mock()
+        call = self.wheel.callLater(1, func)
+        call.cancel()
+        self.assertFalse(call.active())
+        self.assertEqual(len(self.wheel), 0)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+        self.clock.advance(2)
+        func.assert_not_called()
+        with self.assertRaises(RuntimeError):
+            call.cancel()
+
+    def test_far_and_random_delays(self):
+        # delays spread over all rings and the overflow (8 * 8 ticks = 6.4s)
+        fired = {}
+        delays = {}
+        calls = {}
+        rand = random.Random(4)
+
+        def fire(inum):
+            fired[inum] = self.clock.seconds()
+
+        for inum in range(300):
+            delays[inum] = round(rand.uniform(0, 20), 1)
+            calls[inum] = self.wheel.callLater(delays[inum], fire, inum)
+        cancelled = set(range(0, 300, 7))
+        for inum in cancelled:
+            calls[inum].cancel()
+        self.clock.pump([0.1] * 210)
+
+        self.assertEqual(set(fired), set(range(300)) - cancelled)
+        for inum, firetime in fired.items():
+            self.assertAlmostEqual(firetime, delays[inum], delta=1e-6)
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_catch_up(self):
+        # the clock calls the wheel late, all due calls run in order
+        fired = []
+        for delay in (0.3, 0.1, 5.0, 2.0):
+            self.wheel.callLater(delay, fired.append, delay)
+        self.wheel.clock = Mock(seconds=Mock(return_value=10.0))
+        self.wheel._advance()
+        self.assertEqual(fired, [0.1, 0.3, 2.0, 5.0])
+
+    def test_call_from_call(self):
+        fired = []
+
+        def reschedule():
+            fired.append(self.clock.seconds())
+            if len(fired) < 3:
+                self.wheel.callLater(1, reschedule)
+
+        self.wheel.callLater(1, reschedule)
+        self.clock.pump([0.5] * 10)
+        self.assertEqual(fired, [1.0, 2.0, 3.0])
+
+    def test_defer_later(self):
+        func = Mock(return_value="result")
+        deferred = deferLater(self.wheel, 1, func, "arg")
+        results = []
+        deferred.addCallback(results.append)
+        self.clock.advance(1)
+        self.assertEqual(results, ["result"])
+
+        deferred = deferLater(self.wheel, 1, func)
+        deferred.addErrback(lambda failure: None)
+        deferred.cancel()
+        self.assertEqual(len(self.wheel), 0)
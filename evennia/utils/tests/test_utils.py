@@ -10,7 +10,7 @@ import random
 from datetime import datetime, timedelta
 
 import mock
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from parameterized import parameterized
 from twisted.internet import task
 
@@ -497,6 +497,8 @@ class TestDelay(BaseEvenniaTest):
     def tearDown(self):
         super().tearDown()
         _TASK_HANDLER.clear()
+        _TASK_HANDLER.stale_timeout = 60
+        _TASK_HANDLER._now = False
 
     def test_call_early(self):
         # call a task early with call
@@ -703,6 +705,82 @@ class TestDelay(BaseEvenniaTest):
         )  # Clock must advance to trigger, even if past timedelay
         self.assertEqual(self.char1.ndb.dummy_var, "dummy_func ran")
 
+    def test_persistent_storage(self):
+        # each persistent task is stored in its own row
+        from evennia.server.models import ServerConfig
+
+        t1 = utils.delay(self.timedelay, dummy_func, self.char1.dbref, persistent=True)
+        t2 = utils.delay(self.timedelay, dummy_func, self.char1.dbref, persistent=True)
+        utils.delay(self.timedelay, dummy_func, self.char1.dbref)
+        keys = {f"delayed_task_{t1.get_id()}", f"delayed_task_{t2.get_id()}"}
+        stored = ServerConfig.objects.filter(db_key__startswith="delayed_task_")
+        self.assertEqual({conf.db_key for conf in stored}, keys)
+        t1.remove()
+        stored = ServerConfig.objects.filter(db_key__startswith="delayed_task_")
+        self.assertEqual([conf.db_key for conf in stored], [f"delayed_task_{t2.get_id()}"])
+
+        # loaded tasks are only unpacked when called
+        _TASK_HANDLER.clear(False)
+        _TASK_HANDLER.load()
+        self.assertEqual(list(_TASK_HANDLER.tasks), [t2.get_id()])
+        self.assertEqual(_TASK_HANDLER.unloaded, {t2.get_id()})
+        self.assertIsNone(_TASK_HANDLER.tasks[t2.get_id()][1])
+        self.assertTrue(_TASK_HANDLER.call_task(t2.get_id()))
+        self.assertEqual(_TASK_HANDLER.tasks[t2.get_id()][1], dummy_func)
+        self.assertEqual(_TASK_HANDLER.unloaded, set())
+
+    @mock.patch.multiple("evennia.server.shards", SHARDED=True, SHARDS=2, SHARD=1)
+    def test_sharded_task_ids(self):
+        # each shard uses its own task ids, so they never share a stored task
+        _TASK_HANDLER.clear()
+        t1 = utils.delay(self.timedelay, dummy_func, self.char1.dbref, persistent=True)
+        t2 = utils.delay(self.timedelay, dummy_func, self.char1.dbref, persistent=True)
+        self.assertEqual((t1.get_id(), t2.get_id()), (1, 3))
+        with mock.patch("evennia.server.shards.SHARD", 0):
+            t3 = utils.delay(self.timedelay, dummy_func, self.char1.dbref, persistent=True)
+            self.assertEqual(t3.get_id(), 2)
+
+            # a shard only loads and clears its own tasks
+            _TASK_HANDLER.clear(False)
+            _TASK_HANDLER.load()
+            self.assertEqual(list(_TASK_HANDLER.tasks), [2])
+            _TASK_HANDLER.clear()
+        _TASK_HANDLER.load()
+        self.assertEqual(sorted(_TASK_HANDLER.tasks), [1, 3])
+
+    def test_legacy_storage(self):
+        # tasks stored by older versions in one value are moved to one row each
+        from evennia.server.models import ServerConfig
+        from evennia.utils.dbserialize import dbserialize
+
+        date = datetime.now() + timedelta(seconds=self.timedelay)
+        ServerConfig.objects.conf(
+            "delayed_tasks", {5: dbserialize((date, dummy_func, [self.char1.dbref], {}))}
+        )
+        _TASK_HANDLER.load()
+        self.assertIsNone(ServerConfig.objects.conf("delayed_tasks"))
+        self.assertEqual(ServerConfig.objects.conf("delayed_task_5")[0], date)
+        _TASK_HANDLER.create_delays()
+        _TASK_HANDLER.clock.advance(self.timedelay)
+        self.assertEqual(self.char1.ndb.dummy_var, "dummy_func ran")
+        self.assertIsNone(ServerConfig.objects.conf("delayed_task_5"))
+
+
+@override_settings(DELAY_TIMING_WHEEL=True)
+class TestDelayTimingWheel(TestDelay):
+    """
+    Test utils.delay with tasks scheduled by a timing wheel.
+    """
+
+    def test_timing_wheel(self):
+        t = utils.delay(self.timedelay, dummy_func, self.char1.dbref)
+        self.assertEqual(len(_TASK_HANDLER.get_scheduler()), 1)
+        self.assertEqual(len(_TASK_HANDLER.clock.getDelayedCalls()), 1)
+        utils.delay(self.timedelay, dummy_func, self.char1.dbref)
+        self.assertEqual(len(_TASK_HANDLER.clock.getDelayedCalls()), 1)
+        t.cancel()
+        self.assertEqual(len(_TASK_HANDLER.get_scheduler()), 1)
+
 
 class TestIntConversions(TestCase):
     def test_int2str(self):
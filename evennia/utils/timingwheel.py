@@ -0,0 +1,293 @@
+"""
+Hierarchical timing wheel
+
+A timing wheel schedules many delayed calls using a single repeating reactor
+call, instead of one reactor call per delay. Adding and cancelling a call is
+O(1), compared to O(log n) for the reactor's heap of delayed calls, which makes
+a difference when there are very many short delays pending (cooldowns, buff
+expirations, respawns and so on). The cost is precision: calls are only run
+when the wheel ticks, so they may fire up to `resolution` seconds late.
+
+The wheel has `levels` rings of `slots` buckets each. A bucket of the first
+ring covers one tick (`resolution` seconds), a bucket of the second ring
+covers `slots` ticks and so on. Calls due further ahead than the last ring
+covers wait in an overflow bucket. As time passes, the calls of a higher ring's
+bucket are moved down into the finer rings, until they end up in the first ring
+and are run.
+
+The `TimingWheel` implements the `callLater` and `seconds` methods of Twisted's
+`IReactorTime`, so it can be used in place of the reactor, for example with
+`twisted.internet.task.deferLater`:
+
+```python
+from twisted.internet import reactor
+from twisted.internet.task import deferLater
+from evennia.utils.timingwheel import TimingWheel
+
+wheel = TimingWheel(reactor, resolution=0.1)
+delayed_call = wheel.callLater(5, print, "five seconds later")
+deferred = deferLater(wheel, 10, print, "ten seconds later")
+```
+
+The wheel only keeps its reactor call running while it has calls pending.
+The TaskHandler (and thus `utils.delay`) uses a timing wheel if
+`settings.DELAY_TIMING_WHEEL` is set.
+
+"""
+
+import math
+
+from twisted.internet import reactor
+
+from evennia.utils import logger
+
+# tolerance (in ticks) when converting times to ticks, against float rounding errors
+_EPSILON = 1e-6
+
+
+class WheelCall:
+    """
+    A call scheduled with a `TimingWheel`. This mimics Twisted's `DelayedCall`.
+
+    """
+
+    __slots__ = ("wheel", "due", "func", "args", "kwargs", "bucket", "called", "cancelled")
+
+    def __init__(self, wheel, due, func, args, kwargs):
+        self.wheel = wheel
+        self.due = due
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.bucket = None
+        self.called = False
+        self.cancelled = False
+
+    def getTime(self):
+        """
+        Get when the call is due.
+
+        Returns:
+            float: The time (in the wheel clock's `seconds`) the call is due.
+
+        """
+        return self.wheel.start + self.due * self.wheel.resolution
+
+    def cancel(self):
+        """
+        Cancel the call, so it won't be run.
+
+        Raises:
+            RuntimeError: If the call was already run or cancelled.
+
+        """
+        if self.cancelled or self.called:
+            raise RuntimeError(f"{self} was already {'cancelled' if self.cancelled else 'called'}.")
+        self.cancelled = True
+        self.wheel._unschedule(self)
+
+    def active(self):
+        """
+        Check if the call is still waiting to be run.
+
+        Returns:
+            bool: If the call has neither been run nor cancelled.
+
+        """
+        return not (self.called or self.cancelled)
+
+    def __repr__(self):
+        return f"<WheelCall {getattr(self.func, '__name__', self.func)} due tick {self.due}>"
+
+
+class TimingWheel:
+    """
+    Schedules delayed calls in a hierarchical timing wheel, driven by one
+    repeating call on a Twisted clock.
+
+    """
+
+    def __init__(self, clock=reactor, resolution=0.1, slots=64, levels=4):
+        """
+        Set up the wheel.
+
+        Args:
+            clock (IReactorTime, optional): The clock driving the wheel, usually
+                the reactor.
+            resolution (float, optional): The length of a tick in seconds. Calls
+                may run up to this much later than asked for.
+            slots (int, optional): The number of buckets in each ring.
+            levels (int, optional): The number of rings. Calls due later than
+                `resolution * slots ** levels` seconds wait in an overflow bucket.
+
+        """
+        self.clock = clock
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self.start = clock.seconds()
+        # the last tick processed
+        self.tick = 0
+        # rings of buckets, each bucket is a dict used as an ordered set
+        self.rings = [[{} for _ in range(slots)] for _ in range(levels)]
+        self.overflow = {}
+        # the number of ticks covered by one bucket of each ring
+        self.spans = [slots**level for level in range(levels + 1)]
+        self.npending = 0
+        self._clock_call = None
+
+    def __len__(self):
+        return self.npending
+
+    def seconds(self):
+        """
+        Get the current time.
+
+        Returns:
+            float: The current time of the wheel's clock.
+
+        """
+        return self.clock.seconds()
+
+    def _current_tick(self):
+        """
+        Get the tick the clock is at now.
+
+        """
+        return int((self.clock.seconds() - self.start) / self.resolution + _EPSILON)
+
+    def _place(self, call):
+        """
+        Put a call into the bucket matching how far ahead it is due.
+
+        Returns:
+            bool: False if the call is already due and was not placed.
+
+        """
+        delta = call.due - self.tick
+        if delta <= 0:
+            return False
+        for level, ring in enumerate(self.rings):
+            if delta < self.spans[level + 1]:
+                bucket = ring[(call.due // self.spans[level]) % self.slots]
+                break
+        else:
+            bucket = self.overflow
+        bucket[call] = None
+        call.bucket = bucket
+        return True
+
+    def _unschedule(self, call):
+        """
+        Remove a cancelled call from its bucket.
+
+        """
+        if call.bucket is not None:
+            del call.bucket[call]
+            call.bucket = None
+            self.npending -= 1
+            if not self.npending and self._clock_call and self._clock_call.active():
+                self._clock_call.cancel()
+                self._clock_call = None
+
+    def _schedule_tick(self):
+        """
+        Make sure the clock calls the wheel at the next tick.
+
+        """
+        if not self._clock_call or not self._clock_call.active():
+            next_tick = self.start + (self.tick + 1 - _EPSILON / 2) * self.resolution
+            self._clock_call = self.clock.callLater(
+                max(0, next_tick - self.clock.seconds()), self._advance
+            )
+
+    def callLater(self, delay, func, *args, **kwargs):
+        """
+        Schedule a call. This has the same call signature as the reactor's
+        `callLater`.
+
+        Args:
+            delay (float): Seconds until the call is run. It will be run at the
+                first tick at or after this time.
+            func (callable): The function to call.
+            *args, **kwargs: Passed to `func`.
+
+        Returns:
+            WheelCall: The scheduled call. Use its `cancel` method to cancel it.
+
+        """
+        if not self.npending:
+            # nothing is waiting, so skip ahead to now
+            self.tick = max(self.tick, self._current_tick())
+        due = math.ceil((self.clock.seconds() + delay - self.start) / self.resolution - _EPSILON)
+        due = max(self.tick + 1, due)
+        call = WheelCall(self, due, func, args, kwargs)
+        self._place(call)
+        self.npending += 1
+        self._schedule_tick()
+        return call
+
+    def _advance(self):
+        """
+        Process all ticks up to now. This is called by the clock.
+
+        """
+        self._clock_call = None
+        now_tick = self._current_tick()
+        while self.tick < now_tick and self.npending:
+            self.tick += 1
+            self._process_tick()
+        self.tick = max(self.tick, now_tick)
+        if self.npending:
+            self._schedule_tick()
+
+    def _process_tick(self):
+        """
+        Move calls down from the coarser rings and run the calls due this tick.
+
+        """
+        tick = self.tick
+        due_calls = []
+        if tick % self.spans[self.levels] == 0:
+            bucket, self.overflow = self.overflow, {}
+            for call in bucket:
+                if not self._place(call):
+                    due_calls.append(call)
+        for level in range(self.levels - 1, 0, -1):
+            if tick % self.spans[level] == 0:
+                ring = self.rings[level]
+                index = (tick // self.spans[level]) % self.slots
+                bucket, ring[index] = ring[index], {}
+                for call in bucket:
+                    if not self._place(call):
+                        due_calls.append(call)
+        ring = self.rings[0]
+        index = tick % self.slots
+        bucket, ring[index] = ring[index], {}
+        due_calls.extend(bucket)
+
+        for call in due_calls:
+            if call.cancelled:
+                # cancelled by an earlier call of this tick
+                continue
+            call.bucket = None
+            call.called = True
+            self.npending -= 1
+            try:
+                call.func(*call.args, **call.kwargs)
+            except Exception:
+                logger.log_trace(f"Error running {call}.")
+
+    def getDelayedCalls(self):
+        """
+        Get all calls waiting to be run.
+
+        Returns:
+            list: The pending `WheelCall`s, in no particular order.
+
+        """
+        calls = list(self.overflow)
+        for ring in self.rings:
+            for bucket in ring:
+                calls.extend(bucket)
+        return calls
@@ -10,7 +10,7 @@ from django.utils.text import slugify
 from django.views.generic import ListView
 
 from evennia.utils import class_from_module
-from evennia.utils.logger import tail_log_file
+from evennia.utils.logger import tail_log_file, timeformat
 
 from .mixins import TypeclassMixin
 from .objects import ObjectDetailView
@@ -127,22 +127,35 @@ class ChannelDetailView(ChannelMixin, ObjectDetailView):
         context = super().get_context_data(**kwargs)
         channel = self.object
 
-        # Get the filename this Channel is recording to
-        filename = channel.get_log_filename()
-
         # Split log entries so we can filter by time
         bucket = []
-        for log in (x.strip() for x in tail_log_file(filename, 0, self.max_num_lines)):
-            if not log:
-                continue
-            try:
-                time, msg = log.split(" [-] ")
-                time_key = time.split(":")[0]
-            except ValueError:
-                # malformed log line. Skip.
-                continue
-
-            bucket.append({"key": time_key, "timestamp": time, "message": msg})
+        if channel.store_history:
+            # read from the database history
+            for message in channel.get_history(nlines=self.max_num_lines):
+                time = timeformat(message.db_date_created.timestamp())
+                senders = f"{message.db_sender_names}: " if message.db_sender_names else ""
+                bucket.append(
+                    {
+                        "key": time.split(":")[0],
+                        "timestamp": time,
+                        "message": f"{senders}{message.db_message}",
+                    }
+                )
+        else:
+            # Get the filename this Channel is recording to
+            filename = channel.get_log_filename()
+
+            for log in (x.strip() for x in tail_log_file(filename, 0, self.max_num_lines)):
+                if not log:
+                    continue
+                try:
+                    time, msg = log.split(" [-] ")
+                    time_key = time.split(":")[0]
+                except ValueError:
+                    # malformed log line. Skip.
+                    continue
+
+                bucket.append({"key": time_key, "timestamp": time, "message": msg})
 
         # Add the processed entries to the context
         context["object_list"] = bucket